@@ -29,9 +29,13 @@ def create_app() -> Flask:
     app.config['SECRET_KEY'] = SecurityConfig.SECRET_KEY
 
     # 3. Configuración de Extensiones
-    # Inicializa el sistema de caché
+    # Inicializa el sistema de caché e invalida sus entradas ante escrituras
     from .extensions import cache
+    from .infrastructure.caching.config import CacheConfig
+    from .infrastructure.caching.invalidacion import registrar_invalidaciones
+    app.config.from_object(CacheConfig)
     cache.init_app(app)
+    registrar_invalidaciones()
     
     # Inicializa la conexión a la base de datos
     init_db(app)
@@ -43,6 +47,55 @@ def create_app() -> Flask:
     # Configura Flask-Migrate para manejar migraciones de la base de datos
     migrate = Migrate(app, db)
 
+    # Motor de métricas en memoria (si METRICAS_BACKEND lo selecciona)
+    from .infrastructure.analytics.motores import registrar_motor_analitico
+    registrar_motor_analitico(app)
+
+    # Precalentamiento de la caché del tablero (al arrancar y tras cada escritura)
+    from .infrastructure.caching.precalentador import registrar_precalentador
+    registrar_precalentador(app)
+
+    # Precarga de las etiquetas de StackExchange más solicitadas
+    from .infrastructure.external.precarga_stackexchange import registrar_precarga_stackexchange
+    registrar_precarga_stackexchange(app)
+
+    # Índices en memoria para autocompletar nombres de aerolíneas y aeropuertos
+    from .infrastructure.busqueda.autocompletado import registrar_autocompletado
+    registrar_autocompletado(app)
+
+    # Feed de cambios de vuelos para /api/vuelos/stream (en proceso o LISTEN/NOTIFY)
+    from .infrastructure.streaming.flujo_cambios import registrar_flujo_cambios
+    registrar_flujo_cambios(app)
+
+    # Pool acotado para reportes asíncronos (/api/jobs)
+    from .infrastructure.jobs.gestor import gestor_trabajos
+    gestor_trabajos.init_app(app)
+
+    # Comandos de línea de comandos (flask exportar-snapshot / construir-snapshot)
+    from .infrastructure.export.cli import construir_snapshot_mmap, exportar_snapshot
+    app.cli.add_command(exportar_snapshot)
+    app.cli.add_command(construir_snapshot_mmap)
+
+    # Trazas por petición, capa y sentencia SQL (primero, para que el span raíz lo cubra todo)
+    from .infrastructure.observability.trazas import registrar_trazas
+    registrar_trazas(app)
+
+    # Control de admisión: límites de concurrencia y tasa por clase de tráfico
+    from .infrastructure.admision.control import registrar_control_admision
+    registrar_control_admision(app)
+
+    # Registro de consultas lentas con captura asíncrona de EXPLAIN
+    from .infrastructure.observability.consultas_lentas import registrar_consultas_lentas
+    registrar_consultas_lentas()
+
+    # Perfilado bajo demanda de peticiones individuales (cabecera X-Perfilar)
+    from .infrastructure.observability.perfilado import registrar_perfilado
+    registrar_perfilado(app)
+
+    # Plazos por ruta: statement_timeout (SET LOCAL) por transacción y 504 al vencer
+    from .infrastructure.database.plazos import registrar_plazos
+    registrar_plazos(app)
+
     # 5. Registro de Blueprints
     # Importa y registra las rutas de la API
     from .api.routes import bp as api_blueprint
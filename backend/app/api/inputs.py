@@ -0,0 +1,48 @@
+# app/api/inputs.py
+"""Tipos reutilizables para los argumentos de reqparse de las rutas."""
+import base64
+from datetime import date
+from typing import Callable, Tuple
+
+MAX_IDS_LOTE = 1000
+# Registros por petición en las cargas masivas (upsert)
+MAX_REGISTROS_LOTE = 10000
+
+
+def lista_ids(valor: str) -> tuple:
+    """Convierte '1,2,3' en una tupla de enteros únicos, conservando el orden."""
+    try:
+        ids = tuple(dict.fromkeys(int(v) for v in valor.split(',') if v.strip()))
+    except ValueError:
+        raise ValueError("debe ser una lista de enteros separados por coma")
+    if not ids:
+        raise ValueError("la lista de ids no puede estar vacía")
+    if len(ids) > MAX_IDS_LOTE:
+        raise ValueError(f"Máximo {MAX_IDS_LOTE} ids por consulta")
+    return ids
+
+
+def entero_en_rango(minimo: int, maximo: int) -> Callable[[str], int]:
+    """Crea un tipo de argumento que acepta enteros en [minimo, maximo]."""
+    def validar(valor: str) -> int:
+        numero = int(valor)
+        if not minimo <= numero <= maximo:
+            raise ValueError(f"debe estar entre {minimo} y {maximo}")
+        return numero
+    validar.__name__ = f'entero_{minimo}_{maximo}'
+    return validar
+
+
+def codificar_cursor(*valores) -> str:
+    """Codifica la clave de la última fila de una página como cursor opaco."""
+    texto = '|'.join(v.isoformat() if isinstance(v, date) else str(v) for v in valores)
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> Tuple[str, ...]:
+    """Decodifica un cursor de `codificar_cursor` a sus partes en texto."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        return tuple(base64.urlsafe_b64decode(cursor + relleno).decode().split('|'))
+    except Exception:
+        raise ValueError("cursor inválido")
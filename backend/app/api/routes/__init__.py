@@ -21,6 +21,8 @@ from .aeropuertos import ns as aeropuertos_ns
 from .movimientos import ns as movimientos_ns
 from .vuelos import ns as vuelos_ns
 from .stackexchange import ns as stackexchange_ns
+from .admin import ns as admin_ns
+from .jobs import ns as jobs_ns
 
 # Registrar namespaces
 
@@ -29,4 +31,6 @@ api.add_namespace(aeropuertos_ns)
 api.add_namespace(movimientos_ns)
 api.add_namespace(vuelos_ns)
 api.add_namespace(stackexchange_ns)
+api.add_namespace(admin_ns)
+api.add_namespace(jobs_ns)
 
@@ -0,0 +1,264 @@
+import io
+import tempfile
+from flask import Response, send_file, stream_with_context
+from flask_restx import Namespace, Resource, inputs, reqparse
+from app.domain.repositories.vuelo_repository import VueloRepository
+from app.domain.services.vuelo_service import buffer_vuelos
+from app.infrastructure.admision.control import control_admision
+from app.infrastructure.admision.config import AdmisionConfig
+from app.infrastructure.analytics.motores import obtener_motor
+from app.infrastructure.analytics.snapshot_mmap import MotorMetricasSnapshot
+from app.infrastructure.busqueda.autocompletado import indice_aerolineas, indice_aeropuertos
+from app.infrastructure.caching.precalentador import precalentador
+from app.infrastructure.database.connection import db
+from app.infrastructure.database.escritura_agrupada import VUELOS_GROUP_COMMIT
+from app.infrastructure.database.plazos import estadisticas_plazos
+from app.infrastructure.export.snapshot_arrow import (
+    EXTENSIONES, FORMATOS, TIPOS_MIME, escribir_snapshot, generar_flujo_arrow, pyarrow_disponible
+)
+from app.infrastructure.external.precarga_stackexchange import precarga_stackexchange
+from app.infrastructure.observability.consultas_lentas import registro_consultas_lentas
+from app.infrastructure.observability.perfilado import perfilador
+from app.infrastructure.observability.pool_stats import estadisticas_pool
+from app.infrastructure.observability.trazas import exportador_trazas
+from app.infrastructure.security.admin import requiere_admin, ADMIN_HEADER
+from app.infrastructure.streaming.flujo_cambios import difusor_cambios, oyente_postgres, FLUJO_FUENTE
+
+ns = Namespace('admin', description='Endpoints de administración y observabilidad (requieren X-Admin-Token)',
+               decorators=[requiere_admin])
+
+snapshot_parser = reqparse.RequestParser()
+snapshot_parser.add_argument('formato', type=str, default='arrow-stream', choices=FORMATOS, location='args',
+                             help='arrow-stream (se envía por lotes), arrow (archivo IPC) o parquet')
+snapshot_parser.add_argument('desde', type=inputs.date, location='args', help='Fecha inicial (YYYY-MM-DD)')
+snapshot_parser.add_argument('hasta', type=inputs.date, location='args', help='Fecha final (YYYY-MM-DD)')
+
+consultas_lentas_parser = reqparse.RequestParser()
+consultas_lentas_parser.add_argument('orden', type=str, default='total_ms', location='args',
+                                     choices=('total_ms', 'max_ms', 'llamadas'), help='Criterio de orden')
+consultas_lentas_parser.add_argument('limite', type=inputs.int_range(1, 200), default=20, location='args',
+                                     help='Cantidad de sentencias (1-200)')
+
+
+@ns.route('/pool')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class PoolConexiones(Resource):
+    @ns.doc('get_pool_stats')
+    def get(self):
+        """Estadísticas en vivo del pool de conexiones a la base de datos"""
+        return estadisticas_pool.resumen(db.engine.pool)
+
+
+@ns.route('/admision')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class EstadoAdmision(Resource):
+    @ns.doc('get_admission_stats')
+    def get(self):
+        """Límites por clase de tráfico, peticiones en curso y rechazos (429/503) de este proceso"""
+        return {'habilitado': AdmisionConfig.ADMISION_HABILITADA, 'clases': control_admision.resumen()}
+
+
+@ns.route('/plazos')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class PlazosConsultas(Resource):
+    @ns.doc('get_deadline_stats')
+    def get(self):
+        """Plazos configurados por ruta y cuántas peticiones los excedieron (504)"""
+        return estadisticas_plazos.resumen()
+
+
+@ns.route('/consultas-lentas')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class ConsultasLentas(Resource):
+    @ns.doc('list_slow_queries')
+    @ns.expect(consultas_lentas_parser)
+    def get(self):
+        """Sentencias SQL más lentas de este proceso, con su origen en los repositorios y resumen del plan"""
+        args = consultas_lentas_parser.parse_args()
+        return {**registro_consultas_lentas.resumen(),
+                'consultas': registro_consultas_lentas.top(args['orden'], args['limite'])}
+
+    @ns.doc('reset_slow_queries')
+    @ns.response(204, 'Registro vaciado')
+    def delete(self):
+        """Vacía el registro de consultas lentas"""
+        registro_consultas_lentas.limpiar()
+        return None, 204
+
+
+@ns.route('/consultas-lentas/<string:huella>')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+@ns.response(404, 'Consulta no registrada')
+class ConsultaLenta(Resource):
+    @ns.doc('get_slow_query')
+    def get(self, huella):
+        """Sentencia lenta con su plan completo de EXPLAIN (ANALYZE, BUFFERS)"""
+        consulta = registro_consultas_lentas.obtener(huella)
+        if consulta is None:
+            return {"error": "Consulta no registrada"}, 404
+        return consulta
+
+
+@ns.route('/trazas')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class EstadoTrazas(Resource):
+    @ns.doc('get_tracing_stats')
+    def get(self):
+        """Configuración de muestreo y métricas del exportador de trazas de este proceso"""
+        return exportador_trazas.resumen()
+
+
+@ns.route('/perfiles')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class PerfilList(Resource):
+    @ns.doc('list_request_profiles')
+    def get(self):
+        """Últimos perfiles de peticiones guardados por este proceso (más recientes primero)"""
+        return {**perfilador.resumen(), 'perfiles': perfilador.listar()}
+
+
+@ns.route('/perfiles/<string:id>')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+@ns.response(404, 'Perfil no encontrado')
+class PerfilDetail(Resource):
+    @ns.doc('get_request_profile')
+    def get(self, id):
+        """Perfil de una petición: sentencias SQL con su duración y funciones más costosas"""
+        perfil = perfilador.obtener(id)
+        if perfil is None:
+            return {"error": "Perfil no encontrado o descartado"}, 404
+        return perfil
+
+
+@ns.route('/perfiles/<string:id>/pstats')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+@ns.response(404, 'Perfil no encontrado')
+class PerfilPstats(Resource):
+    @ns.doc('download_request_profile_pstats')
+    def get(self, id):
+        """Descarga el perfil en formato pstats (python -m pstats, snakeviz)"""
+        datos = perfilador.obtener_pstats(id)
+        if datos is None:
+            return {"error": "Perfil no encontrado o descartado"}, 404
+        return send_file(io.BytesIO(datos), mimetype='application/octet-stream',
+                         as_attachment=True, download_name=f'perfil_{id}.prof')
+
+
+@ns.route('/vuelos/group-commit')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class GroupCommitVuelos(Resource):
+    @ns.doc('get_group_commit_stats')
+    def get(self):
+        """Métricas del buffer de group commit de vuelos (lotes, filas por lote y duración del commit)"""
+        return {'habilitado': VUELOS_GROUP_COMMIT, **buffer_vuelos.resumen()}
+
+
+@ns.route('/cache/precalentador')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class PrecalentadorCache(Resource):
+    @ns.doc('get_cache_warmer_stats')
+    def get(self):
+        """Métricas del precalentador de caché (ejecuciones, errores y lag)"""
+        return precalentador.resumen()
+
+    @ns.doc('trigger_cache_warmup')
+    def post(self):
+        """Solicita un precalentamiento inmediato de los payloads del tablero"""
+        precalentador.solicitar()
+        return {"mensaje": "Precalentamiento solicitado"}, 202
+
+
+@ns.route('/autocompletado')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class EstadoAutocompletado(Resource):
+    @ns.doc('get_autocomplete_index_stats')
+    def get(self):
+        """Tamaño, antigüedad y latencia de los índices de autocompletado de este proceso"""
+        return {'aerolineas': indice_aerolineas.resumen(), 'aeropuertos': indice_aeropuertos.resumen()}
+
+
+@ns.route('/flujo')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class EstadoFlujo(Resource):
+    @ns.doc('get_change_stream_stats')
+    def get(self):
+        """Conexiones SSE, eventos difundidos y estado del LISTEN de este proceso"""
+        estado = difusor_cambios.resumen()
+        if FLUJO_FUENTE == 'postgres':
+            estado['listen'] = oyente_postgres.resumen()
+        return estado
+
+
+@ns.route('/stackexchange/precarga')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class PrecargaStackExchange(Resource):
+    @ns.doc('get_stackexchange_prefetch_stats')
+    def get(self):
+        """Tasa de aciertos, uso de la cuota y etiquetas precargadas de StackExchange"""
+        return precarga_stackexchange.resumen()
+
+
+@ns.route('/metricas/consistencia')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class ConsistenciaMetricas(Resource):
+    @ns.doc('check_metrics_engine_consistency')
+    def get(self):
+        """Compara las métricas del motor en memoria contra la base de datos"""
+        motor = obtener_motor()
+        if motor is None:
+            return {"error": "El motor de métricas en memoria no está habilitado (METRICAS_BACKEND=sql)"}, 409
+        return motor.verificar_consistencia(VueloRepository.obtener_metricas_sql())
+
+
+@ns.route('/metricas/reconstruir')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class ReconstruirMetricas(Resource):
+    @ns.doc('rebuild_metrics_engine')
+    def post(self):
+        """Recarga el motor de métricas en memoria desde la base de datos"""
+        motor = obtener_motor()
+        if motor is None:
+            return {"error": "El motor de métricas en memoria no está habilitado (METRICAS_BACKEND=sql)"}, 409
+        motor.reconstruir()
+        return {"mensaje": "Motor de métricas reconstruido"}, 200
+
+
+@ns.route('/metricas/snapshot')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class EstadoSnapshot(Resource):
+    @ns.doc('get_mmap_snapshot_state')
+    def get(self):
+        """Estado del snapshot mapeado en memoria por el worker que atiende la petición"""
+        motor = obtener_motor()
+        if not isinstance(motor, MotorMetricasSnapshot):
+            return {"error": "El backend de métricas no es snapshot (METRICAS_BACKEND=snapshot)"}, 409
+        return motor.estado()
+
+
+@ns.route('/snapshot')
+@ns.header(ADMIN_HEADER, 'Token de administración', required=True)
+class SnapshotVuelos(Resource):
+    @ns.doc('export_flights_snapshot')
+    @ns.expect(snapshot_parser)
+    def get(self):
+        """Exporta los vuelos con sus dimensiones en formato Arrow o Parquet"""
+        if not pyarrow_disponible():
+            return {"error": "La exportación requiere pyarrow (requirements-analytics.txt)"}, 501
+        args = snapshot_parser.parse_args()
+        desde = args['desde'].date() if args['desde'] else None
+        hasta = args['hasta'].date() if args['hasta'] else None
+        formato = args['formato']
+        nombre = f"vuelos_{desde or 'inicio'}_{hasta or 'fin'}.{EXTENSIONES[formato]}"
+
+        if formato == 'arrow-stream':
+            return Response(
+                stream_with_context(generar_flujo_arrow(desde, hasta)),
+                mimetype=TIPOS_MIME[formato],
+                headers={'Content-Disposition': f'attachment; filename={nombre}'}
+            )
+
+        # El archivo IPC y Parquet escriben su pie al final: se generan en disco y se envían completos
+        archivo = tempfile.TemporaryFile()
+        escribir_snapshot(archivo, formato, desde, hasta)
+        archivo.seek(0)
+        return send_file(archivo, mimetype=TIPOS_MIME[formato], as_attachment=True, download_name=nombre)
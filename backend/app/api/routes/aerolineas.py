@@ -1,6 +1,9 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, inputs, reqparse
 from app.domain.services.aerolinea_service import AerolineaService
 from app.domain.repositories.aerolinea_repository import AerolineaRepository
+from app.api.inputs import lista_ids, entero_en_rango
+from app.infrastructure.admision.control import clase_trafico
+from app.infrastructure.database.plazos import plazo_consulta
 
 ns = Namespace('aerolineas', description='Operaciones con aerolíneas')
 # Inicializar el servicio
@@ -24,6 +27,45 @@ estadisticas_model = ns.model('EstadisticasAerolinea', {
     })))
 })
 
+estadisticas_lote_model = ns.model('EstadisticasAerolineasLote', {
+    'resultados': fields.List(fields.Nested(estadisticas_model)),
+    'no_encontradas': fields.List(fields.Integer, description='IDs solicitados que no existen')
+})
+
+carga_aerolineas_model = ns.model('CargaAerolineas', {
+    'registros': fields.List(fields.Nested(ns.model('AerolineaCarga', {
+        'id_aerolinea': fields.Integer(required=True),
+        'nombre_aerolinea': fields.String(required=True)
+    })), required=True, description='Aerolíneas a insertar o actualizar por ID')
+})
+
+resultado_carga_model = ns.model('ResultadoCargaAerolineas', {
+    'insertados': fields.Integer,
+    'actualizados': fields.Integer,
+    'sin_cambios': fields.Integer,
+    'total': fields.Integer
+})
+
+estadisticas_lote_parser = reqparse.RequestParser()
+estadisticas_lote_parser.add_argument('ids', type=lista_ids, location='args',
+                                      help='IDs separados por coma (omitir para todas las aerolíneas)')
+estadisticas_lote_parser.add_argument('top', type=entero_en_rango(1, 50), default=5, location='args',
+                                      help='Aeropuertos frecuentes por aerolínea (default: 5)')
+
+sugerencia_model = ns.model('SugerenciaAerolinea', {
+    'id_aerolinea': fields.Integer,
+    'nombre_aerolinea': fields.String,
+    'coincidencia': fields.String(description="'prefijo' o 'difusa' (similitud de trigramas)")
+})
+
+autocompletar_parser = reqparse.RequestParser()
+autocompletar_parser.add_argument('q', type=str, required=True, location='args',
+                                  help='Texto escrito por el usuario')
+autocompletar_parser.add_argument('limite', type=entero_en_rango(1, 50), default=10, location='args',
+                                  help='Máximo de sugerencias (default: 10)')
+autocompletar_parser.add_argument('difuso', type=inputs.boolean, default=True, location='args',
+                                  help='Completar con coincidencias aproximadas (default: true)')
+
 @ns.route('/')
 class AerolineaList(Resource):
     @ns.doc('list_aerolineas')
@@ -39,6 +81,31 @@ class AerolineaList(Resource):
         """Crea una nueva aerolínea"""
         return aerolinea_service.crear_aerolinea(ns.payload)
 
+@ns.route('/lote')
+class AerolineaCargaMasiva(Resource):
+    @clase_trafico('masiva')
+    @ns.doc('upsert_aerolineas')
+    @ns.expect(carga_aerolineas_model)
+    @ns.response(200, 'Lote aplicado', resultado_carga_model)
+    def post(self):
+        """Inserta o actualiza aerolíneas en lote por ID (INSERT ... ON CONFLICT)"""
+        return aerolinea_service.sincronizar_aerolineas(
+            ns.payload.get('registros') if isinstance(ns.payload, dict) else None
+        )
+
+@ns.route('/autocompletar')
+class AutocompletarAerolineas(Resource):
+    @ns.doc('autocomplete_aerolineas')
+    @ns.expect(autocompletar_parser)
+    @ns.response(200, 'Sugerencias', [sugerencia_model])
+    def get(self):
+        """Sugiere aerolíneas por prefijo del nombre y, si faltan, por similitud"""
+        args = autocompletar_parser.parse_args()
+        resultado = aerolinea_service.autocompletar(args['q'], args['limite'], args['difuso'])
+        if isinstance(resultado, tuple):
+            return resultado
+        return ns.marshal(resultado, sugerencia_model)
+
 @ns.route('/<int:id>')
 @ns.response(404, 'Aerolínea no encontrada')
 @ns.param('id', 'ID de la aerolínea')
@@ -66,8 +133,22 @@ class AerolineaResource(Resource):
 @ns.response(404, 'Aerolínea no encontrada')
 @ns.param('id', 'ID de la aerolínea')
 class AerolineaEstadisticas(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('aerolineas.estadisticas')
     @ns.doc('get_airline_stats')
     @ns.marshal_with(estadisticas_model)
     def get(self, id):
         """Obtiene estadísticas de una aerolínea"""
-        return aerolinea_service.obtener_estadisticas(id)
\ No newline at end of file
+        return aerolinea_service.obtener_estadisticas(id)
+
+@ns.route('/estadisticas')
+class AerolineasEstadisticasLote(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('aerolineas.estadisticas_lote')
+    @ns.doc('get_airlines_stats_batch')
+    @ns.expect(estadisticas_lote_parser)
+    @ns.marshal_with(estadisticas_lote_model)
+    def get(self):
+        """Obtiene estadísticas de varias aerolíneas (?ids=1,2,3) o de todas"""
+        args = estadisticas_lote_parser.parse_args()
+        return aerolinea_service.obtener_estadisticas_lote(args['ids'], args['top'])
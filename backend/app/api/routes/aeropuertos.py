@@ -1,6 +1,9 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, reqparse, inputs
 from app.domain.services.aeropuerto_service import AeropuertoService
 from app.domain.repositories.aeropuerto_repository import AeropuertoRepository
+from app.api.inputs import entero_en_rango
+from app.infrastructure.admision.control import clase_trafico
+from app.infrastructure.database.plazos import plazo_consulta
 
 ns = Namespace('aeropuertos', description='Operaciones con aeropuertos')
 
@@ -12,6 +15,50 @@ aeropuerto_model = ns.model('Aeropuerto', {
     'nombre_aeropuerto': fields.String(required=True)
 })
 
+serie_model = ns.model('SerieTraficoAeropuerto', {
+    'aeropuerto': fields.Nested(aeropuerto_model),
+    'granularidad': fields.String(),
+    'desde': fields.String(description='Inicio del primer bucket (YYYY-MM-DD)'),
+    'hasta': fields.String(description='Fin del último bucket (YYYY-MM-DD)'),
+    'timestamps': fields.List(fields.String, description='Inicio de cada bucket'),
+    'salidas': fields.List(fields.Integer),
+    'llegadas': fields.List(fields.Integer)
+})
+
+carga_aeropuertos_model = ns.model('CargaAeropuertos', {
+    'registros': fields.List(fields.Nested(ns.model('AeropuertoCarga', {
+        'id_aeropuerto': fields.Integer(required=True),
+        'nombre_aeropuerto': fields.String(required=True)
+    })), required=True, description='Aeropuertos a insertar o actualizar por ID')
+})
+
+resultado_carga_model = ns.model('ResultadoCargaAeropuertos', {
+    'insertados': fields.Integer,
+    'actualizados': fields.Integer,
+    'sin_cambios': fields.Integer,
+    'total': fields.Integer
+})
+
+serie_parser = reqparse.RequestParser()
+serie_parser.add_argument('granularidad', type=str, default='dia', choices=('dia', 'semana', 'mes'),
+                          location='args', help='Tamaño del bucket: dia, semana o mes')
+serie_parser.add_argument('desde', type=inputs.date, location='args', help='Fecha inicial (YYYY-MM-DD)')
+serie_parser.add_argument('hasta', type=inputs.date, location='args', help='Fecha final (YYYY-MM-DD)')
+
+sugerencia_model = ns.model('SugerenciaAeropuerto', {
+    'id_aeropuerto': fields.Integer,
+    'nombre_aeropuerto': fields.String,
+    'coincidencia': fields.String(description="'prefijo' o 'difusa' (similitud de trigramas)")
+})
+
+autocompletar_parser = reqparse.RequestParser()
+autocompletar_parser.add_argument('q', type=str, required=True, location='args',
+                                  help='Texto escrito por el usuario')
+autocompletar_parser.add_argument('limite', type=entero_en_rango(1, 50), default=10, location='args',
+                                  help='Máximo de sugerencias (default: 10)')
+autocompletar_parser.add_argument('difuso', type=inputs.boolean, default=True, location='args',
+                                  help='Completar con coincidencias aproximadas (default: true)')
+
 @ns.route('/')
 class AeropuertoList(Resource):
     @ns.doc('lista_aeropuertos')
@@ -27,13 +74,40 @@ class AeropuertoList(Resource):
         """Crea un nuevo aeropuerto"""
         return aeropuerto_service.crear_aeropuerto(ns.payload)
 
+@ns.route('/lote')
+class AeropuertoCargaMasiva(Resource):
+    @clase_trafico('masiva')
+    @ns.doc('upsert_aeropuertos')
+    @ns.expect(carga_aeropuertos_model)
+    @ns.response(200, 'Lote aplicado', resultado_carga_model)
+    def post(self):
+        """Inserta o actualiza aeropuertos en lote por ID (INSERT ... ON CONFLICT)"""
+        return aeropuerto_service.sincronizar_aeropuertos(
+            ns.payload.get('registros') if isinstance(ns.payload, dict) else None
+        )
+
 @ns.route('/mas_ocupado')
 class AeropuertoMasOcupado(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('aeropuertos.mas_ocupado')
     @ns.doc('get_busiest_airport')
     def get(self):
         """Obtiene el aeropuerto con más movimiento"""
         return aeropuerto_service.obtener_mas_ocupado()
 
+@ns.route('/autocompletar')
+class AutocompletarAeropuertos(Resource):
+    @ns.doc('autocomplete_aeropuertos')
+    @ns.expect(autocompletar_parser)
+    @ns.response(200, 'Sugerencias', [sugerencia_model])
+    def get(self):
+        """Sugiere aeropuertos por prefijo del nombre y, si faltan, por similitud"""
+        args = autocompletar_parser.parse_args()
+        resultado = aeropuerto_service.autocompletar(args['q'], args['limite'], args['difuso'])
+        if isinstance(resultado, tuple):
+            return resultado
+        return ns.marshal(resultado, sugerencia_model)
+
 @ns.route('/<int:id>')
 @ns.response(404, 'Aeropuerto no encontrado')
 @ns.param('id', 'ID del aeropuerto')
@@ -48,7 +122,30 @@ class AeropuertoDetail(Resource):
 @ns.response(404, 'Aeropuerto no encontrado')
 @ns.param('id', 'ID del aeropuerto')
 class AeropuertoEstadisticas(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('aeropuertos.estadisticas')
     @ns.doc('get_airport_stats')
     def get(self, id):
         """Obtiene estadísticas detalladas del aeropuerto"""
-        return aeropuerto_service.obtener_estadisticas(id)
\ No newline at end of file
+        return aeropuerto_service.obtener_estadisticas(id)
+
+@ns.route('/<int:id>/serie')
+@ns.response(404, 'Aeropuerto no encontrado')
+@ns.param('id', 'ID del aeropuerto')
+class AeropuertoSerie(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('aeropuertos.serie')
+    @ns.doc('get_airport_traffic_series')
+    @ns.expect(serie_parser)
+    def get(self, id):
+        """Obtiene la serie temporal de salidas y llegadas del aeropuerto"""
+        args = serie_parser.parse_args()
+        resultado = aeropuerto_service.obtener_serie(
+            id,
+            args['granularidad'],
+            args['desde'].date() if args['desde'] else None,
+            args['hasta'].date() if args['hasta'] else None
+        )
+        if isinstance(resultado, tuple):
+            return resultado
+        return ns.marshal(resultado, serie_model)
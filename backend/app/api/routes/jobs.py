@@ -0,0 +1,55 @@
+from flask import url_for
+from flask_restx import Namespace, Resource, fields
+from app.domain.services.trabajo_service import TrabajoService
+
+ns = Namespace('jobs', description='Reportes costosos ejecutados como trabajos asíncronos')
+
+# Inicializar el servicio
+trabajo_service = TrabajoService()
+
+solicitud_model = ns.model('SolicitudTrabajo', {
+    'tipo': fields.String(required=True, enum=list(trabajo_service.tipos),
+                          description='metricas, estadisticas_aerolineas, estadisticas_movimientos o serie_aeropuerto'),
+    'parametros': fields.Raw(description='estadisticas_aerolineas: {ids, top}; '
+                                         'serie_aeropuerto: {id_aeropuerto, granularidad, desde, hasta}')
+})
+
+trabajo_model = ns.model('Trabajo', {
+    'id': fields.String(),
+    'tipo': fields.String(),
+    'parametros': fields.Raw(),
+    'estado': fields.String(description='pendiente, ejecutando, completado o fallido'),
+    'creado': fields.Float(description='Epoch en segundos'),
+    'iniciado': fields.Float(),
+    'terminado': fields.Float(),
+    'resultado': fields.Raw(description='Mismo cuerpo que el endpoint síncrono (solo si completado)'),
+    'error': fields.String(),
+    'codigo': fields.Integer(description='Código HTTP que habría devuelto el endpoint síncrono')
+})
+
+@ns.route('/')
+class TrabajoList(Resource):
+    @ns.doc('submit_job')
+    @ns.expect(solicitud_model)
+    @ns.response(202, 'Trabajo encolado', trabajo_model)
+    @ns.response(200, 'Ya había un trabajo idéntico en curso', trabajo_model)
+    @ns.response(503, 'Cola de trabajos llena')
+    def post(self):
+        """Encola un reporte y devuelve el ID del trabajo de inmediato"""
+        payload = ns.payload or {}
+        resultado, codigo = trabajo_service.enviar(payload.get('tipo'), payload.get('parametros'))
+        if codigo == 503:
+            return resultado, codigo, {'Retry-After': '5'}
+        if codigo in (200, 202):
+            return resultado, codigo, {'Location': url_for('api.jobs_trabajo_detail', id=resultado['id'])}
+        return resultado, codigo
+
+@ns.route('/<string:id>')
+@ns.param('id', 'ID del trabajo')
+@ns.response(404, 'Trabajo no encontrado o expirado')
+class TrabajoDetail(Resource):
+    @ns.doc('get_job')
+    @ns.response(200, 'Estado del trabajo', trabajo_model)
+    def get(self, id):
+        """Consulta el estado y, si terminó, el resultado de un trabajo"""
+        return trabajo_service.obtener(id)
@@ -1,6 +1,8 @@
 from flask_restx import Namespace, Resource, fields
 from app.domain.services.movimiento_service import MovimientoService
 from app.domain.repositories.movimiento_repository import MovimientoRepository
+from app.infrastructure.admision.control import clase_trafico
+from app.infrastructure.database.plazos import plazo_consulta
 
 ns = Namespace('movimientos', description='Operaciones con movimientos de vuelos')
 
@@ -66,6 +68,8 @@ class MovimientoList(Resource):
 
 @ns.route('/estadisticas')
 class MovimientoEstadisticas(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('movimientos.estadisticas')
     @ns.doc('get_movements_stats')
     @ns.marshal_with(estadisticas_generales_model)
     def get(self):
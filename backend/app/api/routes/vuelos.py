@@ -1,6 +1,11 @@
-from flask_restx import Namespace, Resource, fields
+from flask import Response, request, stream_with_context
+from flask_restx import Namespace, Resource, fields, reqparse, inputs
 from app.domain.services.vuelo_service import VueloService
 from app.domain.repositories.vuelo_repository import VueloRepository
+from app.api.inputs import lista_ids, entero_en_rango
+from app.infrastructure.admision.control import clase_trafico
+from app.infrastructure.database.plazos import plazo_consulta
+from app.infrastructure.streaming.flujo_cambios import abrir_flujo
 
 ns = Namespace('vuelos', description='Operaciones relacionadas con vuelos')
 
@@ -22,6 +27,89 @@ metricas_model = ns.model('MetricasVuelos', {
     'aerolineas_mas_de_dos_vuelos': fields.List(fields.Raw, description='Aerolíneas con más de 2 vuelos en un día')
 })
 
+# Solo con METRICAS_BACKEND=aproximado; el modo exacto conserva la forma de metricas_model
+metricas_aproximadas_model = ns.inherit('MetricasVuelosAproximadas', metricas_model, {
+    'approximate': fields.Boolean(description='True: las métricas provienen de sketches aproximados'),
+    'cotas_error': fields.Raw(description='Parámetros y garantías de error de los sketches')
+})
+
+aerolinea_frecuente_model = ns.model('AerolineaFrecuente', {
+    'id_aerolinea': fields.Integer(),
+    'nombre_aerolinea': fields.String(),
+    'dia': fields.String(description='Fecha (YYYY-MM-DD)'),
+    'total_vuelos': fields.Integer()
+})
+
+aerolineas_frecuentes_model = ns.model('PaginaAerolineasFrecuentes', {
+    'resultados': fields.List(fields.Nested(aerolinea_frecuente_model)),
+    'siguiente_cursor': fields.String(description='Cursor de la página siguiente (null si no hay más)')
+})
+
+filtro_vuelos_model = ns.model('FiltroVuelos', {
+    'desde': fields.Date(description='Fecha inicial (inclusive)'),
+    'hasta': fields.Date(description='Fecha final (inclusive)'),
+    'id_aerolinea': fields.Integer(),
+    'id_aeropuerto': fields.Integer(),
+    'id_movimiento': fields.Integer()
+})
+
+eliminacion_lote_model = ns.model('EliminacionVuelosLote', {
+    'filtro': fields.Nested(filtro_vuelos_model, required=True, description='Al menos un criterio')
+})
+
+actualizacion_lote_model = ns.model('ActualizacionVuelosLote', {
+    'filtro': fields.Nested(filtro_vuelos_model, required=True, description='Al menos un criterio'),
+    'cambios': fields.Nested(ns.model('CambiosVuelo', {
+        'id_aerolinea': fields.Integer(),
+        'id_aeropuerto': fields.Integer(),
+        'id_movimiento': fields.Integer(),
+        'dia': fields.Date()
+    }), required=True, description='Campos a asignar a todos los vuelos del filtro')
+})
+
+pagina_busqueda_model = ns.model('PaginaBusquedaVuelos', {
+    'resultados': fields.List(fields.Nested(ns.model('VueloBusqueda', {
+        'id': fields.Integer(),
+        'id_aerolinea': fields.Integer(),
+        'id_aeropuerto': fields.Integer(),
+        'id_movimiento': fields.Integer(),
+        'dia': fields.String(description='Fecha (YYYY-MM-DD)')
+    }))),
+    'siguiente_cursor': fields.String(description='Cursor de la página siguiente (null si no hay más)'),
+    'total': fields.Integer(description='Total de la búsqueda (solo en la primera página)'),
+    'total_exacto': fields.Boolean(description='False si el total es una estimación del planificador')
+})
+
+busqueda_parser = reqparse.RequestParser()
+busqueda_parser.add_argument('id_aerolinea', type=lista_ids, location='args',
+                             help='IDs de aerolínea separados por coma')
+busqueda_parser.add_argument('id_aeropuerto', type=lista_ids, location='args',
+                             help='IDs de aeropuerto separados por coma')
+busqueda_parser.add_argument('id_movimiento', type=lista_ids, location='args',
+                             help='IDs de movimiento separados por coma')
+busqueda_parser.add_argument('desde', type=inputs.date, location='args', help='Fecha inicial (YYYY-MM-DD)')
+busqueda_parser.add_argument('hasta', type=inputs.date, location='args', help='Fecha final (YYYY-MM-DD)')
+busqueda_parser.add_argument('orden', type=str, default='dia', choices=('dia', '-dia', 'id', '-id'),
+                             location='args', help='Orden de los resultados (default: dia)')
+busqueda_parser.add_argument('limite', type=entero_en_rango(1, 1000), default=50, location='args',
+                             help='Tamaño de página (máx. 1000)')
+busqueda_parser.add_argument('cursor', type=str, location='args', help='Cursor devuelto por la página anterior')
+busqueda_parser.add_argument('total', type=inputs.boolean, default=True, location='args',
+                             help='Incluir el total en la primera página (default: true)')
+
+frecuentes_parser = reqparse.RequestParser()
+frecuentes_parser.add_argument('min_vuelos', type=entero_en_rango(1, 1000000), default=3, location='args',
+                               help='Mínimo de vuelos en el día (default: 3, es decir, más de 2)')
+frecuentes_parser.add_argument('desde', type=inputs.date, location='args', help='Fecha inicial (YYYY-MM-DD)')
+frecuentes_parser.add_argument('hasta', type=inputs.date, location='args', help='Fecha final (YYYY-MM-DD)')
+frecuentes_parser.add_argument('id_aerolinea', type=lista_ids, location='args',
+                               help='IDs de aerolínea separados por coma')
+frecuentes_parser.add_argument('limite', type=entero_en_rango(1, 1000), default=100, location='args',
+                               help='Tamaño de página (máx. 1000)')
+frecuentes_parser.add_argument('cursor', type=str, location='args', help='Cursor devuelto por la página anterior')
+frecuentes_parser.add_argument('formato', type=str, default='json', choices=('json', 'ndjson'), location='args',
+                               help='json: paginado; ndjson: todas las filas en streaming')
+
 @ns.route('/')
 class VueloList(Resource):
     @ns.doc('list_vuelos')
@@ -39,11 +127,47 @@ class VueloList(Resource):
 
 @ns.route('/metricas')
 class MetricasVuelos(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('vuelos.metricas')
     @ns.doc('get_flight_metrics')
-    @ns.marshal_with(metricas_model)
+    @ns.response(200, 'Métricas; con METRICAS_BACKEND=aproximado incluyen además approximate y cotas_error', metricas_model)
     def get(self):
         """Obtiene todas las métricas de vuelos"""
-        return vuelo_service.obtener_metricas()
+        resultado = vuelo_service.obtener_metricas()
+        modelo = metricas_aproximadas_model if resultado.get('approximate') else metricas_model
+        return ns.marshal(resultado, modelo)
+
+@ns.route('/buscar')
+class VueloBusqueda(Resource):
+    @plazo_consulta('vuelos.buscar')
+    @ns.doc('search_vuelos')
+    @ns.expect(busqueda_parser)
+    @ns.response(200, 'Página de resultados', pagina_busqueda_model)
+    def get(self):
+        """Busca vuelos por aerolínea, aeropuerto, movimiento y rango de días, paginados por cursor"""
+        args = busqueda_parser.parse_args()
+        filtros = {
+            'ids_aerolineas': args['id_aerolinea'],
+            'ids_aeropuertos': args['id_aeropuerto'],
+            'ids_movimientos': args['id_movimiento'],
+            'desde': args['desde'].date() if args['desde'] else None,
+            'hasta': args['hasta'].date() if args['hasta'] else None
+        }
+        resultado = vuelo_service.buscar_vuelos(
+            filtros, orden=args['orden'], cursor=args['cursor'], limite=args['limite'], con_total=args['total']
+        )
+        if isinstance(resultado, tuple):
+            return resultado
+        return ns.marshal(resultado, pagina_busqueda_model)
+
+@ns.route('/stream')
+class VueloStream(Resource):
+    @ns.doc('stream_vuelos', params={'ultimo_id': 'Id del último evento recibido (alternativa al header Last-Event-ID)'})
+    @ns.response(200, 'Flujo text/event-stream: eventos vuelo, vuelos_lote, metricas y reinicio')
+    @ns.response(503, 'Se alcanzó el máximo de conexiones')
+    def get(self):
+        """Flujo Server-Sent Events con los cambios de vuelos y los deltas de las métricas"""
+        return abrir_flujo(request.headers.get('Last-Event-ID') or request.args.get('ultimo_id'))
 
 @ns.route('/<int:id>')
 @ns.response(404, 'Vuelo no encontrado')
@@ -68,9 +192,59 @@ class VueloResource(Resource):
         """Elimina un vuelo"""
         return vuelo_service.eliminar_vuelo(id)
 
+@ns.route('/lote/eliminar')
+class VueloEliminacionLote(Resource):
+    @clase_trafico('masiva')
+    @ns.doc('bulk_delete_vuelos')
+    @ns.expect(eliminacion_lote_model)
+    def post(self):
+        """Elimina por trozos todos los vuelos que cumplen el filtro"""
+        payload = ns.payload if isinstance(ns.payload, dict) else {}
+        return vuelo_service.eliminar_por_filtro(payload.get('filtro'))
+
+@ns.route('/lote/actualizar')
+class VueloActualizacionLote(Resource):
+    @clase_trafico('masiva')
+    @ns.doc('bulk_update_vuelos')
+    @ns.expect(actualizacion_lote_model)
+    def post(self):
+        """Aplica los mismos cambios, por trozos, a todos los vuelos que cumplen el filtro"""
+        payload = ns.payload if isinstance(ns.payload, dict) else {}
+        return vuelo_service.actualizar_por_filtro(payload.get('filtro'), payload.get('cambios'))
+
 @ns.route('/aerolineas-mas-de-dos')
 class AerolineasMasDeDosVuelos(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('vuelos.aerolineas_mas_de_dos')
     @ns.doc('get_airlines_more_than_two_flights')
     def get(self):
         """Obtiene aerolíneas con más de 2 vuelos en un día"""
-        return vuelo_service.obtener_aerolineas_mas_de_dos_vuelos()
\ No newline at end of file
+        return vuelo_service.obtener_aerolineas_mas_de_dos_vuelos()
+
+@ns.route('/aerolineas-frecuentes')
+class AerolineasFrecuentes(Resource):
+    @clase_trafico('analitica')
+    @plazo_consulta('vuelos.aerolineas_frecuentes')
+    @ns.doc('get_airlines_with_min_flights_per_day')
+    @ns.expect(frecuentes_parser)
+    @ns.response(200, 'Página de resultados', aerolineas_frecuentes_model)
+    def get(self):
+        """Aerolíneas con al menos `min_vuelos` vuelos en un día, paginadas por cursor o en streaming NDJSON"""
+        args = frecuentes_parser.parse_args()
+        filtros = {
+            'min_vuelos': args['min_vuelos'],
+            'desde': args['desde'].date() if args['desde'] else None,
+            'hasta': args['hasta'].date() if args['hasta'] else None,
+            'ids_aerolineas': args['id_aerolinea']
+        }
+        if args['formato'] == 'ndjson':
+            return Response(
+                stream_with_context(vuelo_service.stream_aerolineas_frecuentes(**filtros)),
+                mimetype='application/x-ndjson'
+            )
+        resultado = vuelo_service.obtener_aerolineas_frecuentes(
+            cursor=args['cursor'], limite=args['limite'], **filtros
+        )
+        if isinstance(resultado, tuple):
+            return resultado
+        return ns.marshal(resultado, aerolineas_frecuentes_model)
@@ -5,3 +5,10 @@ class AerolineaSchema(Schema):
 
     id_aerolinea = fields.Int(dump_only=True)
     nombre_aerolinea = fields.Str(required=True, validate=validate.Length(min=1, max=50))
+
+
+class AerolineaUpsertSchema(Schema):
+    """Registro de una carga masiva: el ID es obligatorio y decide si se inserta o se actualiza."""
+
+    id_aerolinea = fields.Int(required=True, strict=True, validate=validate.Range(min=1))
+    nombre_aerolinea = fields.Str(required=True, validate=validate.Length(min=1, max=50))
@@ -6,4 +6,11 @@ class AeropuertoSchema(Schema):
     nombre_aeropuerto = fields.Str(required=True, validate=validate.Length(min=1, max=50))
     
     class Meta:
-        fields = ("id_aeropuerto", "nombre_aeropuerto") 
+        fields = ("id_aeropuerto", "nombre_aeropuerto")
+
+
+class AeropuertoUpsertSchema(Schema):
+    """Registro de una carga masiva: el ID es obligatorio y decide si se inserta o se actualiza."""
+
+    id_aeropuerto = fields.Int(required=True, strict=True, validate=validate.Range(min=1))
+    nombre_aeropuerto = fields.Str(required=True, validate=validate.Length(min=1, max=50)) 
@@ -1,11 +1,23 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import Schema, ValidationError, fields, validate, validates_schema
 
 class VueloSchema(Schema):
-    id = fields.Int(dump_only=True, validate=validate.Length(min=1, max=50))
-    id_aerolinea = fields.Int(required=True, validate=validate.Length(min=1, max=50))
-    id_aeropuerto = fields.Int(required=True, validate=validate.Length(min=1, max=50))
-    id_movimiento = fields.Int(required=True, vvalidate=validate.Length(min=1, max=50))
+    id = fields.Int(dump_only=True)
+    id_aerolinea = fields.Int(required=True, validate=validate.Range(min=1))
+    id_aeropuerto = fields.Int(required=True, validate=validate.Range(min=1))
+    id_movimiento = fields.Int(required=True, validate=validate.Range(min=1))
     dia = fields.Date(required=True)
 
 
+class FiltroVuelosSchema(Schema):
+    """Filtro de las operaciones masivas sobre vuelos (todos los criterios se combinan con AND)."""
 
+    desde = fields.Date()
+    hasta = fields.Date()
+    id_aerolinea = fields.Int(strict=True, validate=validate.Range(min=1))
+    id_aeropuerto = fields.Int(strict=True, validate=validate.Range(min=1))
+    id_movimiento = fields.Int(strict=True, validate=validate.Range(min=1))
+
+    @validates_schema
+    def validar_rango(self, datos, **kwargs):
+        if datos.get('desde') and datos.get('hasta') and datos['desde'] > datos['hasta']:
+            raise ValidationError("'desde' no puede ser posterior a 'hasta'", 'desde')
@@ -5,4 +5,8 @@ class Aerolinea(db.Model):
     id_aerolinea = db.Column(db.Integer, primary_key=True, autoincrement=True)
     nombre_aerolinea = db.Column(db.String(50), nullable=False)
 
+    def to_dict(self):
+        """Representación plana de la aerolínea."""
+        return {'id_aerolinea': self.id_aerolinea, 'nombre_aerolinea': self.nombre_aerolinea}
+
 
@@ -6,4 +6,8 @@ class Aeropuerto(db.Model):
     id_aeropuerto = db.Column(db.Integer, primary_key=True, autoincrement=True)
     nombre_aeropuerto = db.Column(db.String(50), nullable=False)
 
+    def to_dict(self):
+        """Representación plana del aeropuerto."""
+        return {'id_aeropuerto': self.id_aeropuerto, 'nombre_aeropuerto': self.nombre_aeropuerto}
+
 
@@ -5,4 +5,8 @@ class Movimiento(db.Model):
     id_movimiento = db.Column(db.Integer, primary_key=True, autoincrement=True)
     descripcion = db.Column(db.String(50), nullable=False)   
 
+    def to_dict(self):
+        """Representación plana del movimiento."""
+        return {'id_movimiento': self.id_movimiento, 'descripcion': self.descripcion}
+
 
@@ -1,10 +1,30 @@
 from app.infrastructure.database.connection import db
 class Vuelo(db.Model):
     __tablename__ = 'vuelos'
+    __table_args__ = (
+        # Agregados por aerolínea y día (GROUP BY id_aerolinea, dia + paginación por clave)
+        db.Index('ix_vuelos_aerolinea_dia', 'id_aerolinea', 'dia'),
+        # Series y estadísticas por aeropuerto en un rango de fechas
+        db.Index('ix_vuelos_aeropuerto_dia', 'id_aeropuerto', 'dia'),
+        # Búsqueda por tipo de movimiento en un rango de fechas (/vuelos/buscar)
+        db.Index('ix_vuelos_movimiento_dia', 'id_movimiento', 'dia'),
+        # Filtros y particiones por fecha
+        db.Index('ix_vuelos_dia', 'dia'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     id_aerolinea = db.Column(db.Integer, db.ForeignKey('aerolineas.id_aerolinea'))
     id_aeropuerto = db.Column(db.Integer, db.ForeignKey('aeropuertos.id_aeropuerto'))
     id_movimiento = db.Column(db.Integer, db.ForeignKey('movimientos.id_movimiento'))
     dia = db.Column(db.Date, nullable=False)
 
+    def to_dict(self):
+        """Representación plana del vuelo (columnas de la tabla)."""
+        return {
+            'id': self.id,
+            'id_aerolinea': self.id_aerolinea,
+            'id_aeropuerto': self.id_aeropuerto,
+            'id_movimiento': self.id_movimiento,
+            'dia': self.dia
+        }
+
 
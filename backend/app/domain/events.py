@@ -0,0 +1,78 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class EventoDominio(NamedTuple):
+    """Cambio confirmado (post-commit) sobre una entidad del dominio.
+
+    Attributes:
+        entidad (str): Nombre de la entidad ('vuelo', 'aerolinea', 'aeropuerto', 'movimiento')
+        accion (str): 'creado', 'actualizado', 'eliminado' o, en escrituras masivas,
+            'sincronizado', 'actualizado_lote' o 'eliminado_lote'
+        antes (Optional[Dict]): Estado previo de la fila (None en creaciones)
+        despues (Optional[Dict]): Estado nuevo de la fila (None en eliminaciones)
+        lote (Tuple[EventoDominio, ...]): En escrituras masivas, un evento por fila
+            afectada; antes y despues quedan en None (ver `desagrupar`)
+    """
+    entidad: str
+    accion: str
+    antes: Optional[Dict[str, Any]] = None
+    despues: Optional[Dict[str, Any]] = None
+    lote: Tuple['EventoDominio', ...] = ()
+
+
+def desagrupar(evento: EventoDominio) -> Iterator[EventoDominio]:
+    """Eventos por fila: los del lote en una escritura masiva, o el propio evento.
+
+    Las escrituras masivas se publican como un solo evento para que los
+    suscriptores que solo invalidan (caché, precalentador) trabajen una vez por
+    lote; los que mantienen agregados aplican cada fila con este iterador.
+    """
+    if evento.lote:
+        yield from evento.lote
+    else:
+        yield evento
+
+
+class BusEventos:
+    """Bus de eventos en proceso para notificar cambios confirmados en la base de datos.
+
+    Los repositorios publican después de cada commit exitoso; cachés, índices y
+    agregados en memoria se suscriben para mantenerse consistentes. Un error en
+    un suscriptor se registra pero nunca revierte ni interrumpe la escritura.
+    """
+
+    def __init__(self):
+        self._suscriptores: Dict[str, List[Callable[[EventoDominio], None]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def suscribir(self, entidad: str, manejador: Callable[[EventoDominio], None]) -> None:
+        """Registra un manejador para los eventos de una entidad ('*' para todas)."""
+        with self._lock:
+            if manejador not in self._suscriptores[entidad]:
+                self._suscriptores[entidad].append(manejador)
+
+    def desuscribir(self, entidad: str, manejador: Callable[[EventoDominio], None]) -> None:
+        """Elimina un manejador registrado previamente."""
+        with self._lock:
+            if manejador in self._suscriptores[entidad]:
+                self._suscriptores[entidad].remove(manejador)
+
+    def publicar(self, entidad: str, accion: str,
+                 antes: Optional[Dict[str, Any]] = None,
+                 despues: Optional[Dict[str, Any]] = None,
+                 lote: Tuple[EventoDominio, ...] = ()) -> None:
+        """Notifica un cambio a los suscriptores de la entidad y a los globales."""
+        evento = EventoDominio(entidad, accion, antes, despues, tuple(lote))
+        with self._lock:
+            manejadores = list(self._suscriptores[entidad]) + list(self._suscriptores['*'])
+        for manejador in manejadores:
+            try:
+                manejador(evento)
+            except Exception as e:
+                logging.error(f"Error en suscriptor de eventos {entidad}.{accion}: {str(e)}")
+
+
+bus_eventos = BusEventos()
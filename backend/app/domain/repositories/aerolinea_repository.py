@@ -1,12 +1,19 @@
-from typing import Dict, List, Tuple, Any
-from sqlalchemy import func
+from typing import Dict, List, Tuple, Any, Optional
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import joinedload
 from app.domain.entities.aerolinea import Aerolinea
 from app.domain.entities.vuelo import Vuelo
 from app.infrastructure.database.connection import db
-from app.infrastructure.database.utils import get_or_404, commit_or_rollback
+from app.domain.events import bus_eventos, EventoDominio
+from app.infrastructure.analytics.motores import obtener_motor_columnar
+from app.infrastructure.database.utils import (
+    actualizar_devolviendo, commit_or_rollback, eliminar_devolviendo, get_or_404, similares_trigrama
+)
+from app.infrastructure.database.upsert import upsert_en_lotes
+from app.infrastructure.observability.trazas import trazar_capa
 
+@trazar_capa('repositorio')
 class AerolineaRepository:
     """Repositorio para operaciones de base de datos relacionadas con aerolíneas."""
 
@@ -34,6 +41,20 @@ class AerolineaRepository:
         """
         return get_or_404(Aerolinea, id_aerolinea)
 
+    @classmethod
+    def buscar_similares(cls, texto: str, limite: int, umbral: float) -> Optional[List[Any]]:
+        """Busca aerolíneas con nombre parecido a `texto` (índice de trigramas pg_trgm).
+
+        Args:
+            texto (str): Texto buscado
+            limite (int): Máximo de resultados
+            umbral (float): Similitud mínima (0 a 1)
+
+        Returns:
+            Optional[List[Any]]: Filas (id_aerolinea, nombre_aerolinea, similitud), o None si el motor no es PostgreSQL
+        """
+        return similares_trigrama(Aerolinea.id_aerolinea, Aerolinea.nombre_aerolinea, texto, limite, umbral)
+
     @classmethod
     def crear(cls, datos: Dict[str, Any]) -> Aerolinea:
         """Crea una nueva aerolínea con los datos proporcionados.
@@ -50,39 +71,83 @@ class AerolineaRepository:
         aerolinea = Aerolinea(**datos)
         db.session.add(aerolinea)
         commit_or_rollback()
+        bus_eventos.publicar('aerolinea', 'creado', despues=aerolinea.to_dict())
         return aerolinea
 
     @classmethod
-    def actualizar(cls, aerolinea: Aerolinea, datos: Dict[str, Any]) -> Aerolinea:
-        """Actualiza una aerolínea existente.
-        
+    def actualizar(cls, id_aerolinea: int, datos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Actualiza una aerolinea existente con un solo UPDATE ... RETURNING.
+
+        La misma sentencia detecta si no existe y devuelve los valores anteriores
+        (para el evento) y los nuevos (para la respuesta).
+
         Args:
-            aerolinea (Aerolinea): Instancia de la aerolínea a actualizar
+            id_aerolinea (int): ID de la aerolínea a actualizar
             datos (Dict[str, Any]): Diccionario con los datos a actualizar
-            
+
         Returns:
-            Aerolinea: Instancia de la aerolínea actualizada
-            
+            Optional[Dict[str, Any]]: Aerolínea actualizada, o None si no existe
+
         Raises:
             SQLAlchemyError: Si ocurre un error al actualizar
         """
-        for key, value in datos.items():
-            setattr(aerolinea, key, value)
+        tabla = Aerolinea.__table__
+        condicion = tabla.c.id_aerolinea == id_aerolinea
+        if not datos:
+            fila = db.session.execute(select(*tabla.c).where(condicion)).first()
+            return dict(fila._mapping) if fila else None
+        filas = actualizar_devolviendo(tabla, [condicion], datos)
         commit_or_rollback()
-        return aerolinea
+        if not filas:
+            return None
+        antes, despues = filas[0]
+        bus_eventos.publicar('aerolinea', 'actualizado', antes=antes, despues=despues)
+        return despues
 
     @classmethod
-    def eliminar(cls, aerolinea: Aerolinea) -> None:
-        """Elimina una aerolínea existente.
-        
+    def upsert_lote(cls, filas: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Inserta o actualiza aerolíneas por ID en una sola transacción.
+
+        Publica un único evento 'sincronizado' con un evento por fila insertada o
+        modificada, de modo que la caché se invalida una vez por lote.
+
         Args:
-            aerolinea (Aerolinea): Instancia de la aerolínea a eliminar
-            
+            filas (List[Dict[str, Any]]): Registros validados, con IDs únicos
+
+        Returns:
+            Dict[str, int]: Conteos de insertados, actualizados y sin_cambios
+
+        Raises:
+            SQLAlchemyError: Si ocurre un error al guardar (no se aplica ningún registro)
+        """
+        conteos, insertadas, actualizadas = upsert_en_lotes(Aerolinea, 'id_aerolinea', filas)
+        if insertadas or actualizadas:
+            bus_eventos.publicar('aerolinea', 'sincronizado', lote=(
+                *(EventoDominio('aerolinea', 'creado', despues=fila) for fila in insertadas),
+                *(EventoDominio('aerolinea', 'actualizado', despues=fila) for fila in actualizadas)
+            ))
+        return conteos
+
+    @classmethod
+    def eliminar(cls, id_aerolinea: int) -> bool:
+        """Elimina una aerolinea existente con un solo DELETE ... RETURNING.
+
+        Args:
+            id_aerolinea (int): ID de la aerolínea a eliminar
+
+        Returns:
+            bool: False si no existe
+
         Raises:
             SQLAlchemyError: Si ocurre un error al eliminar
         """
-        db.session.delete(aerolinea)
+        tabla = Aerolinea.__table__
+        filas = eliminar_devolviendo(tabla, [tabla.c.id_aerolinea == id_aerolinea])
         commit_or_rollback()
+        if not filas:
+            return False
+        bus_eventos.publicar('aerolinea', 'eliminado', antes=filas[0])
+        return True
 
     @classmethod
     def obtener_estadisticas(cls, id_aerolinea: int) -> Dict[str, Any]:
@@ -103,6 +168,17 @@ class AerolineaRepository:
             SQLAlchemyError: Si ocurre un error en la consulta
         """
         aerolinea = cls.obtener_por_id(id_aerolinea)
+
+        motor = obtener_motor_columnar()
+        if motor is not None:
+            datos = motor.estadisticas_aerolineas([id_aerolinea])
+            vuelos_por_movimiento = datos['vuelos_por_movimiento'].get(id_aerolinea, [])
+            return {
+                'aerolinea': aerolinea,
+                'total_vuelos': sum(m.total for m in vuelos_por_movimiento),
+                'vuelos_por_movimiento': vuelos_por_movimiento,
+                'aeropuertos_frecuentes': datos['aeropuertos_frecuentes'].get(id_aerolinea, [])
+            }
         
         # Consulta para el total de vuelos
         total_vuelos = db.session.query(func.count(Vuelo.id))\
@@ -132,4 +208,104 @@ class AerolineaRepository:
             'total_vuelos': total_vuelos,
             'vuelos_por_movimiento': vuelos_por_movimiento,
             'aeropuertos_frecuentes': aeropuertos_frecuentes
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def obtener_estadisticas_lote(cls, ids: Optional[List[int]] = None, top_n: int = 5) -> Dict[str, Any]:
+        """Obtiene estadísticas de varias aerolíneas con un número fijo de consultas agrupadas.
+
+        A diferencia de `obtener_estadisticas`, el costo no crece con el número de
+        aerolíneas: se ejecutan siempre tres consultas (aerolíneas, vuelos por
+        movimiento y top-N aeropuertos con ROW_NUMBER por aerolínea).
+        Con METRICAS_BACKEND=numpy solo se consulta la tabla de aerolíneas y los
+        conteos salen del motor columnar.
+
+        Args:
+            ids (Optional[List[int]]): IDs de aerolíneas a consultar; None para todas
+            top_n (int): Número de aeropuertos frecuentes por aerolínea
+
+        Returns:
+            Dict[str, Any]: Diccionario con:
+                - aerolineas: Lista de instancias de Aerolinea encontradas (ordenadas por ID)
+                - vuelos_por_movimiento: Dict id_aerolinea -> lista de filas (id_movimiento, total)
+                - aeropuertos_frecuentes: Dict id_aerolinea -> lista de filas (id_aeropuerto, total_vuelos)
+
+        Raises:
+            SQLAlchemyError: Si ocurre un error en la consulta
+        """
+        consulta_aerolineas = Aerolinea.query.order_by(Aerolinea.id_aerolinea)
+        if ids is not None:
+            consulta_aerolineas = consulta_aerolineas.filter(Aerolinea.id_aerolinea.in_(ids))
+        aerolineas = consulta_aerolineas.all()
+
+        vuelos_por_movimiento: Dict[int, List[Any]] = {a.id_aerolinea: [] for a in aerolineas}
+        aeropuertos_frecuentes: Dict[int, List[Any]] = {a.id_aerolinea: [] for a in aerolineas}
+        if not aerolineas:
+            return {
+                'aerolineas': aerolineas,
+                'vuelos_por_movimiento': vuelos_por_movimiento,
+                'aeropuertos_frecuentes': aeropuertos_frecuentes
+            }
+
+        motor = obtener_motor_columnar()
+        if motor is not None:
+            datos = motor.estadisticas_aerolineas(list(vuelos_por_movimiento.keys()), top_n)
+            for id_aerolinea in vuelos_por_movimiento:
+                vuelos_por_movimiento[id_aerolinea] = datos['vuelos_por_movimiento'].get(id_aerolinea, [])
+                aeropuertos_frecuentes[id_aerolinea] = datos['aeropuertos_frecuentes'].get(id_aerolinea, [])
+            return {
+                'aerolineas': aerolineas,
+                'vuelos_por_movimiento': vuelos_por_movimiento,
+                'aeropuertos_frecuentes': aeropuertos_frecuentes
+            }
+
+        filtro = Vuelo.id_aerolinea.in_(list(vuelos_por_movimiento.keys()))
+
+        # Vuelos por aerolínea y tipo de movimiento (el total se deriva de esta consulta)
+        por_movimiento = (
+            db.session.query(
+                Vuelo.id_aerolinea,
+                Vuelo.id_movimiento,
+                func.count(Vuelo.id).label('total')
+            )
+            .filter(filtro)
+            .group_by(Vuelo.id_aerolinea, Vuelo.id_movimiento)
+            .order_by(Vuelo.id_aerolinea, Vuelo.id_movimiento)
+            .all()
+        )
+        for fila in por_movimiento:
+            vuelos_por_movimiento[fila.id_aerolinea].append(fila)
+
+        # Top-N aeropuertos por aerolínea en una sola consulta con función de ventana
+        conteos = (
+            db.session.query(
+                Vuelo.id_aerolinea,
+                Vuelo.id_aeropuerto,
+                func.count(Vuelo.id).label('total_vuelos'),
+                func.row_number().over(
+                    partition_by=Vuelo.id_aerolinea,
+                    order_by=(func.count(Vuelo.id).desc(), Vuelo.id_aeropuerto)
+                ).label('posicion')
+            )
+            .filter(filtro)
+            .group_by(Vuelo.id_aerolinea, Vuelo.id_aeropuerto)
+            .subquery()
+        )
+        top_aeropuertos = (
+            db.session.query(
+                conteos.c.id_aerolinea,
+                conteos.c.id_aeropuerto,
+                conteos.c.total_vuelos
+            )
+            .filter(conteos.c.posicion <= top_n)
+            .order_by(conteos.c.id_aerolinea, conteos.c.posicion)
+            .all()
+        )
+        for fila in top_aeropuertos:
+            aeropuertos_frecuentes[fila.id_aerolinea].append(fila)
+
+        return {
+            'aerolineas': aerolineas,
+            'vuelos_por_movimiento': vuelos_por_movimiento,
+            'aeropuertos_frecuentes': aeropuertos_frecuentes
+        }
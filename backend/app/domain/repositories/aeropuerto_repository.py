@@ -1,13 +1,21 @@
+from datetime import date
 from typing import Dict, List, Tuple, Any, Optional
-from sqlalchemy import func
+from sqlalchemy import func, case, cast, select, Date
 from sqlalchemy.exc import SQLAlchemyError
 from app.domain.entities.aeropuerto import Aeropuerto
 from app.domain.entities.vuelo import Vuelo
 from app.domain.entities.movimiento import Movimiento
 from app.domain.entities.aerolinea import Aerolinea
-from app.infrastructure.database.utils import get_or_404, commit_or_rollback
+from app.infrastructure.database.utils import (
+    actualizar_devolviendo, commit_or_rollback, eliminar_devolviendo, get_or_404, similares_trigrama
+)
+from app.infrastructure.database.upsert import upsert_en_lotes
 from app.infrastructure.database.connection import db
+from app.domain.events import bus_eventos, EventoDominio
+from app.infrastructure.analytics.motores import obtener_motor_columnar
+from app.infrastructure.observability.trazas import trazar_capa
 
+@trazar_capa('repositorio')
 class AeropuertoRepository:
     """Repositorio para operaciones de base de datos relacionadas con aeropuertos."""
 
@@ -35,6 +43,20 @@ class AeropuertoRepository:
         """
         return get_or_404(Aeropuerto, id_aeropuerto)
 
+    @classmethod
+    def buscar_similares(cls, texto: str, limite: int, umbral: float) -> Optional[List[Any]]:
+        """Busca aeropuertos con nombre parecido a `texto` (índice de trigramas pg_trgm).
+
+        Args:
+            texto (str): Texto buscado
+            limite (int): Máximo de resultados
+            umbral (float): Similitud mínima (0 a 1)
+
+        Returns:
+            Optional[List[Any]]: Filas (id_aeropuerto, nombre_aeropuerto, similitud), o None si el motor no es PostgreSQL
+        """
+        return similares_trigrama(Aeropuerto.id_aeropuerto, Aeropuerto.nombre_aeropuerto, texto, limite, umbral)
+
     @classmethod
     def crear(cls, datos: Dict[str, Any]) -> Aeropuerto:
         """Crea un nuevo aeropuerto con los datos proporcionados.
@@ -51,39 +73,83 @@ class AeropuertoRepository:
         aeropuerto = Aeropuerto(**datos)
         db.session.add(aeropuerto)
         commit_or_rollback()
+        bus_eventos.publicar('aeropuerto', 'creado', despues=aeropuerto.to_dict())
         return aeropuerto
 
     @classmethod
-    def actualizar(cls, aeropuerto: Aeropuerto, datos: Dict[str, Any]) -> Aeropuerto:
-        """Actualiza un aeropuerto existente.
-        
+    def actualizar(cls, id_aeropuerto: int, datos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Actualiza un aeropuerto existente con un solo UPDATE ... RETURNING.
+
+        La misma sentencia detecta si no existe y devuelve los valores anteriores
+        (para el evento) y los nuevos (para la respuesta).
+
         Args:
-            aeropuerto (Aeropuerto): Instancia del aeropuerto a actualizar
+            id_aeropuerto (int): ID del aeropuerto a actualizar
             datos (Dict[str, Any]): Diccionario con los datos a actualizar
-            
+
         Returns:
-            Aeropuerto: Instancia del aeropuerto actualizado
-            
+            Optional[Dict[str, Any]]: Aeropuerto actualizado, o None si no existe
+
         Raises:
             SQLAlchemyError: Si ocurre un error al actualizar
         """
-        for key, value in datos.items():
-            setattr(aeropuerto, key, value)
+        tabla = Aeropuerto.__table__
+        condicion = tabla.c.id_aeropuerto == id_aeropuerto
+        if not datos:
+            fila = db.session.execute(select(*tabla.c).where(condicion)).first()
+            return dict(fila._mapping) if fila else None
+        filas = actualizar_devolviendo(tabla, [condicion], datos)
         commit_or_rollback()
-        return aeropuerto
+        if not filas:
+            return None
+        antes, despues = filas[0]
+        bus_eventos.publicar('aeropuerto', 'actualizado', antes=antes, despues=despues)
+        return despues
 
     @classmethod
-    def eliminar(cls, aeropuerto: Aeropuerto) -> None:
-        """Elimina un aeropuerto existente.
-        
+    def upsert_lote(cls, filas: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Inserta o actualiza aeropuertos por ID en una sola transacción.
+
+        Publica un único evento 'sincronizado' con un evento por fila insertada o
+        modificada, de modo que la caché se invalida una vez por lote.
+
         Args:
-            aeropuerto (Aeropuerto): Instancia del aeropuerto a eliminar
-            
+            filas (List[Dict[str, Any]]): Registros validados, con IDs únicos
+
+        Returns:
+            Dict[str, int]: Conteos de insertados, actualizados y sin_cambios
+
+        Raises:
+            SQLAlchemyError: Si ocurre un error al guardar (no se aplica ningún registro)
+        """
+        conteos, insertadas, actualizadas = upsert_en_lotes(Aeropuerto, 'id_aeropuerto', filas)
+        if insertadas or actualizadas:
+            bus_eventos.publicar('aeropuerto', 'sincronizado', lote=(
+                *(EventoDominio('aeropuerto', 'creado', despues=fila) for fila in insertadas),
+                *(EventoDominio('aeropuerto', 'actualizado', despues=fila) for fila in actualizadas)
+            ))
+        return conteos
+
+    @classmethod
+    def eliminar(cls, id_aeropuerto: int) -> bool:
+        """Elimina un aeropuerto existente con un solo DELETE ... RETURNING.
+
+        Args:
+            id_aeropuerto (int): ID del aeropuerto a eliminar
+
+        Returns:
+            bool: False si no existe
+
         Raises:
             SQLAlchemyError: Si ocurre un error al eliminar
         """
-        db.session.delete(aeropuerto)
+        tabla = Aeropuerto.__table__
+        filas = eliminar_devolviendo(tabla, [tabla.c.id_aeropuerto == id_aeropuerto])
         commit_or_rollback()
+        if not filas:
+            return False
+        bus_eventos.publicar('aeropuerto', 'eliminado', antes=filas[0])
+        return True
 
     @classmethod
     def obtener_mas_ocupado(cls) -> Tuple[List[Aeropuerto], int]:
@@ -94,6 +160,12 @@ class AeropuertoRepository:
                 - Lista de aeropuertos más ocupados (puede haber empates)
                 - Número total de movimientos del aeropuerto más ocupado
         """
+        motor = obtener_motor_columnar()
+        if motor is not None:
+            ids, max_movimientos = motor.aeropuertos_mas_ocupados()
+            aeropuertos = Aeropuerto.query.filter(Aeropuerto.id_aeropuerto.in_(ids)).all() if ids else []
+            return aeropuertos, max_movimientos
+
         # Subconsulta para contar movimientos por aeropuerto
         subconsulta = (
             db.session.query(
@@ -135,6 +207,17 @@ class AeropuertoRepository:
             SQLAlchemyError: Si ocurre un error en la consulta
         """
         aeropuerto = cls.obtener_por_id(id_aeropuerto)
+
+        motor = obtener_motor_columnar()
+        if motor is not None:
+            datos = motor.estadisticas_aeropuerto(id_aeropuerto)
+            ids = [id_aerolinea for id_aerolinea, _ in datos['aerolineas']]
+            por_id = {a.id_aerolinea: a for a in Aerolinea.query.filter(Aerolinea.id_aerolinea.in_(ids)).all()} if ids else {}
+            return {
+                'aeropuerto': aeropuerto,
+                'movimientos': datos['movimientos'],
+                'aerolineas': [(por_id[i], total) for i, total in datos['aerolineas'] if i in por_id]
+            }
         
         # Consulta para movimientos y conteo de vuelos
         movimientos = (
@@ -165,4 +248,38 @@ class AeropuertoRepository:
             'aeropuerto': aeropuerto,
             'movimientos': movimientos,
             'aerolineas': aerolineas
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def obtener_serie(cls, id_aeropuerto: int, unidad: str, desde: date, hasta: date) -> List[Tuple[date, int, int]]:
+        """Cuenta salidas y llegadas de un aeropuerto agrupadas por bucket de tiempo.
+
+        El agrupamiento se hace en SQL con date_trunc; los buckets sin vuelos no
+        se devuelven (el servicio completa los huecos con ceros).
+
+        Args:
+            id_aeropuerto (int): ID del aeropuerto
+            unidad (str): Unidad de date_trunc ('day', 'week' o 'month')
+            desde (date): Fecha inicial (inclusive)
+            hasta (date): Fecha final (exclusiva)
+
+        Returns:
+            List[Tuple[date, int, int]]: Filas (inicio_bucket, salidas, llegadas) ordenadas por bucket
+        """
+        bucket = cast(func.date_trunc(unidad, Vuelo.dia), Date).label('bucket')
+        return (
+            db.session.query(
+                bucket,
+                func.sum(case((Movimiento.descripcion == 'Salida', 1), else_=0)).label('salidas'),
+                func.sum(case((Movimiento.descripcion == 'Llegada', 1), else_=0)).label('llegadas')
+            )
+            .join(Movimiento, Movimiento.id_movimiento == Vuelo.id_movimiento)
+            .filter(
+                Vuelo.id_aeropuerto == id_aeropuerto,
+                Vuelo.dia >= desde,
+                Vuelo.dia < hasta
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+            .all()
+        )
@@ -7,7 +7,11 @@ from app.domain.entities.aerolinea import Aerolinea
 from app.domain.entities.aeropuerto import Aeropuerto
 from app.infrastructure.database.utils import get_or_404, commit_or_rollback
 from app.infrastructure.database.connection import db
+from app.domain.events import bus_eventos
+from app.infrastructure.analytics.motores import obtener_motor_columnar
+from app.infrastructure.observability.trazas import trazar_capa
 
+@trazar_capa('repositorio')
 class MovimientoRepository:
     """Repositorio para operaciones de base de datos relacionadas con movimientos de vuelos."""
 
@@ -51,6 +55,7 @@ class MovimientoRepository:
         movimiento = Movimiento(**datos)
         db.session.add(movimiento)
         commit_or_rollback()
+        bus_eventos.publicar('movimiento', 'creado', despues=movimiento.to_dict())
         return movimiento
 
     @classmethod
@@ -75,7 +80,13 @@ class MovimientoRepository:
                     ...
                 }
             }
+
+        Con METRICAS_BACKEND=numpy se calculan en el motor columnar sin ejecutar SQL.
         """
+        motor = obtener_motor_columnar()
+        if motor is not None:
+            return motor.estadisticas_movimientos()
+
         # Estadísticas básicas de movimientos
         stats = (
             db.session.query(
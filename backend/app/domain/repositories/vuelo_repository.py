@@ -1,12 +1,33 @@
-from typing import Dict, List, Optional, Any
-from sqlalchemy import func
+import os
+from typing import Dict, Iterator, List, Optional, Any, Sequence, Tuple
+from sqlalchemy import Select, func, insert, or_, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
 from app.domain.entities.vuelo import Vuelo
 from app.domain.entities.aerolinea import Aerolinea
 from app.domain.entities.aeropuerto import Aeropuerto
-from app.infrastructure.database.utils import get_or_404, commit_or_rollback
+from app.infrastructure.database.utils import (
+    actualizar_devolviendo, commit_or_rollback, contar_acotado, eliminar_devolviendo, estimar_filas, get_or_404
+)
 from app.infrastructure.database.connection import db
+from app.domain.events import bus_eventos, EventoDominio
+from app.infrastructure.analytics.motores import obtener_motor
 from datetime import date
+from app.infrastructure.observability.trazas import trazar_capa
 
+# Filas por sentencia en las escrituras masivas por filtro (cada trozo se confirma por separado)
+TAMANO_LOTE_ESCRITURA = int(os.getenv('VUELOS_TAMANO_LOTE_ESCRITURA', '5000'))
+# Hasta este total la búsqueda cuenta exactamente; por encima usa la estimación del planificador
+BUSQUEDA_CONTEO_EXACTO_MAX = int(os.getenv('VUELOS_BUSQUEDA_CONTEO_EXACTO_MAX', '10000'))
+
+# Órdenes de /vuelos/buscar: columnas de la clave de paginación y si es descendente
+ORDENES_BUSQUEDA = {
+    'dia': (('dia', 'id'), False),
+    '-dia': (('dia', 'id'), True),
+    'id': (('id',), False),
+    '-id': (('id',), True)
+}
+
+@trazar_capa('repositorio')
 class VueloRepository:
     """Repositorio para operaciones de base de datos relacionadas con vuelos."""
 
@@ -50,47 +71,268 @@ class VueloRepository:
         vuelo = Vuelo(**datos)
         db.session.add(vuelo)
         commit_or_rollback()
+        bus_eventos.publicar('vuelo', 'creado', despues=vuelo.to_dict())
         return vuelo
 
     @classmethod
-    def actualizar(cls, id_vuelo: int, datos: Dict[str, Any]) -> Vuelo:
-        """Actualiza un vuelo existente.
+    def crear_lote(cls, filas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Inserta varios vuelos con un solo INSERT de varias filas y un único commit.
+
+        Los eventos 'creado' se publican después del commit, uno por vuelo.
+
+        Args:
+            filas (List[Dict[str, Any]]): Datos validados de cada vuelo
+
+        Returns:
+            List[Dict[str, Any]]: Vuelos creados (con su ID), en el mismo orden que `filas`
+
+        Raises:
+            SQLAlchemyError: Si falla el INSERT o el commit (no se guarda ninguna fila)
+        """
+        try:
+            resultado = db.session.execute(
+                insert(Vuelo).returning(
+                    Vuelo.id, Vuelo.id_aerolinea, Vuelo.id_aeropuerto, Vuelo.id_movimiento, Vuelo.dia,
+                    sort_by_parameter_order=True
+                ),
+                filas
+            )
+            creados = [dict(fila._mapping) for fila in resultado]
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise
+        commit_or_rollback()
+        for creado in creados:
+            bus_eventos.publicar('vuelo', 'creado', despues=creado)
+        return creados
+
+    @classmethod
+    def actualizar(cls, id_vuelo: int, datos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Actualiza un vuelo existente con un solo UPDATE ... RETURNING.
+
+        La misma sentencia detecta si no existe y devuelve los valores anteriores
+        (para el evento) y los nuevos (para la respuesta).
         
         Args:
             id_vuelo (int): ID del vuelo a actualizar
             datos (Dict[str, Any]): Diccionario con los datos a actualizar
             
         Returns:
-            Vuelo: Instancia del vuelo actualizado
+            Optional[Dict[str, Any]]: Vuelo actualizado, o None si no existe
             
         Raises:
-            NotFoundError: Si el vuelo no existe
             SQLAlchemyError: Si ocurre un error al actualizar
         """
-        vuelo = cls.obtener_por_id(id_vuelo)
-        for key, value in datos.items():
-            setattr(vuelo, key, value)
+        tabla = Vuelo.__table__
+        condicion = tabla.c.id == id_vuelo
+        if not datos:
+            fila = db.session.execute(select(*tabla.c).where(condicion)).first()
+            return dict(fila._mapping) if fila else None
+        filas = actualizar_devolviendo(tabla, [condicion], datos)
         commit_or_rollback()
-        return vuelo
+        if not filas:
+            return None
+        antes, despues = filas[0]
+        bus_eventos.publicar('vuelo', 'actualizado', antes=antes, despues=despues)
+        return despues
 
     @classmethod
-    def eliminar(cls, id_vuelo: int) -> None:
-        """Elimina un vuelo existente.
+    def eliminar(cls, id_vuelo: int) -> bool:
+        """Elimina un vuelo existente con un solo DELETE ... RETURNING.
         
         Args:
             id_vuelo (int): ID del vuelo a eliminar
+
+        Returns:
+            bool: False si no existe
             
         Raises:
-            NotFoundError: Si el vuelo no existe
             SQLAlchemyError: Si ocurre un error al eliminar
         """
-        vuelo = cls.obtener_por_id(id_vuelo)
-        db.session.delete(vuelo)
+        tabla = Vuelo.__table__
+        filas = eliminar_devolviendo(tabla, [tabla.c.id == id_vuelo])
         commit_or_rollback()
+        if not filas:
+            return False
+        bus_eventos.publicar('vuelo', 'eliminado', antes=filas[0])
+        return True
+
+    @classmethod
+    def _condiciones_filtro(cls, desde: Optional[date] = None, hasta: Optional[date] = None,
+                            id_aerolinea: Optional[int] = None, id_aeropuerto: Optional[int] = None,
+                            id_movimiento: Optional[int] = None) -> List[Any]:
+        """Condiciones WHERE del filtro de las operaciones masivas."""
+        condiciones = []
+        if desde is not None:
+            condiciones.append(Vuelo.dia >= desde)
+        if hasta is not None:
+            condiciones.append(Vuelo.dia <= hasta)
+        if id_aerolinea is not None:
+            condiciones.append(Vuelo.id_aerolinea == id_aerolinea)
+        if id_aeropuerto is not None:
+            condiciones.append(Vuelo.id_aeropuerto == id_aeropuerto)
+        if id_movimiento is not None:
+            condiciones.append(Vuelo.id_movimiento == id_movimiento)
+        return condiciones
+
+    @classmethod
+    def eliminar_por_filtro(cls, filtro: Dict[str, Any],
+                            tamano_lote: int = TAMANO_LOTE_ESCRITURA) -> Iterator[int]:
+        """Elimina los vuelos que cumplen el filtro con un DELETE ... RETURNING por trozo.
+
+        Cada trozo (hasta `tamano_lote` vuelos, en orden de ID) se confirma por
+        separado para acotar la duración de los bloqueos, y tras su commit se
+        publica un único evento 'eliminado_lote' con las filas eliminadas.
+
+        Args:
+            filtro (Dict[str, Any]): desde, hasta, id_aerolinea, id_aeropuerto, id_movimiento
+            tamano_lote (int): Vuelos por sentencia
+
+        Yields:
+            int: Vuelos eliminados en cada trozo ya confirmado
+
+        Raises:
+            SQLAlchemyError: Si falla un trozo (los trozos anteriores quedan confirmados)
+        """
+        tabla = Vuelo.__table__
+        condiciones = cls._condiciones_filtro(**filtro)
+        ultimo_id = 0
+        while True:
+            ids = (select(tabla.c.id).where(*condiciones, tabla.c.id > ultimo_id)
+                   .order_by(tabla.c.id).limit(tamano_lote).scalar_subquery())
+            eliminados = eliminar_devolviendo(tabla, [tabla.c.id.in_(ids)])
+            commit_or_rollback()
+            if not eliminados:
+                return
+            bus_eventos.publicar('vuelo', 'eliminado_lote', lote=tuple(
+                EventoDominio('vuelo', 'eliminado', antes=fila) for fila in eliminados
+            ))
+            yield len(eliminados)
+            if len(eliminados) < tamano_lote:
+                return
+            ultimo_id = max(fila['id'] for fila in eliminados)
+
+    @classmethod
+    def actualizar_por_filtro(cls, filtro: Dict[str, Any], cambios: Dict[str, Any],
+                              tamano_lote: int = TAMANO_LOTE_ESCRITURA) -> Iterator[int]:
+        """Aplica los mismos cambios a los vuelos que cumplen el filtro, por trozos.
+
+        Cada trozo es un solo `UPDATE ... FROM (SELECT ... FOR UPDATE) RETURNING`:
+        la subconsulta bloquea y captura los valores anteriores, de modo que el
+        evento 'actualizado_lote' lleva el estado previo y el nuevo de cada fila
+        sin consultas extra. Solo se tocan las filas en las que algún valor cambia.
+
+        Args:
+            filtro (Dict[str, Any]): desde, hasta, id_aerolinea, id_aeropuerto, id_movimiento
+            cambios (Dict[str, Any]): Columnas a asignar (id_aerolinea, id_aeropuerto, id_movimiento, dia)
+            tamano_lote (int): Vuelos por sentencia
+
+        Yields:
+            int: Vuelos actualizados en cada trozo ya confirmado
+
+        Raises:
+            SQLAlchemyError: Si falla un trozo (los trozos anteriores quedan confirmados)
+        """
+        tabla = Vuelo.__table__
+        condiciones = cls._condiciones_filtro(**filtro)
+        condiciones.append(or_(*(tabla.c[columna].is_distinct_from(valor) for columna, valor in cambios.items())))
+        ultimo_id = 0
+        while True:
+            filas = actualizar_devolviendo(tabla, [*condiciones, tabla.c.id > ultimo_id], cambios, limite=tamano_lote)
+            commit_or_rollback()
+            if not filas:
+                return
+            bus_eventos.publicar('vuelo', 'actualizado_lote', lote=tuple(
+                EventoDominio('vuelo', 'actualizado', antes=antes, despues=despues) for antes, despues in filas
+            ))
+            yield len(filas)
+            if len(filas) < tamano_lote:
+                return
+            ultimo_id = max(despues['id'] for _, despues in filas)
+
+    @classmethod
+    def _consulta_busqueda(cls, ids_aerolineas: Optional[Sequence[int]] = None,
+                           ids_aeropuertos: Optional[Sequence[int]] = None,
+                           ids_movimientos: Optional[Sequence[int]] = None,
+                           desde: Optional[date] = None, hasta: Optional[date] = None) -> Select:
+        """SELECT de los vuelos que cumplen los filtros de búsqueda (sin orden ni límite)."""
+        consulta = select(Vuelo.id, Vuelo.id_aerolinea, Vuelo.id_aeropuerto, Vuelo.id_movimiento, Vuelo.dia)
+        for columna, ids in ((Vuelo.id_aerolinea, ids_aerolineas),
+                             (Vuelo.id_aeropuerto, ids_aeropuertos),
+                             (Vuelo.id_movimiento, ids_movimientos)):
+            if ids:
+                # Un único id como igualdad para que el planificador use el índice (columna, dia)
+                consulta = consulta.where(columna == ids[0] if len(ids) == 1 else columna.in_(list(ids)))
+        if desde is not None:
+            consulta = consulta.where(Vuelo.dia >= desde)
+        if hasta is not None:
+            consulta = consulta.where(Vuelo.dia <= hasta)
+        return consulta
+
+    @classmethod
+    def buscar(cls, filtros: Dict[str, Any], orden: str = 'dia',
+               despues_de: Optional[Tuple[Any, ...]] = None, limite: int = 50) -> List[Any]:
+        """Busca vuelos por aerolínea, aeropuerto, movimiento y rango de días, paginando por clave.
+
+        Cada filtro se compila a una condición sobre una columna indexada
+        (ix_vuelos_aerolinea_dia, ix_vuelos_aeropuerto_dia, ix_vuelos_movimiento_dia
+        o ix_vuelos_dia) y la página siguiente se pide con una comparación de filas
+        sobre la clave del orden (`(dia, id) > (:dia, :id)`), así que el costo de
+        cada página no crece con su posición como con OFFSET.
+
+        Args:
+            filtros (Dict[str, Any]): ids_aerolineas, ids_aeropuertos, ids_movimientos, desde y hasta
+            orden (str): Clave de ORDENES_BUSQUEDA ('dia', '-dia', 'id' o '-id')
+            despues_de (Optional[Tuple[Any, ...]]): Clave de la última fila de la página anterior
+            limite (int): Máximo de filas
+
+        Returns:
+            List: Filas con id, id_aerolinea, id_aeropuerto, id_movimiento y dia
+        """
+        nombres, descendente = ORDENES_BUSQUEDA[orden]
+        columnas = [getattr(Vuelo, nombre) for nombre in nombres]
+        consulta = cls._consulta_busqueda(**filtros)
+        if despues_de is not None:
+            if len(columnas) == 1:
+                clave, valor = columnas[0], despues_de[0]
+            else:
+                clave, valor = tuple_(*columnas), tuple_(*despues_de)
+            consulta = consulta.where(clave < valor if descendente else clave > valor)
+        consulta = consulta.order_by(*(c.desc() if descendente else c.asc() for c in columnas)).limit(limite)
+        return db.session.execute(consulta).all()
+
+    @classmethod
+    def contar_busqueda(cls, filtros: Dict[str, Any],
+                        tope: int = BUSQUEDA_CONTEO_EXACTO_MAX) -> Tuple[int, bool]:
+        """Total de vuelos de la búsqueda sin recorrer resultados grandes.
+
+        En PostgreSQL se consulta primero la estimación del planificador: si
+        supera `tope` se devuelve tal cual. Si no, se cuenta exactamente leyendo
+        como máximo `tope + 1` filas del índice; si aun así hay más (estimación
+        baja), el total se marca como no exacto.
+
+        Args:
+            filtros (Dict[str, Any]): Mismos filtros que `buscar`
+            tope (int): Máximo de filas que se cuentan exactamente
+
+        Returns:
+            Tuple[int, bool]: Total y si es exacto
+        """
+        consulta = cls._consulta_busqueda(**filtros).with_only_columns(Vuelo.id)
+        estimado = estimar_filas(consulta)
+        if estimado is not None and estimado > tope:
+            return estimado, False
+        total = contar_acotado(consulta, tope)
+        if total <= tope:
+            return total, True
+        return max(total, estimado or 0), False
 
     @classmethod
     def obtener_metricas(cls) -> Dict[str, Any]:
         """Obtiene métricas consolidados sobre los vuelos.
+
+        Con METRICAS_BACKEND=memoria, aproximado o numpy se responden desde el motor
+        en memoria sin ejecutar SQL; en otro caso se calculan con `obtener_metricas_sql`.
         
         Returns:
             Dict[str, Any]: Diccionario con:
@@ -99,6 +341,18 @@ class VueloRepository:
                 - dia_mas_ocupado: Lista de días con más vuelos
                 - aerolineas_mas_de_dos_vuelos: Aerolíneas con >2 vuelos en un día
         """
+        motor = obtener_motor()
+        if motor is not None:
+            return motor.obtener_metricas()
+        return cls.obtener_metricas_sql()
+
+    @classmethod
+    def obtener_metricas_sql(cls) -> Dict[str, Any]:
+        """Calcula las métricas consolidadas con agregaciones en la base de datos.
+        
+        Returns:
+            Dict[str, Any]: Misma estructura que `obtener_metricas`
+        """
         return {
             'aeropuerto_mas_ocupado': cls._aeropuerto_mas_ocupado(),
             'aerolinea_mas_ocupada': cls._aerolinea_mas_ocupada(),
@@ -224,32 +478,75 @@ class VueloRepository:
                 - dia: Fecha en formato YYYY-MM-DD
                 - total_vuelos: Número total de vuelos
         """
-        vuelos_por_dia = (
-            db.session.query(
-                Vuelo.id_aerolinea,
-                Aerolinea.nombre_aerolinea,
-                Vuelo.dia,
-                func.count().label('total')
-            )
-            .join(Aerolinea, Aerolinea.id_aerolinea == Vuelo.id_aerolinea)
-            .group_by(Vuelo.id_aerolinea, Aerolinea.nombre_aerolinea, Vuelo.dia)
-            .subquery()
-        )
-
-        resultados = (
-            db.session.query(
-                vuelos_por_dia.c.id_aerolinea,
-                vuelos_por_dia.c.nombre_aerolinea,
-                vuelos_por_dia.c.dia,
-                vuelos_por_dia.c.total
-            )
-            .filter(vuelos_por_dia.c.total > 2)
-            .all()
-        )
-
         return [{
             'id_aerolinea': r.id_aerolinea,
             'nombre_aerolinea': r.nombre_aerolinea,
             'dia': r.dia.strftime('%Y-%m-%d'),
             'total_vuelos': r.total
-        } for r in resultados]
\ No newline at end of file
+        } for r in cls.aerolineas_con_min_vuelos(min_vuelos=3)]
+
+    @classmethod
+    def aerolineas_con_min_vuelos(cls, min_vuelos: int,
+                                  desde: Optional[date] = None,
+                                  hasta: Optional[date] = None,
+                                  ids_aerolineas: Optional[Sequence[int]] = None,
+                                  despues_de: Optional[Tuple[int, date]] = None,
+                                  limite: Optional[int] = None,
+                                  tamano_lote: int = 1000) -> Iterator[Any]:
+        """Itera los pares (aerolínea, día) con al menos `min_vuelos` vuelos.
+
+        El agregado recorre el índice (id_aerolinea, dia) en orden, por lo que
+        PostgreSQL agrupa sin ordenar, aplica el HAVING sobre la marcha y se
+        detiene al alcanzar el LIMIT. La paginación es por clave: `despues_de`
+        es el (id_aerolinea, dia) de la última fila de la página anterior y se
+        filtra antes de agregar. Los nombres se unen solo a las filas devueltas.
+        Las filas se leen en lotes con un cursor del lado del servidor.
+
+        Args:
+            min_vuelos (int): Mínimo de vuelos en el día (inclusive)
+            desde (Optional[date]): Fecha inicial (inclusive)
+            hasta (Optional[date]): Fecha final (inclusive)
+            ids_aerolineas (Optional[Sequence[int]]): Restringe a estas aerolíneas
+            despues_de (Optional[Tuple[int, date]]): Cursor de la página anterior
+            limite (Optional[int]): Máximo de filas; None para todas
+            tamano_lote (int): Filas por lote leído del cursor
+
+        Returns:
+            Iterator: Filas con id_aerolinea, nombre_aerolinea, dia y total, ordenadas por (id_aerolinea, dia)
+        """
+        total = func.count(Vuelo.id).label('total')
+        agregado = (
+            db.session.query(Vuelo.id_aerolinea, Vuelo.dia, total)
+            .filter(Vuelo.id_aerolinea.isnot(None))
+        )
+        if desde is not None:
+            agregado = agregado.filter(Vuelo.dia >= desde)
+        if hasta is not None:
+            agregado = agregado.filter(Vuelo.dia <= hasta)
+        if ids_aerolineas:
+            agregado = agregado.filter(Vuelo.id_aerolinea.in_(list(ids_aerolineas)))
+        if despues_de is not None:
+            agregado = agregado.filter(tuple_(Vuelo.id_aerolinea, Vuelo.dia) > tuple_(*despues_de))
+        agregado = (
+            agregado
+            .group_by(Vuelo.id_aerolinea, Vuelo.dia)
+            .having(func.count(Vuelo.id) >= min_vuelos)
+            .order_by(Vuelo.id_aerolinea, Vuelo.dia)
+        )
+        if limite is not None:
+            agregado = agregado.limit(limite)
+        agregado = agregado.subquery()
+
+        consulta = (
+            db.session.query(
+                agregado.c.id_aerolinea,
+                Aerolinea.nombre_aerolinea,
+                agregado.c.dia,
+                agregado.c.total
+            )
+            .join(Aerolinea, Aerolinea.id_aerolinea == agregado.c.id_aerolinea)
+            .order_by(agregado.c.id_aerolinea, agregado.c.dia)
+            .execution_options(stream_results=True)
+            .yield_per(tamano_lote)
+        )
+        return iter(consulta)
\ No newline at end of file
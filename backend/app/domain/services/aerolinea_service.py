@@ -1,11 +1,16 @@
 from app.domain.repositories.aerolinea_repository import AerolineaRepository
 from app.extensions import cache
-from app.api.schemas.aerolinea_schema import AerolineaSchema
+from app.infrastructure.caching.identidad import IdentidadCacheEstable, respuesta_cacheable
+from app.api.schemas.aerolinea_schema import AerolineaSchema, AerolineaUpsertSchema
+from app.api.inputs import MAX_REGISTROS_LOTE
 from marshmallow import ValidationError
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
+from app.infrastructure.busqueda.autocompletado import autocompletar, indice_aerolineas
+from app.infrastructure.observability.trazas import trazar_capa
 
-class AerolineaService:
+@trazar_capa('servicio')
+class AerolineaService(IdentidadCacheEstable):
     """Servicio para manejar la lógica de negocio relacionada con aerolíneas."""
     
     def __init__(self, repository: AerolineaRepository):
@@ -17,6 +22,7 @@ class AerolineaService:
         self.repository = repository
         self.schema = AerolineaSchema()
         self.schema_list = AerolineaSchema(many=True)
+        self.schema_upsert = AerolineaUpsertSchema(many=True)
 
     @cache.memoize(timeout=3600)
     def obtener_todas(self) -> List[Dict]:
@@ -32,6 +38,24 @@ class AerolineaService:
             logging.error(f"Error al obtener aerolíneas: {str(e)}")
             return []
 
+    def autocompletar(self, texto: str, limite: int = 10, difuso: bool = True) -> Union[List[Dict], Tuple[Dict, int]]:
+        """Sugiere aerolíneas cuyo nombre empieza por `texto` o, si faltan, se le parece.
+
+        Args:
+            texto (str): Texto escrito por el usuario
+            limite (int): Máximo de sugerencias
+            difuso (bool): Completar con coincidencias por trigramas (pg_trgm)
+
+        Returns:
+            Union[List[Dict], Tuple[Dict, int]]: Sugerencias o error con código HTTP
+        """
+        try:
+            return autocompletar(indice_aerolineas, texto, limite,
+                                 self.repository.buscar_similares if difuso else None)
+        except Exception as e:
+            logging.error(f"Error al autocompletar aerolíneas: {str(e)}")
+            return {"error": "Error al autocompletar aerolíneas"}, 500
+
     def obtener_por_id(self, id_aerolinea: int) -> dict:
         """Obtiene una aerolínea específica por su ID.
         
@@ -81,12 +105,10 @@ class AerolineaService:
             tuple: (dict, int) Datos actualizados y código HTTP
         """
         try:
-            aerolinea = self.repository.obtener_por_id(id_aerolinea)
-            if not aerolinea:
-                return {"error": "Aerolínea no encontrada"}, 404
-                
             datos_validados = self.schema.load(datos, partial=True)
-            aerolinea_actualizada = self.repository.actualizar(aerolinea, datos_validados)
+            aerolinea_actualizada = self.repository.actualizar(id_aerolinea, datos_validados)
+            if aerolinea_actualizada is None:
+                return {"error": "Aerolínea no encontrada"}, 404
             return self.schema.dump(aerolinea_actualizada), 200
         except ValidationError as err:
             logging.warning(f"Validación fallida al actualizar aerolínea {id_aerolinea}: {err.messages}")
@@ -95,6 +117,33 @@ class AerolineaService:
             logging.error(f"Error al actualizar aerolínea {id_aerolinea}: {str(e)}")
             return {"error": "Error interno al actualizar aerolínea"}, 500
 
+    def sincronizar_aerolineas(self, registros: List[Dict]) -> tuple:
+        """Inserta o actualiza un lote de aerolíneas por ID (carga desde el sistema maestro).
+
+        Args:
+            registros (List[Dict]): Aerolíneas con `id_aerolinea` y `nombre_aerolinea`
+
+        Returns:
+            tuple: (dict, int) Conteos de insertados, actualizados y sin_cambios, y código HTTP
+        """
+        if not isinstance(registros, list) or not registros:
+            return {"error": "'registros' debe ser una lista no vacía"}, 400
+        if len(registros) > MAX_REGISTROS_LOTE:
+            return {"error": f"Máximo {MAX_REGISTROS_LOTE} registros por lote"}, 400
+        try:
+            filas = self.schema_upsert.load(registros)
+            ids = [fila['id_aerolinea'] for fila in filas]
+            if len(set(ids)) != len(ids):
+                return {"error": "Los IDs de aerolínea del lote deben ser únicos"}, 400
+            conteos = self.repository.upsert_lote(filas)
+            return {**conteos, 'total': len(filas)}, 200
+        except ValidationError as err:
+            logging.warning(f"Validación fallida en la carga masiva de aerolíneas: {err.messages}")
+            return {"error": "Datos inválidos", "detalles": err.messages}, 400
+        except Exception as e:
+            logging.error(f"Error en la carga masiva de aerolíneas: {str(e)}")
+            return {"error": "Error interno al sincronizar aerolíneas"}, 500
+
     def eliminar_aerolinea(self, id_aerolinea: int) -> tuple:
         """Elimina una aerolínea existente.
         
@@ -105,17 +154,14 @@ class AerolineaService:
             tuple: (None, int) Código HTTP de respuesta
         """
         try:
-            aerolinea = self.repository.obtener_por_id(id_aerolinea)
-            if not aerolinea:
+            if not self.repository.eliminar(id_aerolinea):
                 return {"error": "Aerolínea no encontrada"}, 404
-                
-            self.repository.eliminar(aerolinea)
             return None, 204
         except Exception as e:
             logging.error(f"Error al eliminar aerolínea {id_aerolinea}: {str(e)}")
             return {"error": "Error interno al eliminar aerolínea"}, 500
 
-    @cache.memoize(timeout=3600)
+    @cache.memoize(timeout=3600, response_filter=respuesta_cacheable)
     def obtener_estadisticas(self, id_aerolinea: int) -> dict:
         """Obtiene estadísticas de una aerolínea con caché de 1 hora.
         
@@ -131,18 +177,64 @@ class AerolineaService:
                 return {"error": "Aerolínea no encontrada"}, 404
                 
             datos = self.repository.obtener_estadisticas(id_aerolinea)
+            return self._formatear_estadisticas(
+                datos['aerolinea'],
+                datos['total_vuelos'],
+                datos['vuelos_por_movimiento'],
+                datos['aeropuertos_frecuentes']
+            )
+        except Exception as e:
+            logging.error(f"Error al obtener estadísticas de aerolínea {id_aerolinea}: {str(e)}")
+            return {"error": "Error al obtener estadísticas"}, 500
+
+    @cache.memoize(timeout=3600, response_filter=respuesta_cacheable)
+    def obtener_estadisticas_lote(self, ids: Optional[Tuple[int, ...]] = None, top_n: int = 5) -> Dict:
+        """Obtiene estadísticas de varias aerolíneas (o de todas) con caché de 1 hora.
+
+        Args:
+            ids (Optional[Tuple[int, ...]]): IDs de aerolíneas; None para todas
+            top_n (int): Número de aeropuertos frecuentes por aerolínea
+
+        Returns:
+            Dict: Diccionario con:
+                - resultados: Estadísticas por aerolínea, con la misma forma que `obtener_estadisticas`
+                - no_encontradas: IDs solicitados que no existen
+        """
+        try:
+            datos = self.repository.obtener_estadisticas_lote(
+                list(ids) if ids is not None else None, top_n
+            )
+            resultados = []
+            for aerolinea in datos['aerolineas']:
+                por_movimiento = datos['vuelos_por_movimiento'][aerolinea.id_aerolinea]
+                resultados.append(self._formatear_estadisticas(
+                    aerolinea,
+                    sum(m.total for m in por_movimiento),
+                    por_movimiento,
+                    datos['aeropuertos_frecuentes'][aerolinea.id_aerolinea]
+                ))
+
+            encontradas = {a.id_aerolinea for a in datos['aerolineas']}
             return {
-                'aerolinea': self.schema.dump(datos['aerolinea']),
-                'total_vuelos': datos['total_vuelos'],
-                'vuelos_por_movimiento': [
-                    {'id_movimiento': m.id_movimiento, 'total': m.total} 
-                    for m in datos['vuelos_por_movimiento']
-                ],
-                'aeropuertos_frecuentes': [
-                    {'id_aeropuerto': a.id_aeropuerto, 'total_vuelos': a.total_vuelos}
-                    for a in datos['aeropuertos_frecuentes']
-                ]
+                'resultados': resultados,
+                'no_encontradas': [i for i in (ids or ()) if i not in encontradas]
             }
         except Exception as e:
-            logging.error(f"Error al obtener estadísticas de aerolínea {id_aerolinea}: {str(e)}")
-            return {"error": "Error al obtener estadísticas"}, 500
\ No newline at end of file
+            logging.error(f"Error al obtener estadísticas de aerolíneas {ids}: {str(e)}")
+            return {"error": "Error al obtener estadísticas"}, 500
+
+    def _formatear_estadisticas(self, aerolinea, total_vuelos: int,
+                                vuelos_por_movimiento: List, aeropuertos_frecuentes: List) -> Dict:
+        """Serializa las estadísticas de una aerolínea a partir de las filas del repositorio."""
+        return {
+            'aerolinea': self.schema.dump(aerolinea),
+            'total_vuelos': total_vuelos,
+            'vuelos_por_movimiento': [
+                {'id_movimiento': m.id_movimiento, 'total': m.total} 
+                for m in vuelos_por_movimiento
+            ],
+            'aeropuertos_frecuentes': [
+                {'id_aeropuerto': a.id_aeropuerto, 'total_vuelos': a.total_vuelos}
+                for a in aeropuertos_frecuentes
+            ]
+        }
\ No newline at end of file
@@ -1,11 +1,18 @@
 from app.extensions import cache
+from app.infrastructure.caching.identidad import IdentidadCacheEstable, respuesta_cacheable
 from app.domain.repositories.aeropuerto_repository import AeropuertoRepository
-from app.api.schemas.aeropuerto_schema import AeropuertoSchema
+from app.api.schemas.aeropuerto_schema import AeropuertoSchema, AeropuertoUpsertSchema
+from app.api.inputs import MAX_REGISTROS_LOTE
+from app.domain.services import serie_trafico
 from marshmallow import ValidationError
 import logging
+from datetime import date, timedelta
 from typing import Dict, List, Tuple, Optional, Union
+from app.infrastructure.busqueda.autocompletado import autocompletar, indice_aeropuertos
+from app.infrastructure.observability.trazas import trazar_capa
 
-class AeropuertoService:
+@trazar_capa('servicio')
+class AeropuertoService(IdentidadCacheEstable):
     """Servicio para manejar operaciones relacionadas con aeropuertos."""
     
     def __init__(self, repository: AeropuertoRepository):
@@ -17,6 +24,7 @@ class AeropuertoService:
         self.repository = repository
         self.schema = AeropuertoSchema()
         self.schema_list = AeropuertoSchema(many=True)
+        self.schema_upsert = AeropuertoUpsertSchema(many=True)
 
     @cache.memoize(timeout=3600)
     def obtener_todos(self) -> List[Dict]:
@@ -32,6 +40,24 @@ class AeropuertoService:
             logging.error(f"Error al obtener aeropuertos: {str(e)}")
             return []
 
+    def autocompletar(self, texto: str, limite: int = 10, difuso: bool = True) -> Union[List[Dict], Tuple[Dict, int]]:
+        """Sugiere aeropuertos cuyo nombre empieza por `texto` o, si faltan, se le parece.
+
+        Args:
+            texto (str): Texto escrito por el usuario
+            limite (int): Máximo de sugerencias
+            difuso (bool): Completar con coincidencias por trigramas (pg_trgm)
+
+        Returns:
+            Union[List[Dict], Tuple[Dict, int]]: Sugerencias o error con código HTTP
+        """
+        try:
+            return autocompletar(indice_aeropuertos, texto, limite,
+                                 self.repository.buscar_similares if difuso else None)
+        except Exception as e:
+            logging.error(f"Error al autocompletar aeropuertos: {str(e)}")
+            return {"error": "Error al autocompletar aeropuertos"}, 500
+
     def obtener_por_id(self, id_aeropuerto: int) -> Optional[Dict]:
         """Obtiene un aeropuerto por su ID.
         
@@ -81,12 +107,10 @@ class AeropuertoService:
             Tuple: (Datos actualizados o mensaje de error, código HTTP)
         """
         try:
-            aeropuerto = self.repository.obtener_por_id(id_aeropuerto)
-            if not aeropuerto:
-                return {"error": "Aeropuerto no encontrado"}, 404
-                
             datos_validados = self.schema.load(datos, partial=True)
-            aeropuerto = self.repository.actualizar(aeropuerto, datos_validados)
+            aeropuerto = self.repository.actualizar(id_aeropuerto, datos_validados)
+            if aeropuerto is None:
+                return {"error": "Aeropuerto no encontrado"}, 404
             return self.schema.dump(aeropuerto), 200
         except ValidationError as err:
             logging.warning(f"Validación fallida: {err.messages}")
@@ -95,6 +119,33 @@ class AeropuertoService:
             logging.error(f"Error al actualizar aeropuerto {id_aeropuerto}: {str(e)}")
             return {"error": "Error interno del servidor"}, 500
 
+    def sincronizar_aeropuertos(self, registros: List[Dict]) -> Tuple[Dict, int]:
+        """Inserta o actualiza un lote de aeropuertos por ID (carga desde el sistema maestro).
+
+        Args:
+            registros (List[Dict]): Aeropuertos con `id_aeropuerto` y `nombre_aeropuerto`
+
+        Returns:
+            Tuple: (Conteos de insertados, actualizados y sin_cambios o mensaje de error, código HTTP)
+        """
+        if not isinstance(registros, list) or not registros:
+            return {"error": "'registros' debe ser una lista no vacía"}, 400
+        if len(registros) > MAX_REGISTROS_LOTE:
+            return {"error": f"Máximo {MAX_REGISTROS_LOTE} registros por lote"}, 400
+        try:
+            filas = self.schema_upsert.load(registros)
+            ids = [fila['id_aeropuerto'] for fila in filas]
+            if len(set(ids)) != len(ids):
+                return {"error": "Los IDs de aeropuerto del lote deben ser únicos"}, 400
+            conteos = self.repository.upsert_lote(filas)
+            return {**conteos, 'total': len(filas)}, 200
+        except ValidationError as err:
+            logging.warning(f"Validación fallida: {err.messages}")
+            return {"error": "Datos inválidos", "detalles": err.messages}, 400
+        except Exception as e:
+            logging.error(f"Error en la carga masiva de aeropuertos: {str(e)}")
+            return {"error": "Error interno del servidor"}, 500
+
     def eliminar_aeropuerto(self, id_aeropuerto: int) -> Tuple[None, int]:
         """Elimina un aeropuerto.
         
@@ -105,17 +156,14 @@ class AeropuertoService:
             Tuple: (None, código HTTP)
         """
         try:
-            aeropuerto = self.repository.obtener_por_id(id_aeropuerto)
-            if not aeropuerto:
+            if not self.repository.eliminar(id_aeropuerto):
                 return {"error": "Aeropuerto no encontrado"}, 404
-                
-            self.repository.eliminar(aeropuerto)
             return None, 204
         except Exception as e:
             logging.error(f"Error al eliminar aeropuerto {id_aeropuerto}: {str(e)}")
             return {"error": "Error interno del servidor"}, 500
 
-    @cache.memoize(timeout=3600)
+    @cache.memoize(timeout=3600, response_filter=respuesta_cacheable)
     def obtener_mas_ocupado(self) -> Dict:
         """Obtiene el/los aeropuerto(s) más ocupado(s) con caché de 1 hora.
         
@@ -161,4 +209,76 @@ class AeropuertoService:
             }
         except Exception as e:
             logging.error(f"Error al obtener estadísticas del aeropuerto {id_aeropuerto}: {str(e)}")
-            return {"error": "Error al obtener estadísticas"}, 500
\ No newline at end of file
+            return {"error": "Error al obtener estadísticas"}, 500
+
+    def obtener_serie(self, id_aeropuerto: int, granularidad: str = 'dia',
+                      desde: Optional[date] = None, hasta: Optional[date] = None) -> Union[Dict, Tuple[Dict, int]]:
+        """Obtiene la serie temporal de salidas y llegadas de un aeropuerto.
+
+        El rango se amplía a buckets completos. Los buckets ya cerrados (anteriores
+        al bucket actual) se guardan en caché uno por uno sin expiración y se
+        invalidan solo cuando se escribe un vuelo de ese aeropuerto en ese
+        periodo, así que un periodo cerrado no se vuelve a calcular.
+
+        Args:
+            id_aeropuerto (int): ID del aeropuerto
+            granularidad (str): 'dia', 'semana' o 'mes'
+            desde (Optional[date]): Fecha inicial; por defecto una ventana según la granularidad
+            hasta (Optional[date]): Fecha final; por defecto hoy
+
+        Returns:
+            Dict: Arreglos paralelos `timestamps`, `salidas` y `llegadas`
+        """
+        if granularidad not in serie_trafico.GRANULARIDADES:
+            return {"error": f"Granularidad inválida, use una de: {', '.join(serie_trafico.GRANULARIDADES)}"}, 400
+
+        hoy = date.today()
+        hasta = hasta or hoy
+        if desde is None:
+            desde = serie_trafico.truncar(hasta, granularidad)
+            for _ in range(serie_trafico.VENTANA_POR_DEFECTO[granularidad] - 1):
+                desde = serie_trafico.anterior(desde, granularidad)
+        if desde > hasta:
+            return {"error": "'desde' debe ser anterior o igual a 'hasta'"}, 400
+
+        try:
+            buckets = serie_trafico.generar_buckets(desde, hasta, granularidad)
+        except ValueError as err:
+            return {"error": str(err)}, 400
+
+        aeropuerto = self.repository.obtener_por_id(id_aeropuerto)
+
+        try:
+            claves = [serie_trafico.clave_bucket(id_aeropuerto, granularidad, b) for b in buckets]
+            valores = list(cache.get_many(*claves))
+            faltantes = [i for i, valor in enumerate(valores) if valor is None]
+
+            if faltantes:
+                # Una sola consulta cubre desde el primer hasta el último bucket faltante
+                inicio = buckets[faltantes[0]]
+                fin = serie_trafico.siguiente(buckets[faltantes[-1]], granularidad)
+                filas = self.repository.obtener_serie(
+                    id_aeropuerto, serie_trafico.GRANULARIDADES[granularidad], inicio, fin
+                )
+                conteos = {f.bucket: (int(f.salidas or 0), int(f.llegadas or 0)) for f in filas}
+
+                cerrados = {}
+                for i in faltantes:
+                    valores[i] = conteos.get(buckets[i], (0, 0))
+                    if serie_trafico.siguiente(buckets[i], granularidad) <= hoy:
+                        cerrados[claves[i]] = valores[i]
+                if cerrados:
+                    cache.set_many(cerrados, timeout=0)
+
+            return {
+                'aeropuerto': self.schema.dump(aeropuerto),
+                'granularidad': granularidad,
+                'desde': buckets[0].isoformat(),
+                'hasta': (serie_trafico.siguiente(buckets[-1], granularidad) - timedelta(days=1)).isoformat(),
+                'timestamps': [b.isoformat() for b in buckets],
+                'salidas': [v[0] for v in valores],
+                'llegadas': [v[1] for v in valores]
+            }
+        except Exception as e:
+            logging.error(f"Error al obtener serie del aeropuerto {id_aeropuerto}: {str(e)}")
+            return {"error": "Error al obtener la serie de tráfico"}, 500
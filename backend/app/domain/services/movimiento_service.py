@@ -1,12 +1,15 @@
 from typing import Dict, List, Any, Tuple
 from app.extensions import cache
+from app.infrastructure.caching.identidad import IdentidadCacheEstable, respuesta_cacheable
 from app.domain.repositories.movimiento_repository import MovimientoRepository
 from app.api.schemas.movimiento_schema import MovimientoSchema
 from app.api.schemas.vuelo_schema import VueloSchema
 from marshmallow import ValidationError
 import logging
+from app.infrastructure.observability.trazas import trazar_capa
 
-class MovimientoService:
+@trazar_capa('servicio')
+class MovimientoService(IdentidadCacheEstable):
     """Servicio para manejar la lógica de negocio relacionada con movimientos de vuelos."""
 
     def __init__(self, repository: MovimientoRepository):
@@ -78,7 +81,7 @@ class MovimientoService:
             logging.error(f"Error al crear movimiento: {str(e)}")
             return {"error": "Error interno del servidor"}, 500
 
-    @cache.memoize(timeout=3600)
+    @cache.memoize(timeout=3600, response_filter=respuesta_cacheable)
     def obtener_estadisticas(self) -> Dict[str, Any]:
         """Obtiene estadísticas detalladas de movimientos con caché de 1 hora.
         
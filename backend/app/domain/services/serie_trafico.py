@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+from typing import Dict, List
+
+# Granularidad expuesta en la API -> unidad de date_trunc en PostgreSQL
+GRANULARIDADES: Dict[str, str] = {
+    'dia': 'day',
+    'semana': 'week',
+    'mes': 'month'
+}
+
+# Número de buckets devueltos cuando no se indica `desde`
+VENTANA_POR_DEFECTO: Dict[str, int] = {
+    'dia': 30,
+    'semana': 12,
+    'mes': 12
+}
+
+MAX_BUCKETS = 1000
+
+
+def truncar(dia: date, granularidad: str) -> date:
+    """Inicio del bucket que contiene `dia` (semanas ISO: inician en lunes, igual que date_trunc)."""
+    if granularidad == 'dia':
+        return dia
+    if granularidad == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if granularidad == 'mes':
+        return dia.replace(day=1)
+    raise ValueError(f"Granularidad inválida: {granularidad}")
+
+
+def siguiente(inicio: date, granularidad: str) -> date:
+    """Inicio del bucket siguiente a `inicio`."""
+    if granularidad == 'dia':
+        return inicio + timedelta(days=1)
+    if granularidad == 'semana':
+        return inicio + timedelta(weeks=1)
+    if granularidad == 'mes':
+        return (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+    raise ValueError(f"Granularidad inválida: {granularidad}")
+
+
+def anterior(inicio: date, granularidad: str) -> date:
+    """Inicio del bucket anterior a `inicio`."""
+    return truncar(inicio - timedelta(days=1), granularidad)
+
+
+def generar_buckets(desde: date, hasta: date, granularidad: str) -> List[date]:
+    """Lista los inicios de bucket que cubren [desde, hasta] (ambos inclusive).
+
+    Raises:
+        ValueError: Si el rango supera MAX_BUCKETS
+    """
+    buckets = []
+    actual = truncar(desde, granularidad)
+    while actual <= hasta:
+        buckets.append(actual)
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f"El rango solicitado excede {MAX_BUCKETS} buckets")
+        actual = siguiente(actual, granularidad)
+    return buckets
+
+
+def clave_bucket(id_aeropuerto: int, granularidad: str, inicio: date) -> str:
+    """Clave de caché de un bucket cerrado de la serie de un aeropuerto."""
+    return f"serie_trafico:{id_aeropuerto}:{granularidad}:{inicio.isoformat()}"
+
+
+def claves_afectadas(id_aeropuerto: int, dia: date) -> List[str]:
+    """Claves de todos los buckets (de cualquier granularidad) que contienen un vuelo."""
+    return [
+        clave_bucket(id_aeropuerto, granularidad, truncar(dia, granularidad))
+        for granularidad in GRANULARIDADES
+    ]
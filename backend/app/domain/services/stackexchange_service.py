@@ -2,19 +2,26 @@ import requests
 from datetime import datetime
 from flask import current_app
 from app.infrastructure.external.stackexchange import StackExchangeConfig as Config
+from app.infrastructure.external.precarga_stackexchange import precarga_stackexchange
 from typing import Dict, List, Any, Tuple, Optional
+from app.infrastructure.observability.trazas import SesionHttpTrazada, trazar_capa
 
+@trazar_capa('servicio')
 class StackExchangeService:
     """Servicio para interactuar con la API de Stack Exchange y procesar estadísticas de preguntas."""
     
     BASE_URL = Config.API_URL  # URL base de la API configurada externamente
     
     def __init__(self):
-        """Inicializa el servicio con una sesión HTTP reutilizable."""
-        self.session = requests.Session()
+        """Inicializa el servicio con una sesión HTTP reutilizable (propaga la traza al upstream)."""
+        self.session = SesionHttpTrazada()
     
     def obtener_estadisticas(self, etiqueta: str = 'perl') -> Tuple[Dict[str, Any], int]:
         """Obtiene y procesa estadísticas de preguntas de Stack Overflow para una etiqueta específica.
+
+        Las etiquetas populares se sirven del resultado precalculado por la precarga
+        mientras tenga menos de RESULTADO_TTL_S; durante un backoff o una caída del
+        upstream se sirve el último resultado conocido.
         
         Args:
             etiqueta (str): Etiqueta para filtrar preguntas (default: 'perl')
@@ -37,6 +44,38 @@ class StackExchangeService:
         Ejemplo de error:
             ({"error": "No se encontraron resultados"}, 404)
         """
+        etiqueta = (etiqueta or 'perl').strip().lower()
+        precarga_stackexchange.registrar_solicitud(etiqueta)
+        guardado = precarga_stackexchange.obtener(etiqueta)
+        if guardado is not None and guardado['edad_s'] < Config.RESULTADO_TTL_S:
+            precarga_stackexchange.registrar_resultado_servido('acierto')
+            return guardado['resultado'], guardado['codigo']
+
+        if precarga_stackexchange.espera_backoff() > 0:
+            # El upstream pidió esperar: se sirve el último resultado conocido aunque esté vencido
+            if guardado is not None:
+                precarga_stackexchange.registrar_resultado_servido('acierto_vencido')
+                return guardado['resultado'], guardado['codigo']
+            precarga_stackexchange.registrar_resultado_servido('rechazada_backoff')
+            return {"error": "StackExchange no está disponible temporalmente"}, 503
+
+        resultado = self.consultar_api(etiqueta)
+        if resultado[1] == 503 and guardado is not None:
+            precarga_stackexchange.registrar_resultado_servido('acierto_vencido')
+            return guardado['resultado'], guardado['codigo']
+        precarga_stackexchange.registrar_resultado_servido('fallo')
+        return resultado
+
+    def consultar_api(self, etiqueta: str, origen: str = 'usuario') -> Tuple[Dict[str, Any], int]:
+        """Consulta la API de Stack Exchange y guarda el resultado procesado para las siguientes solicitudes.
+
+        Args:
+            etiqueta (str): Etiqueta normalizada
+            origen (str): 'usuario' o 'precarga' (para las métricas de cuota)
+
+        Returns:
+            Tuple[Dict[str, Any], int]: Estadísticas procesadas o mensaje de error, y código HTTP
+        """
         try:
             params = {
                 'order': 'desc',
@@ -46,16 +85,25 @@ class StackExchangeService:
                 'filter': '!9Z(-wzu0T'  # Filtro para campos específicos
             }
             
-            response = self.session.get(self.BASE_URL, params=params, timeout=10)
+            response = self.session.get(self.BASE_URL, params=params, timeout=Config.TIMEOUT)
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+            # La cuota y el backoff llegan también en las respuestas de error
+            precarga_stackexchange.registrar_respuesta(origen, response.status_code, data)
             response.raise_for_status()  # Lanza excepción para códigos 4XX/5XX
-            data = response.json()
-            
-            if not data.get('items'):
-                return {"error": "No se encontraron resultados"}, 404
             
-            return self._procesar_respuesta(data['items']), 200
+            if not data or not data.get('items'):
+                resultado = {"error": "No se encontraron resultados"}, 404
+            else:
+                resultado = self._procesar_respuesta(data['items']), 200
+            precarga_stackexchange.guardar(etiqueta, *resultado)
+            return resultado
             
         except requests.exceptions.RequestException as e:
+            if getattr(e, 'response', None) is None:
+                precarga_stackexchange.registrar_respuesta(origen, None, None)
             current_app.logger.error(f"Error StackExchange API: {str(e)}")
             return {"error": "Error al consultar StackExchange"}, 503
     
@@ -0,0 +1,161 @@
+import logging
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from app.domain.repositories.aerolinea_repository import AerolineaRepository
+from app.domain.repositories.aeropuerto_repository import AeropuertoRepository
+from app.domain.repositories.movimiento_repository import MovimientoRepository
+from app.domain.repositories.vuelo_repository import VueloRepository
+from app.domain.services import serie_trafico
+from app.domain.services.aerolinea_service import AerolineaService
+from app.domain.services.aeropuerto_service import AeropuertoService
+from app.domain.services.movimiento_service import MovimientoService
+from app.domain.services.vuelo_service import VueloService
+from app.api.inputs import MAX_IDS_LOTE
+from app.infrastructure.jobs.gestor import ColaLlenaError, GestorTrabajos, gestor_trabajos
+
+
+class TrabajoService:
+    """Reportes costosos ejecutados en segundo plano como trabajos asíncronos.
+
+    Cada tipo de reporte valida sus parámetros al enviarse y se ejecuta con el
+    mismo servicio que atiende el endpoint síncrono, por lo que su resultado
+    también queda en la caché memoizada de ese servicio.
+    """
+
+    def __init__(self, gestor: GestorTrabajos = gestor_trabajos) -> None:
+        self.gestor = gestor
+        self.vuelo_service = VueloService(VueloRepository())
+        self.aerolinea_service = AerolineaService(AerolineaRepository())
+        self.aeropuerto_service = AeropuertoService(AeropuertoRepository())
+        self.movimiento_service = MovimientoService(MovimientoRepository())
+        # tipo -> (validador de parámetros, ejecutor)
+        self.tipos: Dict[str, Tuple[Callable[[Dict[str, Any]], Dict[str, Any]], Callable[..., Any]]] = {
+            'metricas': (self._sin_parametros, self.vuelo_service.obtener_metricas),
+            'estadisticas_aerolineas': (self._validar_estadisticas_aerolineas, self._estadisticas_aerolineas),
+            'estadisticas_movimientos': (self._sin_parametros, self.movimiento_service.obtener_estadisticas),
+            'serie_aeropuerto': (self._validar_serie_aeropuerto, self._serie_aeropuerto)
+        }
+
+    def enviar(self, tipo: str, parametros: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+        """Valida y encola un reporte.
+
+        Args:
+            tipo (str): Tipo de reporte (ver `self.tipos`)
+            parametros (Optional[Dict[str, Any]]): Parámetros del reporte
+
+        Returns:
+            Tuple[Dict[str, Any], int]: Trabajo y código HTTP:
+                - 202 si se encoló uno nuevo
+                - 200 si ya había uno idéntico en curso (se devuelve ese)
+                - 400 si el tipo o los parámetros no son válidos
+                - 503 si la cola está llena
+        """
+        if tipo not in self.tipos:
+            return {"error": f"Tipo de reporte inválido, use uno de: {', '.join(self.tipos)}"}, 400
+        if parametros is not None and not isinstance(parametros, dict):
+            return {"error": "'parametros' debe ser un objeto"}, 400
+
+        validar, ejecutar = self.tipos[tipo]
+        try:
+            normalizados = validar(parametros or {})
+        except ValueError as err:
+            return {"error": str(err)}, 400
+
+        try:
+            trabajo, nuevo = self.gestor.enviar(tipo, normalizados, ejecutar)
+            return self._formatear(trabajo), 202 if nuevo else 200
+        except ColaLlenaError:
+            return {"error": "Demasiados trabajos en curso, intente más tarde"}, 503
+        except Exception as e:
+            logging.error(f"Error al encolar el trabajo {tipo}: {str(e)}")
+            return {"error": "Error interno al encolar el trabajo"}, 500
+
+    def obtener(self, id_trabajo: str) -> Union[Dict[str, Any], Tuple[Dict[str, Any], int]]:
+        """Obtiene el estado (y el resultado, si terminó) de un trabajo.
+
+        Returns:
+            Dict[str, Any]: Trabajo, o error 404 si no existe o su resultado expiró
+        """
+        trabajo = self.gestor.obtener(id_trabajo)
+        if trabajo is None:
+            return {"error": "Trabajo no encontrado o expirado"}, 404
+        return self._formatear(trabajo)
+
+    # --- Validadores --------------------------------------------------------
+
+    @staticmethod
+    def _sin_parametros(parametros: Dict[str, Any]) -> Dict[str, Any]:
+        if parametros:
+            raise ValueError("Este reporte no admite parámetros")
+        return {}
+
+    @staticmethod
+    def _entero(valor: Any, nombre: str, minimo: int, maximo: Optional[int] = None) -> int:
+        if isinstance(valor, bool) or not isinstance(valor, int) or valor < minimo or (maximo is not None and valor > maximo):
+            rango = f"entre {minimo} y {maximo}" if maximo is not None else f"mayor o igual a {minimo}"
+            raise ValueError(f"'{nombre}' debe ser un entero {rango}")
+        return valor
+
+    @staticmethod
+    def _fecha(valor: Any, nombre: str) -> Optional[str]:
+        if valor is None:
+            return None
+        try:
+            return date.fromisoformat(str(valor)).isoformat()
+        except ValueError:
+            raise ValueError(f"'{nombre}' debe ser una fecha YYYY-MM-DD")
+
+    def _validar_estadisticas_aerolineas(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        desconocidos = set(parametros) - {'ids', 'top'}
+        if desconocidos:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+        ids = parametros.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list) or not ids or len(ids) > MAX_IDS_LOTE:
+                raise ValueError(f"'ids' debe ser una lista de 1 a {MAX_IDS_LOTE} IDs")
+            ids = sorted({self._entero(i, 'ids', 1) for i in ids})
+        return {'ids': ids, 'top': self._entero(parametros.get('top', 5), 'top', 1, 50)}
+
+    def _validar_serie_aeropuerto(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        desconocidos = set(parametros) - {'id_aeropuerto', 'granularidad', 'desde', 'hasta'}
+        if desconocidos:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+        if 'id_aeropuerto' not in parametros:
+            raise ValueError("'id_aeropuerto' es requerido")
+        granularidad = parametros.get('granularidad', 'dia')
+        if granularidad not in serie_trafico.GRANULARIDADES:
+            raise ValueError(f"Granularidad inválida, use una de: {', '.join(serie_trafico.GRANULARIDADES)}")
+        return {
+            'id_aeropuerto': self._entero(parametros['id_aeropuerto'], 'id_aeropuerto', 1),
+            'granularidad': granularidad,
+            'desde': self._fecha(parametros.get('desde'), 'desde'),
+            'hasta': self._fecha(parametros.get('hasta'), 'hasta')
+        }
+
+    # --- Ejecutores ---------------------------------------------------------
+
+    def _estadisticas_aerolineas(self, ids: Optional[List[int]], top: int):
+        return self.aerolinea_service.obtener_estadisticas_lote(tuple(ids) if ids else None, top)
+
+    def _serie_aeropuerto(self, id_aeropuerto: int, granularidad: str,
+                          desde: Optional[str], hasta: Optional[str]):
+        return self.aeropuerto_service.obtener_serie(
+            id_aeropuerto, granularidad,
+            date.fromisoformat(desde) if desde else None,
+            date.fromisoformat(hasta) if hasta else None
+        )
+
+    @staticmethod
+    def _formatear(trabajo: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': trabajo['id'],
+            'tipo': trabajo['tipo'],
+            'parametros': trabajo['parametros'],
+            'estado': trabajo['estado'],
+            'creado': trabajo['creado'],
+            'iniciado': trabajo['iniciado'],
+            'terminado': trabajo['terminado'],
+            'resultado': trabajo['resultado'],
+            'error': trabajo['error'],
+            'codigo': trabajo['codigo']
+        }
@@ -1,14 +1,26 @@
-from typing import List, Dict, Tuple, Optional, Any
+import json
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import List, Dict, Iterator, Tuple, Optional, Any, Sequence, Union
 from datetime import date
 from app.extensions import cache
-from app.domain.repositories.vuelo_repository import VueloRepository
-from app.api.schemas.vuelo_schema import VueloSchema
-from flask import jsonify
+from app.infrastructure.caching.identidad import IdentidadCacheEstable, respuesta_cacheable
+from app.domain.repositories.vuelo_repository import ORDENES_BUSQUEDA, VueloRepository
+from app.api.schemas.vuelo_schema import FiltroVuelosSchema, VueloSchema
+from app.api.inputs import codificar_cursor, decodificar_cursor
+from app.infrastructure.database.escritura_agrupada import (
+    BufferLlenoError, EscrituraAgrupada, GROUP_COMMIT_TIMEOUT_S, VUELOS_GROUP_COMMIT
+)
+from flask import current_app, jsonify
 import logging
 from marshmallow import ValidationError
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.infrastructure.observability.trazas import trazar_capa
 
-class VueloService:
+# Buffer de group commit del proceso (solo se usa con VUELOS_GROUP_COMMIT=true)
+buffer_vuelos = EscrituraAgrupada('vuelos', VueloRepository.crear_lote)
+
+@trazar_capa('servicio')
+class VueloService(IdentidadCacheEstable):
     def __init__(self, repository: VueloRepository) -> None:
         """Inicializa el servicio de vuelos con el repositorio y esquemas necesarios.
         
@@ -18,6 +30,7 @@ class VueloService:
         self.repository = repository
         self.schema = VueloSchema()
         self.schema_list = VueloSchema(many=True)
+        self.schema_filtro = FiltroVuelosSchema()
 
     def obtener_todos(self) -> List[Dict[str, Any]]:
         """Obtiene todos los vuelos disponibles.
@@ -49,15 +62,22 @@ class VueloService:
 
     def crear_vuelo(self, datos: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
         """Crea un nuevo vuelo con los datos proporcionados.
+
+        Con VUELOS_GROUP_COMMIT=true el vuelo se encola en el buffer del proceso
+        y se inserta junto con los demás vuelos recibidos en la misma ventana;
+        la respuesta se envía cuando el lote ya está confirmado.
         
         Args:
             datos (Dict[str, Any]): Datos del vuelo a crear
             
         Returns:
             Tuple[Dict[str, Any], int]: Vuelo creado serializado y código HTTP
+                (503 si el buffer está lleno o el lote no se confirmó a tiempo)
         """
         try:
             datos_validados = self.schema.load(datos)
+            if VUELOS_GROUP_COMMIT:
+                return self._crear_agrupado(datos_validados)
             vuelo = self.repository.crear(datos_validados)
             return self.schema.dump(vuelo), 201
         except ValidationError as err:
@@ -67,6 +87,23 @@ class VueloService:
             logging.error(f"Error de base de datos al crear vuelo: {str(err)}")
             return {"error": "Error al guardar el vuelo"}, 500
 
+    def _crear_agrupado(self, datos_validados: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Encola el vuelo en el buffer de group commit y espera el commit de su lote.
+
+        Raises:
+            SQLAlchemyError: Si el vuelo no se pudo guardar
+        """
+        try:
+            futuro = buffer_vuelos.enviar(datos_validados, current_app._get_current_object())
+        except BufferLlenoError:
+            return {"error": "Demasiadas escrituras pendientes, intente más tarde"}, 503
+        try:
+            return self.schema.dump(futuro.result(timeout=GROUP_COMMIT_TIMEOUT_S)), 201
+        except FutureTimeoutError:
+            # El lote puede confirmarse después: el resultado es desconocido, no un fallo
+            logging.error("Tiempo agotado esperando la confirmación del lote de vuelos")
+            return {"error": "No se pudo confirmar el guardado del vuelo a tiempo"}, 503
+
     def actualizar_vuelo(self, id_vuelo: int, datos: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
         """Actualiza un vuelo existente.
         
@@ -80,6 +117,8 @@ class VueloService:
         try:
             datos_validados = self.schema.load(datos, partial=True)
             vuelo = self.repository.actualizar(id_vuelo, datos_validados)
+            if vuelo is None:
+                return {"error": "Vuelo no encontrado"}, 404
             return self.schema.dump(vuelo), 200
         except ValidationError as err:
             logging.warning(f"Error de validación al actualizar vuelo {id_vuelo}: {err.messages}")
@@ -98,13 +137,80 @@ class VueloService:
             Tuple[None, int]: Código HTTP de respuesta
         """
         try:
-            self.repository.eliminar(id_vuelo)
+            if not self.repository.eliminar(id_vuelo):
+                return {"error": "Vuelo no encontrado"}, 404
             return None, 204
         except SQLAlchemyError as err:
             logging.error(f"Error al eliminar vuelo {id_vuelo}: {str(err)}")
             return {"error": f"No se pudo eliminar el vuelo: {str(err)}"}, 500
 
-    @cache.memoize(timeout=3600)
+    def eliminar_por_filtro(self, filtro: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+        """Elimina todos los vuelos que cumplen el filtro (p. ej. un día cancelado en un aeropuerto).
+
+        Args:
+            filtro (Optional[Dict[str, Any]]): desde, hasta, id_aerolinea, id_aeropuerto, id_movimiento
+
+        Returns:
+            Tuple[Dict[str, Any], int]: Vuelos eliminados y código HTTP; si falla a mitad
+                de camino, el error incluye los vuelos ya eliminados
+        """
+        try:
+            filtro_validado = self._validar_filtro(filtro)
+        except ValidationError as err:
+            return {"error": "Filtro inválido", "detalles": err.messages}, 400
+
+        eliminados = 0
+        try:
+            for cantidad in self.repository.eliminar_por_filtro(filtro_validado):
+                eliminados += cantidad
+            return {"eliminados": eliminados}, 200
+        except SQLAlchemyError as err:
+            logging.error(f"Error al eliminar vuelos por filtro {filtro_validado}: {str(err)}")
+            return {"error": "Error al eliminar los vuelos", "eliminados": eliminados}, 500
+
+    def actualizar_por_filtro(self, filtro: Optional[Dict[str, Any]],
+                              cambios: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+        """Aplica los mismos cambios a todos los vuelos que cumplen el filtro (p. ej. reasignar aerolínea).
+
+        Args:
+            filtro (Optional[Dict[str, Any]]): desde, hasta, id_aerolinea, id_aeropuerto, id_movimiento
+            cambios (Optional[Dict[str, Any]]): Campos del vuelo a asignar
+
+        Returns:
+            Tuple[Dict[str, Any], int]: Vuelos actualizados y código HTTP; si falla a mitad
+                de camino, el error incluye los vuelos ya actualizados
+        """
+        try:
+            filtro_validado = self._validar_filtro(filtro)
+            if not isinstance(cambios, dict) or not cambios:
+                raise ValidationError({"cambios": ["Debe indicar al menos un campo a modificar"]})
+            cambios_validados = self.schema.load(cambios, partial=True)
+        except ValidationError as err:
+            return {"error": "Datos inválidos", "detalles": err.messages}, 400
+
+        actualizados = 0
+        try:
+            for cantidad in self.repository.actualizar_por_filtro(filtro_validado, cambios_validados):
+                actualizados += cantidad
+            return {"actualizados": actualizados}, 200
+        except IntegrityError as err:
+            logging.warning(f"Referencia inválida al actualizar vuelos por filtro: {str(err)}")
+            return {"error": "Los cambios hacen referencia a registros inexistentes",
+                    "actualizados": actualizados}, 400
+        except SQLAlchemyError as err:
+            logging.error(f"Error al actualizar vuelos por filtro {filtro_validado}: {str(err)}")
+            return {"error": "Error al actualizar los vuelos", "actualizados": actualizados}, 500
+
+    def _validar_filtro(self, filtro: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Valida el filtro de una operación masiva; exige al menos un criterio."""
+        if not isinstance(filtro, dict):
+            raise ValidationError({"filtro": ["Debe ser un objeto"]})
+        filtro_validado = self.schema_filtro.load(filtro)
+        if not filtro_validado:
+            raise ValidationError({"filtro": ["Debe indicar al menos un criterio"]})
+        return filtro_validado
+
+    @cache.memoize(timeout=3600, response_filter=respuesta_cacheable)
     def obtener_metricas(self) -> Dict[str, Any]:
         """Obtiene métricas de vuelos con caché de 1 hora.
         
@@ -127,4 +233,145 @@ class VueloService:
             return self.repository._aerolineas_mas_de_dos_vuelos()
         except Exception as e:
             logging.error(f"Error al obtener aerolíneas frecuentes: {str(e)}")
-            return {"error": "Error al obtener aerolíneas frecuentes"}
\ No newline at end of file
+            return {"error": "Error al obtener aerolíneas frecuentes"}
+
+    def obtener_aerolineas_frecuentes(self, min_vuelos: int = 3,
+                                      desde: Optional[date] = None,
+                                      hasta: Optional[date] = None,
+                                      ids_aerolineas: Optional[Sequence[int]] = None,
+                                      cursor: Optional[str] = None,
+                                      limite: int = 100) -> Union[Dict[str, Any], Tuple[Dict[str, Any], int]]:
+        """Obtiene una página de aerolíneas con al menos `min_vuelos` vuelos en un día.
+
+        Args:
+            min_vuelos (int): Mínimo de vuelos por día (inclusive)
+            desde (Optional[date]): Fecha inicial
+            hasta (Optional[date]): Fecha final
+            ids_aerolineas (Optional[Sequence[int]]): Filtro de aerolíneas
+            cursor (Optional[str]): Cursor devuelto por la página anterior
+            limite (int): Tamaño de página
+
+        Returns:
+            Dict[str, Any]: Diccionario con:
+                - resultados: Filas de la página
+                - siguiente_cursor: Cursor para la página siguiente o None si no hay más
+        """
+        try:
+            despues_de = self._decodificar_cursor_frecuentes(cursor) if cursor else None
+        except ValueError as err:
+            return {"error": str(err)}, 400
+
+        try:
+            filas = list(self.repository.aerolineas_con_min_vuelos(
+                min_vuelos, desde, hasta, ids_aerolineas, despues_de, limite + 1
+            ))
+            hay_mas = len(filas) > limite
+            filas = filas[:limite]
+            return {
+                'resultados': [self._formatear_frecuente(f) for f in filas],
+                'siguiente_cursor': (
+                    codificar_cursor(filas[-1].id_aerolinea, filas[-1].dia) if hay_mas else None
+                )
+            }
+        except SQLAlchemyError as err:
+            logging.error(f"Error al obtener aerolíneas frecuentes: {str(err)}")
+            return {"error": "Error al obtener aerolíneas frecuentes"}, 500
+
+    def buscar_vuelos(self, filtros: Dict[str, Any], orden: str = 'dia', cursor: Optional[str] = None,
+                      limite: int = 50, con_total: bool = True) -> Union[Dict[str, Any], Tuple[Dict[str, Any], int]]:
+        """Obtiene una página de vuelos que cumplen los filtros, paginada por cursor.
+
+        El total solo se calcula en la primera página (sin cursor): es exacto
+        hasta BUSQUEDA_CONTEO_EXACTO_MAX vuelos y estimado por el planificador
+        por encima, así que ninguna página ejecuta un COUNT(*) completo.
+
+        Args:
+            filtros (Dict[str, Any]): ids_aerolineas, ids_aeropuertos, ids_movimientos, desde y hasta
+            orden (str): 'dia', '-dia', 'id' o '-id'
+            cursor (Optional[str]): Cursor devuelto por la página anterior
+            limite (int): Tamaño de página
+            con_total (bool): Si se incluye el total en la primera página
+
+        Returns:
+            Dict[str, Any]: Diccionario con:
+                - resultados: Vuelos de la página
+                - siguiente_cursor: Cursor para la página siguiente o None si no hay más
+                - total: Total de vuelos de la búsqueda (None en páginas siguientes)
+                - total_exacto: False si el total es una estimación
+        """
+        if filtros.get('desde') and filtros.get('hasta') and filtros['desde'] > filtros['hasta']:
+            return {"error": "'desde' no puede ser posterior a 'hasta'"}, 400
+        try:
+            despues_de = self._decodificar_cursor_busqueda(cursor, orden) if cursor else None
+        except ValueError as err:
+            return {"error": str(err)}, 400
+
+        try:
+            filas = self.repository.buscar(filtros, orden, despues_de, limite + 1)
+            hay_mas = len(filas) > limite
+            filas = filas[:limite]
+            total, exacto = (None, None)
+            if con_total and cursor is None:
+                total, exacto = self.repository.contar_busqueda(filtros)
+            return {
+                'resultados': [{
+                    'id': f.id,
+                    'id_aerolinea': f.id_aerolinea,
+                    'id_aeropuerto': f.id_aeropuerto,
+                    'id_movimiento': f.id_movimiento,
+                    'dia': f.dia.strftime('%Y-%m-%d')
+                } for f in filas],
+                'siguiente_cursor': codificar_cursor(orden, filas[-1].dia, filas[-1].id) if hay_mas else None,
+                'total': total,
+                'total_exacto': exacto
+            }
+        except SQLAlchemyError as err:
+            logging.error(f"Error al buscar vuelos: {str(err)}")
+            return {"error": "Error al buscar vuelos"}, 500
+
+    @staticmethod
+    def _decodificar_cursor_busqueda(cursor: str, orden: str) -> Tuple[Any, ...]:
+        # El cursor guarda el orden con el que se generó: no sirve para otro orden
+        partes = decodificar_cursor(cursor)
+        if len(partes) != 3 or partes[0] != orden:
+            raise ValueError("cursor inválido")
+        try:
+            dia, id_vuelo = date.fromisoformat(partes[1]), int(partes[2])
+        except ValueError:
+            raise ValueError("cursor inválido")
+        return (dia, id_vuelo) if len(ORDENES_BUSQUEDA[orden][0]) == 2 else (id_vuelo,)
+
+    def stream_aerolineas_frecuentes(self, min_vuelos: int = 3,
+                                     desde: Optional[date] = None,
+                                     hasta: Optional[date] = None,
+                                     ids_aerolineas: Optional[Sequence[int]] = None) -> Iterator[str]:
+        """Genera todas las filas como NDJSON (una línea JSON por fila), leyendo por lotes.
+
+        Returns:
+            Iterator[str]: Líneas JSON terminadas en salto de línea
+        """
+        try:
+            for fila in self.repository.aerolineas_con_min_vuelos(min_vuelos, desde, hasta, ids_aerolineas):
+                yield json.dumps(self._formatear_frecuente(fila), ensure_ascii=False) + '\n'
+        except SQLAlchemyError as err:
+            logging.error(f"Error en el stream de aerolíneas frecuentes: {str(err)}")
+            yield json.dumps({"error": "Error al obtener aerolíneas frecuentes"}) + '\n'
+
+    @staticmethod
+    def _formatear_frecuente(fila) -> Dict[str, Any]:
+        return {
+            'id_aerolinea': fila.id_aerolinea,
+            'nombre_aerolinea': fila.nombre_aerolinea,
+            'dia': fila.dia.strftime('%Y-%m-%d'),
+            'total_vuelos': fila.total
+        }
+
+    @staticmethod
+    def _decodificar_cursor_frecuentes(cursor: str) -> Tuple[int, date]:
+        partes = decodificar_cursor(cursor)
+        if len(partes) != 2:
+            raise ValueError("cursor inválido")
+        try:
+            return int(partes[0]), date.fromisoformat(partes[1])
+        except ValueError:
+            raise ValueError("cursor inválido")
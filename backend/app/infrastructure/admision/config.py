@@ -0,0 +1,27 @@
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Límites por clase de tráfico. Cada ruta pertenece a la clase de su namespace
+# ('vuelos', 'aerolineas', ...) salvo que se marque con `clase_trafico`; las
+# rutas analíticas costosas y las escrituras masivas tienen clases propias.
+#   concurrencia -> peticiones simultáneas por proceso (503 al superarse)
+#   tasa, rafaga -> token bucket: peticiones por segundo y ráfaga máxima (429)
+# Una clase sin entrada (o sin alguno de los valores) no tiene ese límite.
+LIMITES_POR_DEFECTO = {
+    'analitica': {'concurrencia': 4, 'tasa': 20, 'rafaga': 40},
+    'masiva': {'concurrencia': 2}
+}
+
+
+class AdmisionConfig:
+    ADMISION_HABILITADA = os.getenv('ADMISION_HABILITADA', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+    # JSON con límites que se agregan o reemplazan a los de LIMITES_POR_DEFECTO, p. ej.
+    # {"vuelos": {"concurrencia": 32}, "analitica": {"concurrencia": 8, "tasa": 50, "rafaga": 50}}
+    ADMISION_LIMITES = {**LIMITES_POR_DEFECTO, **json.loads(os.getenv('ADMISION_LIMITES', '{}'))}
+    # Espera máxima por un cupo de concurrencia antes de responder 503 (0 = rechazo inmediato)
+    ADMISION_ESPERA_MS = float(os.getenv('ADMISION_ESPERA_MS', '0'))
+    # Retry-After sugerido cuando no hay cupo de concurrencia
+    ADMISION_RETRY_AFTER_S = int(os.getenv('ADMISION_RETRY_AFTER_S', '1'))
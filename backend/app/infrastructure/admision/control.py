@@ -0,0 +1,204 @@
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from flask import Flask, current_app, g, jsonify, request
+from .config import AdmisionConfig
+
+ATRIBUTO_CLASE = '_clase_admision'
+
+
+def clase_trafico(nombre: str) -> Callable:
+    """Asigna un método de un Resource a una clase de tráfico con límites propios.
+
+    No envuelve la función: solo la marca, y el control de admisión la lee
+    antes de despachar la petición.
+
+    Args:
+        nombre (str): Clase de tráfico (clave de ADMISION_LIMITES), p. ej. 'analitica'
+    """
+    def marcar(f):
+        setattr(f, ATRIBUTO_CLASE, nombre)
+        return f
+    return marcar
+
+
+def metodo_de_peticion() -> Optional[Callable]:
+    """Método del Resource de flask_restx que atenderá la petición actual (None si no hay)."""
+    vista = current_app.view_functions.get(request.endpoint)
+    recurso = getattr(vista, 'view_class', None)
+    if recurso is None or request.url_rule is None:
+        return None
+    return getattr(recurso, request.method.lower(), None)
+
+
+class CuboTokens:
+    """Token bucket: admite `tasa` peticiones por segundo con ráfagas de hasta `rafaga`."""
+
+    def __init__(self, tasa: float, rafaga: Optional[float] = None):
+        self.tasa = float(tasa)
+        self.capacidad = float(rafaga if rafaga is not None else max(tasa, 1))
+        self.tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self) -> float:
+        """Consume un token.
+
+        Returns:
+            float: 0 si se admitió; si no, segundos hasta el próximo token
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.tasa
+
+    def devolver(self) -> None:
+        """Reintegra un token consumido por una petición que al final no se atendió."""
+        with self._lock:
+            self.tokens = min(self.capacidad, self.tokens + 1)
+
+
+class LimiteClase:
+    """Cupos de concurrencia y token bucket de una clase de tráfico en este proceso."""
+
+    def __init__(self, nombre: str, concurrencia: Optional[int] = None,
+                 tasa: Optional[float] = None, rafaga: Optional[float] = None):
+        self.nombre = nombre
+        self.concurrencia = concurrencia
+        self._cupos = threading.BoundedSemaphore(concurrencia) if concurrencia else None
+        self._cubo = CuboTokens(tasa, rafaga) if tasa else None
+        self._lock = threading.Lock()
+        # Métricas
+        self.admitidas = 0
+        self.rechazadas_tasa = 0
+        self.rechazadas_concurrencia = 0
+        self.en_curso = 0
+        self.max_en_curso = 0
+
+    def admitir(self, espera_s: float) -> Tuple[bool, int, float]:
+        """Intenta admitir una petición.
+
+        Args:
+            espera_s (float): Espera máxima por un cupo de concurrencia
+
+        Returns:
+            Tuple[bool, int, float]: (admitida, código de rechazo 429/503, segundos sugeridos de espera)
+        """
+        if self._cubo is not None:
+            espera_token = self._cubo.tomar()
+            if espera_token:
+                with self._lock:
+                    self.rechazadas_tasa += 1
+                return False, 429, espera_token
+        if self._cupos is not None:
+            obtenido = self._cupos.acquire(timeout=espera_s) if espera_s > 0 else self._cupos.acquire(blocking=False)
+            if not obtenido:
+                # Un 503 no consume la tasa: el cliente reintenta tras Retry-After sin ser castigado con 429
+                if self._cubo is not None:
+                    self._cubo.devolver()
+                with self._lock:
+                    self.rechazadas_concurrencia += 1
+                return False, 503, AdmisionConfig.ADMISION_RETRY_AFTER_S
+        with self._lock:
+            self.admitidas += 1
+            self.en_curso += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        return True, 0, 0.0
+
+    def liberar(self) -> None:
+        with self._lock:
+            self.en_curso -= 1
+        if self._cupos is not None:
+            self._cupos.release()
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'concurrencia': self.concurrencia,
+                'tasa': self._cubo.tasa if self._cubo else None,
+                'rafaga': self._cubo.capacidad if self._cubo else None,
+                'en_curso': self.en_curso,
+                'max_en_curso': self.max_en_curso,
+                'admitidas': self.admitidas,
+                'rechazadas_429': self.rechazadas_tasa,
+                'rechazadas_503': self.rechazadas_concurrencia
+            }
+
+
+class ControlAdmision:
+    """Control de admisión y descarte de carga para las rutas de la API.
+
+    Cada petición se asigna a una clase de tráfico: la marcada con
+    `clase_trafico` en el método del Resource o, si no tiene, la de su
+    namespace (primer segmento después de /api). Si la clase tiene límites y
+    no hay token o cupo disponible, la petición se rechaza de inmediato con
+    429 (tasa) o 503 (concurrencia) y `Retry-After`, sin ocupar un hilo ni una
+    conexión del pool. Así las rutas analíticas compiten solo entre ellas y
+    los CRUD baratos no quedan detrás.
+    """
+
+    def __init__(self, limites: Optional[Dict[str, Dict[str, Any]]] = None,
+                 espera_ms: float = AdmisionConfig.ADMISION_ESPERA_MS):
+        limites = AdmisionConfig.ADMISION_LIMITES if limites is None else limites
+        self.espera_s = espera_ms / 1000
+        self.clases: Dict[str, LimiteClase] = {
+            nombre: LimiteClase(nombre, valores.get('concurrencia'), valores.get('tasa'), valores.get('rafaga'))
+            for nombre, valores in limites.items()
+        }
+
+    def init_app(self, app: Flask) -> None:
+        app.before_request(self._antes)
+        app.teardown_request(self._despues)
+        app.extensions['control_admision'] = self
+
+    @staticmethod
+    def clase_de_peticion() -> Optional[str]:
+        """Clase de tráfico de la petición actual (None si no es una ruta de la API)."""
+        metodo = metodo_de_peticion()
+        if metodo is None:
+            return None
+        clase = getattr(metodo, ATRIBUTO_CLASE, None)
+        if clase is not None:
+            return clase
+        segmentos = request.url_rule.rule.strip('/').split('/')
+        return segmentos[1] if len(segmentos) > 1 and segmentos[0] == 'api' else None
+
+    def _antes(self):
+        if request.method == 'OPTIONS':
+            return None
+        limite = self.clases.get(self.clase_de_peticion())
+        if limite is None:
+            return None
+        admitida, codigo, espera = limite.admitir(self.espera_s)
+        if admitida:
+            g.limite_admision = limite
+            return None
+        mensaje = ("Demasiadas peticiones para esta ruta, intente más tarde" if codigo == 429
+                   else "Servidor ocupado atendiendo peticiones similares, intente más tarde")
+        respuesta = jsonify({"error": mensaje, "clase": limite.nombre})
+        respuesta.status_code = codigo
+        respuesta.headers['Retry-After'] = str(max(1, math.ceil(espera)))
+        return respuesta
+
+    def _despues(self, excepcion: Optional[BaseException] = None) -> None:
+        limite = g.pop('limite_admision', None)
+        if limite is not None:
+            limite.liberar()
+
+    def resumen(self) -> Dict[str, Any]:
+        """Estado de los límites de cada clase en este proceso."""
+        return {nombre: limite.resumen() for nombre, limite in self.clases.items()}
+
+
+control_admision = ControlAdmision()
+
+
+def registrar_control_admision(app: Flask) -> None:
+    """Activa el control de admisión si ADMISION_HABILITADA."""
+    if AdmisionConfig.ADMISION_HABILITADA:
+        control_admision.init_app(app)
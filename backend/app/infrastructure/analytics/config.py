@@ -0,0 +1,16 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class AnalyticsConfig:
+    # Origen de las métricas de vuelos:
+    #   sql     -> agregaciones en PostgreSQL en cada consulta (por defecto)
+    #   memoria -> contadores incrementales en proceso (MotorMetricas)
+    #   aproximado -> sketches Space-Saving/Count-Min por día (MotorMetricasAproximadas)
+    #   numpy   -> tabla de vuelos en columnas NumPy (MotorMetricasColumnar); requiere
+    #              requirements-analytics.txt y además responde las estadísticas de
+    #              aerolíneas, aeropuertos y movimientos
+    #   snapshot -> igual que numpy pero sobre un archivo mapeado con mmap y compartido
+    #              por todos los workers (SNAPSHOT_RUTA); se regenera tras las escrituras
+    METRICAS_BACKEND = os.getenv('METRICAS_BACKEND', 'sql').strip().lower()
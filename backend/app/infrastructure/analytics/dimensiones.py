@@ -0,0 +1,55 @@
+import threading
+from typing import Dict, Optional
+from app.domain.entities.aerolinea import Aerolinea
+from app.domain.entities.aeropuerto import Aeropuerto
+from app.domain.entities.movimiento import Movimiento
+from app.domain.events import EventoDominio, desagrupar
+from app.infrastructure.database.connection import db
+
+
+class CatalogoDimensiones:
+    """Nombres de aerolíneas, aeropuertos y movimientos en memoria para los motores analíticos.
+
+    Se carga desde la base de datos y se mantiene con los eventos de escritura
+    de las dimensiones, para que las respuestas en memoria no hagan JOINs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.aerolineas: Dict[int, str] = {}
+        self.aeropuertos: Dict[int, str] = {}
+        self.movimientos: Dict[int, str] = {}
+
+    def cargar(self) -> None:
+        """Recarga los catálogos (requiere app context)."""
+        aerolineas = dict(db.session.query(Aerolinea.id_aerolinea, Aerolinea.nombre_aerolinea).all())
+        aeropuertos = dict(db.session.query(Aeropuerto.id_aeropuerto, Aeropuerto.nombre_aeropuerto).all())
+        movimientos = dict(db.session.query(Movimiento.id_movimiento, Movimiento.descripcion).all())
+        with self._lock:
+            self.aerolineas, self.aeropuertos, self.movimientos = aerolineas, aeropuertos, movimientos
+
+    def aplicar_evento(self, evento: EventoDominio) -> None:
+        """Actualiza el nombre afectado por un evento de 'aerolinea', 'aeropuerto' o 'movimiento'."""
+        if evento.entidad == 'aerolinea':
+            nombres, clave, campo = self.aerolineas, 'id_aerolinea', 'nombre_aerolinea'
+        elif evento.entidad == 'aeropuerto':
+            nombres, clave, campo = self.aeropuertos, 'id_aeropuerto', 'nombre_aeropuerto'
+        elif evento.entidad == 'movimiento':
+            nombres, clave, campo = self.movimientos, 'id_movimiento', 'descripcion'
+        else:
+            return
+        with self._lock:
+            for individual in desagrupar(evento):
+                if individual.despues:
+                    nombres[individual.despues[clave]] = individual.despues[campo]
+                elif individual.antes:
+                    nombres.pop(individual.antes[clave], None)
+
+    def nombre_aerolinea(self, id_aerolinea: int) -> Optional[str]:
+        return self.aerolineas.get(id_aerolinea)
+
+    def nombre_aeropuerto(self, id_aeropuerto: int) -> Optional[str]:
+        return self.aeropuertos.get(id_aeropuerto)
+
+    def descripcion_movimiento(self, id_movimiento: int) -> Optional[str]:
+        return self.movimientos.get(id_movimiento)
@@ -0,0 +1,59 @@
+from collections import defaultdict
+from typing import Dict, Hashable, List, Set
+
+
+class ContadorConMaximo:
+    """Contador por clave con índice de máximo que conserva empates.
+
+    Mantiene, además del conteo de cada clave, los grupos de claves por conteo,
+    de modo que incrementar, decrementar y consultar las claves con el conteo
+    máximo cuesta O(1) (más el tamaño del empate al listarlo).
+    """
+
+    def __init__(self):
+        self.conteos: Dict[Hashable, int] = {}
+        self._por_conteo: Dict[int, Set[Hashable]] = defaultdict(set)
+        self.maximo = 0
+
+    def _mover(self, clave: Hashable, anterior: int, nuevo: int) -> None:
+        if anterior > 0:
+            grupo = self._por_conteo[anterior]
+            grupo.discard(clave)
+            if not grupo:
+                del self._por_conteo[anterior]
+        if nuevo > 0:
+            self.conteos[clave] = nuevo
+            self._por_conteo[nuevo].add(clave)
+        else:
+            self.conteos.pop(clave, None)
+
+    def incrementar(self, clave: Hashable, cantidad: int = 1) -> int:
+        """Suma `cantidad` al conteo de la clave y devuelve el nuevo conteo."""
+        anterior = self.conteos.get(clave, 0)
+        nuevo = anterior + cantidad
+        self._mover(clave, anterior, nuevo)
+        if nuevo > self.maximo:
+            self.maximo = nuevo
+        return nuevo
+
+    def decrementar(self, clave: Hashable, cantidad: int = 1) -> int:
+        """Resta `cantidad` al conteo de la clave (sin bajar de cero) y devuelve el nuevo conteo."""
+        anterior = self.conteos.get(clave, 0)
+        if anterior == 0:
+            return 0
+        nuevo = max(anterior - cantidad, 0)
+        self._mover(clave, anterior, nuevo)
+        while self.maximo > 0 and self.maximo not in self._por_conteo:
+            self.maximo -= 1
+        return nuevo
+
+    def claves_maximas(self) -> List[Hashable]:
+        """Claves empatadas en el conteo máximo."""
+        if self.maximo == 0:
+            return []
+        return list(self._por_conteo[self.maximo])
+
+    def limpiar(self) -> None:
+        self.conteos.clear()
+        self._por_conteo.clear()
+        self.maximo = 0
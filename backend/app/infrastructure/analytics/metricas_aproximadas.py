@@ -0,0 +1,348 @@
+import logging
+import os
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from app.domain.entities.vuelo import Vuelo
+from app.domain.events import EventoDominio, desagrupar
+from app.infrastructure.database.connection import db
+from .dimensiones import CatalogoDimensiones
+from .indice_maximo import ContadorConMaximo
+from .metricas_incrementales import UMBRAL_VUELOS_DIA, como_fecha, eventos_no_vistos
+from .sketches import CountMinSketch, SpaceSaving
+
+# Tamaño de los resúmenes Space-Saving (heavy hitters garantizados: frecuencia > total / k)
+SKETCH_TOP_K = int(os.getenv('SKETCH_TOP_K', '64'))
+# Error relativo y probabilidad de fallo de los sketches Count-Min
+SKETCH_EPSILON = float(os.getenv('SKETCH_EPSILON', '0.001'))
+SKETCH_EPSILON_DIA = float(os.getenv('SKETCH_EPSILON_DIA', '0.01'))
+SKETCH_DELTA = float(os.getenv('SKETCH_DELTA', '0.01'))
+# Filas por lote al leer los vuelos agrupados durante la carga
+TAMANO_LOTE_CARGA = 10000
+
+
+class ParticionDia:
+    """Sketches de un día: total exacto y resúmenes por aerolínea."""
+
+    def __init__(self):
+        self.total = 0
+        self.aerolineas = SpaceSaving(SKETCH_TOP_K)
+        self.aerolineas_cm = CountMinSketch.para_error(SKETCH_EPSILON_DIA, SKETCH_DELTA)
+
+    def agregar(self, id_aerolinea: Optional[int], cantidad: int = 1) -> None:
+        self.total += cantidad
+        if id_aerolinea is not None:
+            self.aerolineas.agregar(id_aerolinea, cantidad)
+            self.aerolineas_cm.agregar(id_aerolinea, cantidad)
+
+
+class MotorMetricasAproximadas:
+    """Métricas de vuelos aproximadas con sketches combinables por partición diaria.
+
+    Pensado para volúmenes donde los GROUP BY exactos no son interactivos:
+    - Aerolínea y aeropuerto más ocupados: Space-Saving global acotado con Count-Min
+    - Día más ocupado: total exacto por día (un contador por partición)
+    - Aerolíneas con más de N vuelos en un día: Space-Saving + Count-Min por día
+
+    Las inserciones se aplican en O(k) sin tocar la base de datos. Space-Saving no
+    admite retiros, así que una actualización o eliminación marca la partición
+    del día afectado y se reconstruye solo esa partición en la siguiente consulta.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Serializa las cargas; `_lock` solo se toma para encolar eventos y para cambiar de estado
+        self._lock_carga = threading.RLock()
+        self._cargando = False
+        self._pendientes: List[EventoDominio] = []
+        self.dimensiones = CatalogoDimensiones()
+        self.particiones: Dict[date, ParticionDia] = {}
+        self.por_dia = ContadorConMaximo()
+        self.aerolineas = SpaceSaving(SKETCH_TOP_K)
+        self.aeropuertos = SpaceSaving(SKETCH_TOP_K)
+        self.aerolineas_cm = CountMinSketch.para_error(SKETCH_EPSILON, SKETCH_DELTA)
+        self.aeropuertos_cm = CountMinSketch.para_error(SKETCH_EPSILON, SKETCH_DELTA)
+        # Resúmenes Space-Saving por día de aeropuertos, para recombinar el global tras un retiro
+        self._aeropuertos_dia: Dict[date, SpaceSaving] = {}
+        self._particiones_sucias: set = set()
+        self._globales_sucios = False
+        self.cargado = False
+
+    # --- Carga -------------------------------------------------------------
+
+    def asegurar_cargado(self) -> None:
+        if not self.cargado:
+            with self._lock_carga:
+                if not self.cargado:
+                    self.reconstruir()
+
+    def reconstruir(self) -> None:
+        """Construye todas las particiones leyendo los vuelos agrupados por día (requiere app context).
+
+        Los sketches nuevos se construyen sin tomar `_lock`, así que las lecturas
+        siguen respondiendo con el estado anterior. Los eventos que llegan
+        durante la carga se encolan; sumarlos a los sketches no es idempotente,
+        así que al terminar se relee, con la misma instantánea de la carga, el
+        estado de los vuelos afectados para aplicar solo los que la carga no vio.
+        """
+        with self._lock_carga:
+            with self._lock:
+                self._cargando = True
+                self._pendientes = []
+            try:
+                self.dimensiones.cargar()
+                carga = MotorMetricasAproximadas()
+                grupos = 0
+                with db.engine.connect() as conexion:
+                    if conexion.dialect.name == 'postgresql':
+                        # La carga y la relectura de los eventos encolados ven la misma instantánea
+                        conexion = conexion.execution_options(isolation_level='REPEATABLE READ')
+                    consulta = self._consulta_grupos().execution_options(yield_per=TAMANO_LOTE_CARGA)
+                    for dia, id_aerolinea, id_aeropuerto, total in conexion.execute(consulta):
+                        carga._sumar(dia, id_aerolinea, id_aeropuerto, total)
+                        grupos += 1
+                    carga._recombinar_globales()
+                    with self._lock:
+                        self._reemplazar_estado(carga, eventos_no_vistos(conexion, self._pendientes))
+                        self._cargando = False
+                        self._pendientes = []
+                        self.cargado = True
+            except Exception:
+                with self._lock:
+                    self._cargando = False
+                    self._pendientes = []
+                raise
+            logging.info(f"Motor de métricas aproximadas cargado: {len(self.particiones)} días, {grupos} grupos")
+
+    def _reemplazar_estado(self, carga: 'MotorMetricasAproximadas', eventos: List[EventoDominio]) -> None:
+        self.particiones = carga.particiones
+        self._aeropuertos_dia = carga._aeropuertos_dia
+        self.por_dia = carga.por_dia
+        self.aerolineas = carga.aerolineas
+        self.aeropuertos = carga.aeropuertos
+        self.aerolineas_cm = carga.aerolineas_cm
+        self.aeropuertos_cm = carga.aeropuertos_cm
+        self._particiones_sucias = set()
+        self._globales_sucios = False
+        for evento in eventos:
+            self._aplicar(evento)
+
+    @staticmethod
+    def _consulta_grupos(dia: Optional[date] = None):
+        consulta = select(
+            Vuelo.dia,
+            Vuelo.id_aerolinea,
+            Vuelo.id_aeropuerto,
+            func.count(Vuelo.id)
+        )
+        if dia is not None:
+            consulta = consulta.where(Vuelo.dia == dia)
+        return consulta.group_by(Vuelo.dia, Vuelo.id_aerolinea, Vuelo.id_aeropuerto)
+
+    def _sumar(self, dia: date, id_aerolinea: Optional[int], id_aeropuerto: Optional[int], cantidad: int) -> None:
+        particion = self.particiones.get(dia)
+        if particion is None:
+            particion = self.particiones[dia] = ParticionDia()
+            self._aeropuertos_dia[dia] = SpaceSaving(SKETCH_TOP_K)
+        particion.agregar(id_aerolinea, cantidad)
+        self.por_dia.incrementar(dia, cantidad)
+        if id_aerolinea is not None:
+            self.aerolineas_cm.agregar(id_aerolinea, cantidad)
+        if id_aeropuerto is not None:
+            self.aeropuertos_cm.agregar(id_aeropuerto, cantidad)
+            self._aeropuertos_dia[dia].agregar(id_aeropuerto, cantidad)
+
+    def _reconstruir_particion(self, dia: date) -> None:
+        """Relee un solo día de la base de datos y reemplaza sus sketches."""
+        self.particiones.pop(dia, None)
+        self._aeropuertos_dia.pop(dia, None)
+        self.por_dia.decrementar(dia, self.por_dia.conteos.get(dia, 0))
+        for _, id_aerolinea, id_aeropuerto, total in db.session.execute(self._consulta_grupos(dia)).all():
+            # Los Count-Min globales ya se ajustaron con el retiro exacto en aplicar_evento
+            particion = self.particiones.get(dia)
+            if particion is None:
+                particion = self.particiones[dia] = ParticionDia()
+                self._aeropuertos_dia[dia] = SpaceSaving(SKETCH_TOP_K)
+            particion.agregar(id_aerolinea, total)
+            self.por_dia.incrementar(dia, total)
+            if id_aeropuerto is not None:
+                self._aeropuertos_dia[dia].agregar(id_aeropuerto, total)
+
+    def _recombinar_globales(self) -> None:
+        self.aerolineas = SpaceSaving(SKETCH_TOP_K)
+        self.aeropuertos = SpaceSaving(SKETCH_TOP_K)
+        for dia, particion in self.particiones.items():
+            self.aerolineas.combinar(particion.aerolineas)
+            self.aeropuertos.combinar(self._aeropuertos_dia[dia])
+        self._globales_sucios = False
+
+    def _refrescar(self) -> None:
+        """Reconstruye las particiones marcadas y recombina los resúmenes globales si hace falta."""
+        self.asegurar_cargado()
+        with self._lock:
+            if self._particiones_sucias:
+                for dia in sorted(self._particiones_sucias):
+                    self._reconstruir_particion(dia)
+                self._particiones_sucias.clear()
+            if self._globales_sucios:
+                self._recombinar_globales()
+
+    # --- Actualización incremental ------------------------------------------
+
+    def aplicar_evento(self, evento: EventoDominio) -> None:
+        """Inserciones: se suman a los sketches. Retiros: se marca la partición del día."""
+        with self._lock:
+            if self._cargando:
+                # `reconstruir` decide al terminar si la carga ya incluyó este cambio
+                self._pendientes.append(evento)
+            elif self.cargado:
+                # Antes de la carga inicial no hay nada que actualizar: la carga leerá el cambio
+                self._aplicar(evento)
+
+    def _aplicar(self, evento: EventoDominio) -> None:
+        for individual in desagrupar(evento):
+            if individual.antes:
+                dia = como_fecha(individual.antes.get('dia'))
+                if individual.antes.get('id_aerolinea') is not None:
+                    self.aerolineas_cm.agregar(individual.antes['id_aerolinea'], -1)
+                if individual.antes.get('id_aeropuerto') is not None:
+                    self.aeropuertos_cm.agregar(individual.antes['id_aeropuerto'], -1)
+                if dia is not None:
+                    self._particiones_sucias.add(dia)
+                    self._globales_sucios = True
+            if individual.despues:
+                dia = como_fecha(individual.despues.get('dia'))
+                if dia is None:
+                    continue
+                if dia in self._particiones_sucias:
+                    # La reconstrucción del día leerá esta fila desde la base de datos
+                    for clave, cm in (('id_aerolinea', self.aerolineas_cm), ('id_aeropuerto', self.aeropuertos_cm)):
+                        if individual.despues.get(clave) is not None:
+                            cm.agregar(individual.despues[clave], 1)
+                    continue
+                id_aerolinea = individual.despues.get('id_aerolinea')
+                id_aeropuerto = individual.despues.get('id_aeropuerto')
+                self._sumar(dia, id_aerolinea, id_aeropuerto, 1)
+                if id_aerolinea is not None:
+                    self.aerolineas.agregar(id_aerolinea)
+                if id_aeropuerto is not None:
+                    self.aeropuertos.agregar(id_aeropuerto)
+
+    def aplicar_evento_dimension(self, evento: EventoDominio) -> None:
+        self.dimensiones.aplicar_evento(evento)
+
+    # --- Consultas ----------------------------------------------------------
+
+    @staticmethod
+    def _mas_frecuentes(resumen: SpaceSaving, cm: CountMinSketch) -> List[Tuple[Any, int, int]]:
+        """Claves empatadas en la mayor frecuencia estimada como (clave, estimado, error_maximo)."""
+        candidatos = []
+        for clave, conteo, error in resumen.top():
+            estimado = min(conteo, cm.estimar(clave))
+            candidatos.append((clave, estimado, estimado - max(conteo - error, 0)))
+        if not candidatos:
+            return []
+        maximo = max(estimado for _, estimado, _ in candidatos)
+        return sorted(c for c in candidatos if c[1] == maximo)
+
+    def cotas_error(self) -> Dict[str, Any]:
+        """Parámetros de los sketches y garantías de error de las respuestas."""
+        return {
+            'top_k': SKETCH_TOP_K,
+            'epsilon': round(self.aerolineas_cm.epsilon, 6),
+            'epsilon_dia': round(CountMinSketch.para_error(SKETCH_EPSILON_DIA, SKETCH_DELTA).epsilon, 6),
+            'delta': round(self.aerolineas_cm.delta, 6),
+            'descripcion': (
+                'Los conteos son cotas superiores; el valor real está en '
+                '[conteo - error_maximo, conteo] con probabilidad >= 1 - delta. '
+                'dia_mas_ocupado es exacto.'
+            )
+        }
+
+    def obtener_metricas(self, umbral: int = UMBRAL_VUELOS_DIA) -> Dict[str, Any]:
+        """Métricas con la forma de `VueloRepository.obtener_metricas` más `approximate` y `cotas_error`."""
+        self._refrescar()
+        with self._lock:
+            return {
+                'aeropuerto_mas_ocupado': [{
+                    'id_aeropuerto': id_aeropuerto,
+                    'nombre_aeropuerto': self.dimensiones.nombre_aeropuerto(id_aeropuerto),
+                    'total_movimientos': estimado,
+                    'error_maximo': error
+                } for id_aeropuerto, estimado, error in self._mas_frecuentes(self.aeropuertos, self.aeropuertos_cm)],
+                'aerolinea_mas_ocupada': [{
+                    'id_aerolinea': id_aerolinea,
+                    'nombre_aerolinea': self.dimensiones.nombre_aerolinea(id_aerolinea),
+                    'total_vuelos': estimado,
+                    'error_maximo': error
+                } for id_aerolinea, estimado, error in self._mas_frecuentes(self.aerolineas, self.aerolineas_cm)],
+                'dia_mas_ocupado': [{
+                    'dia': dia.strftime('%Y-%m-%d'),
+                    'total_vuelos': self.por_dia.maximo
+                } for dia in sorted(self.por_dia.claves_maximas())],
+                'aerolineas_mas_de_dos_vuelos': self.aerolineas_mas_de_n_vuelos(umbral),
+                'approximate': True,
+                'cotas_error': self.cotas_error()
+            }
+
+    def aerolineas_mas_de_n_vuelos(self, umbral: int = UMBRAL_VUELOS_DIA) -> List[Dict[str, Any]]:
+        """Pares (aerolínea, día) cuyo conteo estimado supera el umbral.
+
+        Cada día aporta como candidatos las aerolíneas de su resumen Space-Saving
+        (contiene toda aerolínea con más de total_dia / k vuelos ese día).
+        """
+        self._refrescar()
+        resultados = []
+        with self._lock:
+            for dia in sorted(self.particiones):
+                particion = self.particiones[dia]
+                if particion.total <= umbral:
+                    continue
+                for id_aerolinea, conteo, error in particion.aerolineas.top():
+                    estimado = min(conteo, particion.aerolineas_cm.estimar(id_aerolinea))
+                    if estimado > umbral:
+                        resultados.append({
+                            'id_aerolinea': id_aerolinea,
+                            'nombre_aerolinea': self.dimensiones.nombre_aerolinea(id_aerolinea),
+                            'dia': dia.strftime('%Y-%m-%d'),
+                            'total_vuelos': estimado,
+                            'error_maximo': estimado - max(conteo - error, 0)
+                        })
+        return resultados
+
+    def verificar_consistencia(self, metricas_sql: Dict[str, Any]) -> Dict[str, Any]:
+        """Compara contra las métricas exactas: mismas claves y valores exactos dentro de las cotas.
+
+        Args:
+            metricas_sql (Dict[str, Any]): Resultado de `VueloRepository.obtener_metricas_sql`
+
+        Returns:
+            Dict[str, Any]: `consistente` y, por métrica fuera de cota, ambos valores
+        """
+        aproximadas = self.obtener_metricas()
+        campos = {
+            'aeropuerto_mas_ocupado': (('id_aeropuerto',), 'total_movimientos'),
+            'aerolinea_mas_ocupada': (('id_aerolinea',), 'total_vuelos'),
+            'dia_mas_ocupado': (('dia',), 'total_vuelos'),
+            'aerolineas_mas_de_dos_vuelos': (('id_aerolinea', 'dia'), 'total_vuelos')
+        }
+        diferencias = {}
+        for nombre, (claves, campo_total) in campos.items():
+            exactas = {tuple(f[c] for c in claves): f[campo_total] for f in metricas_sql.get(nombre, [])}
+            estimadas = {tuple(f[c] for c in claves): f for f in aproximadas[nombre]}
+            fuera_de_cota = [
+                clave for clave, fila in estimadas.items()
+                if clave in exactas and not (
+                    fila[campo_total] - fila.get('error_maximo', 0) <= exactas[clave] <= fila[campo_total]
+                )
+            ]
+            if set(exactas) != set(estimadas) or fuera_de_cota:
+                diferencias[nombre] = {'aproximado': aproximadas[nombre], 'sql': metricas_sql.get(nombre, [])}
+        return {
+            'consistente': not diferencias,
+            'diferencias': diferencias
+        }
+
+
+motor_metricas_aproximadas = MotorMetricasAproximadas()
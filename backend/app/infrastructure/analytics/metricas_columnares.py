@@ -0,0 +1,530 @@
+import logging
+import threading
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from app.domain.entities.vuelo import Vuelo
+from app.domain.events import EventoDominio, desagrupar
+from app.infrastructure.database.connection import db
+from .dimensiones import CatalogoDimensiones
+from .metricas_incrementales import UMBRAL_VUELOS_DIA, como_fecha, normalizar_filas
+
+try:
+    import numpy as np
+except ImportError:  # Dependencia opcional: requirements-analytics.txt
+    np = None
+
+# Valor de las columnas de ID cuando la FK es NULL
+SIN_VALOR = -1
+# Los días se guardan como días desde 1970-01-01 (igual que datetime64[D])
+EPOCA = date(1970, 1, 1)
+CAPACIDAD_INICIAL = 1024
+# Filas por lote al leer la tabla durante la carga
+TAMANO_LOTE_CARGA = 100000
+# Se compacta cuando las filas eliminadas superan esta fracción del total
+FRACCION_COMPACTACION = 0.25
+# Máximo de celdas para contar pares con bincount; por encima se usa unique (ordenamiento)
+MAX_CELDAS_BINCOUNT = 50_000_000
+
+COLUMNAS = ('id', 'id_aerolinea', 'id_aeropuerto', 'id_movimiento', 'dia')
+
+
+class ConteoMovimiento(NamedTuple):
+    id_movimiento: int
+    total: int
+
+
+class ConteoAeropuerto(NamedTuple):
+    id_aeropuerto: int
+    total_vuelos: int
+
+
+class ConteoDescripcion(NamedTuple):
+    descripcion: str
+    total: int
+
+
+class EstadisticaMovimiento(NamedTuple):
+    id_movimiento: int
+    descripcion: str
+    total_vuelos: int
+
+
+class TopAerolinea(NamedTuple):
+    id_aerolinea: int
+    nombre_aerolinea: Optional[str]
+    total_vuelos: int
+
+
+class TopAeropuerto(NamedTuple):
+    id_aeropuerto: int
+    nombre_aeropuerto: Optional[str]
+    total_vuelos: int
+
+
+def numpy_disponible() -> bool:
+    return np is not None
+
+
+def _dia_a_entero(dia: date) -> int:
+    return (dia - EPOCA).days
+
+
+def _formatear_dias(valores) -> List[str]:
+    """Días desde 1970-01-01 a 'YYYY-MM-DD' sin crear objetos date."""
+    return np.datetime_as_string(np.asarray(valores, dtype=np.int64).astype('datetime64[D]')).tolist()
+
+
+def _contar(valores):
+    """Conteo por valor no negativo como (valores, conteos), ordenado por valor."""
+    valores = valores[valores >= 0]
+    if not valores.size:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    conteos = np.bincount(valores)
+    presentes = np.flatnonzero(conteos)
+    return presentes, conteos[presentes]
+
+
+def _contar_pares(a, b):
+    """Conteo de pares (a, b) con ambos valores no negativos, ordenado por (a, b).
+
+    Si el producto de rangos es pequeño se cuenta con bincount (O(n)); si no,
+    con unique sobre una clave de 64 bits (O(n log n)).
+    """
+    mascara = (a >= 0) & (b >= 0)
+    a, b = a[mascara].astype(np.int64), b[mascara].astype(np.int64)
+    if not a.size:
+        vacio = np.zeros(0, np.int64)
+        return vacio, vacio, vacio
+    ancho = int(b.max()) + 1
+    if (int(a.max()) + 1) * ancho <= MAX_CELDAS_BINCOUNT:
+        conteos = np.bincount(a * ancho + b)
+        claves = np.flatnonzero(conteos)
+        return claves // ancho, claves % ancho, conteos[claves]
+    claves, conteos = np.unique((a << 32) | b, return_counts=True)
+    return claves >> 32, claves & 0xFFFFFFFF, conteos
+
+
+def _top_por_grupo(grupos, valores, conteos, n: int):
+    """Primeros `n` valores de cada grupo por conteo descendente (empates por valor)."""
+    if not grupos.size:
+        return grupos, valores, conteos
+    orden = np.lexsort((valores, -conteos, grupos))
+    ordenados = grupos[orden]
+    inicios = np.flatnonzero(np.r_[True, ordenados[1:] != ordenados[:-1]])
+    largos = np.diff(np.r_[inicios, ordenados.size])
+    rango = np.arange(ordenados.size) - np.repeat(inicios, largos)
+    seleccion = orden[rango < n]
+    return grupos[seleccion], valores[seleccion], conteos[seleccion]
+
+
+class MotorMetricasColumnar:
+    """Motor analítico en memoria con la tabla `vuelos` en columnas NumPy.
+
+    Cada columna es un arreglo int32 (IDs con -1 para NULL y el día como días
+    desde 1970-01-01), ordenado por ID de vuelo. La carga lee la tabla en lotes
+    y después se mantiene con los eventos post-commit de `VueloRepository`:
+    las inserciones se agregan al final (capacidad que se duplica), las
+    actualizaciones se escriben en su posición (búsqueda binaria por ID) y las
+    eliminaciones se marcan y se compactan por lotes.
+
+    Las métricas de vuelos, aerolíneas, aeropuertos y movimientos se calculan
+    con operaciones vectorizadas (bincount, unique, lexsort) sin ejecutar SQL.
+    Como `MotorMetricas`, el estado vive en cada proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Serializa las cargas; `_lock` solo se toma para encolar eventos y para cambiar de estado
+        self._lock_carga = threading.RLock()
+        self._cargando = False
+        self._pendientes: List[EventoDominio] = []
+        self.dimensiones = CatalogoDimensiones()
+        self.columnas: Dict[str, Any] = {}
+        self.vivos = None
+        self.n = 0
+        self.eliminados = 0
+        self.cargado = False
+
+    # --- Carga -------------------------------------------------------------
+
+    def asegurar_cargado(self) -> None:
+        if not self.cargado:
+            with self._lock_carga:
+                if not self.cargado:
+                    self.reconstruir()
+
+    def reconstruir(self) -> None:
+        """Relee la tabla completa en columnas (requiere app context).
+
+        La tabla se lee en columnas nuevas sin tomar `_lock`, así que las
+        lecturas siguen respondiendo con el estado anterior. Los eventos que
+        llegan durante la carga se encolan y se reaplican sobre las columnas
+        nuevas antes de publicarlas: cada evento escribe o marca una fila por
+        su ID, así que reaplicar uno que la carga ya vio no cambia nada.
+        """
+        if np is None:
+            raise RuntimeError("El motor columnar requiere numpy (pip install -r requirements-analytics.txt)")
+        with self._lock_carga:
+            with self._lock:
+                self._cargando = True
+                self._pendientes = []
+            try:
+                carga = self._cargar_tabla()
+                with self._lock:
+                    self.columnas, self.vivos, self.n, self.eliminados = (
+                        carga.columnas, carga.vivos, carga.n, carga.eliminados
+                    )
+                    for evento in self._pendientes:
+                        self._aplicar(evento)
+                    self._cargando = False
+                    self._pendientes = []
+                    self.cargado = True
+            except Exception:
+                with self._lock:
+                    self._cargando = False
+                    self._pendientes = []
+                raise
+            logging.info(f"Motor de métricas columnar cargado: {self.n} vuelos")
+
+    def _cargar_tabla(self) -> 'MotorMetricasColumnar':
+        """Lee dimensiones y vuelos en un motor auxiliar cuyas columnas reemplazan a las actuales."""
+        self.dimensiones.cargar()
+        carga = MotorMetricasColumnar()
+        total = db.session.query(func.count(Vuelo.id)).scalar() or 0
+        carga._reservar(max(total, CAPACIDAD_INICIAL))
+
+        consulta = (
+            select(
+                Vuelo.id,
+                func.coalesce(Vuelo.id_aerolinea, SIN_VALOR),
+                func.coalesce(Vuelo.id_aeropuerto, SIN_VALOR),
+                func.coalesce(Vuelo.id_movimiento, SIN_VALOR),
+                Vuelo.dia
+            )
+            .order_by(Vuelo.id)
+            .execution_options(yield_per=TAMANO_LOTE_CARGA)
+        )
+        for lote in db.session.execute(consulta).partitions():
+            ids, aerolineas, aeropuertos, movimientos, dias = zip(*lote)
+            dias = np.array(dias, dtype='datetime64[D]').astype(np.int64)
+            carga.cargar_columnas(ids, aerolineas, aeropuertos, movimientos, dias, agregar=True)
+        return carga
+
+    def cargar_columnas(self, ids: Sequence[int], id_aerolinea: Sequence[int], id_aeropuerto: Sequence[int],
+                        id_movimiento: Sequence[int], dia: Sequence[int], agregar: bool = False) -> None:
+        """Carga columnas ya materializadas (IDs ascendentes, -1 para NULL, días desde 1970-01-01).
+
+        Se usa durante `reconstruir` y para construir el motor desde datos
+        sintéticos en los benchmarks.
+
+        Args:
+            agregar (bool): Si es True se agregan al final en lugar de reemplazar el contenido
+        """
+        with self._lock:
+            nuevas = dict(zip(COLUMNAS, (ids, id_aerolinea, id_aeropuerto, id_movimiento, dia)))
+            cantidad = len(ids)
+            if not agregar:
+                self._reservar(max(cantidad, CAPACIDAD_INICIAL))
+            self._asegurar_capacidad(self.n + cantidad)
+            for nombre, valores in nuevas.items():
+                self.columnas[nombre][self.n:self.n + cantidad] = np.asarray(valores, dtype=np.int64)
+            self.n += cantidad
+            if not agregar:
+                self.cargado = True
+
+    def _reservar(self, capacidad: int) -> None:
+        self.columnas = {nombre: np.empty(capacidad, dtype=np.int32) for nombre in COLUMNAS}
+        self.vivos = np.ones(capacidad, dtype=bool)
+        self.n = 0
+        self.eliminados = 0
+
+    def _asegurar_capacidad(self, requerida: int) -> None:
+        capacidad = len(self.vivos)
+        if requerida <= capacidad:
+            return
+        while capacidad < requerida:
+            capacidad *= 2
+        for nombre, columna in self.columnas.items():
+            nueva = np.empty(capacidad, dtype=np.int32)
+            nueva[:self.n] = columna[:self.n]
+            self.columnas[nombre] = nueva
+        vivos = np.ones(capacidad, dtype=bool)
+        vivos[:self.n] = self.vivos[:self.n]
+        self.vivos = vivos
+
+    # --- Actualización incremental ------------------------------------------
+
+    @staticmethod
+    def _fila(datos: Dict[str, Any]) -> Tuple[int, int, int, int, int]:
+        def valor(clave):
+            return SIN_VALOR if datos.get(clave) is None else datos[clave]
+        return (datos['id'], valor('id_aerolinea'), valor('id_aeropuerto'),
+                valor('id_movimiento'), _dia_a_entero(como_fecha(datos['dia'])))
+
+    def _posicion(self, id_vuelo: int) -> Optional[int]:
+        ids = self.columnas['id'][:self.n]
+        posicion = int(np.searchsorted(ids, id_vuelo))
+        if posicion < self.n and ids[posicion] == id_vuelo and self.vivos[posicion]:
+            return posicion
+        return None
+
+    def _escribir(self, posicion: int, fila: Tuple[int, ...]) -> None:
+        for nombre, valor in zip(COLUMNAS, fila):
+            self.columnas[nombre][posicion] = valor
+
+    def _insertar(self, fila: Tuple[int, ...]) -> None:
+        id_vuelo = fila[0]
+        if self.n and id_vuelo <= self.columnas['id'][self.n - 1]:
+            # ID fuera de orden (poco común con una secuencia): inserción en medio, O(n)
+            posicion = int(np.searchsorted(self.columnas['id'][:self.n], id_vuelo))
+            if posicion < self.n and self.columnas['id'][posicion] == id_vuelo:
+                if not self.vivos[posicion]:
+                    self.vivos[posicion] = True
+                    self.eliminados -= 1
+                self._escribir(posicion, fila)
+                return
+            self._asegurar_capacidad(self.n + 1)
+            for nombre in COLUMNAS:
+                columna = self.columnas[nombre]
+                columna[posicion + 1:self.n + 1] = columna[posicion:self.n]
+            self.vivos[posicion + 1:self.n + 1] = self.vivos[posicion:self.n]
+            self.vivos[posicion] = True
+            self._escribir(posicion, fila)
+            self.n += 1
+            return
+        self._asegurar_capacidad(self.n + 1)
+        self._escribir(self.n, fila)
+        self.vivos[self.n] = True
+        self.n += 1
+
+    def _compactar(self) -> None:
+        vivos = self.vivos[:self.n]
+        for nombre, columna in self.columnas.items():
+            restantes = columna[:self.n][vivos]
+            columna[:restantes.size] = restantes
+        self.n = int(vivos.sum())
+        self.vivos[:] = True
+        self.eliminados = 0
+
+    def aplicar_evento(self, evento: EventoDominio) -> None:
+        """Aplica una creación, actualización o eliminación de vuelo sobre las columnas."""
+        with self._lock:
+            if self._cargando:
+                # `reconstruir` lo reaplica sobre las columnas recién leídas
+                self._pendientes.append(evento)
+            elif self.cargado:
+                # Antes de la carga inicial no hay nada que actualizar: la carga leerá el cambio
+                self._aplicar(evento)
+
+    def _aplicar(self, evento: EventoDominio) -> None:
+        for individual in desagrupar(evento):
+            if individual.despues and individual.despues.get('id') is not None:
+                fila = self._fila(individual.despues)
+                posicion = self._posicion(fila[0])
+                if posicion is None:
+                    self._insertar(fila)
+                else:
+                    self._escribir(posicion, fila)
+            elif individual.antes and individual.antes.get('id') is not None:
+                posicion = self._posicion(individual.antes['id'])
+                if posicion is not None:
+                    self.vivos[posicion] = False
+                    self.eliminados += 1
+                    if self.eliminados > self.n * FRACCION_COMPACTACION:
+                        self._compactar()
+
+    def aplicar_evento_dimension(self, evento: EventoDominio) -> None:
+        self.dimensiones.aplicar_evento(evento)
+
+    # --- Consultas ----------------------------------------------------------
+
+    def _vista(self, *nombres: str) -> List[Any]:
+        """Columnas de las filas vivas (vistas sin copia si no hay eliminaciones pendientes).
+
+        Se llama con `_lock` tomado y el motor ya cargado: la carga se asegura
+        antes de tomar el lock para no esperarla reteniéndolo.
+        """
+        if self.eliminados:
+            vivos = self.vivos[:self.n]
+            return [self.columnas[nombre][:self.n][vivos] for nombre in nombres]
+        return [self.columnas[nombre][:self.n] for nombre in nombres]
+
+    @staticmethod
+    def _maximos(valores, conteos) -> Tuple[List[int], int]:
+        if not conteos.size:
+            return [], 0
+        maximo = int(conteos.max())
+        return valores[conteos == maximo].tolist(), maximo
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Métricas con la misma forma que `VueloRepository.obtener_metricas`."""
+        self.asegurar_cargado()
+        with self._lock:
+            aerolineas, aeropuertos, dias = self._vista('id_aerolinea', 'id_aeropuerto', 'dia')
+            ids_aeropuerto, max_aeropuerto = self._maximos(*_contar(aeropuertos))
+            ids_aerolinea, max_aerolinea = self._maximos(*_contar(aerolineas))
+            if dias.size:
+                minimo = int(dias.min())
+                valores_dia, max_dia = self._maximos(*_contar(dias.astype(np.int64) - minimo))
+                dias_max = _formatear_dias([v + minimo for v in valores_dia])
+            else:
+                dias_max, max_dia = [], 0
+
+            return {
+                'aeropuerto_mas_ocupado': [{
+                    'id_aeropuerto': id_aeropuerto,
+                    'nombre_aeropuerto': self.dimensiones.nombre_aeropuerto(id_aeropuerto),
+                    'total_movimientos': max_aeropuerto
+                } for id_aeropuerto in ids_aeropuerto],
+                'aerolinea_mas_ocupada': [{
+                    'id_aerolinea': id_aerolinea,
+                    'nombre_aerolinea': self.dimensiones.nombre_aerolinea(id_aerolinea),
+                    'total_vuelos': max_aerolinea
+                } for id_aerolinea in ids_aerolinea],
+                'dia_mas_ocupado': [{
+                    'dia': dia,
+                    'total_vuelos': max_dia
+                } for dia in dias_max],
+                'aerolineas_mas_de_dos_vuelos': self.aerolineas_con_min_vuelos(UMBRAL_VUELOS_DIA + 1)
+            }
+
+    def aerolineas_con_min_vuelos(self, min_vuelos: int) -> List[Dict[str, Any]]:
+        """Pares (aerolínea, día) con al menos `min_vuelos` vuelos, ordenados por (aerolínea, día)."""
+        self.asegurar_cargado()
+        with self._lock:
+            aerolineas, dias = self._vista('id_aerolinea', 'dia')
+            if not dias.size:
+                return []
+            minimo = int(dias.min())
+            ids, desplazamientos, conteos = _contar_pares(aerolineas, dias.astype(np.int64) - minimo)
+            seleccion = conteos >= min_vuelos
+            # Formateo vectorizado: con muchos pares el costo dominante es construir la respuesta
+            fechas = _formatear_dias(desplazamientos[seleccion] + minimo)
+            nombres = self.dimensiones.aerolineas
+            return [{
+                'id_aerolinea': id_aerolinea,
+                'nombre_aerolinea': nombres.get(id_aerolinea),
+                'dia': fecha,
+                'total_vuelos': total
+            } for id_aerolinea, fecha, total in zip(
+                ids[seleccion].tolist(), fechas, conteos[seleccion].tolist()
+            )]
+
+    def estadisticas_aerolineas(self, ids: Optional[Sequence[int]] = None, top_n: int = 5) -> Dict[str, Dict[int, List]]:
+        """Vuelos por movimiento y top-N aeropuertos por aerolínea.
+
+        Args:
+            ids (Optional[Sequence[int]]): Aerolíneas a incluir; None para todas
+            top_n (int): Aeropuertos por aerolínea
+
+        Returns:
+            Dict: `vuelos_por_movimiento` e `aeropuertos_frecuentes`, cada uno id_aerolinea -> filas
+                  con la forma de `AerolineaRepository.obtener_estadisticas_lote`
+        """
+        self.asegurar_cargado()
+        with self._lock:
+            aerolineas, aeropuertos, movimientos = self._vista('id_aerolinea', 'id_aeropuerto', 'id_movimiento')
+            if ids is not None:
+                mascara = np.isin(aerolineas, np.asarray(list(ids), dtype=np.int64))
+                aerolineas, aeropuertos, movimientos = aerolineas[mascara], aeropuertos[mascara], movimientos[mascara]
+
+            por_movimiento: Dict[int, List[ConteoMovimiento]] = {}
+            for id_aerolinea, id_movimiento, total in zip(*(c.tolist() for c in _contar_pares(aerolineas, movimientos))):
+                por_movimiento.setdefault(id_aerolinea, []).append(ConteoMovimiento(id_movimiento, total))
+
+            frecuentes: Dict[int, List[ConteoAeropuerto]] = {}
+            top = _top_por_grupo(*_contar_pares(aerolineas, aeropuertos), top_n)
+            for id_aerolinea, id_aeropuerto, total in zip(*(c.tolist() for c in top)):
+                frecuentes.setdefault(id_aerolinea, []).append(ConteoAeropuerto(id_aeropuerto, total))
+
+            return {'vuelos_por_movimiento': por_movimiento, 'aeropuertos_frecuentes': frecuentes}
+
+    def aeropuertos_mas_ocupados(self) -> Tuple[List[int], Optional[int]]:
+        """IDs de los aeropuertos con más movimientos y ese total (None si no hay vuelos)."""
+        self.asegurar_cargado()
+        with self._lock:
+            (aeropuertos,) = self._vista('id_aeropuerto')
+            ids, maximo = self._maximos(*_contar(aeropuertos))
+            return ids, (maximo if ids else None)
+
+    def estadisticas_aeropuerto(self, id_aeropuerto: int) -> Dict[str, List]:
+        """Vuelos de un aeropuerto por descripción de movimiento y por aerolínea (descendente).
+
+        Returns:
+            Dict: `movimientos` (filas descripcion, total) y `aerolineas` (pares id_aerolinea, total)
+        """
+        self.asegurar_cargado()
+        with self._lock:
+            aeropuertos, aerolineas, movimientos = self._vista('id_aeropuerto', 'id_aerolinea', 'id_movimiento')
+            mascara = aeropuertos == id_aeropuerto
+            por_descripcion: Dict[str, int] = {}
+            for id_movimiento, total in zip(*(c.tolist() for c in _contar(movimientos[mascara]))):
+                descripcion = self.dimensiones.descripcion_movimiento(id_movimiento)
+                if descripcion is not None:
+                    por_descripcion[descripcion] = por_descripcion.get(descripcion, 0) + total
+
+            ids, conteos = _contar(aerolineas[mascara])
+            orden = np.lexsort((ids, -conteos))
+            return {
+                'movimientos': [ConteoDescripcion(d, t) for d, t in por_descripcion.items()],
+                'aerolineas': list(zip(ids[orden].tolist(), conteos[orden].tolist()))
+            }
+
+    def estadisticas_movimientos(self, top_n: int = 5) -> Dict[str, Any]:
+        """Totales por movimiento y top-N aerolíneas y aeropuertos por movimiento.
+
+        Returns:
+            Dict: Misma estructura que `MovimientoRepository.obtener_estadisticas`
+        """
+        self.asegurar_cargado()
+        with self._lock:
+            movimientos, aerolineas, aeropuertos = self._vista('id_movimiento', 'id_aerolinea', 'id_aeropuerto')
+            estadisticas = [
+                EstadisticaMovimiento(id_movimiento, self.dimensiones.descripcion_movimiento(id_movimiento), total)
+                for id_movimiento, total in zip(*(c.tolist() for c in _contar(movimientos)))
+                if self.dimensiones.descripcion_movimiento(id_movimiento) is not None
+            ]
+
+            top_aerolineas: Dict[int, List[TopAerolinea]] = {m: [] for m in self.dimensiones.movimientos}
+            top = _top_por_grupo(*_contar_pares(movimientos, aerolineas), top_n)
+            for id_movimiento, id_aerolinea, total in zip(*(c.tolist() for c in top)):
+                top_aerolineas.setdefault(id_movimiento, []).append(
+                    TopAerolinea(id_aerolinea, self.dimensiones.nombre_aerolinea(id_aerolinea), total)
+                )
+
+            top_aeropuertos: Dict[int, List[TopAeropuerto]] = {m: [] for m in self.dimensiones.movimientos}
+            top = _top_por_grupo(*_contar_pares(movimientos, aeropuertos), top_n)
+            for id_movimiento, id_aeropuerto, total in zip(*(c.tolist() for c in top)):
+                top_aeropuertos.setdefault(id_movimiento, []).append(
+                    TopAeropuerto(id_aeropuerto, self.dimensiones.nombre_aeropuerto(id_aeropuerto), total)
+                )
+
+            return {
+                'estadisticas': estadisticas,
+                'aerolineas': top_aerolineas,
+                'aeropuertos': top_aeropuertos
+            }
+
+    def verificar_consistencia(self, metricas_sql: Dict[str, Any]) -> Dict[str, Any]:
+        """Compara las métricas columnares contra las calculadas en SQL.
+
+        Args:
+            metricas_sql (Dict[str, Any]): Resultado de `VueloRepository.obtener_metricas_sql`
+
+        Returns:
+            Dict[str, Any]: `consistente` y, por métrica con diferencias, ambos valores
+        """
+        columnar = self.obtener_metricas()
+        diferencias = {}
+        for nombre, esperado in metricas_sql.items():
+            actual = columnar.get(nombre, [])
+            if normalizar_filas(actual) != normalizar_filas(esperado):
+                diferencias[nombre] = {'columnar': actual, 'sql': esperado}
+        return {
+            'consistente': not diferencias,
+            'diferencias': diferencias
+        }
+
+
+motor_metricas_columnar = MotorMetricasColumnar()
@@ -0,0 +1,279 @@
+import logging
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from app.domain.entities.vuelo import Vuelo
+from app.domain.events import EventoDominio, desagrupar
+from app.infrastructure.database.connection import db
+from .dimensiones import CatalogoDimensiones
+from .indice_maximo import ContadorConMaximo
+
+# Umbral de `aerolineas_mas_de_dos_vuelos` (estrictamente mayor que)
+UMBRAL_VUELOS_DIA = 2
+# IDs por consulta al releer los vuelos con eventos encolados durante una carga
+TAMANO_LOTE_RELECTURA = 1000
+
+
+class MotorMetricas:
+    """Motor de métricas de vuelos en memoria, actualizado incrementalmente.
+
+    Se carga una sola vez desde la base de datos con una consulta agrupada y
+    después se mantiene con los eventos post-commit de `VueloRepository`, así
+    que responder `obtener_metricas` no ejecuta SQL.
+
+    El estado vive en el proceso: con varios workers cada uno tiene su copia y
+    solo ve las escrituras que él mismo confirma. `verificar_consistencia`
+    compara contra la base de datos y `reconstruir` vuelve a cargarlo.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.por_aeropuerto = ContadorConMaximo()
+        self.por_aerolinea = ContadorConMaximo()
+        self.por_dia = ContadorConMaximo()
+        self.por_aerolinea_dia: Dict[Tuple[int, date], int] = {}
+        self.frecuentes: set = set()
+        self.dimensiones = CatalogoDimensiones()
+        self.cargado = False
+        # Una sola carga a la vez; los eventos que llegan mientras corre se encolan
+        self._lock_carga = threading.RLock()
+        self._cargando = False
+        self._pendientes: List[EventoDominio] = []
+
+    # --- Carga -------------------------------------------------------------
+
+    def asegurar_cargado(self) -> None:
+        """Carga el estado desde la base de datos si aún no se ha hecho."""
+        if not self.cargado:
+            with self._lock_carga:
+                if not self.cargado:
+                    self.reconstruir()
+
+    def reconstruir(self) -> None:
+        """Descarta el estado y lo recarga desde la base de datos (requiere app context).
+
+        La consulta agrupada corre sin tomar `_lock`, así que las lecturas siguen
+        respondiendo con el estado anterior. Los eventos que llegan durante la
+        carga se encolan; al terminar se relee, con la misma instantánea de la
+        consulta, el estado de los vuelos afectados para reaplicar solo los
+        eventos que la carga no vio.
+        """
+        with self._lock_carga:
+            with self._lock:
+                self._cargando = True
+                self._pendientes = []
+            try:
+                self.dimensiones.cargar()
+                with db.engine.connect() as conexion:
+                    if conexion.dialect.name == 'postgresql':
+                        # Todas las consultas de la carga ven la misma instantánea
+                        conexion = conexion.execution_options(isolation_level='REPEATABLE READ')
+                    filas = conexion.execute(
+                        select(Vuelo.id_aerolinea, Vuelo.id_aeropuerto, Vuelo.dia, func.count(Vuelo.id))
+                        .group_by(Vuelo.id_aerolinea, Vuelo.id_aeropuerto, Vuelo.dia)
+                    ).all()
+                    with self._lock:
+                        self._reemplazar_estado(filas, eventos_no_vistos(conexion, self._pendientes))
+                        self._cargando = False
+                        self._pendientes = []
+                        self.cargado = True
+            except Exception:
+                with self._lock:
+                    self._cargando = False
+                    self._pendientes = []
+                raise
+            logging.info(f"Motor de métricas cargado: {len(filas)} grupos")
+
+    def _reemplazar_estado(self, filas: List[tuple], eventos: List[EventoDominio]) -> None:
+        for contador in (self.por_aeropuerto, self.por_aerolinea, self.por_dia):
+            contador.limpiar()
+        self.por_aerolinea_dia.clear()
+        self.frecuentes.clear()
+        for id_aerolinea, id_aeropuerto, dia, total in filas:
+            self._sumar(id_aerolinea, id_aeropuerto, como_fecha(dia), total)
+        for evento in eventos:
+            self._aplicar(evento)
+
+    # --- Actualización incremental ------------------------------------------
+
+    def _sumar(self, id_aerolinea: Optional[int], id_aeropuerto: Optional[int],
+               dia: Optional[date], cantidad: int) -> None:
+        if cantidad > 0:
+            if id_aeropuerto is not None:
+                self.por_aeropuerto.incrementar(id_aeropuerto, cantidad)
+            if id_aerolinea is not None:
+                self.por_aerolinea.incrementar(id_aerolinea, cantidad)
+            if dia is not None:
+                self.por_dia.incrementar(dia, cantidad)
+        else:
+            if id_aeropuerto is not None:
+                self.por_aeropuerto.decrementar(id_aeropuerto, -cantidad)
+            if id_aerolinea is not None:
+                self.por_aerolinea.decrementar(id_aerolinea, -cantidad)
+            if dia is not None:
+                self.por_dia.decrementar(dia, -cantidad)
+
+        if id_aerolinea is not None and dia is not None:
+            clave = (id_aerolinea, dia)
+            total = max(self.por_aerolinea_dia.get(clave, 0) + cantidad, 0)
+            if total:
+                self.por_aerolinea_dia[clave] = total
+            else:
+                self.por_aerolinea_dia.pop(clave, None)
+            if total > UMBRAL_VUELOS_DIA:
+                self.frecuentes.add(clave)
+            else:
+                self.frecuentes.discard(clave)
+
+    def aplicar_evento(self, evento: EventoDominio) -> None:
+        """Aplica un evento de vuelo: retira el estado anterior y suma el nuevo."""
+        with self._lock:
+            if self._cargando:
+                # `reconstruir` decide al terminar si la carga ya incluyó este cambio
+                self._pendientes.append(evento)
+            elif self.cargado:
+                # Antes de la carga inicial no hay nada que actualizar: la carga leerá el cambio
+                self._aplicar(evento)
+
+    def _aplicar(self, evento: EventoDominio) -> None:
+        for individual in desagrupar(evento):
+            if individual.antes:
+                self._sumar(individual.antes.get('id_aerolinea'), individual.antes.get('id_aeropuerto'),
+                            como_fecha(individual.antes.get('dia')), -1)
+            if individual.despues:
+                self._sumar(individual.despues.get('id_aerolinea'), individual.despues.get('id_aeropuerto'),
+                            como_fecha(individual.despues.get('dia')), 1)
+
+    def aplicar_evento_dimension(self, evento: EventoDominio) -> None:
+        """Mantiene los nombres de aerolíneas y aeropuertos usados en las respuestas."""
+        self.dimensiones.aplicar_evento(evento)
+
+    # --- Consultas ----------------------------------------------------------
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Métricas con la misma forma que `VueloRepository.obtener_metricas`."""
+        self.asegurar_cargado()
+        with self._lock:
+            return {
+                'aeropuerto_mas_ocupado': [{
+                    'id_aeropuerto': id_aeropuerto,
+                    'nombre_aeropuerto': self.dimensiones.nombre_aeropuerto(id_aeropuerto),
+                    'total_movimientos': self.por_aeropuerto.maximo
+                } for id_aeropuerto in sorted(self.por_aeropuerto.claves_maximas())],
+                'aerolinea_mas_ocupada': [{
+                    'id_aerolinea': id_aerolinea,
+                    'nombre_aerolinea': self.dimensiones.nombre_aerolinea(id_aerolinea),
+                    'total_vuelos': self.por_aerolinea.maximo
+                } for id_aerolinea in sorted(self.por_aerolinea.claves_maximas())],
+                'dia_mas_ocupado': [{
+                    'dia': dia.strftime('%Y-%m-%d'),
+                    'total_vuelos': self.por_dia.maximo
+                } for dia in sorted(self.por_dia.claves_maximas())],
+                'aerolineas_mas_de_dos_vuelos': self.aerolineas_mas_de_dos_vuelos()
+            }
+
+    def aerolineas_mas_de_dos_vuelos(self) -> List[Dict[str, Any]]:
+        """Pares (aerolínea, día) con más de UMBRAL_VUELOS_DIA vuelos."""
+        self.asegurar_cargado()
+        with self._lock:
+            return [{
+                'id_aerolinea': id_aerolinea,
+                'nombre_aerolinea': self.dimensiones.nombre_aerolinea(id_aerolinea),
+                'dia': dia.strftime('%Y-%m-%d'),
+                'total_vuelos': self.por_aerolinea_dia[(id_aerolinea, dia)]
+            } for id_aerolinea, dia in sorted(self.frecuentes)]
+
+    def verificar_consistencia(self, metricas_sql: Dict[str, Any]) -> Dict[str, Any]:
+        """Compara las métricas en memoria contra las calculadas en SQL.
+
+        Args:
+            metricas_sql (Dict[str, Any]): Resultado de `VueloRepository.obtener_metricas_sql`
+
+        Returns:
+            Dict[str, Any]: `consistente` y, por métrica con diferencias, ambos valores
+        """
+        memoria = self.obtener_metricas()
+        diferencias = {}
+        for nombre, esperado in metricas_sql.items():
+            actual = memoria.get(nombre, [])
+            if normalizar_filas(actual) != normalizar_filas(esperado):
+                diferencias[nombre] = {'memoria': actual, 'sql': esperado}
+        return {
+            'consistente': not diferencias,
+            'diferencias': diferencias
+        }
+
+
+def como_fecha(valor: Any) -> Optional[date]:
+    """Acepta date o 'YYYY-MM-DD' (los eventos pueden traer cualquiera de los dos)."""
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def eventos_no_vistos(conexion, pendientes: List[EventoDominio]) -> List[EventoDominio]:
+    """Eventos encolados durante una carga cuyo cambio no alcanzó a leer la consulta de la carga.
+
+    Los eventos de un mismo vuelo llegan en el orden de sus commits. Para
+    cada vuelo se busca el evento tras el cual su fila quedó como la ve la
+    instantánea de `conexion` (ausente si no existía) y se devuelven los
+    posteriores. El motor la llama con su lock tomado, así que la cola ya no crece.
+
+    Args:
+        conexion: Conexión con la que se hizo la carga (misma instantánea en PostgreSQL)
+        pendientes (List[EventoDominio]): Eventos de vuelos encolados durante la carga
+
+    Returns:
+        List[EventoDominio]: Eventos individuales que hay que aplicar sobre el estado cargado
+    """
+    por_vuelo: Dict[Any, List[EventoDominio]] = {}
+    for evento in pendientes:
+        for individual in desagrupar(evento):
+            fila = individual.despues or individual.antes or {}
+            por_vuelo.setdefault(fila.get('id'), []).append(individual)
+    if not por_vuelo:
+        return []
+
+    ids = [id_vuelo for id_vuelo in por_vuelo if id_vuelo is not None]
+    vistos: Dict[int, tuple] = {}
+    for inicio in range(0, len(ids), TAMANO_LOTE_RELECTURA):
+        for id_vuelo, *clave in conexion.execute(
+            select(Vuelo.id, Vuelo.id_aerolinea, Vuelo.id_aeropuerto, Vuelo.dia)
+            .where(Vuelo.id.in_(ids[inicio:inicio + TAMANO_LOTE_RELECTURA]))
+        ):
+            vistos[id_vuelo] = (clave[0], clave[1], como_fecha(clave[2]))
+
+    no_vistos = []
+    for id_vuelo, eventos in por_vuelo.items():
+        if id_vuelo is None:
+            no_vistos.extend(eventos)
+            continue
+        visto = vistos.get(id_vuelo)
+        estados = [_clave_fila(eventos[0].antes)] + [_clave_fila(e.despues) for e in eventos]
+        # Con estados repetidos (A -> B -> A) cualquier coincidencia deja el mismo efecto neto
+        aplicados = next((i for i in range(len(estados) - 1, -1, -1) if estados[i] == visto), None)
+        if aplicados is None:
+            logging.warning(f"El vuelo {id_vuelo} no coincide con ningún evento encolado durante la carga")
+            aplicados = 0
+        no_vistos.extend(eventos[aplicados:])
+    return no_vistos
+
+
+def _clave_fila(fila: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    """(aerolínea, aeropuerto, día) de una fila de evento, o None si la fila no existe."""
+    if not fila:
+        return None
+    return fila.get('id_aerolinea'), fila.get('id_aeropuerto'), como_fecha(fila.get('dia'))
+
+
+def normalizar_filas(filas: List[Dict[str, Any]]) -> List[tuple]:
+    """Forma comparable de una lista de filas, independiente del orden."""
+    return sorted(tuple(sorted(fila.items())) for fila in filas)
+
+
+motor_metricas = MotorMetricas()
@@ -0,0 +1,63 @@
+from typing import Optional, Union
+from flask import Flask
+from app.domain.events import bus_eventos
+from .config import AnalyticsConfig
+from .metricas_aproximadas import MotorMetricasAproximadas, motor_metricas_aproximadas
+from .metricas_columnares import MotorMetricasColumnar, motor_metricas_columnar, numpy_disponible
+from .metricas_incrementales import MotorMetricas, motor_metricas
+from .snapshot_mmap import motor_metricas_snapshot
+
+BACKENDS = ('sql', 'memoria', 'aproximado', 'numpy', 'snapshot')
+# Backends que además responden las estadísticas de aerolíneas, aeropuertos y movimientos
+BACKENDS_COLUMNARES = ('numpy', 'snapshot')
+
+
+def obtener_motor() -> Optional[Union[MotorMetricas, MotorMetricasAproximadas, MotorMetricasColumnar]]:
+    """Devuelve el motor de métricas en memoria configurado, o None si se usa SQL."""
+    backend = AnalyticsConfig.METRICAS_BACKEND
+    if backend == 'memoria':
+        return motor_metricas
+    if backend == 'aproximado':
+        return motor_metricas_aproximadas
+    if backend in BACKENDS_COLUMNARES:
+        return obtener_motor_columnar()
+    return None
+
+
+def obtener_motor_columnar() -> Optional[MotorMetricasColumnar]:
+    """Devuelve el motor columnar (en memoria o sobre snapshot) si está configurado."""
+    backend = AnalyticsConfig.METRICAS_BACKEND
+    if backend == 'numpy':
+        return motor_metricas_columnar
+    if backend == 'snapshot':
+        return motor_metricas_snapshot
+    return None
+
+
+def registrar_motor_analitico(app: Flask) -> None:
+    """Suscribe el motor configurado a los eventos de escritura y lo carga al arrancar.
+
+    Si la carga inicial falla (p. ej. la base de datos aún no responde), el motor
+    se cargará en la primera consulta.
+    """
+    if AnalyticsConfig.METRICAS_BACKEND not in BACKENDS:
+        raise ValueError(f"METRICAS_BACKEND inválido: {AnalyticsConfig.METRICAS_BACKEND} "
+                         f"(opciones: {', '.join(BACKENDS)})")
+    if AnalyticsConfig.METRICAS_BACKEND in BACKENDS_COLUMNARES and not numpy_disponible():
+        raise RuntimeError(f"METRICAS_BACKEND={AnalyticsConfig.METRICAS_BACKEND} requiere numpy "
+                           f"(pip install -r requirements-analytics.txt)")
+
+    motor = obtener_motor()
+    if motor is None:
+        return
+
+    bus_eventos.suscribir('vuelo', motor.aplicar_evento)
+    bus_eventos.suscribir('aerolinea', motor.aplicar_evento_dimension)
+    bus_eventos.suscribir('aeropuerto', motor.aplicar_evento_dimension)
+    bus_eventos.suscribir('movimiento', motor.aplicar_evento_dimension)
+
+    with app.app_context():
+        try:
+            motor.asegurar_cargado()
+        except Exception as e:
+            app.logger.warning(f"No se pudo cargar el motor de métricas al arrancar: {str(e)}")
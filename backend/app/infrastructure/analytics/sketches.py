@@ -0,0 +1,120 @@
+import hashlib
+import math
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+def _hash_estable(clave: Hashable) -> Tuple[int, int]:
+    """Dos hashes de 32 bits independientes del PYTHONHASHSEED del proceso."""
+    digest = hashlib.blake2b(repr(clave).encode(), digest_size=8).digest()
+    return int.from_bytes(digest[:4], 'little'), int.from_bytes(digest[4:], 'little') | 1
+
+
+class CountMinSketch:
+    """Sketch Count-Min para estimar frecuencias por clave.
+
+    La estimación nunca es menor que la frecuencia real (mientras los conteos
+    no sean negativos) y la excede en a lo sumo `epsilon * total` con
+    probabilidad `1 - delta`, donde epsilon = e / ancho y delta = e^-profundidad.
+    Dos sketches con las mismas dimensiones se combinan sumando sus tablas.
+    """
+
+    def __init__(self, ancho: int = 2048, profundidad: int = 4):
+        self.ancho = ancho
+        self.profundidad = profundidad
+        self.tabla = [[0] * ancho for _ in range(profundidad)]
+        self.total = 0
+
+    @classmethod
+    def para_error(cls, epsilon: float, delta: float) -> 'CountMinSketch':
+        """Crea un sketch dimensionado para el error relativo y la probabilidad de fallo dados."""
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.ancho
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.profundidad)
+
+    def _columnas(self, clave: Hashable):
+        h1, h2 = _hash_estable(clave)
+        return [(h1 + i * h2) % self.ancho for i in range(self.profundidad)]
+
+    def agregar(self, clave: Hashable, cantidad: int = 1) -> None:
+        """Suma `cantidad` (puede ser negativa para retirar) a la clave."""
+        for fila, columna in zip(self.tabla, self._columnas(clave)):
+            fila[columna] += cantidad
+        self.total += cantidad
+
+    def estimar(self, clave: Hashable) -> int:
+        """Frecuencia estimada (cota superior) de la clave."""
+        return min(fila[columna] for fila, columna in zip(self.tabla, self._columnas(clave)))
+
+    def error_maximo(self) -> int:
+        """Sobreestimación máxima con probabilidad 1 - delta."""
+        return math.ceil(self.epsilon * self.total)
+
+    def combinar(self, otro: 'CountMinSketch') -> 'CountMinSketch':
+        """Suma otro sketch de las mismas dimensiones sobre este."""
+        if (otro.ancho, otro.profundidad) != (self.ancho, self.profundidad):
+            raise ValueError("Solo se pueden combinar sketches Count-Min con las mismas dimensiones")
+        for fila, fila_otro in zip(self.tabla, otro.tabla):
+            for i, valor in enumerate(fila_otro):
+                if valor:
+                    fila[i] += valor
+        self.total += otro.total
+        return self
+
+
+class SpaceSaving:
+    """Resumen Space-Saving para los k elementos más frecuentes (heavy hitters).
+
+    Cada contador guarda una cota superior del conteo y el error máximo, de
+    modo que la frecuencia real está en [conteo - error, conteo]. Todo elemento
+    con frecuencia mayor que total / k está garantizado en el resumen.
+    Solo admite inserciones; los retiros se resuelven reconstruyendo la partición.
+    """
+
+    def __init__(self, k: int = 64):
+        self.k = k
+        self.contadores: Dict[Hashable, List[int]] = {}
+        self.total = 0
+
+    def minimo(self) -> int:
+        """Conteo mínimo del resumen si está lleno (error máximo de cualquier clave ausente)."""
+        if len(self.contadores) < self.k:
+            return 0
+        return min(conteo for conteo, _ in self.contadores.values())
+
+    def agregar(self, clave: Hashable, cantidad: int = 1) -> None:
+        self.total += cantidad
+        contador = self.contadores.get(clave)
+        if contador is not None:
+            contador[0] += cantidad
+            return
+        if len(self.contadores) < self.k:
+            self.contadores[clave] = [cantidad, 0]
+            return
+        # Reemplaza la clave con menor conteo: la nueva hereda ese conteo como error
+        victima = min(self.contadores, key=lambda c: self.contadores[c][0])
+        minimo = self.contadores.pop(victima)[0]
+        self.contadores[clave] = [minimo + cantidad, minimo]
+
+    def combinar(self, otro: 'SpaceSaving') -> 'SpaceSaving':
+        """Combina otro resumen sobre este conservando las cotas de error."""
+        minimo_propio, minimo_otro = self.minimo(), otro.minimo()
+        combinados: Dict[Hashable, List[int]] = {}
+        for clave in set(self.contadores) | set(otro.contadores):
+            propio = self.contadores.get(clave, [minimo_propio, minimo_propio])
+            ajeno = otro.contadores.get(clave, [minimo_otro, minimo_otro])
+            combinados[clave] = [propio[0] + ajeno[0], propio[1] + ajeno[1]]
+        mejores = sorted(combinados.items(), key=lambda item: item[1][0], reverse=True)[:self.k]
+        self.contadores = dict(mejores)
+        self.total += otro.total
+        return self
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Hashable, int, int]]:
+        """Elementos ordenados por conteo estimado como (clave, conteo, error)."""
+        ordenados = sorted(self.contadores.items(), key=lambda item: item[1][0], reverse=True)
+        return [(clave, conteo, error) for clave, (conteo, error) in ordenados[:n]]
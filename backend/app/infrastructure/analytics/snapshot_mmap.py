@@ -0,0 +1,232 @@
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from flask import current_app, has_app_context
+from app.domain.events import EventoDominio
+from .metricas_columnares import COLUMNAS, MotorMetricasColumnar, np
+
+# Archivo compartido por todos los workers de la máquina
+SNAPSHOT_RUTA = os.getenv('SNAPSHOT_RUTA', os.path.join(tempfile.gettempdir(), 'vuelos.snapshot'))
+# Espera tras una escritura antes de regenerar (agrupa ráfagas de escrituras)
+SNAPSHOT_DEBOUNCE_S = float(os.getenv('SNAPSHOT_DEBOUNCE_S', '2'))
+# Cada cuánto se comprueba si otro proceso publicó un snapshot nuevo
+SNAPSHOT_VERIFICAR_S = float(os.getenv('SNAPSHOT_VERIFICAR_S', '1'))
+
+MAGIA = b'VUELSNP1'
+VERSION = 1
+ALINEACION = 64
+# magia, versión, número de columnas, filas, generado (ns), offset y largo de las dimensiones (JSON)
+CABECERA = struct.Struct('<8sIIQQQQ')
+# nombre de columna, offset
+ENTRADA_COLUMNA = struct.Struct('<16sQ')
+
+
+def _alinear(posicion: int) -> int:
+    return (posicion + ALINEACION - 1) // ALINEACION * ALINEACION
+
+
+def escribir_archivo(ruta: str, columnas: Dict[str, Any], filas: int, dimensiones: Dict[str, Dict[int, str]]) -> None:
+    """Escribe un snapshot y lo publica con un rename atómico.
+
+    Formato (little endian): cabecera, tabla de columnas y, alineadas a 64
+    bytes, las columnas int32 de `COLUMNAS` seguidas de los nombres de las
+    dimensiones en JSON. Los lectores que ya tenían mapeado el archivo anterior
+    siguen usándolo hasta que lo sueltan.
+    """
+    posicion = _alinear(CABECERA.size + ENTRADA_COLUMNA.size * len(COLUMNAS))
+    offsets = {}
+    for nombre in COLUMNAS:
+        offsets[nombre] = posicion
+        posicion = _alinear(posicion + filas * 4)
+    datos_dimensiones = json.dumps(dimensiones, ensure_ascii=False).encode()
+
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    descriptor, temporal = tempfile.mkstemp(prefix='.vuelos-', suffix='.tmp', dir=directorio)
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(CABECERA.pack(MAGIA, VERSION, len(COLUMNAS), filas, time.time_ns(),
+                                        posicion, len(datos_dimensiones)))
+            for nombre in COLUMNAS:
+                archivo.write(ENTRADA_COLUMNA.pack(nombre.encode(), offsets[nombre]))
+            for nombre in COLUMNAS:
+                archivo.seek(offsets[nombre])
+                archivo.write(np.ascontiguousarray(columnas[nombre][:filas], dtype='<i4').data)
+            archivo.seek(posicion)
+            archivo.write(datos_dimensiones)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def construir_snapshot(ruta: str = SNAPSHOT_RUTA, solo_si_falta: bool = False) -> Optional[int]:
+    """Lee `vuelos` y las dimensiones de la base de datos y publica un snapshot (requiere app context).
+
+    Un lock de archivo evita que varios workers lo construyan a la vez al arrancar.
+
+    Args:
+        ruta (str): Ruta del snapshot
+        solo_si_falta (bool): No reconstruir si otro proceso ya lo publicó
+
+    Returns:
+        Optional[int]: Filas escritas, o None si no hizo falta construirlo
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    with open(f'{ruta}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if solo_si_falta and os.path.exists(ruta):
+            return None
+        origen = MotorMetricasColumnar()
+        origen.reconstruir()
+        dimensiones = {
+            'aerolineas': origen.dimensiones.aerolineas,
+            'aeropuertos': origen.dimensiones.aeropuertos,
+            'movimientos': origen.dimensiones.movimientos
+        }
+        escribir_archivo(ruta, origen.columnas, origen.n, dimensiones)
+        logging.info(f"Snapshot de vuelos publicado en {ruta}: {origen.n} vuelos")
+        return origen.n
+
+
+class MotorMetricasSnapshot(MotorMetricasColumnar):
+    """Motor columnar de solo lectura sobre un snapshot mapeado en memoria.
+
+    Cada worker mapea el mismo archivo con `mmap` y las columnas son vistas
+    NumPy sobre esas páginas, así que el sistema operativo las comparte entre
+    procesos: el RSS privado de cada worker no crece con el tamaño de la tabla.
+    Las consultas son las del motor columnar.
+
+    Las escrituras no modifican el mapa: el worker que recibe el evento
+    programa (con debounce) la regeneración del archivo, que se publica con un
+    rename atómico; todos los workers detectan el archivo nuevo por inode/mtime
+    y cambian al nuevo mapa en su siguiente consulta.
+    """
+
+    def __init__(self, ruta: str = SNAPSHOT_RUTA):
+        super().__init__()
+        self.ruta = ruta
+        self.generado_ns = 0
+        self.bytes_mapeados = 0
+        self._identidad: Optional[Tuple[int, int]] = None
+        self._ultima_verificacion = 0.0
+        self._temporizador: Optional[threading.Timer] = None
+        # Lock propio del debounce: el suscriptor post-commit nunca espera a una reconstrucción
+        self._lock_temporizador = threading.Lock()
+
+    # --- Carga -------------------------------------------------------------
+
+    def asegurar_cargado(self) -> None:
+        """Mapea el snapshot (construyéndolo si no existe) o cambia al publicado más recientemente."""
+        ahora = time.monotonic()
+        if self.cargado and ahora - self._ultima_verificacion < SNAPSHOT_VERIFICAR_S:
+            return
+        self._ultima_verificacion = ahora
+        try:
+            estado = os.stat(self.ruta)
+        except FileNotFoundError:
+            if self.cargado:
+                return
+            # La construcción va fuera del lock del motor; el lock de archivo evita construirlo dos veces
+            construir_snapshot(self.ruta, solo_si_falta=True)
+            estado = os.stat(self.ruta)
+        if (estado.st_ino, estado.st_mtime_ns) != self._identidad:
+            with self._lock:
+                if (estado.st_ino, estado.st_mtime_ns) != self._identidad:
+                    self._abrir()
+
+    def reconstruir(self) -> None:
+        """Regenera el snapshot desde la base de datos y lo vuelve a mapear (requiere app context).
+
+        La lectura de la tabla y la escritura del archivo temporal ocurren sin el
+        lock del motor (las consultas siguen usando el mapa anterior); el lock solo
+        cubre el cambio al archivo publicado.
+        """
+        if np is None:
+            raise RuntimeError("El motor de snapshot requiere numpy (pip install -r requirements-analytics.txt)")
+        construir_snapshot(self.ruta)
+        with self._lock:
+            self._abrir()
+
+    def _abrir(self) -> None:
+        with open(self.ruta, 'rb') as archivo:
+            estado = os.fstat(archivo.fileno())
+            # El mapa sigue válido aunque se cierre el archivo o se reemplace la ruta
+            mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magia, version, num_columnas, filas, generado_ns, offset_dim, largo_dim = CABECERA.unpack_from(mapa, 0)
+        if magia != MAGIA or version != VERSION:
+            raise ValueError(f"Snapshot inválido o de otra versión: {self.ruta}")
+        columnas = {}
+        for i in range(num_columnas):
+            nombre, offset = ENTRADA_COLUMNA.unpack_from(mapa, CABECERA.size + i * ENTRADA_COLUMNA.size)
+            columnas[nombre.rstrip(b'\0').decode()] = np.frombuffer(mapa, dtype='<i4', count=filas, offset=offset)
+        dimensiones = json.loads(mapa[offset_dim:offset_dim + largo_dim].decode())
+
+        with self.dimensiones._lock:
+            self.dimensiones.aerolineas = {int(k): v for k, v in dimensiones['aerolineas'].items()}
+            self.dimensiones.aeropuertos = {int(k): v for k, v in dimensiones['aeropuertos'].items()}
+            self.dimensiones.movimientos = {int(k): v for k, v in dimensiones['movimientos'].items()}
+        # Las vistas anteriores mantienen vivo el mapa viejo hasta que ninguna consulta las use
+        self.columnas = columnas
+        self.n = filas
+        self.eliminados = 0
+        self.vivos = None
+        self.generado_ns = generado_ns
+        self.bytes_mapeados = len(mapa)
+        self._identidad = (estado.st_ino, estado.st_mtime_ns)
+        self.cargado = True
+
+    # --- Actualización ------------------------------------------------------
+
+    def aplicar_evento(self, evento: EventoDominio) -> None:
+        """Programa la regeneración del snapshot tras una escritura."""
+        self._programar_regeneracion()
+
+    def aplicar_evento_dimension(self, evento: EventoDominio) -> None:
+        self._programar_regeneracion()
+
+    def _programar_regeneracion(self) -> None:
+        if not has_app_context():
+            return
+        app = current_app._get_current_object()
+        with self._lock_temporizador:
+            if self._temporizador is not None:
+                return
+            self._temporizador = threading.Timer(SNAPSHOT_DEBOUNCE_S, self._regenerar, args=(app,))
+            self._temporizador.daemon = True
+            self._temporizador.start()
+
+    def _regenerar(self, app) -> None:
+        with self._lock_temporizador:
+            self._temporizador = None
+        try:
+            with app.app_context():
+                self.reconstruir()
+        except Exception as e:
+            logging.error(f"Error al regenerar el snapshot de vuelos: {str(e)}")
+
+    def estado(self) -> Dict[str, Any]:
+        """Datos del snapshot mapeado por este proceso."""
+        self.asegurar_cargado()
+        return {
+            'ruta': self.ruta,
+            'filas': self.n,
+            'bytes_mapeados': self.bytes_mapeados,
+            'generado': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.generado_ns / 1e9)),
+            'pid': os.getpid(),
+            'regeneracion_pendiente': self._temporizador is not None
+        }
+
+
+motor_metricas_snapshot = MotorMetricasSnapshot()
@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import Flask
+from app.domain.entities.aerolinea import Aerolinea
+from app.domain.entities.aeropuerto import Aeropuerto
+from app.domain.events import EventoDominio, bus_eventos, desagrupar
+from app.infrastructure.database.connection import db
+
+# Antigüedad máxima del índice: los cambios hechos por otros procesos llegan como mucho con este retraso
+AUTOCOMPLETAR_RECARGA_S = float(os.getenv('AUTOCOMPLETAR_RECARGA_S', '300'))
+# Similitud mínima (pg_trgm) de las coincidencias difusas
+AUTOCOMPLETAR_UMBRAL_DIFUSO = float(os.getenv('AUTOCOMPLETAR_UMBRAL_DIFUSO', '0.3'))
+# Duraciones recientes de búsquedas por prefijo con las que se calculan los percentiles
+MUESTRAS_LATENCIA = 2048
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin acentos y con los espacios colapsados ('  Aeroméxico ' -> 'aeromexico')."""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.casefold().split())
+
+
+class IndicePrefijos:
+    """Índice en memoria de los nombres de una dimensión para autocompletar por prefijo.
+
+    Guarda dos arreglos ordenados de (clave normalizada, id): uno con el nombre
+    completo y otro con el resto del nombre a partir de cada palabra siguiente
+    ('american airlines' también se encuentra por 'airl'). Una búsqueda es un
+    `bisect` al primer candidato y un recorrido de a lo sumo `limite` entradas
+    contiguas, así que su costo no depende del tamaño de la tabla.
+
+    Se carga desde la base de datos, se mantiene con los eventos de escritura de
+    la dimensión (incluidas las cargas masivas, vía `desagrupar`) y se recarga
+    completo cada AUTOCOMPLETAR_RECARGA_S para recoger las escrituras de otros
+    procesos.
+    """
+
+    def __init__(self, entidad: str, modelo, clave: str, campo: str):
+        self.entidad = entidad
+        self.modelo = modelo
+        self.clave = clave
+        self.campo = campo
+        self._lock = threading.Lock()
+        self._nombres: Dict[int, str] = {}
+        self._completos: List[Tuple[str, int]] = []
+        self._palabras: List[Tuple[str, int]] = []
+        self.cargado_en: Optional[float] = None
+        self.recargas = 0
+        self.eventos = 0
+        self.consultas = 0
+        self._latencias_us: deque = deque(maxlen=MUESTRAS_LATENCIA)
+
+    @staticmethod
+    def _claves(nombre: str) -> Tuple[str, List[str]]:
+        palabras = normalizar(nombre).split(' ')
+        return ' '.join(palabras), [' '.join(palabras[i:]) for i in range(1, len(palabras))]
+
+    def cargar(self) -> None:
+        """Reconstruye el índice desde la tabla de la dimensión (requiere app context)."""
+        filas = db.session.query(getattr(self.modelo, self.clave), getattr(self.modelo, self.campo)).all()
+        nombres, completos, palabras = {}, [], []
+        for id_fila, nombre in filas:
+            nombres[id_fila] = nombre
+            completa, resto = self._claves(nombre)
+            completos.append((completa, id_fila))
+            palabras.extend((clave, id_fila) for clave in resto)
+        completos.sort()
+        palabras.sort()
+        with self._lock:
+            self._nombres, self._completos, self._palabras = nombres, completos, palabras
+            self.cargado_en = time.monotonic()
+            self.recargas += 1
+
+    def asegurar_vigente(self) -> None:
+        """Carga el índice si nunca se cargó o si superó AUTOCOMPLETAR_RECARGA_S."""
+        if self.cargado_en is None or time.monotonic() - self.cargado_en > AUTOCOMPLETAR_RECARGA_S:
+            self.cargar()
+
+    def _quitar(self, id_fila: int) -> None:
+        nombre = self._nombres.pop(id_fila, None)
+        if nombre is None:
+            return
+        completa, resto = self._claves(nombre)
+        for arreglo, claves in ((self._completos, [completa]), (self._palabras, resto)):
+            for clave in claves:
+                posicion = bisect_left(arreglo, (clave, id_fila))
+                if posicion < len(arreglo) and arreglo[posicion] == (clave, id_fila):
+                    del arreglo[posicion]
+
+    def _agregar(self, id_fila: int, nombre: str) -> None:
+        self._quitar(id_fila)
+        self._nombres[id_fila] = nombre
+        completa, resto = self._claves(nombre)
+        insort(self._completos, (completa, id_fila))
+        for clave in resto:
+            insort(self._palabras, (clave, id_fila))
+
+    def aplicar_evento(self, evento: EventoDominio) -> None:
+        """Refleja en el índice las altas, cambios de nombre y bajas de la dimensión."""
+        with self._lock:
+            self.eventos += 1
+            if self.cargado_en is None:
+                return
+            for individual in desagrupar(evento):
+                if individual.despues:
+                    self._agregar(individual.despues[self.clave], individual.despues[self.campo])
+                elif individual.antes:
+                    self._quitar(individual.antes[self.clave])
+
+    def buscar(self, texto: str, limite: int = 10) -> List[Tuple[int, str]]:
+        """Nombres que empiezan por `texto` (o con una palabra que empieza por `texto`).
+
+        Args:
+            texto (str): Prefijo escrito por el usuario (se normaliza)
+            limite (int): Máximo de resultados
+
+        Returns:
+            List[Tuple[int, str]]: (id, nombre); primero los que coinciden desde el
+                inicio del nombre, cada grupo en orden alfabético
+        """
+        inicio = time.perf_counter()
+        prefijo = normalizar(texto)
+        resultados: Dict[int, str] = {}
+        with self._lock:
+            for arreglo in (self._completos, self._palabras):
+                posicion = bisect_left(arreglo, (prefijo,))
+                while len(resultados) < limite and posicion < len(arreglo) \
+                        and arreglo[posicion][0].startswith(prefijo):
+                    id_fila = arreglo[posicion][1]
+                    resultados.setdefault(id_fila, self._nombres[id_fila])
+                    posicion += 1
+            self.consultas += 1
+            self._latencias_us.append((time.perf_counter() - inicio) * 1e6)
+        return list(resultados.items())
+
+    def resumen(self) -> Dict[str, Any]:
+        """Tamaño, recargas y latencia de las búsquedas por prefijo de este proceso."""
+        with self._lock:
+            latencias = sorted(self._latencias_us)
+            return {
+                'nombres': len(self._nombres),
+                'claves': len(self._completos) + len(self._palabras),
+                'antiguedad_s': round(time.monotonic() - self.cargado_en, 1) if self.cargado_en else None,
+                'recargas': self.recargas,
+                'eventos': self.eventos,
+                'consultas': self.consultas,
+                'latencia_us': {
+                    'p50': round(latencias[len(latencias) // 2], 1),
+                    'p99': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))], 1),
+                    'max': round(latencias[-1], 1)
+                } if latencias else None
+            }
+
+
+def autocompletar(indice: IndicePrefijos, texto: str, limite: int,
+                  buscar_similares: Optional[Callable[[str, int, float], Optional[List[Any]]]] = None
+                  ) -> List[Dict[str, Any]]:
+    """Sugerencias por prefijo desde el índice y, si no alcanzan `limite`, por similitud.
+
+    Args:
+        indice (IndicePrefijos): Índice de la dimensión
+        texto (str): Texto escrito por el usuario
+        limite (int): Máximo de sugerencias
+        buscar_similares (Optional[Callable]): Búsqueda difusa del repositorio
+            (texto, limite, umbral); None para solo prefijos
+
+    Returns:
+        List[Dict[str, Any]]: Sugerencias con el id, el nombre y `coincidencia`
+            ('prefijo' o 'difusa')
+    """
+    indice.asegurar_vigente()
+    sugerencias = [{indice.clave: id_fila, indice.campo: nombre, 'coincidencia': 'prefijo'}
+                   for id_fila, nombre in indice.buscar(texto, limite)]
+    if buscar_similares is not None and len(sugerencias) < limite:
+        vistos = {s[indice.clave] for s in sugerencias}
+        try:
+            similares = buscar_similares(texto, limite, AUTOCOMPLETAR_UMBRAL_DIFUSO) or []
+        except Exception as e:
+            # La búsqueda difusa es un complemento: si falla se responde solo con los prefijos
+            logging.warning(f"Falló el autocompletado difuso de {indice.entidad}: {str(e)}")
+            similares = []
+        for fila in similares:
+            if len(sugerencias) >= limite:
+                break
+            if fila[0] not in vistos:
+                sugerencias.append({indice.clave: fila[0], indice.campo: fila[1], 'coincidencia': 'difusa'})
+    return sugerencias
+
+
+indice_aerolineas = IndicePrefijos('aerolinea', Aerolinea, 'id_aerolinea', 'nombre_aerolinea')
+indice_aeropuertos = IndicePrefijos('aeropuerto', Aeropuerto, 'id_aeropuerto', 'nombre_aeropuerto')
+
+
+def registrar_autocompletado(app: Flask) -> None:
+    """Suscribe los índices de autocompletado a los eventos de las dimensiones y los carga.
+
+    Si la carga inicial falla, cada índice se carga en su primera consulta.
+    """
+    for indice in (indice_aerolineas, indice_aeropuertos):
+        bus_eventos.suscribir(indice.entidad, indice.aplicar_evento)
+        with app.app_context():
+            try:
+                indice.cargar()
+            except Exception as e:
+                logging.warning(f"No se pudo cargar el índice de autocompletado de {indice.entidad}: {str(e)}")
@@ -1,7 +1,17 @@
-from flask_caching import Cache
+import os
+from dotenv import load_dotenv
 
-# Configuración directa para desarrollo local
-cache = Cache(config={
-    'CACHE_TYPE': 'SimpleCache',  # Caché en memoria
-    'CACHE_DEFAULT_TIMEOUT': 800  
-})
\ No newline at end of file
+load_dotenv()
+
+class CacheConfig:
+    # Sin caché salvo que se active: SimpleCache (un proceso) o RedisCache (varios workers)
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'NullCache')
+    CACHE_HABILITADA = CACHE_TYPE.strip().lower() not in ('nullcache', 'null')
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', '800'))
+    CACHE_THRESHOLD = int(os.getenv('CACHE_THRESHOLD', '5000'))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+
+    # Precalentamiento en segundo plano de los payloads del tablero
+    PRECALENTAR_HABILITADO = os.getenv('PRECALENTAR_HABILITADO', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+    PRECALENTAR_DEBOUNCE_S = float(os.getenv('PRECALENTAR_DEBOUNCE_S', '1'))
+    PRECALENTAR_ESPERA_MAX_S = float(os.getenv('PRECALENTAR_ESPERA_MAX_S', '10'))
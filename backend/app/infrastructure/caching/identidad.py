@@ -0,0 +1,24 @@
+class IdentidadCacheEstable:
+    """Hace que `cache.memoize` use el nombre de la clase como identidad de la instancia.
+
+    Por defecto Flask-Caching usa `repr(self)` en la clave, que incluye la
+    dirección de memoria: cada instancia del servicio (rutas, trabajos,
+    precalentador) y cada worker tendrían sus propias entradas. Los servicios
+    no guardan estado que cambie el resultado, así que todas las instancias
+    pueden compartirlas.
+    """
+
+    def __caching_id__(self, _instancia=None) -> str:
+        # Flask-Caching lo invoca como getattr(obj, '__caching_id__')(obj)
+        return type(self).__name__
+
+
+
+def respuesta_cacheable(valor) -> bool:
+    """Filtro para `cache.memoize(response_filter=...)`: no guarda respuestas de error.
+
+    Los servicios devuelven los errores como `{"error": ...}` o `(payload, código)`;
+    si se memoizaran, un fallo transitorio (p. ej. una consulta cancelada por
+    su plazo) se serviría desde la caché durante todo el timeout.
+    """
+    return not isinstance(valor, tuple) and not (isinstance(valor, dict) and 'error' in valor)
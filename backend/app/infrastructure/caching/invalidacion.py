@@ -0,0 +1,59 @@
+import logging
+from app.extensions import cache
+from app.domain.events import bus_eventos, desagrupar, EventoDominio
+from app.domain.services import serie_trafico
+from app.domain.services.aerolinea_service import AerolineaService
+from app.domain.services.aeropuerto_service import AeropuertoService
+from app.domain.services.movimiento_service import MovimientoService
+from app.domain.services.vuelo_service import VueloService
+
+# Resultados memoizados que dependen de la tabla de vuelos
+DEPENDIENTES_DE_VUELOS = (
+    VueloService.obtener_metricas,
+    MovimientoService.obtener_estadisticas,
+    AeropuertoService.obtener_mas_ocupado,
+    AerolineaService.obtener_estadisticas,
+    AerolineaService.obtener_estadisticas_lote
+)
+
+# Listados memoizados de cada dimensión
+LISTADOS = {
+    'aerolinea': (AerolineaService.obtener_todas,),
+    'aeropuerto': (AeropuertoService.obtener_todos,),
+    'movimiento': (MovimientoService.obtener_todos,)
+}
+
+
+def _borrar_memoizados(*funciones) -> None:
+    """Invalida los resultados memoizados de las funciones para todas las instancias."""
+    for funcion in funciones:
+        cache.delete_memoized(funcion)
+
+
+def invalidar_por_vuelo(evento: EventoDominio) -> None:
+    """Invalida los buckets de series afectados y los agregados que dependen de vuelos.
+
+    En escrituras masivas los agregados se invalidan una sola vez para todo el lote.
+    """
+    claves = set()
+    for individual in desagrupar(evento):
+        for fila in (individual.antes, individual.despues):
+            if fila and fila.get('id_aeropuerto') is not None and fila.get('dia') is not None:
+                claves.update(serie_trafico.claves_afectadas(fila['id_aeropuerto'], fila['dia']))
+    # delete_many se detiene en la primera clave ausente; se borra una por una
+    for clave in claves:
+        cache.delete(clave)
+    _borrar_memoizados(*DEPENDIENTES_DE_VUELOS)
+
+
+def invalidar_por_dimension(evento: EventoDominio) -> None:
+    """Invalida el listado de la dimensión y los agregados que incluyen sus nombres."""
+    _borrar_memoizados(*LISTADOS.get(evento.entidad, ()), *DEPENDIENTES_DE_VUELOS)
+
+
+def registrar_invalidaciones() -> None:
+    """Suscribe la invalidación de caché a los eventos de escritura de los repositorios."""
+    bus_eventos.suscribir('vuelo', invalidar_por_vuelo)
+    for entidad in LISTADOS:
+        bus_eventos.suscribir(entidad, invalidar_por_dimension)
+    logging.info("Invalidación de caché por eventos registrada")
@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import Flask
+from app.extensions import cache
+from app.domain.events import bus_eventos, EventoDominio
+from app.infrastructure.observability.pool_stats import Histograma
+from .config import CacheConfig
+from .identidad import respuesta_cacheable
+
+# Buckets (ms) del histograma de lag: desde la primera escritura hasta la caché lista
+BUCKETS_LAG_MS = (100, 250, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+
+class Precalentador:
+    """Recalcula en segundo plano los payloads memoizados del tablero.
+
+    Tras el arranque y tras cada escritura que invalida la caché, un hilo
+    dedicado vuelve a calcular los resultados registrados y los guarda bajo la
+    misma clave que usaría `cache.memoize`, antes de que llegue el siguiente
+    visitante. Las ráfagas de escrituras se agrupan: se espera a que pasen
+    PRECALENTAR_DEBOUNCE_S sin escrituras, pero nunca más de
+    PRECALENTAR_ESPERA_MAX_S desde la primera.
+
+    El lag medido es el tiempo desde la primera solicitud pendiente hasta que
+    todos los payloads quedan en caché.
+    """
+
+    def __init__(self, debounce_s: float = CacheConfig.PRECALENTAR_DEBOUNCE_S,
+                 espera_max_s: float = CacheConfig.PRECALENTAR_ESPERA_MAX_S):
+        self.debounce_s = debounce_s
+        self.espera_max_s = espera_max_s
+        self._objetivos: List[Tuple[str, Any, Callable]] = []
+        self._condicion = threading.Condition()
+        self._app: Optional[Flask] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._detener = False
+        self._pendiente_desde: Optional[float] = None
+        self._ultima_solicitud: Optional[float] = None
+        # Métricas
+        self.solicitudes = 0
+        self.ejecuciones = 0
+        self.errores = 0
+        self.ultima_ejecucion: Optional[float] = None
+        self.ultima_duracion_ms = 0.0
+        self.ultimo_lag_ms = 0.0
+        self.lag = Histograma(BUCKETS_LAG_MS)
+
+    def registrar(self, nombre: str, servicio: Any, metodo: Callable) -> None:
+        """Agrega un método memoizado (sin argumentos) de un servicio a precalentar.
+
+        Args:
+            nombre (str): Nombre para las métricas
+            servicio (Any): Instancia del servicio
+            metodo (Callable): Método decorado con `cache.memoize`, tomado de la clase
+        """
+        self._objetivos.append((nombre, servicio, metodo))
+
+    def iniciar(self, app: Flask) -> None:
+        """Asocia la aplicación y solicita el precalentamiento inicial."""
+        self._app = app
+        self.solicitar()
+
+    def _asegurar_hilo(self) -> None:
+        # Los hilos no sobreviven a un fork (p. ej. gunicorn --preload): se crean por proceso
+        if self._hilo is None or not self._hilo.is_alive() or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._bucle, name='precalentador-cache', daemon=True)
+            self._hilo.start()
+
+    def solicitar(self, evento: Optional[EventoDominio] = None) -> None:
+        """Marca los payloads como pendientes de recalcular (se puede usar como suscriptor de eventos)."""
+        if self._app is None:
+            return
+        ahora = time.monotonic()
+        with self._condicion:
+            self.solicitudes += 1
+            if self._pendiente_desde is None:
+                self._pendiente_desde = ahora
+            self._ultima_solicitud = ahora
+            self._asegurar_hilo()
+            self._condicion.notify()
+
+    def detener(self) -> None:
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+
+    def _bucle(self) -> None:
+        while True:
+            with self._condicion:
+                while self._pendiente_desde is None and not self._detener:
+                    self._condicion.wait()
+                if self._detener:
+                    return
+                # Debounce: esperar a que cese la ráfaga, con un límite desde la primera solicitud
+                while True:
+                    ahora = time.monotonic()
+                    restante = min(self._ultima_solicitud + self.debounce_s,
+                                   self._pendiente_desde + self.espera_max_s) - ahora
+                    if restante <= 0 or self._detener:
+                        break
+                    self._condicion.wait(restante)
+                if self._detener:
+                    return
+                pendiente_desde = self._pendiente_desde
+                self._pendiente_desde = self._ultima_solicitud = None
+
+            self._precalentar(pendiente_desde)
+
+    def _precalentar(self, pendiente_desde: float) -> None:
+        inicio = time.monotonic()
+        with self._app.app_context():
+            for nombre, servicio, metodo in self._objetivos:
+                try:
+                    # La clave se calcula antes que el valor: si una escritura la invalida
+                    # mientras tanto, el valor queda bajo la versión anterior (inalcanzable)
+                    clave = metodo.make_cache_key(metodo.uncached, servicio)
+                    valor = metodo.uncached(servicio)
+                    if not respuesta_cacheable(valor):
+                        raise RuntimeError(f"respuesta de error: {valor}")
+                    cache.set(clave, valor, timeout=metodo.cache_timeout)
+                except Exception as e:
+                    self.errores += 1
+                    logging.warning(f"No se pudo precalentar {nombre}: {str(e)}")
+        fin = time.monotonic()
+        with self._condicion:
+            self.ejecuciones += 1
+            self.ultima_ejecucion = time.time()
+            self.ultima_duracion_ms = (fin - inicio) * 1000
+            self.ultimo_lag_ms = (fin - pendiente_desde) * 1000
+            self.lag.registrar(self.ultimo_lag_ms)
+
+    def resumen(self) -> Dict[str, Any]:
+        """Métricas del precalentador de este proceso."""
+        with self._condicion:
+            pendiente_ms = (time.monotonic() - self._pendiente_desde) * 1000 if self._pendiente_desde else 0.0
+            return {
+                'objetivos': [nombre for nombre, _, _ in self._objetivos],
+                'hilo_activo': self._hilo is not None and self._hilo.is_alive(),
+                'solicitudes': self.solicitudes,
+                'ejecuciones': self.ejecuciones,
+                'errores': self.errores,
+                'pendiente_ms': round(pendiente_ms, 1),
+                'ultima_ejecucion': self.ultima_ejecucion,
+                'ultima_duracion_ms': round(self.ultima_duracion_ms, 1),
+                'ultimo_lag_ms': round(self.ultimo_lag_ms, 1),
+                'lag': self.lag.resumen()
+            }
+
+
+precalentador = Precalentador()
+
+
+def registrar_precalentador(app: Flask) -> None:
+    """Registra los payloads del tablero, se suscribe a las escrituras y lanza el precalentamiento inicial.
+
+    No hace nada sin una caché configurada (CACHE_TYPE): no habría dónde guardar los resultados.
+    """
+    if not CacheConfig.PRECALENTAR_HABILITADO or not CacheConfig.CACHE_HABILITADA:
+        return
+    from app.domain.repositories.aeropuerto_repository import AeropuertoRepository
+    from app.domain.repositories.movimiento_repository import MovimientoRepository
+    from app.domain.repositories.vuelo_repository import VueloRepository
+    from app.domain.services.aeropuerto_service import AeropuertoService
+    from app.domain.services.movimiento_service import MovimientoService
+    from app.domain.services.vuelo_service import VueloService
+
+    precalentador.registrar('vuelos/metricas', VueloService(VueloRepository()),
+                            VueloService.obtener_metricas)
+    precalentador.registrar('movimientos/estadisticas', MovimientoService(MovimientoRepository()),
+                            MovimientoService.obtener_estadisticas)
+    precalentador.registrar('aeropuertos/mas_ocupado', AeropuertoService(AeropuertoRepository()),
+                            AeropuertoService.obtener_mas_ocupado)
+
+    # Se suscribe después de la invalidación, así que solicita sobre una caché ya limpia
+    for entidad in ('vuelo', 'aerolinea', 'aeropuerto', 'movimiento'):
+        bus_eventos.suscribir(entidad, precalentador.solicitar)
+    precalentador.iniciar(app)
@@ -1,13 +1,36 @@
 import os
 from dotenv import load_dotenv
+from app.infrastructure.observability.pool_stats import QueuePoolInstrumentado
 
 load_dotenv()
 
+
+def _env_bool(nombre: str, defecto: bool) -> bool:
+    """Lee una variable de entorno booleana ('1', 'true', 'si', 'yes', 'on')."""
+    valor = os.getenv(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+
+def _connect_args() -> dict:
+    """Argumentos de conexión para psycopg2 (statement_timeout global opcional)."""
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+    if statement_timeout > 0:
+        return {'options': f'-c statement_timeout={statement_timeout}'}
+    return {}
+
+
 class DBConfig:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql://postgres:Henry1587@db:5432/vuelos_db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 5,
-        'pool_timeout': 30,
-        'pool_recycle': 3600
-    }
\ No newline at end of file
+        'poolclass': QueuePoolInstrumentado,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '3600')),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_use_lifo': _env_bool('DB_POOL_USE_LIFO', False),
+        'connect_args': _connect_args()
+    }
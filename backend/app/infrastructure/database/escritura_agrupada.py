@@ -0,0 +1,188 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import Flask
+from app.infrastructure.observability.pool_stats import Histograma
+from .config import _env_bool
+
+# Modo opcional: POST /api/vuelos/ encola en el buffer en lugar de hacer un commit por vuelo
+VUELOS_GROUP_COMMIT = _env_bool('VUELOS_GROUP_COMMIT', False)
+# Se confirma un lote al juntar N filas...
+GROUP_COMMIT_MAX_FILAS = int(os.getenv('GROUP_COMMIT_MAX_FILAS', '500'))
+# ...o al pasar M milisegundos desde la primera fila del lote
+GROUP_COMMIT_MAX_ESPERA_MS = float(os.getenv('GROUP_COMMIT_MAX_ESPERA_MS', '5'))
+# Filas en espera admitidas por proceso antes de rechazar con 503
+GROUP_COMMIT_MAX_PENDIENTES = int(os.getenv('GROUP_COMMIT_MAX_PENDIENTES', '10000'))
+# Tiempo máximo que una petición espera la confirmación de su lote
+GROUP_COMMIT_TIMEOUT_S = float(os.getenv('GROUP_COMMIT_TIMEOUT_S', '30'))
+
+# Buckets (ms) del histograma de duración del INSERT + COMMIT
+BUCKETS_COMMIT_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class BufferLlenoError(Exception):
+    """El buffer alcanzó GROUP_COMMIT_MAX_PENDIENTES filas en espera."""
+
+
+class EscrituraAgrupada:
+    """Agrupa inserciones individuales en transacciones de varias filas (group commit).
+
+    Cada `enviar` deja la fila en una cola del proceso y devuelve un `Future`.
+    Un hilo dedicado toma la primera fila disponible, junta las que lleguen
+    hasta completar `max_filas` o hasta que pasen `max_espera_ms`, y llama a
+    `escribir_lote` una sola vez con todas: un INSERT de varias filas y un
+    único commit (un solo fsync). Mientras se confirma un lote, el siguiente
+    se va llenando.
+
+    El `Future` de cada fila se resuelve solo después del commit de su lote,
+    así que quien espera recibe una confirmación durable. Si el lote falla
+    (por ejemplo, una clave foránea inválida), se reintenta fila por fila para
+    que el error afecte solo a las filas culpables.
+    """
+
+    def __init__(self, nombre: str, escribir_lote: Callable[[List[Dict[str, Any]]], List[Any]],
+                 max_filas: int = GROUP_COMMIT_MAX_FILAS, max_espera_ms: float = GROUP_COMMIT_MAX_ESPERA_MS,
+                 max_pendientes: int = GROUP_COMMIT_MAX_PENDIENTES):
+        """
+        Args:
+            nombre (str): Nombre del buffer (hilo y métricas)
+            escribir_lote (Callable): Inserta y confirma las filas en una transacción;
+                devuelve un resultado por fila, en el mismo orden
+            max_filas (int): Filas máximas por lote
+            max_espera_ms (float): Espera máxima desde la primera fila del lote
+            max_pendientes (int): Filas en cola admitidas antes de rechazar
+        """
+        self.nombre = nombre
+        self.escribir_lote = escribir_lote
+        self.max_filas = max_filas
+        self.max_espera_s = max_espera_ms / 1000
+        self._cola: 'queue.Queue[Tuple[Dict[str, Any], Future, Flask]]' = queue.Queue(maxsize=max_pendientes)
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        # Métricas
+        self.lotes = 0
+        self.filas = 0
+        self.lotes_fallidos = 0
+        self.filas_fallidas = 0
+        self.rechazadas = 0
+        self.max_filas_lote = 0
+        self.duracion_commit = Histograma(BUCKETS_COMMIT_MS)
+
+    def _asegurar_hilo(self) -> None:
+        # Los hilos no sobreviven a un fork (p. ej. gunicorn --preload): se crean por proceso
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._bucle, name=f'group-commit-{self.nombre}', daemon=True)
+                self._hilo.start()
+
+    def enviar(self, fila: Dict[str, Any], app: Flask) -> Future:
+        """Encola una fila para el siguiente lote.
+
+        Args:
+            fila (Dict[str, Any]): Valores ya validados de la fila
+            app (Flask): Aplicación en cuyo contexto se escribe el lote
+
+        Returns:
+            Future: Se resuelve con el resultado de la fila tras el commit de su lote,
+                o con la excepción que impidió guardarla
+
+        Raises:
+            BufferLlenoError: Si la cola está llena
+        """
+        self._asegurar_hilo()
+        futuro: Future = Future()
+        try:
+            self._cola.put_nowait((fila, futuro, app))
+        except queue.Full:
+            with self._lock:
+                self.rechazadas += 1
+            raise BufferLlenoError()
+        return futuro
+
+    def _bucle(self) -> None:
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.max_espera_s
+            while len(lote) < self.max_filas:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            # Un lote por aplicación (en la práctica hay una sola por proceso)
+            por_app: Dict[int, List[Tuple[Dict[str, Any], Future, Flask]]] = {}
+            for elemento in lote:
+                por_app.setdefault(id(elemento[2]), []).append(elemento)
+            for elementos in por_app.values():
+                self._escribir(elementos)
+
+    def _escribir(self, elementos: List[Tuple[Dict[str, Any], Future, Flask]]) -> None:
+        app = elementos[0][2]
+        inicio = time.monotonic()
+        with app.app_context():
+            try:
+                resultados = self.escribir_lote([fila for fila, _, _ in elementos])
+            except Exception as e:
+                logging.warning(f"Falló el lote de {len(elementos)} filas en {self.nombre}, "
+                                f"se reintenta fila por fila: {str(e)}")
+                with self._lock:
+                    self.lotes_fallidos += 1
+                self._escribir_individualmente(elementos, e)
+                return
+        duracion_ms = (time.monotonic() - inicio) * 1000
+        with self._lock:
+            self.lotes += 1
+            self.filas += len(elementos)
+            self.max_filas_lote = max(self.max_filas_lote, len(elementos))
+            self.duracion_commit.registrar(duracion_ms)
+        for (_, futuro, _), resultado in zip(elementos, resultados):
+            futuro.set_result(resultado)
+
+    def _escribir_individualmente(self, elementos: List[Tuple[Dict[str, Any], Future, Flask]],
+                                  error_lote: Exception) -> None:
+        if len(elementos) == 1:
+            with self._lock:
+                self.filas_fallidas += 1
+            elementos[0][1].set_exception(error_lote)
+            return
+        with elementos[0][2].app_context():
+            for fila, futuro, _ in elementos:
+                try:
+                    resultado = self.escribir_lote([fila])[0]
+                except Exception as e:
+                    with self._lock:
+                        self.filas_fallidas += 1
+                    futuro.set_exception(e)
+                    continue
+                with self._lock:
+                    self.lotes += 1
+                    self.filas += 1
+                    self.max_filas_lote = max(self.max_filas_lote, 1)
+                futuro.set_result(resultado)
+
+    def resumen(self) -> Dict[str, Any]:
+        """Métricas del buffer de este proceso."""
+        with self._lock:
+            return {
+                'nombre': self.nombre,
+                'hilo_activo': self._hilo is not None and self._hilo.is_alive(),
+                'max_filas': self.max_filas,
+                'max_espera_ms': self.max_espera_s * 1000,
+                'en_cola': self._cola.qsize(),
+                'lotes': self.lotes,
+                'filas': self.filas,
+                'filas_por_lote': round(self.filas / self.lotes, 2) if self.lotes else 0.0,
+                'lotes_fallidos': self.lotes_fallidos,
+                'filas_fallidas': self.filas_fallidas,
+                'rechazadas': self.rechazadas,
+                'max_filas_lote': self.max_filas_lote,
+                'duracion_commit_ms': self.duracion_commit.resumen()
+            }
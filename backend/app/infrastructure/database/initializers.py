@@ -1,5 +1,9 @@
+from typing import Dict
 from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
 from app.infrastructure.database.connection import db
+from app.infrastructure.database.utils import pg_trgm_disponible
 from .initial_data import DatabaseInitializer
 
 def initialize_database(app: Flask) -> None:
@@ -13,4 +17,94 @@ def initialize_database(app: Flask) -> None:
             except Exception as e:
                 app.logger.error(f"❌ Error en inicialización: {str(e)}")                
         else:
-            app.logger.info("🔍 Base de datos ya inicializada")
\ No newline at end of file
+            app.logger.info("🔍 Base de datos ya inicializada")
+        ensure_indexes(app)
+
+
+# Índices de trigramas (pg_trgm) para el autocompletado difuso de nombres
+INDICES_TRIGRAMAS = {
+    'ix_aerolineas_nombre_trgm': ('aerolineas', 'nombre_aerolinea'),
+    'ix_aeropuertos_nombre_trgm': ('aeropuertos', 'nombre_aeropuerto')
+}
+
+
+def ensure_indexes(app: Flask) -> None:
+    """Crea los índices declarados en los modelos que falten en tablas ya existentes.
+
+    `db.create_all()` solo crea índices junto con tablas nuevas, así que en una
+    base de datos ya inicializada se crean aquí. En PostgreSQL se usa
+    CREATE INDEX CONCURRENTLY para no bloquear las escrituras de `vuelos`
+    mientras se construyen, y solo para los que faltan o quedaron inválidos.
+    """
+    from app.domain.entities.vuelo import Vuelo
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            crear_indices_concurrentes(app, {
+                index.name: str(CreateIndex(index, if_not_exists=True).compile(dialect=db.engine.dialect))
+                .replace('INDEX', 'INDEX CONCURRENTLY', 1)
+                for index in Vuelo.__table__.indexes
+            })
+        else:
+            for index in Vuelo.__table__.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+    except Exception as e:
+        app.logger.error(f"❌ Error al crear índices: {str(e)}")
+    ensure_trigram_indexes(app)
+
+
+def crear_indices_concurrentes(app: Flask, sentencias: Dict[str, str]) -> None:
+    """Ejecuta el CREATE INDEX CONCURRENTLY de cada índice que falte (solo PostgreSQL).
+
+    CONCURRENTLY no puede correr dentro de una transacción, así que se usa una
+    conexión en AUTOCOMMIT. Una construcción interrumpida deja el índice
+    marcado como inválido (y IF NOT EXISTS lo daría por creado): se elimina y
+    se vuelve a crear. Con los índices ya presentes solo se consulta el catálogo.
+
+    Args:
+        app (Flask): Aplicación (para el logger)
+        sentencias (Dict[str, str]): Nombre del índice -> sentencia CREATE INDEX CONCURRENTLY
+    """
+    with db.engine.connect() as conn:
+        conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+        validos = dict(conn.execute(
+            text('SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+                 'WHERE c.relname = ANY(:nombres)'),
+            {'nombres': list(sentencias)}
+        ).all())
+        for nombre, sentencia in sentencias.items():
+            if validos.get(nombre):
+                continue
+            try:
+                if nombre in validos:
+                    conn.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS {nombre}')
+                app.logger.info(f"⚡ Creando índice {nombre}...")
+                conn.exec_driver_sql(sentencia)
+            except Exception as e:
+                # Otro worker puede estar creándolo a la vez; se reintenta en el próximo arranque
+                app.logger.error(f"❌ Error al crear el índice {nombre}: {str(e)}")
+
+
+def ensure_trigram_indexes(app: Flask) -> None:
+    """Habilita pg_trgm y crea los índices GIN de trigramas sobre los nombres (solo PostgreSQL).
+
+    No se declaran en los modelos porque `create_all` fallaría si la extensión
+    no está instalada; sin ellos el autocompletado solo responde por prefijo.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    try:
+        with db.engine.connect() as conn:
+            conn.execution_options(isolation_level='AUTOCOMMIT').exec_driver_sql(
+                'CREATE EXTENSION IF NOT EXISTS pg_trgm'
+            )
+        crear_indices_concurrentes(app, {
+            nombre: f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla} USING gin ({columna} gin_trgm_ops)'
+            for nombre, (tabla, columna) in INDICES_TRIGRAMAS.items()
+        })
+    except Exception as e:
+        app.logger.warning(f"⚠️ No se pudieron crear los índices de trigramas: {str(e)}")
+    try:
+        if not pg_trgm_disponible(recomprobar=True):
+            app.logger.warning("⚠️ pg_trgm no está instalada: el autocompletado solo responderá por prefijo")
+    except Exception as e:
+        app.logger.warning(f"⚠️ No se pudo comprobar pg_trgm: {str(e)}")
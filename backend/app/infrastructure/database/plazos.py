@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from flask import Flask, g, has_request_context, jsonify, request
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.infrastructure.admision.control import metodo_de_peticion
+
+ATRIBUTO_PLAZO = '_plazo_consulta'
+
+# Plazo (ms) de cada ruta marcada con `plazo_consulta`
+PLAZOS_POR_DEFECTO = {
+    'vuelos.metricas': 30000,
+    'vuelos.aerolineas_mas_de_dos': 30000,
+    'vuelos.aerolineas_frecuentes': 30000,
+    'vuelos.buscar': 10000,
+    'movimientos.estadisticas': 30000,
+    'aerolineas.estadisticas': 15000,
+    'aerolineas.estadisticas_lote': 30000,
+    'aeropuertos.mas_ocupado': 15000,
+    'aeropuertos.estadisticas': 15000,
+    'aeropuertos.serie': 15000
+}
+# JSON con plazos que se agregan o reemplazan a los anteriores (0 = sin plazo), p. ej.
+# {"vuelos.metricas": 10000}
+DB_PLAZOS_MS = {**PLAZOS_POR_DEFECTO, **json.loads(os.getenv('DB_PLAZOS_MS', '{}'))}
+# Plazo de las rutas sin marca (0 = sin plazo; aplica DB_STATEMENT_TIMEOUT_MS si está definido)
+DB_PLAZO_POR_DEFECTO_MS = int(os.getenv('DB_PLAZO_POR_DEFECTO_MS', '0'))
+
+# SQLSTATE query_canceled: statement_timeout (o pg_cancel_backend) interrumpió la sentencia
+SQLSTATE_CONSULTA_CANCELADA = '57014'
+
+
+def plazo_consulta(nombre: str) -> Callable:
+    """Asigna a un método de un Resource el plazo configurado en DB_PLAZOS_MS[nombre].
+
+    Como `clase_trafico`, solo marca la función.
+
+    Args:
+        nombre (str): Clave del plazo, p. ej. 'vuelos.metricas'
+    """
+    def marcar(f):
+        setattr(f, ATRIBUTO_PLAZO, nombre)
+        return f
+    return marcar
+
+
+class EstadisticasPlazos:
+    """Peticiones con plazo y plazos vencidos por ruta, en este proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rutas: Dict[str, Dict[str, int]] = {}
+
+    def _ruta(self, nombre: str) -> Dict[str, int]:
+        return self.rutas.setdefault(nombre, {'peticiones': 0, 'excedidas': 0})
+
+    def registrar_peticion(self, nombre: str) -> None:
+        with self._lock:
+            self._ruta(nombre)['peticiones'] += 1
+
+    def registrar_excedida(self, nombre: str) -> None:
+        with self._lock:
+            self._ruta(nombre)['excedidas'] += 1
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'plazos_ms': {**DB_PLAZOS_MS, '*': DB_PLAZO_POR_DEFECTO_MS},
+                'excedidas_total': sum(r['excedidas'] for r in self.rutas.values()),
+                'rutas': {nombre: dict(valores) for nombre, valores in self.rutas.items()}
+            }
+
+
+estadisticas_plazos = EstadisticasPlazos()
+
+
+class Plazo:
+    """Plazo de la petición actual: nombre, duración y vencimiento (reloj monotónico)."""
+
+    def __init__(self, nombre: str, ms: int):
+        self.nombre = nombre
+        self.ms = ms
+        self.vence = time.monotonic() + ms / 1000
+        self.excedido = False
+
+    def restante_ms(self) -> int:
+        return int((self.vence - time.monotonic()) * 1000)
+
+
+def _plazo_de_peticion() -> Optional[Plazo]:
+    metodo = metodo_de_peticion()
+    if metodo is None:
+        return None
+    nombre = getattr(metodo, ATRIBUTO_PLAZO, None)
+    ms = DB_PLAZOS_MS.get(nombre, 0) if nombre else DB_PLAZO_POR_DEFECTO_MS
+    if ms <= 0:
+        return None
+    return Plazo(nombre or request.endpoint, ms)
+
+
+def _iniciar_plazo() -> None:
+    plazo = _plazo_de_peticion()
+    if plazo is not None:
+        g.plazo_consulta = plazo
+        estadisticas_plazos.registrar_peticion(plazo.nombre)
+
+
+def _aplicar_statement_timeout(session, transaction, connection) -> None:
+    """Fija `statement_timeout` para la transacción con lo que resta del plazo.
+
+    `set_config(..., true)` equivale a SET LOCAL: vale hasta el COMMIT o
+    ROLLBACK, así que la conexión vuelve al pool con su valor original. Si el
+    plazo ya venció se usa 1 ms y PostgreSQL cancela la primera sentencia.
+    """
+    if not has_request_context() or connection.dialect.name != 'postgresql':
+        return
+    plazo = g.get('plazo_consulta')
+    if plazo is None:
+        return
+    connection.execute(select(func.set_config('statement_timeout', str(max(1, plazo.restante_ms())), True)))
+
+
+def _detectar_cancelacion(contexto) -> None:
+    """Marca el plazo como vencido cuando PostgreSQL cancela una sentencia de la petición."""
+    if getattr(contexto.original_exception, 'pgcode', None) != SQLSTATE_CONSULTA_CANCELADA:
+        return
+    if not has_request_context():
+        return
+    plazo = g.get('plazo_consulta')
+    if plazo is not None and not plazo.excedido:
+        plazo.excedido = True
+        estadisticas_plazos.registrar_excedida(plazo.nombre)
+
+
+def _responder_plazo_excedido(respuesta):
+    # Los servicios capturan la excepción y responden 500; aquí se traduce a 504
+    plazo = g.get('plazo_consulta')
+    if plazo is None or not plazo.excedido:
+        return respuesta
+    resultado = jsonify({"error": f"La consulta excedió el plazo de {plazo.ms} ms", "plazo_ms": plazo.ms})
+    resultado.status_code = 504
+    return resultado
+
+
+def registrar_plazos(app: Flask) -> None:
+    """Activa los plazos por ruta: statement_timeout por transacción y 504 al vencer."""
+    app.before_request(_iniciar_plazo)
+    app.after_request(_responder_plazo_excedido)
+    if not event.contains(Session, 'after_begin', _aplicar_statement_timeout):
+        event.listen(Session, 'after_begin', _aplicar_statement_timeout)
+        event.listen(Engine, 'handle_error', _detectar_cancelacion)
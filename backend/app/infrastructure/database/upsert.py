@@ -0,0 +1,78 @@
+import os
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from app.infrastructure.database.connection import db
+from app.infrastructure.database.utils import commit_or_rollback
+
+# Filas por sentencia INSERT ... ON CONFLICT (el lote completo va en una sola transacción)
+UPSERT_TAMANO_LOTE = int(os.getenv('UPSERT_TAMANO_LOTE', '1000'))
+
+
+def upsert_en_lotes(modelo, clave: str, filas: List[Dict[str, Any]],
+                    tamano_lote: int = UPSERT_TAMANO_LOTE
+                    ) -> Tuple[Dict[str, int], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Inserta o actualiza filas por clave primaria con `INSERT ... ON CONFLICT DO UPDATE` (PostgreSQL).
+
+    Cada trozo de `tamano_lote` filas es una sola sentencia y todo el lote se
+    confirma en una única transacción. El UPDATE solo se aplica si algún
+    valor cambia (`IS DISTINCT FROM`), así que las filas idénticas no generan
+    versiones nuevas ni aparecen en el RETURNING; entre las devueltas,
+    `xmax = 0` distingue las insertadas de las actualizadas.
+
+    Si se insertaron claves explícitas, se adelanta la secuencia de la clave
+    para que las altas individuales posteriores no choquen con ellas.
+
+    Args:
+        modelo: Modelo SQLAlchemy de la tabla
+        clave (str): Nombre de la columna de clave primaria
+        filas (List[Dict[str, Any]]): Filas completas, con claves únicas
+        tamano_lote (int): Filas por sentencia
+
+    Returns:
+        Tuple[Dict[str, int], List[Dict[str, Any]], List[Dict[str, Any]]]: Conteos
+            (insertados, actualizados, sin_cambios), filas insertadas y filas modificadas
+
+    Raises:
+        SQLAlchemyError: Si falla alguna sentencia o el commit (no se aplica ninguna fila)
+    """
+    tabla = modelo.__table__
+    columnas = [c for c in filas[0] if c != clave] if filas else []
+    conteos = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0}
+    insertadas: List[Dict[str, Any]] = []
+    actualizadas: List[Dict[str, Any]] = []
+
+    try:
+        for inicio in range(0, len(filas), tamano_lote):
+            trozo = filas[inicio:inicio + tamano_lote]
+            sentencia = insert(tabla).values(trozo)
+            sentencia = sentencia.on_conflict_do_update(
+                index_elements=[tabla.c[clave]],
+                set_={c: sentencia.excluded[c] for c in columnas},
+                where=or_(*(tabla.c[c].is_distinct_from(sentencia.excluded[c]) for c in columnas))
+            ).returning(*tabla.c, literal_column('xmax = 0').label('insertado'))
+
+            devueltas = 0
+            for fila in db.session.execute(sentencia):
+                datos = dict(fila._mapping)
+                (insertadas if datos.pop('insertado') else actualizadas).append(datos)
+                devueltas += 1
+            conteos['sin_cambios'] += len(trozo) - devueltas
+
+        conteos['insertados'], conteos['actualizados'] = len(insertadas), len(actualizadas)
+        if insertadas:
+            _adelantar_secuencia(modelo, clave)
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    commit_or_rollback()
+    return conteos, insertadas, actualizadas
+
+
+def _adelantar_secuencia(modelo, clave: str) -> None:
+    tabla = modelo.__table__
+    maximo = select(func.coalesce(func.max(tabla.c[clave]), 0)).scalar_subquery()
+    db.session.execute(
+        select(func.setval(func.pg_get_serial_sequence(tabla.name, clave), func.greatest(maximo, 1)))
+    )
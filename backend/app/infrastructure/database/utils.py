@@ -1,3 +1,8 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Select, Table, delete, func, select, update
+from sqlalchemy.orm import InstrumentedAttribute
 from sqlalchemy.exc import SQLAlchemyError
 from app.infrastructure.database.connection import db
 from flask import abort
@@ -15,4 +20,154 @@ def commit_or_rollback():
         db.session.commit()
     except SQLAlchemyError as e:
         db.session.rollback()
-        raise e
\ No newline at end of file
+        raise e
+
+
+def actualizar_devolviendo(tabla: Table, condiciones: Sequence[Any], cambios: Dict[str, Any],
+                           limite: Optional[int] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Actualiza filas con una sola sentencia y devuelve su estado anterior y nuevo.
+
+    `UPDATE t SET ... FROM (SELECT ... FOR UPDATE) AS antes WHERE t.pk = antes.pk
+    RETURNING t.*, antes.*`: la subconsulta bloquea y captura los valores
+    previos, así que no hace falta cargar las filas antes de modificarlas. No
+    hace commit; si la sentencia falla, hace rollback y relanza el error.
+
+    Args:
+        tabla (Table): Tabla a modificar
+        condiciones (Sequence[Any]): Condiciones WHERE sobre las columnas de la tabla
+        cambios (Dict[str, Any]): Columnas a asignar (no vacío)
+        limite (Optional[int]): Máximo de filas, en orden de clave primaria
+
+    Returns:
+        List[Tuple[Dict[str, Any], Dict[str, Any]]]: (antes, despues) por fila modificada;
+            lista vacía si ninguna fila cumple las condiciones
+    """
+    clave = list(tabla.primary_key.columns)
+    antes = select(*tabla.c).where(*condiciones)
+    if limite is not None:
+        antes = antes.order_by(*clave).limit(limite)
+    antes = antes.with_for_update().subquery('antes')
+    sentencia = (update(tabla)
+                 .where(*(columna == antes.c[columna.name] for columna in clave))
+                 .values(**cambios)
+                 .returning(*tabla.c, *(c.label(f'antes_{c.name}') for c in antes.c)))
+    try:
+        return [
+            ({c.name: fila._mapping[f'antes_{c.name}'] for c in tabla.c}, {c.name: fila._mapping[c.name] for c in tabla.c})
+            for fila in db.session.execute(sentencia)
+        ]
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+
+
+def eliminar_devolviendo(tabla: Table, condiciones: Sequence[Any]) -> List[Dict[str, Any]]:
+    """Elimina filas con `DELETE ... RETURNING` y devuelve su último estado.
+
+    No hace commit; si la sentencia falla, hace rollback y relanza el error.
+    """
+    sentencia = delete(tabla).where(*condiciones).returning(*tabla.c)
+    try:
+        return [dict(fila._mapping) for fila in db.session.execute(sentencia)]
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+
+
+def estimar_filas(consulta: Select) -> Optional[int]:
+    """Filas que el planificador de PostgreSQL estima para la consulta, sin ejecutarla.
+
+    Usa `EXPLAIN (FORMAT JSON)`, que solo consulta las estadísticas de las
+    tablas (pg_class/pg_statistic): el costo no depende del tamaño del resultado.
+
+    Args:
+        consulta (Select): Consulta a estimar
+
+    Returns:
+        Optional[int]: Filas estimadas del nodo raíz, o None si el motor no es PostgreSQL
+    """
+    conexion = db.session.connection()
+    if conexion.dialect.name != 'postgresql':
+        return None
+    compilada = consulta.compile(dialect=conexion.dialect, compile_kwargs={'render_postcompile': True})
+    plan = conexion.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compilada}", compilada.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def contar_acotado(consulta: Select, tope: int) -> int:
+    """Cuenta las filas de la consulta leyendo como máximo `tope + 1`.
+
+    Args:
+        consulta (Select): Consulta a contar (sin ORDER BY)
+        tope (int): Máximo de filas que interesa contar exactamente
+
+    Returns:
+        int: Filas de la consulta si son `tope` o menos; `tope + 1` si hay más
+    """
+    acotada = consulta.limit(tope + 1).subquery()
+    return db.session.scalar(select(func.count()).select_from(acotada))
+
+
+# None hasta la primera comprobación; ver `pg_trgm_disponible`
+_pg_trgm_disponible: Optional[bool] = None
+
+
+def pg_trgm_disponible(recomprobar: bool = False) -> bool:
+    """Indica si la extensión pg_trgm está instalada (se consulta pg_extension una vez por proceso).
+
+    Args:
+        recomprobar (bool): Vuelve a consultar pg_extension (p. ej. tras intentar instalarla)
+
+    Returns:
+        bool: False también si el motor no es PostgreSQL
+    """
+    global _pg_trgm_disponible
+    if _pg_trgm_disponible is None or recomprobar:
+        if db.engine.dialect.name != 'postgresql':
+            _pg_trgm_disponible = False
+        else:
+            with db.engine.connect() as conexion:
+                _pg_trgm_disponible = conexion.exec_driver_sql(
+                    "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+                ).scalar()
+    return _pg_trgm_disponible
+
+
+def similares_trigrama(columna_id: InstrumentedAttribute, columna_nombre: InstrumentedAttribute,
+                       texto: str, limite: int, umbral: float) -> Optional[List[Any]]:
+    """Filas cuyo nombre se parece a `texto` según pg_trgm, de la más a la menos parecida.
+
+    El operador `%` usa el índice GIN de trigramas de la columna y compara contra
+    `pg_trgm.similarity_threshold`, que se fija solo para la transacción actual.
+    La consulta corre en un SAVEPOINT: si falla, la sesión sigue utilizable y se
+    devuelve None.
+
+    Args:
+        columna_id (InstrumentedAttribute): Clave primaria de la dimensión
+        columna_nombre (InstrumentedAttribute): Columna con índice gin_trgm_ops
+        texto (str): Texto buscado
+        limite (int): Máximo de filas
+        umbral (float): Similitud mínima (0 a 1)
+
+    Returns:
+        Optional[List[Any]]: Filas (id, nombre, similitud), o None si el motor no es
+            PostgreSQL, pg_trgm no está instalada o la consulta falló
+    """
+    if not pg_trgm_disponible():
+        return None
+    similitud = func.similarity(columna_nombre, texto).label('similitud')
+    consulta = (
+        select(columna_id, columna_nombre, similitud)
+        .where(columna_nombre.op('%')(texto))
+        .order_by(similitud.desc(), columna_nombre)
+        .limit(limite)
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.execute(select(func.set_config('pg_trgm.similarity_threshold', str(umbral), True)))
+            return db.session.execute(consulta).all()
+    except SQLAlchemyError as e:
+        logging.warning(f"Falló la búsqueda por trigramas: {str(e)}")
+        return None
@@ -0,0 +1,44 @@
+import os
+import click
+from flask.cli import with_appcontext
+from app.infrastructure.analytics.snapshot_mmap import SNAPSHOT_RUTA, construir_snapshot
+from .snapshot_arrow import FORMATOS, escribir_snapshot
+
+
+@click.command('exportar-snapshot')
+@click.argument('salida', type=click.Path(dir_okay=False, writable=True))
+@click.option('--formato', type=click.Choice(FORMATOS), default='arrow', show_default=True,
+              help='arrow (archivo IPC, legible con memory map), arrow-stream o parquet')
+@click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), help='Fecha inicial (inclusive)')
+@click.option('--hasta', type=click.DateTime(formats=['%Y-%m-%d']), help='Fecha final (inclusive)')
+@with_appcontext
+def exportar_snapshot(salida: str, formato: str, desde, hasta) -> None:
+    """Exporta los vuelos con sus dimensiones a un snapshot columnar (Arrow o Parquet).
+
+    El archivo se escribe con un nombre temporal y se renombra al terminar, así
+    que los lectores nunca ven un snapshot a medias.
+    """
+    temporal = f'{salida}.tmp-{os.getpid()}'
+    try:
+        resultado = escribir_snapshot(
+            temporal, formato,
+            desde.date() if desde else None,
+            hasta.date() if hasta else None
+        )
+        os.replace(temporal, salida)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    click.echo(f"{resultado['filas']} vuelos en {resultado['lotes']} lotes -> {salida} ({formato})")
+
+
+@click.command('construir-snapshot')
+@click.option('--ruta', default=SNAPSHOT_RUTA, show_default=True, type=click.Path(dir_okay=False))
+@with_appcontext
+def construir_snapshot_mmap(ruta: str) -> None:
+    """Publica el snapshot mapeable que comparten los workers (METRICAS_BACKEND=snapshot).
+
+    Útil al desplegar, para que ningún worker tenga que construirlo al arrancar.
+    """
+    filas = construir_snapshot(ruta)
+    click.echo(f"{filas} vuelos -> {ruta}")
@@ -0,0 +1,223 @@
+import os
+from datetime import date, datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from sqlalchemy import select
+from app.domain.entities.aerolinea import Aerolinea
+from app.domain.entities.aeropuerto import Aeropuerto
+from app.domain.entities.movimiento import Movimiento
+from app.domain.entities.vuelo import Vuelo
+from app.infrastructure.database.connection import db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Dependencia opcional: requirements-analytics.txt
+    pa = pq = None
+
+FORMATOS = ('arrow', 'arrow-stream', 'parquet')
+TIPOS_MIME = {
+    'arrow': 'application/vnd.apache.arrow.file',
+    'arrow-stream': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+EXTENSIONES = {'arrow': 'arrow', 'arrow-stream': 'arrows', 'parquet': 'parquet'}
+# Filas por record batch (y por lote leído del cursor del servidor)
+TAMANO_LOTE = int(os.getenv('SNAPSHOT_TAMANO_LOTE', '65536'))
+
+# (columna de nombre, columna de ID) codificadas con diccionario
+_DIMENSIONES = (
+    ('nombre_aerolinea', 'id_aerolinea'),
+    ('nombre_aeropuerto', 'id_aeropuerto'),
+    ('movimiento', 'id_movimiento')
+)
+
+
+def pyarrow_disponible() -> bool:
+    return pa is not None
+
+
+def _requerir_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("La exportación de snapshots requiere pyarrow (pip install -r requirements-analytics.txt)")
+
+
+class Diccionario:
+    """Diccionario fijo de una dimensión: el mismo en todos los batches del archivo.
+
+    Se construye una sola vez desde la tabla de la dimensión, de modo que cada
+    batch solo lleva índices int32 y el formato de archivo IPC (que no admite
+    reemplazar diccionarios) puede escribirse por lotes.
+    """
+
+    def __init__(self, filas: List[Tuple[int, str]]):
+        self.indices: Dict[int, int] = {id_: i for i, (id_, _) in enumerate(filas)}
+        self.valores = pa.array([nombre for _, nombre in filas], type=pa.string())
+
+    def codificar(self, ids: List[Optional[int]]) -> 'pa.DictionaryArray':
+        indices = pa.array([self.indices.get(i) for i in ids], type=pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, self.valores)
+
+
+def esquema(desde: Optional[date] = None, hasta: Optional[date] = None) -> 'pa.Schema':
+    """Esquema del snapshot; el rango exportado y la fecha de generación van como metadatos."""
+    _requerir_pyarrow()
+    nombre = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        pa.field('id', pa.int32(), nullable=False),
+        pa.field('dia', pa.date32(), nullable=False),
+        pa.field('id_aerolinea', pa.int32()),
+        pa.field('nombre_aerolinea', nombre),
+        pa.field('id_aeropuerto', pa.int32()),
+        pa.field('nombre_aeropuerto', nombre),
+        pa.field('id_movimiento', pa.int32()),
+        pa.field('movimiento', nombre)
+    ], metadata={
+        'desde': desde.isoformat() if desde else '',
+        'hasta': hasta.isoformat() if hasta else '',
+        'generado': datetime.now(timezone.utc).isoformat(timespec='seconds')
+    })
+
+
+def _diccionarios() -> Dict[str, Diccionario]:
+    return {
+        'nombre_aerolinea': Diccionario(
+            db.session.query(Aerolinea.id_aerolinea, Aerolinea.nombre_aerolinea).order_by(Aerolinea.id_aerolinea).all()
+        ),
+        'nombre_aeropuerto': Diccionario(
+            db.session.query(Aeropuerto.id_aeropuerto, Aeropuerto.nombre_aeropuerto).order_by(Aeropuerto.id_aeropuerto).all()
+        ),
+        'movimiento': Diccionario(
+            db.session.query(Movimiento.id_movimiento, Movimiento.descripcion).order_by(Movimiento.id_movimiento).all()
+        )
+    }
+
+
+def iterar_lotes(desde: Optional[date] = None, hasta: Optional[date] = None,
+                 tamano_lote: int = TAMANO_LOTE) -> Iterator['pa.RecordBatch']:
+    """Lee `vuelos` en orden de ID con un cursor del servidor y produce record batches.
+
+    Los nombres de las dimensiones no se unen en SQL: se resuelven con los
+    diccionarios cargados al inicio, así que la consulta solo lee la tabla de
+    vuelos (y el índice de `dia` cuando se pide un rango).
+
+    Args:
+        desde (Optional[date]): Fecha inicial (inclusive) para snapshots incrementales
+        hasta (Optional[date]): Fecha final (inclusive)
+        tamano_lote (int): Filas por batch
+
+    Yields:
+        pa.RecordBatch: Lotes con el esquema de `esquema()`
+    """
+    _requerir_pyarrow()
+    schema = esquema(desde, hasta)
+    diccionarios = _diccionarios()
+
+    consulta = select(Vuelo.id, Vuelo.dia, Vuelo.id_aerolinea, Vuelo.id_aeropuerto, Vuelo.id_movimiento)
+    if desde is not None:
+        consulta = consulta.where(Vuelo.dia >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Vuelo.dia <= hasta)
+    consulta = consulta.order_by(Vuelo.id).execution_options(stream_results=True, yield_per=tamano_lote)
+
+    for lote in db.session.execute(consulta).partitions():
+        ids, dias, aerolineas, aeropuertos, movimientos = (list(c) for c in zip(*lote))
+        valores = {'id_aerolinea': aerolineas, 'id_aeropuerto': aeropuertos, 'id_movimiento': movimientos}
+        columnas = {
+            'id': pa.array(ids, type=pa.int32()),
+            'dia': pa.array(dias, type=pa.date32())
+        }
+        for nombre, columna_id in _DIMENSIONES:
+            columnas[columna_id] = pa.array(valores[columna_id], type=pa.int32())
+            columnas[nombre] = diccionarios[nombre].codificar(valores[columna_id])
+        yield pa.RecordBatch.from_arrays([columnas[f.name] for f in schema], schema=schema)
+
+
+def escribir_snapshot(destino: Union[str, BinaryIO], formato: str = 'arrow',
+                      desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[str, Any]:
+    """Escribe el snapshot completo en un archivo o flujo binario (requiere app context).
+
+    'arrow' es el formato de archivo IPC: se puede abrir con memory map y leer
+    sin copias (`pyarrow.ipc.open_file(pyarrow.memory_map(ruta))`, Polars,
+    DuckDB). 'arrow-stream' es el formato IPC de flujo y 'parquet' usa
+    codificación por diccionario y compresión zstd.
+
+    Args:
+        destino (Union[str, BinaryIO]): Ruta o archivo binario abierto para escritura
+        formato (str): 'arrow', 'arrow-stream' o 'parquet'
+        desde (Optional[date]): Fecha inicial (inclusive)
+        hasta (Optional[date]): Fecha final (inclusive)
+
+    Returns:
+        Dict[str, Any]: Filas y batches escritos
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    _requerir_pyarrow()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (opciones: {', '.join(FORMATOS)})")
+
+    schema = esquema(desde, hasta)
+    filas = lotes = 0
+    with _abrir_escritor(destino, formato, schema) as escritor:
+        for lote in iterar_lotes(desde, hasta):
+            escritor.write_batch(lote)
+            filas += lote.num_rows
+            lotes += 1
+    return {'filas': filas, 'lotes': lotes, 'formato': formato}
+
+
+def _abrir_escritor(destino: Union[str, BinaryIO], formato: str, schema: 'pa.Schema'):
+    if formato == 'parquet':
+        return pq.ParquetWriter(
+            destino, schema,
+            use_dictionary=[nombre for nombre, _ in _DIMENSIONES],
+            compression='zstd'
+        )
+    if formato == 'arrow-stream':
+        return pa.ipc.new_stream(destino, schema)
+    return pa.ipc.new_file(destino, schema)
+
+
+class _Tubo:
+    """Archivo de solo escritura que acumula bytes para entregarlos por partes."""
+
+    def __init__(self):
+        self.partes: List[bytes] = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos) -> int:
+        datos = bytes(datos)
+        self.partes.append(datos)
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self.posicion
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def vaciar(self) -> bytes:
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def generar_flujo_arrow(desde: Optional[date] = None, hasta: Optional[date] = None) -> Iterator[bytes]:
+    """Produce el snapshot en formato IPC de flujo, un batch a la vez, para respuestas HTTP.
+
+    La memoria usada es la de un batch: cada uno se envía en cuanto se escribe.
+    """
+    _requerir_pyarrow()
+    tubo = _Tubo()
+    escritor = pa.ipc.new_stream(pa.PythonFile(tubo, mode='w'), esquema(desde, hasta))
+    for lote in iterar_lotes(desde, hasta):
+        escritor.write_batch(lote)
+        yield tubo.vaciar()
+    escritor.close()
+    yield tubo.vaciar()
@@ -0,0 +1,264 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import Flask
+from app.extensions import cache
+from app.infrastructure.caching.config import CacheConfig
+from .stackexchange import StackExchangeConfig as Config
+
+# Códigos del upstream que indican throttling o caída: activan el backoff exponencial
+CODIGOS_BACKOFF = (429, 502, 503, 504)
+# StackExchange limita por IP con un HTTP 400 y este `error_name` (no con 429)
+ERROR_THROTTLE = 'throttle_violation'
+PREFIJO_CLAVE = 'stackexchange:estadisticas:'
+
+
+class PrecargaStackExchange:
+    """Popularidad de etiquetas, resultados precalculados y cuota de la API de StackExchange.
+
+    Cada solicitud suma 1 al contador de su etiqueta, que decae a la mitad
+    cada POPULARIDAD_VIDA_MEDIA_S. Un hilo dedicado refresca cada
+    PRECARGA_INTERVALO_S las PRECARGA_TOP etiquetas más populares y guarda el
+    resultado ya procesado en la caché compartida, así que las solicitudes de
+    esas etiquetas no esperan al upstream.
+
+    La precarga respeta la cuota: se detiene cuando `quota_remaining` baja de
+    CUOTA_RESERVA y no llama a la API mientras haya un `backoff` pedido por
+    StackExchange o un backoff exponencial por errores de throttling. El
+    backoff también aplica a las solicitudes de usuarios, que en ese caso
+    reciben el último resultado guardado aunque esté vencido.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._condicion = threading.Condition(self._lock)
+        self._popularidad: Dict[str, Tuple[float, float]] = {}
+        self._hilo: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._app: Optional[Flask] = None
+        self._consultar: Optional[Callable[[str, str], Any]] = None
+        self._detener = False
+        # Estado del upstream
+        self.cuota_restante: Optional[int] = None
+        self.cuota_max: Optional[int] = None
+        self._backoff_hasta = 0.0
+        self.fallos_consecutivos = 0
+        # Métricas
+        self.solicitudes = 0
+        self.aciertos = 0
+        self.aciertos_vencidos = 0
+        self.fallos = 0
+        self.rechazadas_backoff = 0
+        self.llamadas = {'usuario': 0, 'precarga': 0}
+        self.backoffs = 0
+        self.rondas = 0
+        self.rondas_cortadas_cuota = 0
+
+    # --- Popularidad --------------------------------------------------------
+
+    @staticmethod
+    def _decaer(puntaje: float, desde: float, ahora: float) -> float:
+        return puntaje * 0.5 ** ((ahora - desde) / Config.POPULARIDAD_VIDA_MEDIA_S)
+
+    def registrar_solicitud(self, etiqueta: str) -> None:
+        self.asegurar_hilo()
+        ahora = time.monotonic()
+        with self._lock:
+            self.solicitudes += 1
+            puntaje, desde = self._popularidad.get(etiqueta, (0.0, ahora))
+            self._popularidad[etiqueta] = (self._decaer(puntaje, desde, ahora) + 1, ahora)
+            if len(self._popularidad) > Config.POPULARIDAD_MAX_ETIQUETAS:
+                menos_popular = min(self._popularidad,
+                                    key=lambda e: self._decaer(*self._popularidad[e], ahora))
+                del self._popularidad[menos_popular]
+
+    def populares(self, n: int, puntaje_min: float = 0.0) -> List[Tuple[str, float]]:
+        """Las `n` etiquetas con mayor puntaje actual (al menos `puntaje_min`)."""
+        ahora = time.monotonic()
+        with self._lock:
+            puntajes = [(etiqueta, self._decaer(puntaje, desde, ahora))
+                        for etiqueta, (puntaje, desde) in self._popularidad.items()]
+        puntajes = [p for p in puntajes if p[1] >= puntaje_min]
+        return sorted(puntajes, key=lambda p: p[1], reverse=True)[:n]
+
+    # --- Resultados precalculados -------------------------------------------
+
+    def guardar(self, etiqueta: str, resultado: Dict[str, Any], codigo: int) -> None:
+        # Se conserva el doble del TTL para poder servir un resultado vencido durante un backoff
+        cache.set(PREFIJO_CLAVE + etiqueta, {'resultado': resultado, 'codigo': codigo, 'obtenido': time.time()},
+                  timeout=int(Config.RESULTADO_TTL_S * 2))
+
+    def obtener(self, etiqueta: str) -> Optional[Dict[str, Any]]:
+        """Resultado guardado de la etiqueta con su antigüedad en segundos (`edad_s`), o None."""
+        guardado = cache.get(PREFIJO_CLAVE + etiqueta)
+        if guardado is None:
+            return None
+        return {**guardado, 'edad_s': time.time() - guardado['obtenido']}
+
+    def registrar_resultado_servido(self, tipo: str) -> None:
+        """Cuenta una solicitud atendida: 'acierto', 'acierto_vencido', 'fallo' o 'rechazada_backoff'."""
+        with self._lock:
+            if tipo == 'acierto':
+                self.aciertos += 1
+            elif tipo == 'acierto_vencido':
+                self.aciertos_vencidos += 1
+            elif tipo == 'rechazada_backoff':
+                self.rechazadas_backoff += 1
+            else:
+                self.fallos += 1
+
+    # --- Cuota y backoff ----------------------------------------------------
+
+    def registrar_respuesta(self, origen: str, codigo: Optional[int], datos: Optional[Dict[str, Any]]) -> None:
+        """Actualiza cuota y backoff con una respuesta del upstream (`codigo` None si no hubo respuesta).
+
+        Args:
+            origen (str): 'usuario' o 'precarga'
+            codigo (Optional[int]): Código HTTP del upstream
+            datos (Optional[Dict[str, Any]]): Cuerpo JSON (incluye quota_remaining, quota_max y backoff)
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            self.llamadas[origen] = self.llamadas.get(origen, 0) + 1
+            datos = datos or {}
+            if datos.get('quota_remaining') is not None:
+                self.cuota_restante = int(datos['quota_remaining'])
+            if datos.get('quota_max') is not None:
+                self.cuota_max = int(datos['quota_max'])
+            if datos.get('backoff'):
+                # StackExchange exige esperar `backoff` segundos antes de repetir la misma consulta
+                self._backoff_hasta = max(self._backoff_hasta, ahora + float(datos['backoff']))
+                self.backoffs += 1
+            if datos.get('error_name') == ERROR_THROTTLE:
+                # "... more requests available in 42 seconds": se espera al menos ese tiempo
+                segundos = re.search(r'(\d+) seconds', str(datos.get('error_message', '')))
+                if segundos:
+                    self._backoff_hasta = max(self._backoff_hasta, ahora + float(segundos.group(1)))
+            if codigo is None or codigo in CODIGOS_BACKOFF or datos.get('error_name') == ERROR_THROTTLE:
+                self.fallos_consecutivos += 1
+                espera = min(Config.BACKOFF_BASE_S * 2 ** (self.fallos_consecutivos - 1), Config.BACKOFF_MAX_S)
+                self._backoff_hasta = max(self._backoff_hasta, ahora + espera)
+                self.backoffs += 1
+            else:
+                self.fallos_consecutivos = 0
+
+    def espera_backoff(self) -> float:
+        """Segundos que faltan para poder volver a llamar a la API (0 si no hay backoff)."""
+        with self._lock:
+            return max(0.0, self._backoff_hasta - time.monotonic())
+
+    def cuota_disponible(self) -> bool:
+        with self._lock:
+            return self.cuota_restante is None or self.cuota_restante > Config.CUOTA_RESERVA
+
+    # --- Hilo de precarga ---------------------------------------------------
+
+    def iniciar(self, app: Flask, consultar: Callable[[str, str], Any]) -> None:
+        """Lanza el hilo de precarga.
+
+        Args:
+            app (Flask): Aplicación en cuyo contexto se guardan los resultados
+            consultar (Callable[[str, str], Any]): Consulta la API y guarda el resultado de
+                una etiqueta; recibe (etiqueta, origen)
+        """
+        self._app = app
+        self._consultar = consultar
+        with self._lock:
+            self._detener = False
+        self.asegurar_hilo()
+
+    def asegurar_hilo(self) -> None:
+        """Relanza el hilo en este proceso si no corre (se llama también en cada solicitud)."""
+        # Los hilos no sobreviven a un fork (p. ej. gunicorn --preload): se crean por proceso
+        if self._consultar is None:
+            return
+        with self._lock:
+            caido = not self._detener and (self._hilo is None or not self._hilo.is_alive())
+            if caido or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._detener = False
+                self._hilo = threading.Thread(target=self._bucle, name='precarga-stackexchange', daemon=True)
+                self._hilo.start()
+
+    def detener(self) -> None:
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+
+    def _esperar(self, segundos: float) -> bool:
+        """Duerme hasta `segundos`; devuelve False si se pidió detener el hilo."""
+        with self._condicion:
+            if not self._detener and segundos > 0:
+                self._condicion.wait(segundos)
+            return not self._detener
+
+    def _bucle(self) -> None:
+        while self._esperar(Config.PRECARGA_INTERVALO_S):
+            try:
+                with self._app.app_context():
+                    self._ronda()
+            except Exception as e:
+                logging.warning(f"Falló la ronda de precarga de StackExchange: {str(e)}")
+
+    def _ronda(self) -> None:
+        with self._lock:
+            self.rondas += 1
+        for etiqueta, _ in self.populares(Config.PRECARGA_TOP, Config.PRECARGA_PUNTAJE_MIN):
+            guardado = self.obtener(etiqueta)
+            # Solo se refrescan los resultados que vencerían antes de la próxima ronda
+            if guardado is not None and guardado['edad_s'] + Config.PRECARGA_INTERVALO_S < Config.RESULTADO_TTL_S:
+                continue
+            if not self._esperar(self.espera_backoff()):
+                return
+            if not self.cuota_disponible():
+                with self._lock:
+                    self.rondas_cortadas_cuota += 1
+                return
+            self._consultar(etiqueta, 'precarga')
+            if not self._esperar(Config.PRECARGA_PAUSA_S):
+                return
+
+    def resumen(self) -> Dict[str, Any]:
+        """Tasa de aciertos, uso de la cuota y etiquetas más populares de este proceso."""
+        self.asegurar_hilo()
+        populares = self.populares(Config.PRECARGA_TOP)
+        espera = self.espera_backoff()
+        with self._lock:
+            servidas = self.aciertos + self.aciertos_vencidos + self.fallos + self.rechazadas_backoff
+            return {
+                'hilo_activo': self._hilo is not None and self._hilo.is_alive(),
+                'solicitudes': self.solicitudes,
+                'aciertos': self.aciertos,
+                'aciertos_vencidos': self.aciertos_vencidos,
+                'fallos': self.fallos,
+                'rechazadas_backoff': self.rechazadas_backoff,
+                'tasa_acierto': round((self.aciertos + self.aciertos_vencidos) / servidas, 4) if servidas else 0.0,
+                'cuota': {
+                    'restante': self.cuota_restante,
+                    'max': self.cuota_max,
+                    'reserva': Config.CUOTA_RESERVA,
+                    'llamadas': dict(self.llamadas)
+                },
+                'backoff': {
+                    'activo_s': round(espera, 1),
+                    'fallos_consecutivos': self.fallos_consecutivos,
+                    'total': self.backoffs
+                },
+                'rondas': self.rondas,
+                'rondas_cortadas_cuota': self.rondas_cortadas_cuota,
+                'populares': [{'etiqueta': e, 'puntaje': round(p, 3)} for e, p in populares]
+            }
+
+
+precarga_stackexchange = PrecargaStackExchange()
+
+
+def registrar_precarga_stackexchange(app: Flask) -> None:
+    """Lanza la precarga de etiquetas populares si STACKEXCHANGE_PRECARGA_HABILITADA y hay caché (CACHE_TYPE)."""
+    if not Config.PRECARGA_HABILITADA or not CacheConfig.CACHE_HABILITADA:
+        return
+    from app.api.routes.stackexchange import stackexchange_service
+    precarga_stackexchange.iniciar(app, stackexchange_service.consultar_api)
@@ -5,4 +5,23 @@ load_dotenv()
 
 class StackExchangeConfig:
     API_URL = os.getenv("STACKEXCHANGE_API_URL", "https://api.stackexchange.com/2.2/search")
-    TIMEOUT = 10  # segundos
\ No newline at end of file
+    TIMEOUT = 10  # segundos
+
+    # Precarga en segundo plano de las etiquetas más solicitadas
+    PRECARGA_HABILITADA = os.getenv('STACKEXCHANGE_PRECARGA_HABILITADA', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+    PRECARGA_TOP = int(os.getenv('STACKEXCHANGE_PRECARGA_TOP', '10'))
+    PRECARGA_INTERVALO_S = float(os.getenv('STACKEXCHANGE_PRECARGA_INTERVALO_S', '300'))
+    # Pausa entre llamadas de una misma ronda de precarga
+    PRECARGA_PAUSA_S = float(os.getenv('STACKEXCHANGE_PRECARGA_PAUSA_S', '0.5'))
+    # Puntaje mínimo (solicitudes con decaimiento) para que una etiqueta se precargue
+    PRECARGA_PUNTAJE_MIN = float(os.getenv('STACKEXCHANGE_PRECARGA_PUNTAJE_MIN', '2'))
+    # Vida media del contador de popularidad de cada etiqueta
+    POPULARIDAD_VIDA_MEDIA_S = float(os.getenv('STACKEXCHANGE_POPULARIDAD_VIDA_MEDIA_S', '3600'))
+    POPULARIDAD_MAX_ETIQUETAS = int(os.getenv('STACKEXCHANGE_POPULARIDAD_MAX_ETIQUETAS', '1000'))
+    # Antigüedad máxima de un resultado precalculado para servirlo sin consultar la API
+    RESULTADO_TTL_S = float(os.getenv('STACKEXCHANGE_RESULTADO_TTL_S', '900'))
+    # Cuota diaria que la precarga deja libre para las peticiones de usuarios
+    CUOTA_RESERVA = int(os.getenv('STACKEXCHANGE_CUOTA_RESERVA', '1000'))
+    # Backoff exponencial ante throttling o caídas del upstream
+    BACKOFF_BASE_S = float(os.getenv('STACKEXCHANGE_BACKOFF_BASE_S', '5'))
+    BACKOFF_MAX_S = float(os.getenv('STACKEXCHANGE_BACKOFF_MAX_S', '600'))
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+from app.extensions import cache
+from app.infrastructure.caching.config import CacheConfig
+
+# Hilos que ejecutan trabajos (acotado: los reportes compiten con las peticiones por el pool de BD)
+JOBS_MAX_WORKERS = int(os.getenv('JOBS_MAX_WORKERS', '2'))
+# Trabajos pendientes o en ejecución admitidos por proceso antes de rechazar con 503
+JOBS_MAX_PENDIENTES = int(os.getenv('JOBS_MAX_PENDIENTES', '32'))
+# Tiempo que se conserva el resultado de un trabajo terminado
+JOBS_TTL_S = int(os.getenv('JOBS_TTL_S', '3600'))
+
+ESTADOS_ACTIVOS = ('pendiente', 'ejecutando')
+
+
+class ColaLlenaError(Exception):
+    """No se admiten más trabajos hasta que terminen algunos de los pendientes."""
+
+
+def clave_deduplicacion(tipo: str, parametros: Dict[str, Any]) -> str:
+    """Identifica trabajos idénticos: mismo tipo y mismos parámetros (sin importar el orden)."""
+    canonico = json.dumps({'tipo': tipo, 'parametros': parametros}, sort_keys=True, default=str)
+    return hashlib.sha256(canonico.encode()).hexdigest()[:32]
+
+
+class GestorTrabajos:
+    """Ejecuta trabajos en un pool de hilos acotado y guarda su estado con TTL.
+
+    Con la caché activada (CACHE_TYPE) el estado y el resultado de cada trabajo
+    se guardan en ella, así que con un backend compartido (Redis) cualquier
+    worker puede responder la consulta de un trabajo lanzado por otro, y los
+    trabajos idénticos en curso se deduplican con una clave reclamada con
+    `cache.add` (atómico en Redis). Sin caché (NullCache, el valor por defecto)
+    el estado se guarda en un diccionario del proceso y la deduplicación es solo
+    local: el trabajo se consulta en el mismo worker que lo recibió.
+    """
+
+    def __init__(self, max_workers: int = JOBS_MAX_WORKERS, max_pendientes: int = JOBS_MAX_PENDIENTES,
+                 ttl: int = JOBS_TTL_S):
+        self.max_workers = max_workers
+        self.max_pendientes = max_pendientes
+        self.ttl = ttl
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._app: Optional[Flask] = None
+        self._lock = threading.RLock()
+        self._en_curso: Dict[str, str] = {}
+        # id -> (expiración, trabajo); solo se usa sin caché compartida
+        self._locales: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def init_app(self, app: Flask) -> None:
+        self._app = app
+        app.extensions['gestor_trabajos'] = self
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        # Se crea en el primer uso: no se hereda un pool con hilos a través de un fork
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='trabajo')
+        return self._executor
+
+    # --- Estado -------------------------------------------------------------
+
+    @staticmethod
+    def _clave(id_trabajo: str) -> str:
+        return f'trabajo:{id_trabajo}'
+
+    def obtener(self, id_trabajo: str) -> Optional[Dict[str, Any]]:
+        """Estado actual del trabajo, o None si no existe o ya expiró."""
+        if CacheConfig.CACHE_HABILITADA:
+            return cache.get(self._clave(id_trabajo))
+        with self._lock:
+            guardado = self._locales.get(id_trabajo)
+            if guardado is None:
+                return None
+            expira, trabajo = guardado
+            if expira <= time.monotonic():
+                del self._locales[id_trabajo]
+                return None
+            return dict(trabajo)
+
+    def _guardar(self, trabajo: Dict[str, Any]) -> None:
+        if CacheConfig.CACHE_HABILITADA:
+            cache.set(self._clave(trabajo['id']), trabajo, timeout=self.ttl)
+            return
+        ahora = time.monotonic()
+        with self._lock:
+            # Se purgan los expirados al guardar: nadie más los elimina
+            for id_trabajo in [i for i, (expira, _) in self._locales.items() if expira <= ahora]:
+                del self._locales[id_trabajo]
+            self._locales[trabajo['id']] = (ahora + self.ttl, dict(trabajo))
+
+    # --- Envío y ejecución --------------------------------------------------
+
+    def enviar(self, tipo: str, parametros: Dict[str, Any],
+               funcion: Callable[..., Any]) -> Tuple[Dict[str, Any], bool]:
+        """Encola un trabajo o devuelve el idéntico que ya está en curso.
+
+        Args:
+            tipo (str): Tipo de reporte
+            parametros (Dict[str, Any]): Parámetros ya validados (serializables)
+            funcion (Callable): Se invoca como `funcion(**parametros)` dentro de un app context
+
+        Returns:
+            Tuple[Dict[str, Any], bool]: Estado del trabajo y si es un trabajo nuevo
+
+        Raises:
+            ColaLlenaError: Si se alcanzó JOBS_MAX_PENDIENTES en este proceso
+        """
+        clave = clave_deduplicacion(tipo, parametros)
+        clave_cache = f'trabajo_en_curso:{clave}'
+        with self._lock:
+            existente = self._activo(self._en_curso.get(clave))
+            if existente is None and CacheConfig.CACHE_HABILITADA:
+                existente = self._activo(cache.get(clave_cache))
+            if existente is not None:
+                return existente, False
+            if len(self._en_curso) >= self.max_pendientes:
+                raise ColaLlenaError()
+
+            trabajo = {
+                'id': uuid.uuid4().hex,
+                'tipo': tipo,
+                'parametros': parametros,
+                'estado': 'pendiente',
+                'creado': time.time(),
+                'iniciado': None,
+                'terminado': None,
+                'resultado': None,
+                'error': None,
+                'codigo': None
+            }
+            # Otro worker pudo reclamar la misma clave entre el get y aquí: se usa el suyo
+            if CacheConfig.CACHE_HABILITADA and not cache.add(clave_cache, trabajo['id'], timeout=self.ttl):
+                existente = self._activo(cache.get(clave_cache))
+                if existente is not None:
+                    return existente, False
+                cache.set(clave_cache, trabajo['id'], timeout=self.ttl)
+            self._guardar(trabajo)
+            self._en_curso[clave] = trabajo['id']
+
+        self._obtener_executor().submit(self._ejecutar, trabajo, clave, clave_cache, funcion)
+        return trabajo, True
+
+    def _activo(self, id_trabajo: Optional[str]) -> Optional[Dict[str, Any]]:
+        if id_trabajo is None:
+            return None
+        trabajo = self.obtener(id_trabajo)
+        if trabajo is not None and trabajo['estado'] in ESTADOS_ACTIVOS:
+            return trabajo
+        return None
+
+    def _ejecutar(self, trabajo: Dict[str, Any], clave: str, clave_cache: str, funcion: Callable[..., Any]) -> None:
+        with self._app.app_context():
+            try:
+                trabajo.update(estado='ejecutando', iniciado=time.time())
+                self._guardar(trabajo)
+                try:
+                    resultado = funcion(**trabajo['parametros'])
+                except HTTPException as e:
+                    resultado = ({"error": e.description}, e.code)
+                if isinstance(resultado, tuple):
+                    datos, codigo = resultado
+                    trabajo.update(estado='fallido', error=datos.get('error') if isinstance(datos, dict) else datos,
+                                   codigo=codigo)
+                else:
+                    trabajo.update(estado='completado', resultado=resultado, codigo=200)
+            except Exception as e:
+                logging.error(f"Error en el trabajo {trabajo['id']} ({trabajo['tipo']}): {str(e)}")
+                trabajo.update(estado='fallido', error='Error interno al ejecutar el trabajo', codigo=500)
+            finally:
+                trabajo['terminado'] = time.time()
+                self._guardar(trabajo)
+                if CacheConfig.CACHE_HABILITADA:
+                    cache.delete(clave_cache)
+                with self._lock:
+                    self._en_curso.pop(clave, None)
+
+    def resumen(self) -> Dict[str, Any]:
+        """Ocupación del pool de este proceso."""
+        with self._lock:
+            return {
+                'en_curso': len(self._en_curso),
+                'max_pendientes': self.max_pendientes,
+                'max_workers': self.max_workers
+            }
+
+
+gestor_trabajos = GestorTrabajos()
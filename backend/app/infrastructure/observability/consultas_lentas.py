@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.infrastructure.database.config import _env_bool
+
+# Sentencias que tardan más que esto (ms) se registran (0 = deshabilitado)
+CONSULTAS_LENTAS_UMBRAL_MS = float(os.getenv('CONSULTAS_LENTAS_UMBRAL_MS', '200'))
+# Sentencias distintas conservadas; al superarse se descarta la de menor tiempo total
+CONSULTAS_LENTAS_MAX = int(os.getenv('CONSULTAS_LENTAS_MAX', '200'))
+# Captura asíncrona de EXPLAIN (ANALYZE, BUFFERS) de los SELECT lentos (solo PostgreSQL).
+# Deshabilitada por defecto: ANALYZE vuelve a ejecutar cada consulta lenta y duplica su carga
+CONSULTAS_LENTAS_EXPLAIN = _env_bool('CONSULTAS_LENTAS_EXPLAIN', False)
+# Una misma sentencia se vuelve a explicar como mucho cada N segundos
+CONSULTAS_LENTAS_EXPLAIN_INTERVALO_S = float(os.getenv('CONSULTAS_LENTAS_EXPLAIN_INTERVALO_S', '600'))
+# statement_timeout del EXPLAIN ANALYZE (vuelve a ejecutar la consulta)
+CONSULTAS_LENTAS_EXPLAIN_TIMEOUT_MS = int(os.getenv('CONSULTAS_LENTAS_EXPLAIN_TIMEOUT_MS', '30000'))
+
+# Opción de ejecución que marca las sentencias del propio EXPLAIN (no se registran)
+OPCION_EXPLAIN = 'explain_consulta_lenta'
+# Directorio de los repositorios, para atribuir cada sentencia a su método
+DIRECTORIO_REPOSITORIOS = f"{os.sep}domain{os.sep}repositories{os.sep}"
+_LISTA_IN = re.compile(r'\bIN\s*\((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+_ESPACIOS = re.compile(r'\s+')
+_NO_SOLO_LECTURA = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|SHARE|setval|nextval|set_config)\b', re.IGNORECASE)
+
+
+def normalizar_sql(sql: str) -> str:
+    """Colapsa espacios y listas IN (...) para agrupar variantes de una misma consulta."""
+    return _LISTA_IN.sub('IN (...)', _ESPACIOS.sub(' ', sql).strip())
+
+
+def forma_parametros(parametros: Any, lote: bool = False) -> Any:
+    """Tipos de los parámetros (sin sus valores)."""
+    if lote and isinstance(parametros, (list, tuple)):
+        return {'filas': len(parametros), 'fila': forma_parametros(parametros[0]) if parametros else None}
+    if isinstance(parametros, dict):
+        return {nombre: _forma_valor(valor) for nombre, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [_forma_valor(valor) for valor in parametros]
+    return None
+
+
+def _forma_valor(valor: Any) -> str:
+    if isinstance(valor, (list, tuple)):
+        return f"{type(valor).__name__}[{len(valor)}]"
+    return type(valor).__name__
+
+
+def origen_repositorio() -> Optional[str]:
+    """Método del repositorio (p. ej. 'VueloRepository.obtener_metricas') en la pila actual."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        codigo = frame.f_code
+        if DIRECTORIO_REPOSITORIOS in codigo.co_filename:
+            # Las comprensiones y funciones anidadas se atribuyen al método que las contiene
+            return getattr(codigo, 'co_qualname', codigo.co_name).split('.<locals>')[0]
+        frame = frame.f_back
+    return None
+
+
+class RegistroConsultasLentas:
+    """Registro acotado de sentencias SQL lentas con su plan de ejecución.
+
+    Cada sentencia se mide con los eventos del engine. Las que superan
+    CONSULTAS_LENTAS_UMBRAL_MS se agrupan por su texto normalizado y acumulan
+    llamadas, tiempo total y máximo, el método del repositorio que las emitió
+    y la forma de sus parámetros. Con CONSULTAS_LENTAS_EXPLAIN, para los
+    SELECT un hilo aparte captura `EXPLAIN (ANALYZE, BUFFERS)` con los
+    parámetros reales en una conexión propia y una transacción de solo
+    lectura, sin demorar la petición.
+    """
+
+    def __init__(self, umbral_ms: float = CONSULTAS_LENTAS_UMBRAL_MS, maximo: int = CONSULTAS_LENTAS_MAX):
+        self.umbral_ms = umbral_ms
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._consultas: Dict[str, Dict[str, Any]] = {}
+        self._explicar: 'queue.Queue[Tuple[Engine, str, str, Any]]' = queue.Queue(maxsize=100)
+        self._hilo: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        # Métricas
+        self.registradas = 0
+        self.descartadas = 0
+        self.planes = 0
+        self.errores_plan = 0
+
+    def registrar(self) -> None:
+        """Suscribe la medición a todos los engines."""
+        if not event.contains(Engine, 'before_cursor_execute', _antes_de_sentencia):
+            event.listen(Engine, 'before_cursor_execute', _antes_de_sentencia)
+            event.listen(Engine, 'after_cursor_execute', _despues_de_sentencia)
+
+    def observar(self, conn, statement: str, parameters: Any, lote: bool, duracion_ms: float) -> None:
+        """Registra la sentencia si superó el umbral y, si es un SELECT, solicita su plan."""
+        sql = normalizar_sql(statement)
+        huella = hashlib.sha1(sql.encode()).hexdigest()[:16]
+        origen = origen_repositorio()
+        ahora = time.time()
+        with self._lock:
+            consulta = self._consultas.get(huella)
+            if consulta is None:
+                if len(self._consultas) >= self.maximo:
+                    menor = min(self._consultas, key=lambda h: self._consultas[h]['total_ms'])
+                    del self._consultas[menor]
+                    self.descartadas += 1
+                consulta = self._consultas[huella] = {
+                    'huella': huella, 'sql': sql, 'origenes': [], 'llamadas': 0,
+                    'total_ms': 0.0, 'max_ms': 0.0, 'ultima': None, 'parametros': None,
+                    'plan': None, 'plan_capturado': None, 'plan_error': None, '_plan_pendiente': False
+                }
+            self.registradas += 1
+            consulta['llamadas'] += 1
+            consulta['total_ms'] += duracion_ms
+            consulta['max_ms'] = max(consulta['max_ms'], duracion_ms)
+            consulta['ultima'] = ahora
+            consulta['parametros'] = forma_parametros(parameters, lote)
+            if origen and origen not in consulta['origenes']:
+                consulta['origenes'].append(origen)
+            solicitar_plan = (
+                CONSULTAS_LENTAS_EXPLAIN and not lote and conn.dialect.name == 'postgresql'
+                and _es_select(statement) and not consulta['_plan_pendiente']
+                and (consulta['plan_capturado'] is None
+                     or ahora - consulta['plan_capturado'] > CONSULTAS_LENTAS_EXPLAIN_INTERVALO_S)
+            )
+            if solicitar_plan:
+                consulta['_plan_pendiente'] = True
+        if solicitar_plan:
+            self._solicitar_plan(conn.engine, huella, statement, parameters)
+
+    def _solicitar_plan(self, engine: Engine, huella: str, statement: str, parameters: Any) -> None:
+        self._asegurar_hilo()
+        try:
+            self._explicar.put_nowait((engine, huella, statement, parameters))
+        except queue.Full:
+            with self._lock:
+                if huella in self._consultas:
+                    self._consultas[huella]['_plan_pendiente'] = False
+
+    def _asegurar_hilo(self) -> None:
+        # Los hilos no sobreviven a un fork (p. ej. gunicorn --preload): se crean por proceso
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._bucle, name='explain-consultas-lentas', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self) -> None:
+        while True:
+            engine, huella, statement, parameters = self._explicar.get()
+            plan, error = None, None
+            try:
+                plan = self._explain(engine, statement, parameters)
+            except Exception as e:
+                error = str(e).split('\n')[0]
+                logging.warning(f"No se pudo capturar el plan de la consulta lenta {huella}: {error}")
+            with self._lock:
+                if error is None:
+                    self.planes += 1
+                else:
+                    self.errores_plan += 1
+                consulta = self._consultas.get(huella)
+                if consulta is not None:
+                    consulta['_plan_pendiente'] = False
+                    consulta['plan'], consulta['plan_error'] = plan, error
+                    consulta['plan_capturado'] = time.time()
+
+    @staticmethod
+    def _explain(engine: Engine, statement: str, parameters: Any) -> Any:
+        with engine.connect() as conn:
+            conn.execution_options(**{OPCION_EXPLAIN: True})
+            conn.exec_driver_sql('SET TRANSACTION READ ONLY')
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {CONSULTAS_LENTAS_EXPLAIN_TIMEOUT_MS}")
+            plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters).scalar()
+            conn.rollback()
+        return plan
+
+    def top(self, orden: str = 'total_ms', limite: int = 20) -> List[Dict[str, Any]]:
+        """Sentencias lentas ordenadas de mayor a menor por `orden` (total_ms, max_ms o llamadas)."""
+        with self._lock:
+            consultas = sorted(self._consultas.values(), key=lambda c: c[orden], reverse=True)[:limite]
+            return [self._formatear(c, con_plan=False) for c in consultas]
+
+    def obtener(self, huella: str) -> Optional[Dict[str, Any]]:
+        """Sentencia lenta con su plan completo."""
+        with self._lock:
+            consulta = self._consultas.get(huella)
+            return self._formatear(consulta, con_plan=True) if consulta is not None else None
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._consultas.clear()
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'umbral_ms': self.umbral_ms,
+                'explain': CONSULTAS_LENTAS_EXPLAIN,
+                'distintas': len(self._consultas),
+                'max_distintas': self.maximo,
+                'registradas': self.registradas,
+                'descartadas': self.descartadas,
+                'planes': self.planes,
+                'errores_plan': self.errores_plan,
+                'planes_pendientes': self._explicar.qsize()
+            }
+
+    @staticmethod
+    def _formatear(consulta: Dict[str, Any], con_plan: bool) -> Dict[str, Any]:
+        datos = {clave: valor for clave, valor in consulta.items() if not clave.startswith('_') and clave != 'plan'}
+        datos['origenes'] = list(consulta['origenes'])
+        datos['total_ms'] = round(consulta['total_ms'], 3)
+        datos['max_ms'] = round(consulta['max_ms'], 3)
+        datos['promedio_ms'] = round(consulta['total_ms'] / consulta['llamadas'], 3)
+        plan = consulta['plan']
+        if con_plan:
+            datos['plan'] = plan
+        elif plan:
+            # Resumen de EXPLAIN ... FORMAT JSON: [{"Plan": {...}, "Planning Time": ..., "Execution Time": ...}]
+            raiz = plan[0]
+            datos['plan'] = {
+                'nodo': raiz['Plan'].get('Node Type'),
+                'planificacion_ms': raiz.get('Planning Time'),
+                'ejecucion_ms': raiz.get('Execution Time')
+            }
+        else:
+            datos['plan'] = None
+        return datos
+
+
+def _es_select(statement: str) -> bool:
+    """Solo se explican consultas de lectura: EXPLAIN ANALYZE ejecuta la sentencia."""
+    return (statement.lstrip()[:6].upper().startswith(('SELECT', 'WITH'))
+            and not _NO_SOLO_LECTURA.search(statement))
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._inicio_consulta_lenta = time.perf_counter()
+
+
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany) -> None:
+    inicio = getattr(context, '_inicio_consulta_lenta', None)
+    if inicio is None:
+        return
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    if duracion_ms < registro_consultas_lentas.umbral_ms or conn.get_execution_options().get(OPCION_EXPLAIN):
+        return
+    registro_consultas_lentas.observar(conn, statement, parameters, executemany, duracion_ms)
+
+
+registro_consultas_lentas = RegistroConsultasLentas()
+
+
+def registrar_consultas_lentas() -> None:
+    """Activa el registro de consultas lentas si CONSULTAS_LENTAS_UMBRAL_MS > 0."""
+    if CONSULTAS_LENTAS_UMBRAL_MS > 0:
+        registro_consultas_lentas.registrar()
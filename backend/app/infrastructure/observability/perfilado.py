@@ -0,0 +1,213 @@
+import cProfile
+import logging
+import marshal
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.infrastructure.security.admin import token_perfilado_valido
+from app.infrastructure.security.config import SecurityConfig
+
+# Cabecera con PERFILADO_TOKEN que activa el perfilado de la petición. No se acepta como
+# parámetro de query: el token quedaría en la ruta guardada y en los logs de acceso y proxies
+PERFILADO_HEADER = 'X-Perfilar'
+# Cabecera de la respuesta con el ID del perfil guardado
+PERFIL_ID_HEADER = 'X-Perfil-Id'
+
+# Perfiles conservados por proceso (los más antiguos se descartan)
+PERFILADO_MAX_PERFILES = int(os.getenv('PERFILADO_MAX_PERFILES', '20'))
+# Sentencias SQL registradas por perfil y caracteres conservados de cada una
+PERFILADO_MAX_SENTENCIAS = int(os.getenv('PERFILADO_MAX_SENTENCIAS', '500'))
+PERFILADO_MAX_SQL = int(os.getenv('PERFILADO_MAX_SQL', '2000'))
+# Funciones incluidas en el resumen (ordenadas por tiempo acumulado)
+PERFILADO_TOP_FUNCIONES = int(os.getenv('PERFILADO_TOP_FUNCIONES', '30'))
+
+
+class PerfilEnCurso:
+    """Profiler y sentencias SQL de la petición que se está perfilando."""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.inicio = time.perf_counter()
+        self.sentencias: List[Dict[str, Any]] = []
+        self.sentencias_omitidas = 0
+        self.sql_ms = 0.0
+
+    def registrar_sentencia(self, sql: str, duracion_ms: float, filas: int, lote: bool) -> None:
+        self.sql_ms += duracion_ms
+        if len(self.sentencias) >= PERFILADO_MAX_SENTENCIAS:
+            self.sentencias_omitidas += 1
+            return
+        self.sentencias.append({
+            'sql': sql[:PERFILADO_MAX_SQL],
+            'duracion_ms': round(duracion_ms, 3),
+            'filas': filas,
+            'executemany': lote
+        })
+
+
+class Perfilador:
+    """Perfila bajo demanda peticiones individuales y guarda los últimos N perfiles.
+
+    Una petición con la cabecera X-Perfilar igual a
+    PERFILADO_TOKEN se ejecuta bajo cProfile, y además se registran las
+    sentencias SQL que emite con su duración. El perfil queda en un buffer
+    circular del proceso y su ID se devuelve en X-Perfil-Id. Las estadísticas
+    se pueden descargar en formato pstats (`python -m pstats`, snakeviz).
+
+    cProfile solo mide el hilo que lo activa, así que no mezcla peticiones
+    concurrentes de un servidor con hilos.
+    """
+
+    def __init__(self, max_perfiles: int = PERFILADO_MAX_PERFILES):
+        self._lock = threading.Lock()
+        self._perfiles: Deque[Dict[str, Any]] = deque(maxlen=max_perfiles)
+        self.perfiladas = 0
+        self.fallidas = 0
+
+    def init_app(self, app: Flask) -> None:
+        app.before_request(self._antes)
+        app.after_request(self._despues)
+        app.teardown_request(self._limpiar)
+        if not event.contains(Engine, 'before_cursor_execute', _antes_de_sentencia):
+            event.listen(Engine, 'before_cursor_execute', _antes_de_sentencia)
+            event.listen(Engine, 'after_cursor_execute', _despues_de_sentencia)
+        app.extensions['perfilador'] = self
+
+    @staticmethod
+    def _solicitado() -> bool:
+        token = request.headers.get(PERFILADO_HEADER, '')
+        return token_perfilado_valido(token)
+
+    def _antes(self) -> None:
+        if not self._solicitado():
+            return
+        perfil = PerfilEnCurso()
+        try:
+            perfil.profiler.enable()
+        except ValueError as e:
+            # Otro profiler ya está activo en este hilo
+            logging.warning(f"No se pudo perfilar {request.path}: {str(e)}")
+            with self._lock:
+                self.fallidas += 1
+            return
+        g.perfil_en_curso = perfil
+
+    def _despues(self, respuesta):
+        perfil = g.pop('perfil_en_curso', None)
+        if perfil is None:
+            return respuesta
+        perfil.profiler.disable()
+        duracion_ms = (time.perf_counter() - perfil.inicio) * 1000
+        estadisticas = pstats.Stats(perfil.profiler)
+        id_perfil = uuid.uuid4().hex
+        with self._lock:
+            self.perfiladas += 1
+            self._perfiles.append({
+                'id': id_perfil,
+                'creado': time.time(),
+                'metodo': request.method,
+                'ruta': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'codigo': respuesta.status_code,
+                'duracion_ms': round(duracion_ms, 3),
+                'sql_ms': round(perfil.sql_ms, 3),
+                'sentencias': perfil.sentencias,
+                'sentencias_omitidas': perfil.sentencias_omitidas,
+                'funciones': _resumir_funciones(estadisticas),
+                'pstats': marshal.dumps(estadisticas.stats)
+            })
+        respuesta.headers[PERFIL_ID_HEADER] = id_perfil
+        return respuesta
+
+    def _limpiar(self, excepcion: Optional[BaseException] = None) -> None:
+        # Si la petición terminó con una excepción no se llegó a `_despues`
+        perfil = g.pop('perfil_en_curso', None)
+        if perfil is not None:
+            perfil.profiler.disable()
+
+    def listar(self) -> List[Dict[str, Any]]:
+        """Perfiles guardados (más recientes primero), sin detalle."""
+        with self._lock:
+            return [
+                {
+                    **{clave: valor for clave, valor in perfil.items()
+                       if clave not in ('sentencias', 'funciones', 'pstats')},
+                    'total_sentencias': len(perfil['sentencias']) + perfil['sentencias_omitidas']
+                }
+                for perfil in reversed(self._perfiles)
+            ]
+
+    def obtener(self, id_perfil: str) -> Optional[Dict[str, Any]]:
+        """Perfil con sus sentencias SQL y funciones más costosas (sin el pstats binario)."""
+        with self._lock:
+            for perfil in self._perfiles:
+                if perfil['id'] == id_perfil:
+                    return {clave: valor for clave, valor in perfil.items() if clave != 'pstats'}
+        return None
+
+    def obtener_pstats(self, id_perfil: str) -> Optional[bytes]:
+        """Estadísticas del perfil en formato pstats (lo mismo que escribe `Stats.dump_stats`)."""
+        with self._lock:
+            for perfil in self._perfiles:
+                if perfil['id'] == id_perfil:
+                    return perfil['pstats']
+        return None
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'habilitado': bool(SecurityConfig.PERFILADO_TOKEN),
+                'max_perfiles': self._perfiles.maxlen,
+                'guardados': len(self._perfiles),
+                'perfiladas': self.perfiladas,
+                'fallidas': self.fallidas
+            }
+
+
+def _resumir_funciones(estadisticas: pstats.Stats) -> List[Dict[str, Any]]:
+    """Funciones con mayor tiempo acumulado."""
+    filas = sorted(estadisticas.stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            'funcion': f"{archivo}:{linea}({nombre})",
+            'llamadas': llamadas_totales,
+            'llamadas_primitivas': llamadas,
+            'tiempo_propio_ms': round(propio * 1000, 3),
+            'tiempo_acumulado_ms': round(acumulado * 1000, 3)
+        }
+        for (archivo, linea, nombre), (llamadas, llamadas_totales, propio, acumulado, _) in filas[:PERFILADO_TOP_FUNCIONES]
+    ]
+
+
+def _perfil_actual() -> Optional[PerfilEnCurso]:
+    return g.get('perfil_en_curso') if has_request_context() else None
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _perfil_actual() is not None:
+        conn.info.setdefault('_perfil_inicio', []).append(time.perf_counter())
+
+
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany) -> None:
+    perfil = _perfil_actual()
+    inicios = conn.info.get('_perfil_inicio')
+    if perfil is None or not inicios:
+        return
+    duracion_ms = (time.perf_counter() - inicios.pop()) * 1000
+    perfil.registrar_sentencia(statement, duracion_ms, cursor.rowcount, executemany)
+
+
+perfilador = Perfilador()
+
+
+def registrar_perfilado(app: Flask) -> None:
+    """Activa el perfilado bajo demanda si PERFILADO_TOKEN está configurado."""
+    if SecurityConfig.PERFILADO_TOKEN:
+        perfilador.init_app(app)
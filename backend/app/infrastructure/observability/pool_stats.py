@@ -0,0 +1,159 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Límites superiores (ms) de los buckets de los histogramas
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 30000)
+
+
+class Histograma:
+    """Histograma acumulativo de latencias en milisegundos con buckets fijos."""
+
+    def __init__(self, buckets: tuple = BUCKETS_MS):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.suma_ms = 0.0
+        self.max_ms = 0.0
+
+    def registrar(self, valor_ms: float) -> None:
+        """Registra una observación en el bucket correspondiente."""
+        indice = len(self.buckets)
+        for i, limite in enumerate(self.buckets):
+            if valor_ms <= limite:
+                indice = i
+                break
+        self.conteos[indice] += 1
+        self.total += 1
+        self.suma_ms += valor_ms
+        self.max_ms = max(self.max_ms, valor_ms)
+
+    def resumen(self) -> Dict[str, Any]:
+        """Devuelve el histograma serializable (buckets con conteos no acumulados)."""
+        etiquetas = [f'<={b}ms' for b in self.buckets] + [f'>{self.buckets[-1]}ms']
+        return {
+            'total': self.total,
+            'promedio_ms': round(self.suma_ms / self.total, 3) if self.total else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'buckets': dict(zip(etiquetas, self.conteos))
+        }
+
+
+class EstadisticasPool:
+    """Recolecta estadísticas en vivo del pool de conexiones.
+
+    Mide el tiempo de espera para obtener una conexión, el tiempo que cada
+    conexión permanece prestada (checkout → checkin), los timeouts del pool
+    y la edad de las conexiones físicas abiertas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.espera = Histograma()
+        self.uso = Histograma()
+        self.timeouts = 0
+        self.conexiones_creadas = 0
+        self.conexiones_cerradas = 0
+        self.invalidaciones = 0
+        self._creacion: Dict[int, float] = {}
+
+    def registrar_espera(self, duracion_ms: float, timeout: bool = False) -> None:
+        with self._lock:
+            self.espera.registrar(duracion_ms)
+            if timeout:
+                self.timeouts += 1
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.conexiones_creadas += 1
+            self._creacion[id(connection_record)] = time.time()
+
+    def on_close(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.conexiones_cerradas += 1
+            self._creacion.pop(id(connection_record), None)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidaciones += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.info['_checkout_inicio'] = time.perf_counter()
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        inicio = connection_record.info.pop('_checkout_inicio', None)
+        if inicio is not None:
+            with self._lock:
+                self.uso.registrar((time.perf_counter() - inicio) * 1000)
+
+    def resumen(self, pool: Optional[QueuePool] = None) -> Dict[str, Any]:
+        """Construye la foto actual del pool y los histogramas acumulados.
+
+        Args:
+            pool (Optional[QueuePool]): Pool del engine activo, para el estado instantáneo
+
+        Returns:
+            Dict[str, Any]: Estado del pool, histogramas y edad de conexiones
+        """
+        ahora = time.time()
+        with self._lock:
+            edades: List[float] = [ahora - creada for creada in self._creacion.values()]
+            datos = {
+                'espera_checkout': self.espera.resumen(),
+                'duracion_checkout': self.uso.resumen(),
+                'timeouts': self.timeouts,
+                'conexiones_creadas': self.conexiones_creadas,
+                'conexiones_cerradas': self.conexiones_cerradas,
+                'invalidaciones': self.invalidaciones,
+                'edad_conexiones_s': {
+                    'abiertas': len(edades),
+                    'min': round(min(edades), 1) if edades else 0.0,
+                    'max': round(max(edades), 1) if edades else 0.0,
+                    'promedio': round(sum(edades) / len(edades), 1) if edades else 0.0
+                }
+            }
+
+        if pool is not None and isinstance(pool, QueuePool):
+            datos['estado'] = {
+                'tamano': pool.size(),
+                'prestadas': pool.checkedout(),
+                'disponibles': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'max_overflow': getattr(pool, 'max_overflow_configurado', None),
+                'timeout_s': pool.timeout()
+            }
+        return datos
+
+
+estadisticas_pool = EstadisticasPool()
+
+
+class QueuePoolInstrumentado(QueuePool):
+    """QueuePool que mide cuánto espera cada petición para obtener una conexión."""
+
+    def __init__(self, creator, pool_size: int = 5, max_overflow: int = 10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        # Se guarda aquí para no leer el atributo privado de QueuePool
+        self.max_overflow_configurado = max_overflow
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super().connect()
+        except PoolTimeoutError:
+            estadisticas_pool.registrar_espera((time.perf_counter() - inicio) * 1000, timeout=True)
+            raise
+        estadisticas_pool.registrar_espera((time.perf_counter() - inicio) * 1000)
+        return conexion
+
+
+# Los listeners se registran a nivel de clase: aplican a cualquier engine que use este pool
+event.listen(QueuePoolInstrumentado, 'connect', estadisticas_pool.on_connect)
+event.listen(QueuePoolInstrumentado, 'close', estadisticas_pool.on_close)
+event.listen(QueuePoolInstrumentado, 'detach', estadisticas_pool.on_close)
+event.listen(QueuePoolInstrumentado, 'invalidate', estadisticas_pool.on_invalidate)
+event.listen(QueuePoolInstrumentado, 'checkout', estadisticas_pool.on_checkout)
+event.listen(QueuePoolInstrumentado, 'checkin', estadisticas_pool.on_checkin)
@@ -0,0 +1,337 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import requests
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.infrastructure.database.config import _env_bool
+
+# Con TRAZAS_HABILITADAS=false los decoradores no envuelven nada (costo cero)
+TRAZAS_HABILITADAS = _env_bool('TRAZAS_HABILITADAS', False)
+# Fracción de peticiones sin `traceparent` que se trazan; si llega uno se respeta su flag de muestreo
+TRAZAS_MUESTREO = float(os.getenv('TRAZAS_MUESTREO', '0.1'))
+# Archivo JSONL en formato OTLP/JSON (receptor `otlpjsonfile` del OpenTelemetry Collector);
+# por defecto en el directorio temporal, no en el directorio de trabajo
+TRAZAS_ARCHIVO = os.getenv('TRAZAS_ARCHIVO', os.path.join(tempfile.gettempdir(), 'trazas.jsonl'))
+TRAZAS_NOMBRE_SERVICIO = os.getenv('TRAZAS_NOMBRE_SERVICIO', 'vuelos-api')
+# Spans en espera de escritura antes de descartar
+TRAZAS_MAX_PENDIENTES = int(os.getenv('TRAZAS_MAX_PENDIENTES', '10000'))
+TRAZAS_MAX_SQL = 1000
+
+TRACEPARENT_HEADER = 'traceparent'
+TRACE_ID_HEADER = 'X-Trace-Id'
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# Tipo de span -> SpanKind de OTLP
+KIND_OTLP = {
+    'http.server': 'SPAN_KIND_SERVER',
+    'http.client': 'SPAN_KIND_CLIENT',
+    'sql': 'SPAN_KIND_CLIENT'
+}
+
+_span_actual: ContextVar[Optional['Span']] = ContextVar('span_actual', default=None)
+
+
+class Span:
+    """Tramo de una traza: una petición, una llamada entre capas, una sentencia SQL o una llamada HTTP."""
+
+    __slots__ = ('trace_id', 'span_id', 'padre_id', 'nombre', 'tipo', 'inicio_ns', 'fin_ns', 'atributos', 'error')
+
+    def __init__(self, nombre: str, tipo: str, trace_id: str, padre_id: Optional[str] = None,
+                 atributos: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.padre_id = padre_id
+        self.nombre = nombre
+        self.tipo = tipo
+        self.inicio_ns = time.time_ns()
+        self.fin_ns: Optional[int] = None
+        self.atributos = atributos or {}
+        self.error: Optional[str] = None
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def terminar(self, error: Optional[BaseException] = None) -> None:
+        if self.fin_ns is not None:
+            return
+        self.fin_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        exportador_trazas.exportar(self)
+
+    def a_otlp(self) -> Dict[str, Any]:
+        """Span en el formato JSON de OTLP."""
+        datos = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.nombre,
+            'kind': KIND_OTLP.get(self.tipo, 'SPAN_KIND_INTERNAL'),
+            'startTimeUnixNano': str(self.inicio_ns),
+            'endTimeUnixNano': str(self.fin_ns),
+            'attributes': [_atributo_otlp(clave, valor) for clave, valor in {'capa': self.tipo, **self.atributos}.items()],
+            'status': {'code': 'STATUS_CODE_ERROR', 'message': self.error} if self.error else {}
+        }
+        if self.padre_id:
+            datos['parentSpanId'] = self.padre_id
+        return datos
+
+
+def _atributo_otlp(clave: str, valor: Any) -> Dict[str, Any]:
+    if isinstance(valor, bool):
+        return {'key': clave, 'value': {'boolValue': valor}}
+    if isinstance(valor, int):
+        return {'key': clave, 'value': {'intValue': str(valor)}}
+    if isinstance(valor, float):
+        return {'key': clave, 'value': {'doubleValue': valor}}
+    return {'key': clave, 'value': {'stringValue': str(valor)}}
+
+
+class ExportadorTrazas:
+    """Escribe los spans terminados en un archivo JSONL desde un hilo aparte.
+
+    Cada línea es un `ExportTraceServiceRequest` de OTLP/JSON con los spans
+    acumulados desde la escritura anterior. Si la cola se llena, los spans
+    nuevos se descartan en lugar de frenar las peticiones.
+    """
+
+    def __init__(self, archivo: str = TRAZAS_ARCHIVO, max_pendientes: int = TRAZAS_MAX_PENDIENTES):
+        self.archivo = archivo
+        self._cola: 'queue.Queue[Span]' = queue.Queue(maxsize=max_pendientes)
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        # Métricas
+        self.exportados = 0
+        self.descartados = 0
+        self.errores = 0
+
+    def exportar(self, span: Span) -> None:
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+
+    def _asegurar_hilo(self) -> None:
+        # Los hilos no sobreviven a un fork (p. ej. gunicorn --preload): se crean por proceso
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._bucle, name='exportador-trazas', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self) -> None:
+        while True:
+            spans = [self._cola.get()]
+            while len(spans) < 1000:
+                try:
+                    spans.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._escribir(spans)
+                with self._lock:
+                    self.exportados += len(spans)
+            except OSError as e:
+                logging.warning(f"No se pudieron exportar {len(spans)} spans: {str(e)}")
+                with self._lock:
+                    self.errores += 1
+
+    def _escribir(self, spans: List[Span]) -> None:
+        linea = {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    _atributo_otlp('service.name', TRAZAS_NOMBRE_SERVICIO),
+                    _atributo_otlp('process.pid', os.getpid())
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [span.a_otlp() for span in spans]
+                }]
+            }]
+        }
+        with open(self.archivo, 'a', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(linea, separators=(',', ':')) + '\n')
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'habilitado': TRAZAS_HABILITADAS,
+                'muestreo': TRAZAS_MUESTREO,
+                'archivo': self.archivo,
+                'pendientes': self._cola.qsize(),
+                'exportados': self.exportados,
+                'descartados': self.descartados,
+                'errores': self.errores
+            }
+
+
+exportador_trazas = ExportadorTrazas()
+
+
+def span_actual() -> Optional[Span]:
+    return _span_actual.get()
+
+
+@contextmanager
+def tramo(nombre: str, tipo: str, **atributos) -> Iterator[Optional[Span]]:
+    """Abre un span hijo del actual; si la petición no se está trazando no hace nada."""
+    padre = _span_actual.get()
+    if padre is None:
+        yield None
+        return
+    span = Span(nombre, tipo, padre.trace_id, padre.span_id, atributos)
+    token = _span_actual.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.terminar(e)
+        raise
+    finally:
+        _span_actual.reset(token)
+        span.terminar()
+
+
+def _envolver(funcion: Callable, nombre: str, tipo: str) -> Callable:
+    @functools.wraps(funcion)
+    def envuelta(*args, **kwargs):
+        if _span_actual.get() is None:
+            return funcion(*args, **kwargs)
+        with tramo(nombre, tipo):
+            return funcion(*args, **kwargs)
+    return envuelta
+
+
+def trazar_capa(tipo: str) -> Callable[[type], type]:
+    """Decorador de clase: abre un span por cada llamada a sus métodos públicos.
+
+    Se aplica a servicios y repositorios para ver cómo se reparte la latencia
+    entre capas. Los generadores no se envuelven (su trabajo ocurre al
+    iterarlos, fuera de la llamada). Con TRAZAS_HABILITADAS=false devuelve la
+    clase intacta.
+
+    Args:
+        tipo (str): Capa, p. ej. 'servicio' o 'repositorio'
+    """
+    def decorar(cls: type) -> type:
+        if not TRAZAS_HABILITADAS:
+            return cls
+        for nombre, atributo in list(vars(cls).items()):
+            if nombre.startswith('_'):
+                continue
+            envoltorio = type(atributo) if isinstance(atributo, (classmethod, staticmethod)) else None
+            funcion = atributo.__func__ if envoltorio else atributo
+            if not inspect.isfunction(funcion) or inspect.isgeneratorfunction(funcion):
+                continue
+            envuelta = _envolver(funcion, f"{cls.__name__}.{nombre}", tipo)
+            setattr(cls, nombre, envoltorio(envuelta) if envoltorio else envuelta)
+        return cls
+    return decorar
+
+
+class SesionHttpTrazada(requests.Session):
+    """Sesión de requests que abre un span por llamada y propaga `traceparent` al upstream."""
+
+    def request(self, method, url, *args, **kwargs):
+        with tramo(f"HTTP {method.upper()}", 'http.client', **{'http.method': method.upper(), 'http.url': url}) as span:
+            if span is None:
+                return super().request(method, url, *args, **kwargs)
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), TRACEPARENT_HEADER: span.traceparent()}
+            respuesta = super().request(method, url, *args, **kwargs)
+            span.atributos['http.status_code'] = respuesta.status_code
+            return respuesta
+
+
+def _parsear_traceparent(valor: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    coincidencia = _TRACEPARENT.match((valor or '').strip().lower())
+    if not coincidencia or coincidencia.group(1) == '0' * 32 or coincidencia.group(2) == '0' * 16:
+        return None
+    return coincidencia.group(1), coincidencia.group(2), bool(int(coincidencia.group(3), 16) & 1)
+
+
+def _iniciar_traza() -> None:
+    entrante = _parsear_traceparent(request.headers.get(TRACEPARENT_HEADER))
+    if entrante is not None:
+        trace_id, padre_id, muestreada = entrante
+    else:
+        trace_id, padre_id, muestreada = os.urandom(16).hex(), None, random.random() < TRAZAS_MUESTREO
+    if not muestreada:
+        return
+    regla = request.url_rule.rule if request.url_rule is not None else request.path
+    span = Span(f"{request.method} {regla}", 'http.server', trace_id, padre_id,
+                {'http.method': request.method, 'http.route': regla, 'http.target': request.full_path.rstrip('?')})
+    g.traza = (span, _span_actual.set(span))
+
+
+def _anotar_respuesta(respuesta):
+    traza = g.get('traza')
+    if traza is not None:
+        traza[0].atributos['http.status_code'] = respuesta.status_code
+        respuesta.headers[TRACE_ID_HEADER] = traza[0].trace_id
+    return respuesta
+
+
+def _terminar_traza(excepcion: Optional[BaseException] = None) -> None:
+    traza = g.pop('traza', None)
+    if traza is None:
+        return
+    span, token = traza
+    try:
+        _span_actual.reset(token)
+    except ValueError:
+        # El teardown corre en otro contexto (p. ej. respuestas en streaming)
+        _span_actual.set(None)
+    span.terminar(excepcion)
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany) -> None:
+    padre = _span_actual.get()
+    if padre is None or context is None:
+        return
+    context._span_traza = Span('SQL', 'sql', padre.trace_id, padre.span_id, {
+        'db.system': conn.dialect.name,
+        'db.statement': statement[:TRAZAS_MAX_SQL],
+        'db.executemany': bool(executemany)
+    })
+
+
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany) -> None:
+    span = getattr(context, '_span_traza', None)
+    if span is not None:
+        span.atributos['db.filas'] = cursor.rowcount
+        span.terminar()
+
+
+def _error_de_sentencia(contexto) -> None:
+    span = getattr(contexto.execution_context, '_span_traza', None)
+    if span is not None:
+        span.terminar(contexto.original_exception)
+
+
+def registrar_trazas(app: Flask) -> None:
+    """Activa las trazas si TRAZAS_HABILITADAS: span por petición, por capa y por sentencia SQL."""
+    if not TRAZAS_HABILITADAS:
+        return
+    app.before_request(_iniciar_traza)
+    app.after_request(_anotar_respuesta)
+    app.teardown_request(_terminar_traza)
+    if not event.contains(Engine, 'before_cursor_execute', _antes_de_sentencia):
+        event.listen(Engine, 'before_cursor_execute', _antes_de_sentencia)
+        event.listen(Engine, 'after_cursor_execute', _despues_de_sentencia)
+        event.listen(Engine, 'handle_error', _error_de_sentencia)
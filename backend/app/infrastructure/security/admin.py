@@ -0,0 +1,45 @@
+# app/infrastructure/security/admin.py
+import hmac
+from functools import wraps
+from flask import abort, request
+from .config import SecurityConfig
+
+ADMIN_HEADER = 'X-Admin-Token'
+
+
+def _token_valido(token: str, esperado: str) -> bool:
+    if not esperado or not token:
+        return False
+    return hmac.compare_digest(token.encode(), esperado.encode())
+
+
+def token_admin_valido(token: str) -> bool:
+    """Compara en tiempo constante un token contra ADMIN_TOKEN.
+
+    Sin ADMIN_TOKEN configurado ningún token es válido.
+    """
+    return _token_valido(token, SecurityConfig.ADMIN_TOKEN)
+
+
+def token_perfilado_valido(token: str) -> bool:
+    """Compara en tiempo constante un token contra PERFILADO_TOKEN.
+
+    Sin PERFILADO_TOKEN configurado ningún token es válido.
+    """
+    return _token_valido(token, SecurityConfig.PERFILADO_TOKEN)
+
+
+def requiere_admin(f):
+    """Protege un endpoint de administración con el token de la cabecera X-Admin-Token.
+
+    Responde 403 si los endpoints de administración están deshabilitados
+    (ADMIN_TOKEN no configurado) y 401 si el token no coincide.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not SecurityConfig.ADMIN_TOKEN:
+            abort(403, description="Endpoints de administración deshabilitados (ADMIN_TOKEN no configurado)")
+        if not token_admin_valido(request.headers.get(ADMIN_HEADER, '')):
+            abort(401, description="Token de administración inválido")
+        return f(*args, **kwargs)
+    return decorated
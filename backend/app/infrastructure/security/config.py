@@ -5,4 +5,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class SecurityConfig:
-    SECRET_KEY = os.getenv('SECRET_KEY') 
\ No newline at end of file
+    SECRET_KEY = os.getenv('SECRET_KEY') 
+    # Token requerido en la cabecera X-Admin-Token para los endpoints /api/admin
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    # Secreto que activa el perfilado de una petición (cabecera X-Perfilar); sin él, deshabilitado
+    PERFILADO_TOKEN = os.getenv('PERFILADO_TOKEN')
@@ -0,0 +1,401 @@
+import json
+import logging
+import os
+import re
+import select
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import date
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+from flask import Flask, Response
+from sqlalchemy import func
+from sqlalchemy import select as sql_select
+from sqlalchemy.engine import Engine
+from app.domain.events import EventoDominio, bus_eventos, desagrupar
+from app.infrastructure.database.connection import db
+
+FUENTES = ('memoria', 'postgres')
+# memoria: los cambios de este proceso se difunden a sus clientes (un solo nodo);
+# postgres: cada proceso publica con NOTIFY y todos difunden lo que reciben con LISTEN
+FLUJO_FUENTE = os.getenv('FLUJO_FUENTE', 'memoria').strip().lower()
+FLUJO_CANAL = os.getenv('FLUJO_CANAL', 'vuelos_cambios')
+# Conexiones SSE simultáneas por proceso; las siguientes reciben 503
+FLUJO_MAX_CONEXIONES = int(os.getenv('FLUJO_MAX_CONEXIONES', '2000'))
+# Comentario SSE periódico para mantener viva la conexión y detectar clientes desconectados
+FLUJO_LATIDO_S = float(os.getenv('FLUJO_LATIDO_S', '15'))
+# Eventos recientes conservados para reanudar con Last-Event-ID
+FLUJO_RETENCION = int(os.getenv('FLUJO_RETENCION', '1000'))
+# Por encima de estas filas una escritura masiva se anuncia con un solo evento 'vuelos_lote'
+FLUJO_MAX_FILAS_LOTE = int(os.getenv('FLUJO_MAX_FILAS_LOTE', '200'))
+# El payload de NOTIFY admite menos de 8000 bytes
+MAX_BYTES_NOTIFY = 7500
+# Milisegundos que el navegador espera antes de reconectar (campo `retry` de SSE)
+REINTENTO_MS = 3000
+
+Fila = Optional[Dict[str, Any]]
+
+
+class EventoFlujo(NamedTuple):
+    """Evento ya serializado: el JSON se genera una vez y lo comparten todos los clientes."""
+    id: int
+    tipo: str
+    datos: str
+
+
+def _serializar_fila(fila: Fila) -> Fila:
+    if fila is None:
+        return None
+    return {k: v.isoformat() if isinstance(v, date) else v for k, v in fila.items()}
+
+
+def _accion_fila(antes: Fila, despues: Fila) -> str:
+    if antes is None:
+        return 'creado'
+    if despues is None:
+        return 'eliminado'
+    return 'actualizado'
+
+
+def delta_metricas(filas: List[Tuple[Fila, Fila]]) -> Dict[str, Any]:
+    """Variación de los conteos de vuelos por aeropuerto, aerolínea y día que producen los cambios.
+
+    Args:
+        filas (List[Tuple[Fila, Fila]]): (antes, despues) de cada vuelo modificado
+
+    Returns:
+        Dict[str, Any]: total y, por dimensión, {clave: variación} sin las claves que quedan en 0
+    """
+    total = 0
+    conteos = {'por_aeropuerto': Counter(), 'por_aerolinea': Counter(), 'por_dia': Counter()}
+    for antes, despues in filas:
+        for fila, signo in ((antes, -1), (despues, 1)):
+            if fila is None:
+                continue
+            total += signo
+            conteos['por_aeropuerto'][str(fila.get('id_aeropuerto'))] += signo
+            conteos['por_aerolinea'][str(fila.get('id_aerolinea'))] += signo
+            conteos['por_dia'][str(fila.get('dia'))] += signo
+    return {'total': total, **{nombre: {k: v for k, v in conteo.items() if v}
+                               for nombre, conteo in conteos.items()}}
+
+
+def construir_mensaje(accion: str, filas: List[Tuple[Fila, Fila]]) -> Dict[str, Any]:
+    """Mensaje del feed de cambios para un evento de dominio de vuelos.
+
+    Las escrituras masivas grandes no llevan las filas, solo su número y el delta.
+    """
+    return {
+        'accion': accion,
+        'filas': filas if len(filas) <= FLUJO_MAX_FILAS_LOTE else None,
+        'total_filas': len(filas),
+        'delta': delta_metricas(filas)
+    }
+
+
+class DifusorCambios:
+    """Reparte los cambios de vuelos a las conexiones SSE de este proceso.
+
+    Los eventos se guardan una sola vez, ya serializados, en un buffer circular
+    con ids crecientes; publicar es O(1) sin importar cuántos clientes haya.
+    Cada conexión solo recuerda el último id que envió y espera en una misma
+    condición: una conexión ociosa no hace consultas ni ocupa memoria aparte
+    del hilo que la atiende. Un cliente que se queda atrás más de
+    FLUJO_RETENCION eventos (o que reanuda con un id desconocido) recibe
+    'reinicio' para que vuelva a pedir el estado completo.
+    """
+
+    def __init__(self):
+        # Prefijo de los ids: un Last-Event-ID de otro proceso (o de antes de reiniciarlo) no es válido aquí
+        self.instancia = uuid.uuid4().hex[:8]
+        self._condicion = threading.Condition()
+        self._eventos: deque = deque(maxlen=FLUJO_RETENCION)
+        self._ultimo_id = 0
+        self.conexiones = 0
+        self.conexiones_max = 0
+        self.rechazadas = 0
+        self.reinicios_enviados = 0
+        self.eventos_publicados = 0
+
+    # --- Publicación --------------------------------------------------------
+
+    def _publicar(self, tipo: str, datos: Dict[str, Any]) -> None:
+        self._ultimo_id += 1
+        self._eventos.append(EventoFlujo(self._ultimo_id, tipo, json.dumps(datos, ensure_ascii=False)))
+        self.eventos_publicados += 1
+
+    def aplicar(self, mensaje: Dict[str, Any]) -> None:
+        """Publica los eventos de un mensaje del feed y despierta a las conexiones.
+
+        Genera un evento 'vuelo' por fila (o uno 'vuelos_lote' si el mensaje no
+        trae filas) y un evento 'metricas' con el delta de los conteos.
+        """
+        with self._condicion:
+            if mensaje.get('filas') is not None:
+                for antes, despues in mensaje['filas']:
+                    self._publicar('vuelo', {'accion': _accion_fila(antes, despues),
+                                             'antes': antes, 'despues': despues})
+            elif mensaje.get('total_filas'):
+                self._publicar('vuelos_lote', {'accion': mensaje['accion'], 'filas': mensaje['total_filas']})
+            delta = mensaje.get('delta')
+            # Un cambio que no mueve ningún conteo (p. ej. solo id_movimiento) no genera evento de métricas
+            if delta and (delta['total'] or delta['por_aeropuerto'] or delta['por_aerolinea'] or delta['por_dia']):
+                self._publicar('metricas', delta)
+            self._condicion.notify_all()
+
+    def reiniciar(self) -> None:
+        """Pide a todas las conexiones que recarguen el estado (p. ej. se perdieron eventos del feed)."""
+        with self._condicion:
+            self._publicar('reinicio', {})
+            self._condicion.notify_all()
+
+    # --- Conexiones ---------------------------------------------------------
+
+    def conectar(self) -> bool:
+        """Reserva un lugar para una conexión; False si se alcanzó FLUJO_MAX_CONEXIONES."""
+        with self._condicion:
+            if self.conexiones >= FLUJO_MAX_CONEXIONES:
+                self.rechazadas += 1
+                return False
+            self.conexiones += 1
+            self.conexiones_max = max(self.conexiones_max, self.conexiones)
+            return True
+
+    def desconectar(self) -> None:
+        with self._condicion:
+            self.conexiones -= 1
+
+    def _id_reanudacion(self, ultimo_id: Optional[str]) -> Optional[int]:
+        """Id numérico de un Last-Event-ID de esta instancia que aún se puede reanudar."""
+        instancia, _, numero = (ultimo_id or '').partition('-')
+        if instancia != self.instancia or not numero.isdigit():
+            return None
+        numero = int(numero)
+        primero = self._eventos[0].id if self._eventos else self._ultimo_id + 1
+        if numero > self._ultimo_id or numero < primero - 1:
+            return None
+        return numero
+
+    def _pendientes(self, desde: int) -> List[EventoFlujo]:
+        # Los clientes casi siempre están al final: se recorre desde la derecha
+        nuevos = []
+        for evento in reversed(self._eventos):
+            if evento.id <= desde:
+                break
+            nuevos.append(evento)
+        nuevos.reverse()
+        return nuevos
+
+    def _perdio_eventos(self, desde: int) -> bool:
+        return self._ultimo_id > desde and (not self._eventos or self._eventos[0].id > desde + 1)
+
+    def _formato_reinicio(self) -> str:
+        return f"id: {self.instancia}-{self._ultimo_id}\nevent: reinicio\ndata: {{}}\n\n"
+
+    def escuchar(self, ultimo_id: Optional[str] = None) -> Iterator[str]:
+        """Genera el flujo SSE de una conexión (ya reservada con `conectar`).
+
+        Args:
+            ultimo_id (Optional[str]): Last-Event-ID con el que el cliente reanuda
+
+        Yields:
+            str: Bloques de texto en formato text/event-stream
+        """
+        # La posición se fija antes del primer bloque: lo publicado mientras se envía `retry` no se pierde
+        reinicio = None
+        with self._condicion:
+            desde = self._id_reanudacion(ultimo_id)
+            if desde is None:
+                desde = self._ultimo_id
+                if ultimo_id:
+                    # No se puede reanudar: el cliente debe recargar el estado antes de aplicar eventos
+                    self.reinicios_enviados += 1
+                    reinicio = self._formato_reinicio()
+        yield f"retry: {REINTENTO_MS}\n\n"
+        if reinicio:
+            yield reinicio
+        while True:
+            with self._condicion:
+                if self._ultimo_id == desde:
+                    self._condicion.wait(FLUJO_LATIDO_S)
+                if self._perdio_eventos(desde):
+                    self.reinicios_enviados += 1
+                    pendientes, reinicio = [], self._formato_reinicio()
+                    desde = self._ultimo_id
+                else:
+                    pendientes, reinicio = self._pendientes(desde), None
+            if reinicio:
+                yield reinicio
+            elif not pendientes:
+                yield ": latido\n\n"
+            for evento in pendientes:
+                yield f"id: {self.instancia}-{evento.id}\nevent: {evento.tipo}\ndata: {evento.datos}\n\n"
+                desde = evento.id
+
+    def resumen(self) -> Dict[str, Any]:
+        """Conexiones y eventos de este proceso."""
+        with self._condicion:
+            return {
+                'fuente': FLUJO_FUENTE,
+                'instancia': self.instancia,
+                'conexiones': self.conexiones,
+                'conexiones_max': self.conexiones_max,
+                'limite_conexiones': FLUJO_MAX_CONEXIONES,
+                'rechazadas': self.rechazadas,
+                'eventos_publicados': self.eventos_publicados,
+                'ultimo_id': self._ultimo_id,
+                'retenidos': len(self._eventos),
+                'reinicios_enviados': self.reinicios_enviados
+            }
+
+
+class OyentePostgres:
+    """Hilo que escucha el canal FLUJO_CANAL (LISTEN) y entrega cada mensaje al difusor.
+
+    Usa una conexión propia, separada del pool, en autocommit. Si la conexión
+    se pierde, reconecta con espera exponencial y envía 'reinicio' a los
+    clientes, porque los NOTIFY emitidos mientras tanto no se recuperan.
+    """
+
+    def __init__(self, difusor: DifusorCambios):
+        self.difusor = difusor
+        self._engine: Optional[Engine] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.conectado = False
+        self.notificaciones = 0
+        self.reconexiones = 0
+        self.ultimo_error: Optional[str] = None
+
+    def iniciar(self, engine: Engine) -> None:
+        self._engine = engine
+        self.asegurar_hilo()
+
+    def asegurar_hilo(self) -> None:
+        # Los hilos no sobreviven a un fork (p. ej. gunicorn --preload): se crean por proceso
+        if self._engine is None:
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._bucle, name='flujo-cambios-listen', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self) -> None:
+        espera = 1.0
+        while True:
+            conexion = None
+            try:
+                crudo = self._engine.raw_connection()
+                crudo.detach()
+                conexion = crudo.driver_connection
+                conexion.autocommit = True
+                with conexion.cursor() as cursor:
+                    cursor.execute(f'LISTEN {FLUJO_CANAL}')
+                if self.reconexiones:
+                    self.difusor.reiniciar()
+                self.conectado, espera = True, 1.0
+                while True:
+                    if select.select([conexion], [], [], FLUJO_LATIDO_S) == ([], [], []):
+                        continue
+                    conexion.poll()
+                    while conexion.notifies:
+                        notificacion = conexion.notifies.pop(0)
+                        self.notificaciones += 1
+                        self.difusor.aplicar(json.loads(notificacion.payload))
+            except Exception as e:
+                self.conectado = False
+                self.reconexiones += 1
+                self.ultimo_error = str(e)
+                logging.warning(f"Se perdió el LISTEN de {FLUJO_CANAL}; reintento en {espera:.0f}s: {str(e)}")
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except Exception:
+                        pass
+                time.sleep(espera)
+                espera = min(espera * 2, 30.0)
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            'canal': FLUJO_CANAL,
+            'conectado': self.conectado,
+            'notificaciones': self.notificaciones,
+            'reconexiones': self.reconexiones,
+            'ultimo_error': self.ultimo_error
+        }
+
+
+difusor_cambios = DifusorCambios()
+oyente_postgres = OyentePostgres(difusor_cambios)
+
+
+def _trocear(mensaje: Dict[str, Any]) -> Iterator[str]:
+    """Divide un mensaje en payloads de NOTIFY de menos de MAX_BYTES_NOTIFY bytes.
+
+    Las filas se reparten a la mitad hasta que cada parte cabe; el delta viaja
+    en la última. Si el delta de un lote sin filas no cabe, se omite y los
+    clientes solo reciben 'vuelos_lote' (y recargan las métricas).
+    """
+    texto = json.dumps(mensaje, ensure_ascii=False, separators=(',', ':'))
+    if len(texto.encode()) <= MAX_BYTES_NOTIFY:
+        yield texto
+        return
+    filas = mensaje.get('filas')
+    if filas and len(filas) > 1:
+        mitad = len(filas) // 2
+        yield from _trocear({**mensaje, 'filas': filas[:mitad], 'total_filas': mitad, 'delta': None})
+        yield from _trocear({**mensaje, 'filas': filas[mitad:], 'total_filas': len(filas) - mitad})
+    elif mensaje.get('delta') is not None:
+        yield from _trocear({**mensaje, 'delta': None})
+    else:
+        logging.warning(f"Mensaje del feed de cambios demasiado grande para NOTIFY: {mensaje['accion']}")
+
+
+def publicar_cambio_vuelo(evento: EventoDominio) -> None:
+    """Suscriptor del bus de eventos: lleva cada escritura de vuelos al feed de cambios."""
+    filas = [(_serializar_fila(individual.antes), _serializar_fila(individual.despues))
+             for individual in desagrupar(evento)]
+    if not filas:
+        return
+    mensaje = construir_mensaje(evento.accion, filas)
+    if FLUJO_FUENTE != 'postgres':
+        difusor_cambios.aplicar(mensaje)
+        return
+    # Conexión aparte en autocommit: la escritura ya se confirmó y el NOTIFY no debe esperar otra transacción
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexion:
+        for payload in _trocear(mensaje):
+            conexion.execute(sql_select(func.pg_notify(FLUJO_CANAL, payload)))
+
+
+def abrir_flujo(ultimo_id: Optional[str] = None) -> Union[Response, Tuple[Dict[str, str], int, Dict[str, str]]]:
+    """Respuesta text/event-stream para una nueva conexión, o 503 si no hay lugar.
+
+    Args:
+        ultimo_id (Optional[str]): Last-Event-ID enviado por el navegador al reconectar
+    """
+    oyente_postgres.asegurar_hilo()
+    if not difusor_cambios.conectar():
+        return ({"error": "Demasiadas conexiones al flujo de cambios"}, 503,
+                {'Retry-After': str(REINTENTO_MS // 1000)})
+    respuesta = Response(difusor_cambios.escuchar(ultimo_id), mimetype='text/event-stream',
+                         headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Libera el lugar cuando el servidor cierra la respuesta, también si el cliente se fue antes del primer byte
+    respuesta.call_on_close(difusor_cambios.desconectar)
+    return respuesta
+
+
+def registrar_flujo_cambios(app: Flask) -> None:
+    """Suscribe el feed de cambios a los eventos de vuelos y, con FLUJO_FUENTE=postgres, lanza el LISTEN."""
+    if FLUJO_FUENTE not in FUENTES:
+        raise ValueError(f"FLUJO_FUENTE inválido: {FLUJO_FUENTE} (opciones: {', '.join(FUENTES)})")
+    if not re.fullmatch(r'[a-z_][a-z0-9_]*', FLUJO_CANAL):
+        raise ValueError(f"FLUJO_CANAL inválido: {FLUJO_CANAL} (solo minúsculas, dígitos y '_')")
+    bus_eventos.suscribir('vuelo', publicar_cambio_vuelo)
+    if FLUJO_FUENTE == 'postgres':
+        with app.app_context():
+            if db.engine.dialect.name != 'postgresql':
+                raise ValueError("FLUJO_FUENTE=postgres requiere una base de datos PostgreSQL")
+            oyente_postgres.iniciar(db.engine)
@@ -0,0 +1,431 @@
+"""Generador de carga mixta (lazo abierto) contra una instancia en ejecución.
+
+Las llegadas siguen un proceso de Poisson con la tasa pedida, sin esperar a
+que terminen las peticiones anteriores (lazo abierto). La latencia se mide
+desde el instante programado de llegada, así que el encolamiento en el
+cliente cuando el servidor se atrasa también cuenta (sin coordinated omission).
+
+Uso (desde backend/):
+
+    # Mezcla por defecto: 50 req/s durante 60 s
+    python -m benchmarks.generador_carga mezcla --url http://localhost:5000 --tasa 50 --duracion 60
+
+    # Mezcla propia (pesos relativos) y resultados en JSON
+    python -m benchmarks.generador_carga mezcla --mezcla ver_vuelo=60,metricas=10,crear_vuelo=5 --json resultado.json
+
+    # Stub local de StackExchange; la API debe arrancar con
+    # STACKEXCHANGE_API_URL=http://127.0.0.1:8900/2.2/search
+    python -m benchmarks.generador_carga stub --puerto 8900 --latencia-ms 150
+
+    # Reproducir un access log (formato common/combined) al doble de velocidad
+    python -m benchmarks.generador_carga replay access.log --velocidad 2
+
+Operaciones de la mezcla: listar_vuelos, listar_aerolineas, listar_aeropuertos,
+ver_vuelo, metricas, estadisticas_movimientos, estadisticas_aerolineas,
+mas_ocupado, serie_aeropuerto, crear_vuelo, actualizar_vuelo, eliminar_vuelo,
+stackexchange.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+MEZCLA_POR_DEFECTO = {
+    'listar_aerolineas': 10,
+    'listar_aeropuertos': 5,
+    'listar_vuelos': 2,
+    'ver_vuelo': 40,
+    'metricas': 8,
+    'estadisticas_movimientos': 5,
+    'estadisticas_aerolineas': 4,
+    'mas_ocupado': 4,
+    'serie_aeropuerto': 4,
+    'crear_vuelo': 8,
+    'actualizar_vuelo': 4,
+    'eliminar_vuelo': 3,
+    'stackexchange': 3
+}
+ETIQUETAS_STACKEXCHANGE = ('python', 'perl', 'java', 'postgresql', 'flask', 'sqlalchemy', 'rust', 'go')
+PERCENTILES = (50, 90, 95, 99)
+# Códigos de descarte de carga (control de admisión / plazos): se informan aparte de los errores
+CODIGOS_DESCARTE = (429, 503, 504)
+
+# "GET /api/vuelos/12 HTTP/1.1" y [10/Oct/2026:13:55:36 +0000] de los formatos common/combined
+_LINEA_LOG = re.compile(r'\[(?P<fecha>[^\]]+)\] "(?P<metodo>[A-Z]+) (?P<ruta>\S+) [^"]*"')
+_SEGMENTO_NUMERICO = re.compile(r'/\d+(?=/|$|\?)')
+
+
+class Resultado:
+    __slots__ = ('ruta', 'codigo', 'latencia_ms', 'error')
+
+    def __init__(self, ruta: str, codigo: Optional[int], latencia_ms: float, error: bool):
+        self.ruta = ruta
+        self.codigo = codigo
+        self.latencia_ms = latencia_ms
+        self.error = error
+
+
+class Cliente:
+    """Sesión HTTP por hilo y estado compartido de la mezcla (IDs creados, dimensiones)."""
+
+    def __init__(self, url: str, timeout: float, rng: random.Random, id_max: int):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.rng = rng
+        self.id_max = id_max
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.creados: List[int] = []
+        self.aerolineas: List[int] = [1]
+        self.aeropuertos: List[int] = [1]
+        self.movimientos: List[int] = [1, 2]
+
+    @property
+    def sesion(self) -> requests.Session:
+        if not hasattr(self._local, 'sesion'):
+            self._local.sesion = requests.Session()
+        return self._local.sesion
+
+    def pedir(self, metodo: str, ruta: str, **kwargs) -> requests.Response:
+        return self.sesion.request(metodo, self.url + ruta, timeout=self.timeout, **kwargs)
+
+    def cargar_dimensiones(self) -> None:
+        """Lee los IDs de aerolíneas, aeropuertos y movimientos para armar vuelos válidos."""
+        for atributo, ruta, clave in (('aerolineas', '/api/aerolineas/', 'id_aerolinea'),
+                                      ('aeropuertos', '/api/aeropuertos/', 'id_aeropuerto'),
+                                      ('movimientos', '/api/movimientos/', 'id_movimiento')):
+            try:
+                respuesta = self.pedir('GET', ruta)
+                ids = [fila[clave] for fila in respuesta.json() if clave in fila]
+                if ids:
+                    setattr(self, atributo, ids)
+            except (requests.RequestException, ValueError, TypeError) as e:
+                print(f"  aviso: no se pudieron leer {atributo} ({e}); se usan IDs por defecto", file=sys.stderr)
+
+    def vuelo_aleatorio(self) -> Dict[str, Any]:
+        return {
+            'id_aerolinea': self.rng.choice(self.aerolineas),
+            'id_aeropuerto': self.rng.choice(self.aeropuertos),
+            'id_movimiento': self.rng.choice(self.movimientos),
+            'dia': (date(2024, 1, 1) + timedelta(days=self.rng.randrange(730))).isoformat()
+        }
+
+    def id_existente(self, quitar: bool = False) -> Optional[int]:
+        with self._lock:
+            if not self.creados:
+                return None
+            indice = self.rng.randrange(len(self.creados))
+            return self.creados.pop(indice) if quitar else self.creados[indice]
+
+
+# Cada operación devuelve (ruta agrupada para el reporte, método, ruta real, kwargs, códigos esperados)
+Operacion = Callable[[Cliente], Tuple[str, str, str, Dict[str, Any], Tuple[int, ...]]]
+
+
+def _ver_vuelo(c: Cliente):
+    id_vuelo = c.id_existente() or c.rng.randint(1, c.id_max)
+    return 'GET /api/vuelos/{id}', 'GET', f'/api/vuelos/{id_vuelo}', {}, (200, 404)
+
+
+def _crear_vuelo(c: Cliente):
+    return 'POST /api/vuelos/', 'POST', '/api/vuelos/', {'json': c.vuelo_aleatorio()}, (201,)
+
+
+def _actualizar_vuelo(c: Cliente):
+    id_vuelo = c.id_existente()
+    if id_vuelo is None:
+        return _crear_vuelo(c)
+    return 'PUT /api/vuelos/{id}', 'PUT', f'/api/vuelos/{id_vuelo}', {'json': c.vuelo_aleatorio()}, (200, 404)
+
+
+def _eliminar_vuelo(c: Cliente):
+    id_vuelo = c.id_existente(quitar=True)
+    if id_vuelo is None:
+        return _crear_vuelo(c)
+    return 'DELETE /api/vuelos/{id}', 'DELETE', f'/api/vuelos/{id_vuelo}', {}, (204, 404)
+
+
+def _serie_aeropuerto(c: Cliente):
+    id_aeropuerto = c.rng.choice(c.aeropuertos)
+    granularidad = c.rng.choice(('dia', 'semana', 'mes'))
+    return ('GET /api/aeropuertos/{id}/serie', 'GET',
+            f'/api/aeropuertos/{id_aeropuerto}/serie?granularidad={granularidad}', {}, (200, 404))
+
+
+def _get(ruta: str) -> Operacion:
+    return lambda c: (f'GET {ruta}', 'GET', ruta, {}, (200,))
+
+
+OPERACIONES: Dict[str, Operacion] = {
+    'listar_vuelos': _get('/api/vuelos/'),
+    'listar_aerolineas': _get('/api/aerolineas/'),
+    'listar_aeropuertos': _get('/api/aeropuertos/'),
+    'ver_vuelo': _ver_vuelo,
+    'metricas': _get('/api/vuelos/metricas'),
+    'estadisticas_movimientos': _get('/api/movimientos/estadisticas'),
+    'estadisticas_aerolineas': _get('/api/aerolineas/estadisticas'),
+    'mas_ocupado': _get('/api/aeropuertos/mas_ocupado'),
+    'serie_aeropuerto': _serie_aeropuerto,
+    'crear_vuelo': _crear_vuelo,
+    'actualizar_vuelo': _actualizar_vuelo,
+    'eliminar_vuelo': _eliminar_vuelo,
+    'stackexchange': lambda c: ('GET /api/stackexchange/stats', 'GET',
+                                f'/api/stackexchange/stats?etiqueta={c.rng.choice(ETIQUETAS_STACKEXCHANGE)}',
+                                {}, (200, 404))
+}
+
+
+class Recolector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.resultados: List[Resultado] = []
+
+    def agregar(self, resultado: Resultado) -> None:
+        with self._lock:
+            self.resultados.append(resultado)
+
+
+def ejecutar(cliente: Cliente, recolector: Recolector, programado: float, operacion: Operacion) -> None:
+    ruta, metodo, url, kwargs, esperados = operacion(cliente)
+    codigo, error = None, True
+    try:
+        respuesta = cliente.pedir(metodo, url, **kwargs)
+        codigo = respuesta.status_code
+        error = codigo not in esperados
+        if codigo == 201 and metodo == 'POST':
+            id_creado = respuesta.json().get('id')
+            if id_creado:
+                with cliente._lock:
+                    cliente.creados.append(id_creado)
+    except (requests.RequestException, ValueError):
+        pass
+    recolector.agregar(Resultado(ruta, codigo, (time.perf_counter() - programado) * 1000, error))
+
+
+def lazo_abierto(llegadas: Iterator[Tuple[float, Callable[[float], None]]], max_concurrencia: int) -> float:
+    """Despacha cada llegada en su instante programado (relativo al inicio) sin esperar respuestas.
+
+    Returns:
+        float: Duración total en segundos, hasta que termina la última petición
+    """
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_concurrencia) as pool:
+        for desplazamiento, tarea in llegadas:
+            programado = inicio + desplazamiento
+            espera = programado - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            pool.submit(tarea, programado)
+    return time.perf_counter() - inicio
+
+
+def percentil(ordenados: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre valores ya ordenados."""
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def reporte(resultados: List[Resultado], duracion_s: float, tasa_ofrecida: Optional[float]) -> Dict[str, Any]:
+    por_ruta: Dict[str, List[Resultado]] = defaultdict(list)
+    for resultado in resultados:
+        por_ruta[resultado.ruta].append(resultado)
+
+    def resumir(grupo: List[Resultado]) -> Dict[str, Any]:
+        latencias = sorted(r.latencia_ms for r in grupo)
+        errores = sum(1 for r in grupo if r.error)
+        return {
+            'peticiones': len(grupo),
+            'errores': errores,
+            'tasa_error': round(errores / len(grupo), 4),
+            'descartadas': sum(1 for r in grupo if r.codigo in CODIGOS_DESCARTE),
+            'sin_respuesta': sum(1 for r in grupo if r.codigo is None),
+            **{f'p{p}_ms': round(percentil(latencias, p), 2) for p in PERCENTILES},
+            'max_ms': round(latencias[-1], 2),
+            'throughput_rps': round(len(grupo) / duracion_s, 2) if duracion_s else 0.0
+        }
+
+    return {
+        'duracion_s': round(duracion_s, 2),
+        'tasa_ofrecida_rps': tasa_ofrecida,
+        'total': resumir(resultados) if resultados else {},
+        'rutas': {ruta: resumir(grupo) for ruta, grupo in sorted(por_ruta.items())}
+    }
+
+
+def imprimir(datos: Dict[str, Any]) -> None:
+    columnas = ('peticiones', 'tasa_error', 'descartadas', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'throughput_rps')
+    tasa = datos['tasa_ofrecida_rps']
+    print(f"\nDuración {datos['duracion_s']} s, tasa ofrecida "
+          f"{f'{tasa} req/s' if tasa is not None else 'según el log'}")
+    print(f"{'ruta':<42}" + ''.join(f"{c:>15}" for c in columnas))
+    for ruta, fila in list(datos['rutas'].items()) + [('TOTAL', datos['total'])]:
+        if fila:
+            print(f"{ruta[:41]:<42}" + ''.join(f"{fila[c]:>15}" for c in columnas))
+
+
+def _parsear_mezcla(texto: Optional[str]) -> Dict[str, float]:
+    if not texto:
+        return dict(MEZCLA_POR_DEFECTO)
+    mezcla = {}
+    for parte in texto.split(','):
+        nombre, _, peso = parte.partition('=')
+        nombre = nombre.strip()
+        if nombre not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"Operación desconocida: {nombre}")
+        mezcla[nombre] = float(peso or 1)
+    return mezcla
+
+
+def mezcla(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.semilla)
+    cliente = Cliente(args.url, args.timeout, rng, args.id_max)
+    cliente.cargar_dimensiones()
+    pesos = _parsear_mezcla(args.mezcla)
+    nombres, valores = list(pesos), list(pesos.values())
+    recolector = Recolector()
+
+    def llegadas():
+        instante = 0.0
+        while True:
+            instante += rng.expovariate(args.tasa)
+            if instante >= args.duracion:
+                return
+            operacion = OPERACIONES[rng.choices(nombres, valores)[0]]
+            yield instante, lambda programado, op=operacion: ejecutar(cliente, recolector, programado, op)
+
+    print(f"Mezcla contra {args.url}: {args.tasa} req/s durante {args.duracion} s")
+    duracion = lazo_abierto(llegadas(), args.max_concurrencia)
+    return reporte(recolector.resultados, duracion, args.tasa)
+
+
+def leer_log(ruta: str, incluir: Tuple[str, ...]) -> Tuple[List[Tuple[float, str, str]], int]:
+    """Lee un access log y devuelve (desplazamiento en s, método, ruta) de las peticiones a reproducir."""
+    peticiones, omitidas, primera = [], 0, None
+    with open(ruta, encoding='utf-8', errors='replace') as archivo:
+        for linea in archivo:
+            coincidencia = _LINEA_LOG.search(linea)
+            if not coincidencia:
+                omitidas += 1
+                continue
+            if coincidencia.group('metodo') not in incluir:
+                omitidas += 1
+                continue
+            instante = datetime.strptime(coincidencia.group('fecha'), '%d/%b/%Y:%H:%M:%S %z').timestamp()
+            primera = instante if primera is None else primera
+            peticiones.append((instante - primera, coincidencia.group('metodo'), coincidencia.group('ruta')))
+    peticiones.sort(key=lambda p: p[0])
+    return peticiones, omitidas
+
+
+def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    # Los logs no guardan el cuerpo de las peticiones: solo se reproducen lecturas
+    peticiones, omitidas = leer_log(args.log, ('GET', 'HEAD'))
+    print(f"Reproduciendo {len(peticiones)} peticiones de {args.log} a velocidad x{args.velocidad} "
+          f"({omitidas} líneas omitidas: escrituras o formato no reconocido)")
+    cliente = Cliente(args.url, args.timeout, random.Random(args.semilla), 0)
+    recolector = Recolector()
+
+    def llegadas():
+        for desplazamiento, metodo, ruta in peticiones:
+            agrupada = f"{metodo} {_SEGMENTO_NUMERICO.sub('/{id}', urlparse(ruta).path)}"
+            operacion = (lambda c, a=agrupada, m=metodo, r=ruta:
+                         (a, m, r, {}, (200, 204, 304, 404)))
+            yield desplazamiento / args.velocidad, \
+                lambda programado, op=operacion: ejecutar(cliente, recolector, programado, op)
+
+    duracion = lazo_abierto(llegadas(), args.max_concurrencia)
+    return reporte(recolector.resultados, duracion, None)
+
+
+class _StubStackExchange(BaseHTTPRequestHandler):
+    """Responde como /2.2/search con preguntas sintéticas, tras una latencia configurable."""
+
+    latencia_s = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latencia_s)
+        ahora = int(time.time())
+        cuerpo = json.dumps({'items': [{
+            'title': f'Pregunta {i} ({self.path})',
+            'score': random.randint(-2, 50),
+            'view_count': random.randint(1, 10000),
+            'link': f'https://stackoverflow.com/q/{i}',
+            'creation_date': ahora - random.randint(0, 10 ** 8),
+            'is_answered': random.random() < 0.7
+        } for i in range(30)], 'quota_remaining': 9999}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def stub(args: argparse.Namespace) -> None:
+    _StubStackExchange.latencia_s = args.latencia_ms / 1000
+    servidor = ThreadingHTTPServer(('127.0.0.1', args.puerto), _StubStackExchange)
+    print(f"Stub de StackExchange en http://127.0.0.1:{args.puerto}/2.2/search "
+          f"(latencia {args.latencia_ms} ms); Ctrl+C para terminar")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    def comunes(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument('--url', default='http://localhost:5000', help='URL base de la API')
+        sub.add_argument('--timeout', type=float, default=30.0, help='Timeout por petición (s)')
+        sub.add_argument('--max-concurrencia', type=int, default=256, help='Peticiones simultáneas máximas del cliente')
+        sub.add_argument('--semilla', type=int, default=42)
+        sub.add_argument('--json', help='Guardar el reporte en este archivo')
+
+    sub_mezcla = comandos.add_parser('mezcla', help='Mezcla configurable de operaciones con llegadas de Poisson')
+    comunes(sub_mezcla)
+    sub_mezcla.add_argument('--tasa', type=float, default=50.0, help='Llegadas por segundo')
+    sub_mezcla.add_argument('--duracion', type=float, default=60.0, help='Duración (s)')
+    sub_mezcla.add_argument('--mezcla', help='Pesos: operacion=peso,... (por defecto MEZCLA_POR_DEFECTO)')
+    sub_mezcla.add_argument('--id-max', type=int, default=1000, help='ID máximo para leer vuelos existentes')
+
+    sub_replay = comandos.add_parser('replay', help='Reproduce las lecturas de un access log')
+    comunes(sub_replay)
+    sub_replay.add_argument('log', help='Access log en formato common o combined')
+    sub_replay.add_argument('--velocidad', type=float, default=1.0, help='Factor de aceleración de los tiempos')
+
+    sub_stub = comandos.add_parser('stub', help='Stub local de la API de StackExchange')
+    sub_stub.add_argument('--puerto', type=int, default=8900)
+    sub_stub.add_argument('--latencia-ms', type=float, default=100.0)
+
+    args = parser.parse_args()
+    if args.comando == 'stub':
+        stub(args)
+        return 0
+
+    datos = mezcla(args) if args.comando == 'mezcla' else replay(args)
+    imprimir(datos)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(datos, archivo, indent=2, ensure_ascii=False)
+    return 0 if datos['total'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Benchmark del motor columnar (NumPy) contra las agregaciones SQL.
+
+Uso (desde backend/):
+
+    # Solo motor columnar con datos sintéticos en memoria
+    python -m benchmarks.metricas_columnar --filas 10000000
+
+    # Sembrar 10M vuelos sintéticos en la base de DATABASE_URL (PostgreSQL)
+    python -m benchmarks.metricas_columnar --filas 10000000 --sembrar
+
+    # Comparar contra el camino SQL usando la base de DATABASE_URL
+    python -m benchmarks.metricas_columnar --sql
+
+Requiere requirements-analytics.txt.
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import date
+from typing import Callable, Dict, List
+
+import numpy as np
+from sqlalchemy import text
+
+from app.infrastructure.analytics.metricas_columnares import EPOCA, MotorMetricasColumnar
+
+SEMBRAR_SQL = text("""
+    INSERT INTO vuelos (id_aerolinea, id_aeropuerto, id_movimiento, dia)
+    SELECT
+        a.ids[1 + floor(random() * array_length(a.ids, 1))::int],
+        p.ids[1 + floor(random() * array_length(p.ids, 1))::int],
+        m.ids[1 + floor(random() * array_length(m.ids, 1))::int],
+        DATE '2015-01-01' + floor(random() * :dias)::int
+    FROM generate_series(1, :filas),
+         (SELECT array_agg(id_aerolinea) AS ids FROM aerolineas) a,
+         (SELECT array_agg(id_aeropuerto) AS ids FROM aeropuertos) p,
+         (SELECT array_agg(id_movimiento) AS ids FROM movimientos) m
+""")
+
+
+def medir(nombre: str, funcion: Callable[[], object], repeticiones: int) -> Dict[str, float]:
+    """Ejecuta la función varias veces y reporta mediana y mínimo en ms."""
+    tiempos: List[float] = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    resultado = {'mediana_ms': statistics.median(tiempos), 'min_ms': min(tiempos)}
+    print(f"  {nombre:<38} mediana {resultado['mediana_ms']:>10.1f} ms   min {resultado['min_ms']:>10.1f} ms")
+    return resultado
+
+
+def medir_motor(motor: MotorMetricasColumnar, repeticiones: int) -> None:
+    medir('obtener_metricas', motor.obtener_metricas, repeticiones)
+    medir('estadisticas_aerolineas (todas)', motor.estadisticas_aerolineas, repeticiones)
+    medir('aeropuertos_mas_ocupados', motor.aeropuertos_mas_ocupados, repeticiones)
+    medir('estadisticas_movimientos', motor.estadisticas_movimientos, repeticiones)
+
+
+def sinteticos(args: argparse.Namespace) -> None:
+    print(f"Motor columnar con {args.filas:,} vuelos sintéticos")
+    rng = np.random.default_rng(args.semilla)
+    inicio = time.perf_counter()
+    motor = MotorMetricasColumnar()
+    motor.cargar_columnas(
+        np.arange(1, args.filas + 1),
+        rng.integers(1, args.aerolineas + 1, args.filas),
+        rng.integers(1, args.aeropuertos + 1, args.filas),
+        rng.integers(1, 3, args.filas),
+        (date(2015, 1, 1) - EPOCA).days + rng.integers(0, args.dias, args.filas)
+    )
+    print(f"  carga desde arreglos: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    medir_motor(motor, args.repeticiones)
+
+
+def contra_sql(args: argparse.Namespace) -> None:
+    from app import create_app
+    from app.infrastructure.database.connection import db
+    from app.domain.repositories.vuelo_repository import VueloRepository
+    from app.domain.repositories.aerolinea_repository import AerolineaRepository
+    from app.domain.repositories.aeropuerto_repository import AeropuertoRepository
+    from app.domain.repositories.movimiento_repository import MovimientoRepository
+
+    app = create_app()
+    with app.app_context():
+        if args.sembrar:
+            inicio = time.perf_counter()
+            db.session.execute(SEMBRAR_SQL, {'filas': args.filas, 'dias': args.dias})
+            db.session.commit()
+            db.session.execute(text('ANALYZE vuelos'))
+            db.session.commit()
+            print(f"Sembrados {args.filas:,} vuelos en {time.perf_counter() - inicio:.1f} s")
+            if not args.sql:
+                return
+
+        total = db.session.execute(text('SELECT count(*) FROM vuelos')).scalar()
+        print(f"Camino SQL ({total:,} vuelos)")
+        medir('obtener_metricas_sql', VueloRepository.obtener_metricas_sql, args.repeticiones)
+        medir('obtener_estadisticas_lote (todas)', AerolineaRepository.obtener_estadisticas_lote, args.repeticiones)
+        medir('obtener_mas_ocupado (aeropuertos)', AeropuertoRepository.obtener_mas_ocupado, args.repeticiones)
+        medir('obtener_estadisticas (movimientos)', MovimientoRepository.obtener_estadisticas, args.repeticiones)
+
+        print("Motor columnar sobre la misma base")
+        motor = MotorMetricasColumnar()
+        inicio = time.perf_counter()
+        motor.reconstruir()
+        print(f"  carga desde PostgreSQL: {(time.perf_counter() - inicio):.1f} s "
+              f"({sum(c.nbytes for c in motor.columnas.values()) / 2 ** 20:.0f} MiB)")
+        medir_motor(motor, args.repeticiones)
+        consistencia = motor.verificar_consistencia(VueloRepository.obtener_metricas_sql())
+        print(f"  consistente con SQL: {consistencia['consistente']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=10_000_000)
+    parser.add_argument('--aerolineas', type=int, default=50)
+    parser.add_argument('--aeropuertos', type=int, default=300)
+    parser.add_argument('--dias', type=int, default=3650)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--sql', action='store_true', help='Comparar contra la base de DATABASE_URL')
+    parser.add_argument('--sembrar', action='store_true', help='Insertar --filas vuelos sintéticos (PostgreSQL)')
+    args = parser.parse_args()
+
+    if args.sql or args.sembrar:
+        contra_sql(args)
+    else:
+        sinteticos(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import os
+import tempfile
+from datetime import date
+
+import pytest
+
+# La configuración se lee del entorno al importar la app: una base SQLite propia para las pruebas
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pruebas.db')}")
+
+from flask import Flask  # noqa: E402
+from app.domain.entities.aerolinea import Aerolinea  # noqa: E402
+from app.domain.entities.aeropuerto import Aeropuerto  # noqa: E402
+from app.domain.entities.movimiento import Movimiento  # noqa: E402
+from app.domain.entities.vuelo import Vuelo  # noqa: E402
+from app.domain.events import bus_eventos  # noqa: E402
+from app.infrastructure.database.connection import db, init_db  # noqa: E402
+
+AEROLINEAS = {1: 'Volaris', 2: 'Aeromar', 3: 'Interjet', 4: 'Aeroméxico'}
+AEROPUERTOS = {1: 'Benito Juárez', 2: 'Guanajuato', 3: 'La Paz', 4: 'Oaxaca'}
+MOVIMIENTOS = {1: 'Salida', 2: 'Llegada'}
+# (id_aerolinea, id_aeropuerto, id_movimiento, dia)
+VUELOS = [
+    (1, 1, 1, date(2021, 5, 2)),
+    (2, 1, 1, date(2021, 5, 2)),
+    (3, 2, 2, date(2021, 5, 2)),
+    (4, 3, 2, date(2021, 5, 2)),
+    (1, 3, 2, date(2021, 5, 2)),
+    (1, 3, 1, date(2021, 5, 2)),
+    (2, 3, 1, date(2021, 5, 4)),
+    (2, 1, 1, date(2021, 5, 4)),
+    (2, 1, 1, date(2021, 5, 4)),
+]
+
+
+@pytest.fixture
+def app():
+    """Aplicación mínima con la base de datos de pruebas, dentro de un app context."""
+    aplicacion = Flask(__name__)
+    init_db(aplicacion)
+    with aplicacion.app_context():
+        db.create_all()
+        yield aplicacion
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def datos(app):
+    """Catálogos y vuelos de ejemplo (los mismos de la carga inicial)."""
+    db.session.add_all([Aerolinea(id_aerolinea=i, nombre_aerolinea=n) for i, n in AEROLINEAS.items()])
+    db.session.add_all([Aeropuerto(id_aeropuerto=i, nombre_aeropuerto=n) for i, n in AEROPUERTOS.items()])
+    db.session.add_all([Movimiento(id_movimiento=i, descripcion=n) for i, n in MOVIMIENTOS.items()])
+    db.session.add_all([
+        Vuelo(id_aerolinea=aerolinea, id_aeropuerto=aeropuerto, id_movimiento=movimiento, dia=dia)
+        for aerolinea, aeropuerto, movimiento, dia in VUELOS
+    ])
+    db.session.commit()
+
+
+@pytest.fixture(autouse=True)
+def suscriptores():
+    """Restaura los suscriptores del bus de eventos global al terminar cada prueba."""
+    originales = {entidad: list(manejadores) for entidad, manejadores in bus_eventos._suscriptores.items()}
+    yield
+    bus_eventos._suscriptores.clear()
+    bus_eventos._suscriptores.update(originales)
@@ -0,0 +1,91 @@
+import pytest
+
+from app.domain.entities.aerolinea import Aerolinea
+from app.domain.events import EventoDominio
+from app.domain.repositories.aerolinea_repository import AerolineaRepository
+from app.domain.services.aerolinea_service import AerolineaService
+from app.infrastructure.busqueda.autocompletado import (
+    IndicePrefijos, autocompletar, indice_aerolineas, normalizar
+)
+
+
+@pytest.fixture
+def indice(datos):
+    indice = IndicePrefijos('aerolinea', Aerolinea, 'id_aerolinea', 'nombre_aerolinea')
+    indice.cargar()
+    return indice
+
+
+def nombres(sugerencias):
+    return [(s['nombre_aerolinea'], s['coincidencia']) for s in sugerencias]
+
+
+def test_normalizar():
+    assert normalizar('  Aeroméxico   Connect ') == 'aeromexico connect'
+
+
+def test_prefijo_sin_acentos_ni_mayusculas(indice):
+    assert nombres(autocompletar(indice, 'AERO', 10)) == [
+        ('Aeromar', 'prefijo'), ('Aeroméxico', 'prefijo')
+    ]
+    assert nombres(autocompletar(indice, 'aerome', 10)) == [('Aeroméxico', 'prefijo')]
+
+
+def test_prefijo_de_una_palabra_interna(indice):
+    indice.aplicar_evento(EventoDominio('aerolinea', 'creado', despues={
+        'id_aerolinea': 5, 'nombre_aerolinea': 'American Airlines'}))
+    assert nombres(autocompletar(indice, 'airl', 10)) == [('American Airlines', 'prefijo')]
+
+
+def test_limite(indice):
+    assert len(autocompletar(indice, 'a', 1)) == 1
+
+
+def test_eventos_mantienen_el_indice(indice):
+    indice.aplicar_evento(EventoDominio('aerolinea', 'actualizado',
+                                        antes={'id_aerolinea': 2, 'nombre_aerolinea': 'Aeromar'},
+                                        despues={'id_aerolinea': 2, 'nombre_aerolinea': 'TAR Aerolíneas'}))
+    indice.aplicar_evento(EventoDominio('aerolinea', 'eliminado_lote', lote=(
+        EventoDominio('aerolinea', 'eliminado', antes={'id_aerolinea': 3, 'nombre_aerolinea': 'Interjet'}),
+    )))
+
+    assert nombres(autocompletar(indice, 'aero', 10)) == [('Aeroméxico', 'prefijo'), ('TAR Aerolíneas', 'prefijo')]
+    assert autocompletar(indice, 'inter', 10) == []
+
+
+def test_completa_con_coincidencias_difusas_sin_repetir(indice):
+    def similares(texto, limite, umbral):
+        return [(1, 'Volaris', 0.4), (4, 'Aeroméxico', 0.35), (2, 'Aeromar', 0.3)]
+
+    assert nombres(autocompletar(indice, 'aeromex', 3, similares)) == [
+        ('Aeroméxico', 'prefijo'), ('Volaris', 'difusa'), ('Aeromar', 'difusa')
+    ]
+
+
+def test_sin_busqueda_difusa_cuando_alcanzan_los_prefijos(indice):
+    def similares(texto, limite, umbral):
+        raise AssertionError('no debería consultarse')
+
+    assert len(autocompletar(indice, 'aero', 2, similares)) == 2
+
+
+def test_falla_difusa_responde_con_los_prefijos(indice):
+    def similares(texto, limite, umbral):
+        raise RuntimeError('function similarity(character varying, unknown) does not exist')
+
+    assert nombres(autocompletar(indice, 'aerom', 10, similares)) == [
+        ('Aeromar', 'prefijo'), ('Aeroméxico', 'prefijo')
+    ]
+
+
+def test_repositorio_sin_pg_trgm_devuelve_none(datos):
+    # SQLite no tiene pg_trgm: el repositorio lo indica con None en lugar de fallar
+    assert AerolineaRepository.buscar_similares('volaris', 10, 0.3) is None
+
+
+def test_servicio_sin_pg_trgm_responde_por_prefijo(datos):
+    indice_aerolineas.cargar()
+    servicio = AerolineaService(AerolineaRepository())
+
+    assert nombres(servicio.autocompletar('vol')) == [('Volaris', 'prefijo')]
+    assert servicio.autocompletar('volaris airlines') == []
@@ -0,0 +1,114 @@
+from datetime import date
+
+import pytest
+
+from app.api.inputs import codificar_cursor, decodificar_cursor
+from app.domain.entities.vuelo import Vuelo
+from app.domain.repositories.vuelo_repository import VueloRepository
+from app.domain.services.vuelo_service import VueloService
+
+SIN_FILTROS = {'ids_aerolineas': None, 'ids_aeropuertos': None, 'ids_movimientos': None,
+               'desde': None, 'hasta': None}
+
+
+@pytest.fixture
+def servicio(datos):
+    return VueloService(VueloRepository())
+
+
+def recorrer(servicio, filtros, orden, limite):
+    """Pide páginas siguiendo `siguiente_cursor` hasta el final; devuelve (ids, páginas)."""
+    ids, paginas, cursor = [], [], None
+    while True:
+        pagina = servicio.buscar_vuelos(filtros, orden=orden, cursor=cursor, limite=limite)
+        paginas.append(pagina)
+        ids.extend(v['id'] for v in pagina['resultados'])
+        cursor = pagina['siguiente_cursor']
+        if cursor is None:
+            return ids, paginas
+
+
+def test_cursor_ida_y_vuelta():
+    cursor = codificar_cursor('dia', date(2021, 5, 2), 7)
+    assert '=' not in cursor
+    assert decodificar_cursor(cursor) == ('dia', '2021-05-02', '7')
+
+
+@pytest.mark.parametrize('cursor', ['a', '_w'])
+def test_cursor_invalido(cursor):
+    # Base64 truncado y bytes que no son UTF-8
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor)
+
+
+@pytest.mark.parametrize('orden, clave', [
+    ('dia', lambda v: (v.dia, v.id)),
+    ('-dia', lambda v: (-v.dia.toordinal(), -v.id)),
+    ('id', lambda v: v.id),
+    ('-id', lambda v: -v.id),
+])
+@pytest.mark.parametrize('limite', [1, 2, 4, 20])
+def test_recorrido_por_clave_coincide_con_el_orden_completo(servicio, orden, clave, limite):
+    esperado = [v.id for v in sorted(Vuelo.query.all(), key=clave)]
+
+    ids, paginas = recorrer(servicio, SIN_FILTROS, orden, limite)
+
+    assert ids == esperado
+    assert all(len(p['resultados']) <= limite for p in paginas)
+    # El total solo se calcula en la primera página
+    assert paginas[0]['total'] == 9 and paginas[0]['total_exacto'] is True
+    assert all(p['total'] is None for p in paginas[1:])
+
+
+def test_recorrido_con_filtros(servicio):
+    filtros = {**SIN_FILTROS, 'ids_aerolineas': (1, 2), 'ids_movimientos': (1,), 'desde': date(2021, 5, 3)}
+
+    ids, paginas = recorrer(servicio, filtros, 'dia', 1)
+
+    esperado = [v.id for v in Vuelo.query.filter(Vuelo.id_aerolinea.in_([1, 2]), Vuelo.id_movimiento == 1,
+                                                 Vuelo.dia >= date(2021, 5, 3)).order_by(Vuelo.dia, Vuelo.id)]
+    assert ids == esperado and len(ids) == 3
+    assert paginas[0]['total'] == 3
+
+
+def test_escrituras_entre_paginas_no_repiten_ni_saltan_filas(servicio):
+    primera = servicio.buscar_vuelos(SIN_FILTROS, orden='id', limite=3)
+    # Con OFFSET, borrar una fila ya vista desplazaría la siguiente página
+    VueloRepository.eliminar(primera['resultados'][0]['id'])
+
+    segunda = servicio.buscar_vuelos(SIN_FILTROS, orden='id', cursor=primera['siguiente_cursor'], limite=3)
+
+    assert [v['id'] for v in segunda['resultados']] == [4, 5, 6]
+
+
+def test_cursor_de_otro_orden_se_rechaza(servicio):
+    pagina = servicio.buscar_vuelos(SIN_FILTROS, orden='dia', limite=2)
+
+    respuesta, codigo = servicio.buscar_vuelos(SIN_FILTROS, orden='-id', cursor=pagina['siguiente_cursor'])
+
+    assert codigo == 400
+    assert respuesta == {'error': 'cursor inválido'}
+
+
+@pytest.mark.parametrize('cursor', ['no-es-un-cursor', codificar_cursor('dia', 'ayer', 1), codificar_cursor('dia')])
+def test_cursor_malformado_se_rechaza(servicio, cursor):
+    assert servicio.buscar_vuelos(SIN_FILTROS, orden='dia', cursor=cursor)[1] == 400
+
+
+def test_rango_de_dias_invertido(servicio):
+    filtros = {**SIN_FILTROS, 'desde': date(2021, 5, 4), 'hasta': date(2021, 5, 2)}
+    assert servicio.buscar_vuelos(filtros)[1] == 400
+
+
+def test_aerolineas_frecuentes_por_cursor(servicio):
+    paginas, cursor = [], None
+    while True:
+        pagina = servicio.obtener_aerolineas_frecuentes(min_vuelos=2, cursor=cursor, limite=1)
+        paginas.append(pagina)
+        cursor = pagina['siguiente_cursor']
+        if cursor is None:
+            break
+
+    assert [(f['id_aerolinea'], f['dia'], f['total_vuelos']) for p in paginas for f in p['resultados']] == [
+        (1, '2021-05-02', 3), (2, '2021-05-04', 3)
+    ]
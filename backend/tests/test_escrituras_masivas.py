@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+from app.domain.entities.vuelo import Vuelo
+from app.domain.events import EventoDominio, bus_eventos
+from app.domain.repositories.vuelo_repository import VueloRepository
+from app.infrastructure.analytics.metricas_incrementales import MotorMetricas
+
+
+@pytest.fixture
+def motor(datos):
+    motor = MotorMetricas()
+    bus_eventos.suscribir('vuelo', motor.aplicar_evento)
+    motor.reconstruir()
+    return motor
+
+
+@pytest.fixture
+def eventos():
+    """Eventos de vuelos publicados durante la prueba."""
+    recibidos = []
+    bus_eventos.suscribir('vuelo', recibidos.append)
+    return recibidos
+
+
+def test_eliminar_por_filtro_confirma_y_publica_por_trozos(motor, eventos):
+    trozos = list(VueloRepository.eliminar_por_filtro({'id_aerolinea': 2}, tamano_lote=2))
+
+    assert trozos == [2, 2]
+    assert Vuelo.query.filter_by(id_aerolinea=2).count() == 0
+    assert [e.accion for e in eventos] == ['eliminado_lote', 'eliminado_lote']
+    assert [len(e.lote) for e in eventos] == [2, 2]
+    assert all(individual.antes['id_aerolinea'] == 2 for e in eventos for individual in e.lote)
+
+    # El motor aplica cada fila del lote
+    resultado = motor.verificar_consistencia(VueloRepository.obtener_metricas_sql())
+    assert resultado['consistente'], resultado['diferencias']
+    assert 2 not in motor.por_aerolinea.conteos
+    assert motor.aerolineas_mas_de_dos_vuelos() == [
+        {'id_aerolinea': 1, 'nombre_aerolinea': 'Volaris', 'dia': '2021-05-02', 'total_vuelos': 3}
+    ]
+
+
+def test_eliminar_por_filtro_respeta_el_rango_de_dias(motor, eventos):
+    total = sum(VueloRepository.eliminar_por_filtro({'desde': date(2021, 5, 3), 'hasta': date(2021, 5, 31)}))
+
+    assert total == 3
+    assert Vuelo.query.count() == 6
+    assert motor.por_dia.conteos == {date(2021, 5, 2): 6}
+
+
+def test_eliminar_por_filtro_sin_coincidencias_no_publica(motor, eventos):
+    assert list(VueloRepository.eliminar_por_filtro({'id_aeropuerto': 4})) == []
+    assert eventos == []
+
+
+def test_lote_de_actualizaciones_se_aplica_fila_por_fila(motor):
+    # Lo que publica `actualizar_por_filtro` al pasar los vuelos de Aeromar del 2021-05-04 a Interjet
+    filas = VueloRepository.buscar({'ids_aerolineas': [2], 'desde': date(2021, 5, 4)})
+    motor.aplicar_evento(EventoDominio('vuelo', 'actualizado_lote', lote=tuple(
+        EventoDominio('vuelo', 'actualizado',
+                      antes={'id': f.id, 'id_aerolinea': 2, 'id_aeropuerto': f.id_aeropuerto, 'dia': f.dia},
+                      despues={'id': f.id, 'id_aerolinea': 3, 'id_aeropuerto': f.id_aeropuerto, 'dia': f.dia})
+        for f in filas
+    )))
+
+    assert motor.por_aerolinea.conteos[2] == 1
+    assert motor.por_aerolinea.conteos[3] == 4
+    assert [(f['id_aerolinea'], f['total_vuelos']) for f in motor.aerolineas_mas_de_dos_vuelos()] == [(1, 3), (3, 3)]
@@ -0,0 +1,188 @@
+import json
+from datetime import date
+
+import pytest
+
+from app.domain.events import EventoDominio
+from app.infrastructure.streaming import flujo_cambios
+from app.infrastructure.streaming.flujo_cambios import (
+    MAX_BYTES_NOTIFY, DifusorCambios, _trocear, construir_mensaje, delta_metricas
+)
+
+VUELO = {'id': 1, 'id_aerolinea': 1, 'id_aeropuerto': 1, 'id_movimiento': 1, 'dia': '2021-05-02'}
+
+
+@pytest.fixture(autouse=True)
+def latido_corto(monkeypatch):
+    # Una conexión sin eventos pendientes no se queda 15 s esperando
+    monkeypatch.setattr(flujo_cambios, 'FLUJO_LATIDO_S', 0.01)
+
+
+def bloque(texto):
+    """(id, evento, datos) de un bloque SSE; None para el `retry` inicial y los latidos."""
+    campos = dict(linea.split(': ', 1) for linea in texto.strip().split('\n') if not linea.startswith(':'))
+    if 'event' not in campos:
+        return None
+    return campos['id'], campos['event'], json.loads(campos['data'])
+
+
+def siguientes(flujo, cantidad):
+    """Los próximos `cantidad` eventos del flujo, saltando latidos."""
+    eventos = []
+    while len(eventos) < cantidad:
+        evento = bloque(next(flujo))
+        if evento is not None:
+            eventos.append(evento)
+    return eventos
+
+
+def creado(id_vuelo):
+    return construir_mensaje('creado', [(None, {**VUELO, 'id': id_vuelo})])
+
+
+def test_conexion_nueva_recibe_solo_eventos_posteriores():
+    difusor = DifusorCambios()
+    difusor.aplicar(creado(1))
+    flujo = difusor.escuchar()
+    assert next(flujo).startswith('retry:')
+
+    difusor.aplicar(creado(2))
+
+    (id_vuelo, tipo, datos), (id_metricas, tipo_metricas, delta) = siguientes(flujo, 2)
+    assert tipo == 'vuelo' and datos['accion'] == 'creado' and datos['despues']['id'] == 2
+    assert id_vuelo == f'{difusor.instancia}-3'
+    assert tipo_metricas == 'metricas' and id_metricas == f'{difusor.instancia}-4'
+    assert delta == {'total': 1, 'por_aeropuerto': {'1': 1}, 'por_aerolinea': {'1': 1},
+                     'por_dia': {'2021-05-02': 1}}
+
+
+def test_reanuda_desde_last_event_id():
+    difusor = DifusorCambios()
+    for id_vuelo in (1, 2, 3):
+        difusor.aplicar(creado(id_vuelo))
+
+    flujo = difusor.escuchar(f'{difusor.instancia}-2')
+    next(flujo)
+
+    eventos = siguientes(flujo, 4)
+    assert [e[0] for e in eventos] == [f'{difusor.instancia}-{n}' for n in (3, 4, 5, 6)]
+    assert [e[2]['despues']['id'] for e in eventos if e[1] == 'vuelo'] == [2, 3]
+
+
+@pytest.mark.parametrize('ultimo_id', ['otra-2', 'basura', '{instancia}-99'])
+def test_last_event_id_desconocido_pide_reinicio(ultimo_id):
+    difusor = DifusorCambios()
+    difusor.aplicar(creado(1))
+
+    flujo = difusor.escuchar(ultimo_id.format(instancia=difusor.instancia))
+    next(flujo)
+
+    assert siguientes(flujo, 1) == [(f'{difusor.instancia}-2', 'reinicio', {})]
+    # Después del reinicio sigue con los eventos nuevos
+    difusor.aplicar(creado(2))
+    assert siguientes(flujo, 1)[0][0] == f'{difusor.instancia}-3'
+    assert difusor.resumen()['reinicios_enviados'] == 1
+
+
+def test_last_event_id_fuera_de_la_retencion_pide_reinicio(monkeypatch):
+    monkeypatch.setattr(flujo_cambios, 'FLUJO_RETENCION', 4)
+    difusor = DifusorCambios()
+    for id_vuelo in range(1, 5):
+        difusor.aplicar(creado(id_vuelo))
+
+    # Retiene los eventos 5..8: se puede reanudar desde el 4, no desde el 3
+    reanudable = difusor.escuchar(f'{difusor.instancia}-4')
+    next(reanudable)
+    assert siguientes(reanudable, 1)[0][0] == f'{difusor.instancia}-5'
+
+    vencido = difusor.escuchar(f'{difusor.instancia}-3')
+    next(vencido)
+    assert siguientes(vencido, 1)[0][1] == 'reinicio'
+
+
+def test_cliente_que_se_queda_atras_recibe_reinicio(monkeypatch):
+    monkeypatch.setattr(flujo_cambios, 'FLUJO_RETENCION', 4)
+    difusor = DifusorCambios()
+    flujo = difusor.escuchar()
+    next(flujo)
+    difusor.aplicar(creado(1))
+    assert siguientes(flujo, 1)[0][0] == f'{difusor.instancia}-1'
+    flujo.close()
+
+    # Una conexión que no lee mientras se publican más eventos de los retenidos
+    flujo = difusor.escuchar(f'{difusor.instancia}-1')
+    for id_vuelo in range(2, 6):
+        difusor.aplicar(creado(id_vuelo))
+    next(flujo)
+
+    assert siguientes(flujo, 1) == [(f'{difusor.instancia}-10', 'reinicio', {})]
+
+
+def test_reinicio_global_llega_a_las_conexiones():
+    difusor = DifusorCambios()
+    flujo = difusor.escuchar()
+    next(flujo)
+
+    difusor.reiniciar()
+
+    assert siguientes(flujo, 1) == [(f'{difusor.instancia}-1', 'reinicio', {})]
+
+
+def test_cambio_que_no_mueve_conteos_no_publica_metricas():
+    difusor = DifusorCambios()
+    difusor.aplicar(construir_mensaje('actualizado', [(VUELO, {**VUELO, 'id_movimiento': 2})]))
+    assert [e.tipo for e in difusor._eventos] == ['vuelo']
+
+
+def test_lote_grande_se_anuncia_sin_filas(monkeypatch):
+    monkeypatch.setattr(flujo_cambios, 'FLUJO_MAX_FILAS_LOTE', 2)
+    filas = [({**VUELO, 'id': n}, None) for n in range(1, 4)]
+    difusor = DifusorCambios()
+
+    difusor.aplicar(construir_mensaje('eliminado_lote', filas))
+
+    assert [(e.tipo, json.loads(e.datos)) for e in difusor._eventos] == [
+        ('vuelos_lote', {'accion': 'eliminado_lote', 'filas': 3}),
+        ('metricas', {'total': -3, 'por_aeropuerto': {'1': -3}, 'por_aerolinea': {'1': -3},
+                      'por_dia': {'2021-05-02': -3}})
+    ]
+
+
+def test_delta_de_una_actualizacion():
+    delta = delta_metricas([(VUELO, {**VUELO, 'id_aeropuerto': 2})])
+    assert delta == {'total': 0, 'por_aeropuerto': {'1': -1, '2': 1}, 'por_aerolinea': {}, 'por_dia': {}}
+
+
+def test_mensajes_grandes_se_trocean_para_notify():
+    filas = [(None, {**VUELO, 'id': n}) for n in range(150)]
+    partes = [json.loads(p) for p in _trocear(construir_mensaje('creado', filas))]
+
+    assert len(partes) > 1
+    assert all(len(json.dumps(p, separators=(',', ':')).encode()) <= MAX_BYTES_NOTIFY for p in partes)
+    assert [f[1]['id'] for p in partes for f in p['filas']] == list(range(150))
+    # El delta viaja una sola vez, en la última parte
+    assert [p['delta'] is not None for p in partes] == [False] * (len(partes) - 1) + [True]
+
+
+def test_limite_de_conexiones(monkeypatch):
+    monkeypatch.setattr(flujo_cambios, 'FLUJO_MAX_CONEXIONES', 1)
+    difusor = DifusorCambios()
+
+    assert difusor.conectar()
+    assert not difusor.conectar()
+    difusor.desconectar()
+    assert difusor.conectar()
+    assert difusor.resumen()['rechazadas'] == 1
+
+
+def test_eventos_del_bus_llegan_al_difusor(monkeypatch):
+    difusor = DifusorCambios()
+    monkeypatch.setattr(flujo_cambios, 'difusor_cambios', difusor)
+
+    flujo_cambios.publicar_cambio_vuelo(EventoDominio('vuelo', 'eliminado_lote', lote=(
+        EventoDominio('vuelo', 'eliminado', antes={**VUELO, 'dia': date(2021, 5, 2)}),
+    )))
+
+    vuelo, metricas = [json.loads(e.datos) for e in difusor._eventos]
+    assert vuelo == {'accion': 'eliminado', 'antes': VUELO, 'despues': None}
+    assert metricas['total'] == -1
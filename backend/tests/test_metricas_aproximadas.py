@@ -0,0 +1,88 @@
+from datetime import date
+
+import pytest
+
+from app.domain.events import EventoDominio, bus_eventos
+from app.domain.repositories.vuelo_repository import VueloRepository
+from app.infrastructure.analytics.metricas_aproximadas import MotorMetricasAproximadas
+
+
+@pytest.fixture
+def motor(datos):
+    """Motor suscrito a los eventos de vuelos y todavía sin cargar, como al arrancar un worker."""
+    motor = MotorMetricasAproximadas()
+    bus_eventos.suscribir('vuelo', motor.aplicar_evento)
+    return motor
+
+
+def escribir_durante_la_carga(motor, escribir):
+    """Ejecuta `escribir` después de leer las dimensiones y antes de leer los vuelos."""
+    cargar = motor.dimensiones.cargar
+
+    def cargar_y_escribir():
+        cargar()
+        escribir()
+
+    motor.dimensiones.cargar = cargar_y_escribir
+
+
+def test_carga_por_particiones(motor):
+    metricas = motor.obtener_metricas()
+
+    assert metricas['dia_mas_ocupado'] == [{'dia': '2021-05-02', 'total_vuelos': 6}]
+    assert [(f['id_aerolinea'], f['dia'], f['total_vuelos']) for f in metricas['aerolineas_mas_de_dos_vuelos']] == [
+        (1, '2021-05-02', 3), (2, '2021-05-04', 3)
+    ]
+
+
+def test_eventos_durante_la_primera_carga_no_se_pierden_ni_se_duplican(motor):
+    def escribir():
+        # Confirmado antes de la consulta agrupada: la carga ya lo cuenta y el evento no se reaplica
+        VueloRepository.crear({'id_aerolinea': 3, 'id_aeropuerto': 4, 'id_movimiento': 1,
+                               'dia': date(2021, 5, 4)})
+        # Cambio que la consulta agrupada no llega a ver (su fila no está en la base)
+        motor.aplicar_evento(EventoDominio('vuelo', 'creado', despues={
+            'id': 1000, 'id_aerolinea': 3, 'id_aeropuerto': 4, 'dia': '2021-05-04'}))
+
+    escribir_durante_la_carga(motor, escribir)
+    motor.reconstruir()
+
+    assert motor.por_dia.conteos[date(2021, 5, 4)] == 5
+    assert motor.aeropuertos_cm.estimar(4) == 2
+    assert motor.particiones[date(2021, 5, 4)].aerolineas_cm.estimar(3) == 2
+    assert not motor._cargando and not motor._pendientes
+
+
+def test_recarga_sigue_respondiendo_con_el_estado_anterior(motor):
+    motor.reconstruir()
+
+    def escribir():
+        VueloRepository.eliminar(1)
+        assert motor._pendientes and motor.por_dia.conteos[date(2021, 5, 2)] == 6
+
+    escribir_durante_la_carga(motor, escribir)
+    motor.reconstruir()
+
+    assert motor.por_dia.conteos[date(2021, 5, 2)] == 5
+    assert motor.aerolineas_cm.estimar(1) == 2
+    assert motor.obtener_metricas()['aerolineas_mas_de_dos_vuelos'] == [{
+        'id_aerolinea': 2, 'nombre_aerolinea': 'Aeromar', 'dia': '2021-05-04', 'total_vuelos': 3, 'error_maximo': 0
+    }]
+
+
+def test_eventos_antes_de_la_carga_se_ignoran(motor):
+    motor.aplicar_evento(EventoDominio('vuelo', 'creado', despues={
+        'id': 1000, 'id_aerolinea': 1, 'id_aeropuerto': 1, 'dia': date(2021, 5, 2)}))
+
+    assert motor.obtener_metricas()['dia_mas_ocupado'][0]['total_vuelos'] == 6
+
+
+def test_carga_fallida_deja_de_encolar(motor, monkeypatch):
+    def fallar():
+        raise RuntimeError('sin conexión')
+
+    monkeypatch.setattr(motor.dimensiones, 'cargar', fallar)
+    with pytest.raises(RuntimeError):
+        motor.reconstruir()
+    assert not motor._cargando and not motor._pendientes
+    assert not motor.cargado
@@ -0,0 +1,95 @@
+from datetime import date
+
+import pytest
+
+from app.domain.events import EventoDominio, bus_eventos
+from app.domain.repositories.vuelo_repository import VueloRepository
+from app.infrastructure.analytics.metricas_columnares import MotorMetricasColumnar
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def motor(datos):
+    """Motor suscrito a los eventos de vuelos y todavía sin cargar, como al arrancar un worker."""
+    motor = MotorMetricasColumnar()
+    bus_eventos.suscribir('vuelo', motor.aplicar_evento)
+    return motor
+
+
+def assert_consistente(motor):
+    resultado = motor.verificar_consistencia(VueloRepository.obtener_metricas_sql())
+    assert resultado['consistente'], resultado['diferencias']
+
+
+def escribir_durante_la_carga(motor, escribir):
+    """Ejecuta `escribir` después de leer las dimensiones y antes de leer los vuelos."""
+    cargar = motor.dimensiones.cargar
+
+    def cargar_y_escribir():
+        cargar()
+        escribir()
+
+    motor.dimensiones.cargar = cargar_y_escribir
+
+
+def test_carga_coincide_con_sql(motor):
+    motor.reconstruir()
+    assert_consistente(motor)
+    assert motor.n == 9
+
+
+def test_eventos_durante_la_primera_carga_no_se_pierden_ni_se_duplican(motor):
+    def escribir():
+        # Confirmado antes de leer los vuelos: la carga ya lo incluye y reaplicarlo no lo duplica
+        VueloRepository.crear({'id_aerolinea': 3, 'id_aeropuerto': 4, 'id_movimiento': 1,
+                               'dia': date(2021, 5, 4)})
+        # Cambios cuyas filas la carga no llega a ver
+        motor.aplicar_evento(EventoDominio('vuelo', 'creado', despues={
+            'id': 1000, 'id_aerolinea': 3, 'id_aeropuerto': 4, 'id_movimiento': 1, 'dia': '2021-05-04'}))
+        motor.aplicar_evento(EventoDominio('vuelo', 'eliminado', antes={
+            'id': 1, 'id_aerolinea': 1, 'id_aeropuerto': 1, 'id_movimiento': 1, 'dia': '2021-05-02'}))
+
+    escribir_durante_la_carga(motor, escribir)
+    motor.reconstruir()
+
+    ids, aeropuertos = motor._vista('id', 'id_aeropuerto')
+    assert list(ids) == [2, 3, 4, 5, 6, 7, 8, 9, 10, 1000]
+    assert int((aeropuertos == 4).sum()) == 2
+    assert not motor._cargando and not motor._pendientes
+
+
+def test_recarga_sigue_respondiendo_con_el_estado_anterior(motor):
+    motor.reconstruir()
+
+    def escribir():
+        # Mientras se lee la tabla, las consultas ven las columnas anteriores
+        assert motor.n == 9
+        VueloRepository.crear({'id_aerolinea': 4, 'id_aeropuerto': 4, 'id_movimiento': 1,
+                               'dia': date(2021, 5, 4)})
+        assert motor._pendientes and motor.n == 9
+
+    escribir_durante_la_carga(motor, escribir)
+    motor.reconstruir()
+
+    assert motor.n == 10
+    assert_consistente(motor)
+
+
+def test_eventos_antes_de_la_carga_se_ignoran(motor):
+    motor.aplicar_evento(EventoDominio('vuelo', 'creado', despues={
+        'id': 1000, 'id_aerolinea': 1, 'id_aeropuerto': 1, 'id_movimiento': 1, 'dia': date(2021, 5, 2)}))
+    assert not motor.cargado
+
+    assert motor.obtener_metricas()['dia_mas_ocupado'] == [{'dia': '2021-05-02', 'total_vuelos': 6}]
+
+
+def test_carga_fallida_deja_de_encolar(motor, monkeypatch):
+    def fallar():
+        raise RuntimeError('sin conexión')
+
+    monkeypatch.setattr(motor.dimensiones, 'cargar', fallar)
+    with pytest.raises(RuntimeError):
+        motor.reconstruir()
+    assert not motor._cargando and not motor._pendientes
+    assert not motor.cargado
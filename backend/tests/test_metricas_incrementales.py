@@ -0,0 +1,97 @@
+from datetime import date
+
+import pytest
+
+from app.domain.entities.vuelo import Vuelo
+from app.domain.events import EventoDominio, bus_eventos
+from app.domain.repositories.vuelo_repository import VueloRepository
+from app.infrastructure.analytics.metricas_incrementales import MotorMetricas
+
+
+@pytest.fixture
+def motor(datos):
+    """Motor cargado y suscrito a los eventos de vuelos, como con METRICAS_BACKEND=memoria."""
+    motor = MotorMetricas()
+    bus_eventos.suscribir('vuelo', motor.aplicar_evento)
+    motor.reconstruir()
+    return motor
+
+
+def assert_consistente(motor):
+    resultado = motor.verificar_consistencia(VueloRepository.obtener_metricas_sql())
+    assert resultado['consistente'], resultado['diferencias']
+
+
+def test_carga_coincide_con_sql(motor):
+    assert_consistente(motor)
+    metricas = motor.obtener_metricas()
+    assert metricas['dia_mas_ocupado'] == [{'dia': '2021-05-02', 'total_vuelos': 6}]
+    assert metricas['aerolineas_mas_de_dos_vuelos'] == [
+        {'id_aerolinea': 1, 'nombre_aerolinea': 'Volaris', 'dia': '2021-05-02', 'total_vuelos': 3},
+        {'id_aerolinea': 2, 'nombre_aerolinea': 'Aeromar', 'dia': '2021-05-04', 'total_vuelos': 3}
+    ]
+
+
+def test_alta_y_baja_actualizan_el_estado(motor):
+    vuelo = VueloRepository.crear({'id_aerolinea': 4, 'id_aeropuerto': 4, 'id_movimiento': 1,
+                                   'dia': date(2021, 5, 4)})
+    assert motor.por_aeropuerto.conteos[4] == 1
+    assert_consistente(motor)
+
+    VueloRepository.eliminar(vuelo.id)
+    assert 4 not in motor.por_aeropuerto.conteos
+    assert_consistente(motor)
+
+
+def test_actualizacion_mueve_el_vuelo_entre_grupos(motor):
+    motor.aplicar_evento(EventoDominio(
+        'vuelo', 'actualizado',
+        antes={'id': 1, 'id_aerolinea': 1, 'id_aeropuerto': 1, 'dia': '2021-05-02'},
+        despues={'id': 1, 'id_aerolinea': 2, 'id_aeropuerto': 1, 'dia': '2021-05-04'}
+    ))
+    metricas = motor.obtener_metricas()
+    assert metricas['aerolinea_mas_ocupada'][0]['id_aerolinea'] == 2
+    assert metricas['aerolinea_mas_ocupada'][0]['total_vuelos'] == 5
+    # Volaris baja a 2 vuelos el 2021-05-02 y deja de ser frecuente; Aeromar sube a 4 el 2021-05-04
+    assert [(f['id_aerolinea'], f['total_vuelos']) for f in metricas['aerolineas_mas_de_dos_vuelos']] == [(2, 4)]
+
+
+def test_eventos_antes_de_la_carga_se_ignoran(datos):
+    motor = MotorMetricas()
+    motor.aplicar_evento(EventoDominio('vuelo', 'creado', despues={
+        'id': 100, 'id_aerolinea': 1, 'id_aeropuerto': 1, 'dia': date(2021, 5, 2)}))
+    assert motor.obtener_metricas()['dia_mas_ocupado'][0]['total_vuelos'] == 6
+
+
+def test_eventos_durante_la_carga_no_se_pierden_ni_se_duplican(motor):
+    cargar = motor.dimensiones.cargar
+
+    def escribir_durante_la_carga():
+        cargar()
+        # Confirmado antes de la consulta agrupada: la carga ya lo cuenta y el evento no se reaplica
+        VueloRepository.crear({'id_aerolinea': 3, 'id_aeropuerto': 4, 'id_movimiento': 1,
+                               'dia': date(2021, 5, 4)})
+        # Cambio que la consulta agrupada no llega a ver (su fila no está en la base)
+        motor.aplicar_evento(EventoDominio('vuelo', 'creado', despues={
+            'id': 1000, 'id_aerolinea': 3, 'id_aeropuerto': 4, 'dia': '2021-05-04'}))
+
+    motor.dimensiones.cargar = escribir_durante_la_carga
+    motor.reconstruir()
+
+    assert motor.por_aeropuerto.conteos[4] == 2
+    assert motor.por_dia.conteos[date(2021, 5, 4)] == 5
+    assert not motor._cargando and not motor._pendientes
+
+
+def test_carga_fallida_deja_de_encolar(motor, monkeypatch):
+    def fallar():
+        raise RuntimeError('sin conexión')
+
+    monkeypatch.setattr(motor.dimensiones, 'cargar', fallar)
+    with pytest.raises(RuntimeError):
+        motor.reconstruir()
+    assert not motor._cargando
+
+    VueloRepository.crear({'id_aerolinea': 4, 'id_aeropuerto': 4, 'id_movimiento': 1, 'dia': date(2021, 5, 4)})
+    assert motor.por_aeropuerto.conteos[4] == 1
+    assert Vuelo.query.count() == 10
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from app.infrastructure.caching.config import CacheConfig
+from app.infrastructure.jobs.gestor import GestorTrabajos
+
+
+@pytest.fixture
+def gestor(app):
+    """Gestor con la configuración por defecto: sin caché compartida (NullCache)."""
+    assert not CacheConfig.CACHE_HABILITADA
+    gestor = GestorTrabajos(max_workers=1, max_pendientes=2)
+    gestor.init_app(app)
+    return gestor
+
+
+def esperar(gestor, id_trabajo, limite_s=5):
+    """Consulta el trabajo hasta que termina, como lo haría un cliente con GET /api/jobs/<id>."""
+    fin = time.monotonic() + limite_s
+    while time.monotonic() < fin:
+        trabajo = gestor.obtener(id_trabajo)
+        assert trabajo is not None
+        if trabajo['estado'] not in ('pendiente', 'ejecutando'):
+            return trabajo
+        time.sleep(0.01)
+    raise AssertionError('el trabajo no terminó')
+
+
+def test_trabajo_se_consulta_sin_cache(gestor):
+    trabajo, nuevo = gestor.enviar('metricas', {'top': 3}, lambda top: {'total': top})
+
+    assert nuevo
+    terminado = esperar(gestor, trabajo['id'])
+    assert terminado['estado'] == 'completado'
+    assert terminado['resultado'] == {'total': 3} and terminado['codigo'] == 200
+
+
+def test_trabajo_fallido_guarda_el_error(gestor):
+    trabajo, _ = gestor.enviar('metricas', {}, lambda: ({"error": "Aeropuerto no encontrado"}, 404))
+
+    terminado = esperar(gestor, trabajo['id'])
+    assert (terminado['estado'], terminado['error'], terminado['codigo']) == ('fallido', 'Aeropuerto no encontrado', 404)
+
+
+def test_trabajos_identicos_se_deduplican_en_el_proceso(gestor):
+    liberar = threading.Event()
+
+    def lento():
+        liberar.wait(5)
+        return 'listo'
+
+    primero, nuevo = gestor.enviar('metricas', {}, lento)
+    repetido, repetido_nuevo = gestor.enviar('metricas', {}, lento)
+    liberar.set()
+
+    assert nuevo and not repetido_nuevo
+    assert repetido['id'] == primero['id']
+    assert esperar(gestor, primero['id'])['resultado'] == 'listo'
+    # Ya terminado, el mismo reporte vuelve a encolarse
+    assert gestor.enviar('metricas', {}, lento)[1]
+
+
+def test_trabajo_expirado_deja_de_encontrarse(gestor):
+    gestor.ttl = 0
+    trabajo, _ = gestor.enviar('metricas', {}, lambda: 'listo')
+    gestor._executor.shutdown(wait=True)
+
+    assert gestor.obtener(trabajo['id']) is None
+    assert gestor._locales == {}